@@ -0,0 +1,27 @@
+"""Add PassKit push delivery outcome columns to apple_pass_registrations
+
+Revision ID: 118
+Revises: 117
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "118"
+down_revision = "117"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("apple_pass_registrations", sa.Column("last_push_at", sa.DateTime(), nullable=True))
+    op.add_column("apple_pass_registrations", sa.Column("last_push_status", sa.String(64), nullable=True))
+    op.add_column(
+        "apple_pass_registrations",
+        sa.Column("push_failure_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade():
+    op.drop_column("apple_pass_registrations", "push_failure_count")
+    op.drop_column("apple_pass_registrations", "last_push_status")
+    op.drop_column("apple_pass_registrations", "last_push_at")
@@ -0,0 +1,76 @@
+"""Add wallet_timeline_events feed table and backfill it
+
+Revision ID: 119
+Revises: 118
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "119"
+down_revision = "118"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "wallet_timeline_events",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("driver_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("event_type", sa.String(10), nullable=False),
+        sa.Column("sort_rank", sa.Integer(), nullable=False),
+        sa.Column("amount_cents", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("subtitle", sa.String(), nullable=False),
+        sa.Column("merchant_id", sa.String(), nullable=True),
+        sa.Column("redemption_id", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        "ix_wallet_timeline_driver_created",
+        "wallet_timeline_events",
+        ["driver_user_id", sa.text("created_at DESC"), "sort_rank", "id"],
+    )
+
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        source = "t.metadata->>'source'"
+        event_id = "t.metadata->>'event_id'"
+    else:
+        source = "json_extract(t.metadata, '$.source')"
+        event_id = "json_extract(t.metadata, '$.event_id')"
+
+    # Backfill EARNED events (driver_earn only; driver_redeem stays excluded)
+    op.execute(f"""
+        INSERT INTO wallet_timeline_events
+            (id, driver_user_id, event_type, sort_rank, amount_cents, title, subtitle,
+             merchant_id, redemption_id, created_at)
+        SELECT
+            'earn_' || t.id, t.driver_user_id, 'EARNED', 1, t.amount,
+            CASE
+                WHEN {source} = 'charging_session' THEN 'Charging Reward'
+                WHEN {event_id} IS NOT NULL THEN 'Event Reward'
+                ELSE 'Off-Peak Charging'
+            END,
+            'Nova issued', t.merchant_id, NULL, t.created_at
+        FROM nova_transactions t
+        WHERE t.type = 'driver_earn' AND t.driver_user_id IS NOT NULL
+    """)
+
+    # Backfill SPENT events from merchant_redemptions (the only SPENT source)
+    op.execute("""
+        INSERT INTO wallet_timeline_events
+            (id, driver_user_id, event_type, sort_rank, amount_cents, title, subtitle,
+             merchant_id, redemption_id, created_at)
+        SELECT
+            'spent_' || r.id, r.driver_user_id, 'SPENT', 0, r.nova_spent_cents,
+            COALESCE(m.name, 'Merchant ' || SUBSTR(r.merchant_id, 1, 8)),
+            'Nova applied', r.merchant_id, r.id, r.created_at
+        FROM merchant_redemptions r
+        LEFT JOIN domain_merchants m ON m.id = r.merchant_id
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_wallet_timeline_driver_created", table_name="wallet_timeline_events")
+    op.drop_table("wallet_timeline_events")
@@ -0,0 +1,33 @@
+"""Add wallet_credit_queue for the durable async wallet processor
+
+Revision ID: 120
+Revises: 119
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "120"
+down_revision = "119"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "wallet_credit_queue",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.String(), nullable=False, unique=True),
+        sa.Column("user_ref", sa.String(), nullable=False),
+        sa.Column("amount_cents", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("enqueued_at", sa.DateTime(), nullable=False),
+        sa.Column("applied_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_wallet_credit_queue_status_id", "wallet_credit_queue", ["status", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_wallet_credit_queue_status_id", table_name="wallet_credit_queue")
+    op.drop_table("wallet_credit_queue")
@@ -0,0 +1,20 @@
+"""Add content_hash to merchant_cache for write-behind change detection
+
+Revision ID: 121
+Revises: 120
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "121"
+down_revision = "120"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("merchant_cache", sa.Column("content_hash", sa.String(64), nullable=True))
+
+
+def downgrade():
+    op.drop_column("merchant_cache", "content_hash")
@@ -0,0 +1,74 @@
+"""Add daily rollup tables for admin analytics
+
+Revision ID: 122
+Revises: 121
+
+Today and the last 366 days, plus every older day with an incentive grant
+(campaign grant totals are all-time), are marked dirty so the rollup worker
+backfills them on its first passes.
+"""
+from datetime import date, datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "122"
+down_revision = "121"
+branch_labels = None
+depends_on = None
+
+BACKFILL_DAYS = 366
+
+
+def upgrade():
+    op.create_table(
+        "analytics_daily_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("session_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_kwh", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("active_drivers", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("new_drivers", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("grant_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("grants_cents", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("payout_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("payouts_cents", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "analytics_campaign_daily_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("campaign_id", sa.String(36), primary_key=True),
+        sa.Column("grant_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("grants_cents", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "analytics_charger_daily_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("charger_id", sa.String(), primary_key=True),
+        sa.Column("session_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_kwh", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("active_drivers", sa.Integer(), nullable=False, server_default="0"),
+    )
+    dirty_days = op.create_table(
+        "analytics_dirty_days",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("marked_at", sa.DateTime(), nullable=False),
+    )
+
+    now = datetime.utcnow()
+    today = now.date()
+    days = {today - timedelta(days=offset) for offset in range(0, BACKFILL_DAYS + 1)}
+    grant_days = op.get_bind().execute(
+        sa.text("SELECT DISTINCT date(created_at) FROM incentive_grants WHERE created_at IS NOT NULL")
+    ).scalars()
+    for day in grant_days:
+        # SQLite returns date() as text
+        days.add(date.fromisoformat(day) if isinstance(day, str) else day)
+    op.bulk_insert(dirty_days, [{"day": day, "marked_at": now} for day in sorted(days)])
+
+
+def downgrade():
+    op.drop_table("analytics_dirty_days")
+    op.drop_table("analytics_charger_daily_rollups")
+    op.drop_table("analytics_campaign_daily_rollups")
+    op.drop_table("analytics_daily_rollups")
@@ -0,0 +1,48 @@
+"""Add admin overview snapshot and subscription invoice payment ledger
+
+Revision ID: 123
+Revises: 122
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "123"
+down_revision = "122"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "admin_overview_snapshots",
+        sa.Column("name", sa.String(50), primary_key=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+        sa.Column("compute_ms", sa.Integer(), nullable=True),
+    )
+    op.create_table(
+        "subscription_invoice_payments",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("stripe_invoice_id", sa.String(), nullable=False, unique=True),
+        sa.Column("stripe_customer_id", sa.String(), nullable=True),
+        sa.Column("stripe_subscription_id", sa.String(), nullable=True),
+        sa.Column("amount_paid_cents", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("currency", sa.String(3), nullable=True),
+        sa.Column("paid_at", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        "ix_subscription_invoice_payments_stripe_customer_id",
+        "subscription_invoice_payments", ["stripe_customer_id"],
+    )
+    op.create_index(
+        "ix_subscription_invoice_payments_stripe_subscription_id",
+        "subscription_invoice_payments", ["stripe_subscription_id"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_subscription_invoice_payments_stripe_subscription_id", table_name="subscription_invoice_payments")
+    op.drop_index("ix_subscription_invoice_payments_stripe_customer_id", table_name="subscription_invoice_payments")
+    op.drop_table("subscription_invoice_payments")
+    op.drop_table("admin_overview_snapshots")
@@ -0,0 +1,39 @@
+"""Add weekly merchant report run / delivery checkpoints
+
+Revision ID: 124
+Revises: 123
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "124"
+down_revision = "123"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "weekly_report_runs",
+        sa.Column("week_key", sa.String(10), primary_key=True),
+        sa.Column("window_end", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("sent", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failed", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "weekly_report_deliveries",
+        sa.Column("week_key", sa.String(10), primary_key=True),
+        sa.Column("merchant_id", sa.String(36), primary_key=True),
+        sa.Column("status", sa.String(20), nullable=False, server_default="sending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("claimed_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("weekly_report_deliveries")
+    op.drop_table("weekly_report_runs")
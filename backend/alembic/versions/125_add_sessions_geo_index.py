@@ -0,0 +1,31 @@
+"""Index verified sessions by location for merchant analytics
+
+Revision ID: 125
+Revises: 124
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "125"
+down_revision = "124"
+branch_labels = None
+depends_on = None
+
+
+def _has_columns(table: str, columns) -> bool:
+    insp = sa.inspect(op.get_bind())
+    if table not in insp.get_table_names():
+        return False
+    existing = {c["name"] for c in insp.get_columns(table)}
+    return set(columns) <= existing
+
+
+def upgrade():
+    # sessions is a legacy table without a model; skip DBs that lack it
+    if _has_columns("sessions", ["status", "lat", "lng"]):
+        op.create_index("idx_sessions_status_lat_lng", "sessions", ["status", "lat", "lng"])
+
+
+def downgrade():
+    if _has_columns("sessions", ["status", "lat", "lng"]):
+        op.drop_index("idx_sessions_status_lat_lng", table_name="sessions")
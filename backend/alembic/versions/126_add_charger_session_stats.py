@@ -0,0 +1,53 @@
+"""Add per-charger session stats and covering charger indexes on session_events
+
+Rows are created by the first session write on a charger and by the nightly
+reconciliation.
+
+Revision ID: 126
+Revises: 125
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "126"
+down_revision = "125"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "charger_session_stats",
+        sa.Column("charger_id", sa.String(), primary_key=True),
+        sa.Column("sessions_7d", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sessions_30d", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("drivers_30d", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("avg_duration_30d", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("completed_sessions", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed_over_5min", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed_drivers", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("avg_completed_duration", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("open_sessions", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed_timed_sessions", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed_duration_total", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+    )
+    # Incremental updates check whether a driver has other completed sessions at a charger
+    op.create_index("ix_session_events_charger_driver", "session_events", ["charger_id", "driver_user_id"])
+
+    # Recomputing a charger's stats reads only these columns: let Postgres
+    # answer it from the (charger_id, session_start) index alone
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_session_events_charger_start", table_name="session_events")
+        op.create_index(
+            "ix_session_events_charger_start", "session_events", ["charger_id", "session_start"],
+            postgresql_include=["session_end", "duration_minutes", "driver_user_id"],
+        )
+
+
+def downgrade():
+    op.drop_index("ix_session_events_charger_driver", table_name="session_events")
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_session_events_charger_start", table_name="session_events")
+        op.create_index("ix_session_events_charger_start", "session_events", ["charger_id", "session_start"])
+    op.drop_table("charger_session_stats")
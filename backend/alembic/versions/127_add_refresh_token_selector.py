@@ -0,0 +1,26 @@
+"""Add a lookup selector to refresh_tokens
+
+New refresh tokens are "<selector>.<verifier>" and are found by an indexed
+selector lookup. Existing tokens keep a NULL selector and are migrated to the
+new format when they are next rotated.
+
+Revision ID: 127
+Revises: 126
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "127"
+down_revision = "126"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("refresh_tokens", sa.Column("selector", sa.String(32), nullable=True))
+    op.create_index("ix_refresh_tokens_selector", "refresh_tokens", ["selector"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_refresh_tokens_selector", table_name="refresh_tokens")
+    op.drop_column("refresh_tokens", "selector")
@@ -0,0 +1,30 @@
+"""Add a token-refresh lease to tesla_connections
+
+A worker that refreshes a connection's tokens first claims the lease, so
+concurrent pollers across processes coalesce onto one refresh instead of
+each rotating the refresh token.
+
+Revision ID: 128
+Revises: 127
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "128"
+down_revision = "127"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("tesla_connections", sa.Column("refresh_lease_owner", sa.String(64), nullable=True))
+    op.add_column("tesla_connections", sa.Column("refresh_lease_until", sa.DateTime(), nullable=True))
+    op.create_index(
+        "idx_tesla_connection_active_expiry", "tesla_connections", ["is_active", "token_expires_at"],
+    )
+
+
+def downgrade():
+    op.drop_index("idx_tesla_connection_active_expiry", table_name="tesla_connections")
+    op.drop_column("tesla_connections", "refresh_lease_until")
+    op.drop_column("tesla_connections", "refresh_lease_owner")
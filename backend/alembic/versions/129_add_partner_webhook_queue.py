@@ -0,0 +1,76 @@
+"""Add the durable partner webhook queue and its dead letters
+
+Webhook events are queued per partner and delivered in order by a
+background dispatcher; events that exhaust their attempts move to
+partner_webhook_dead_letters for replay. partners.webhook_batch_size lets a
+partner opt in to batched delivery.
+
+Revision ID: 129
+Revises: 128
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "129"
+down_revision = "128"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "partners",
+        sa.Column("webhook_batch_size", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.create_table(
+        "partner_webhook_deliveries",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("partner_id", sa.String(36), sa.ForeignKey("partners.id"), nullable=False),
+        sa.Column("event_id", sa.String(36), nullable=False, unique=True),
+        sa.Column("event_type", sa.String(100), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("last_status_code", sa.Integer(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("delivered_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_partner_webhook_deliveries_lane", "partner_webhook_deliveries", ["partner_id", "status", "id"],
+    )
+    op.create_index(
+        "ix_partner_webhook_deliveries_due", "partner_webhook_deliveries", ["status", "next_attempt_at"],
+    )
+    op.create_table(
+        "partner_webhook_dead_letters",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("partner_id", sa.String(36), sa.ForeignKey("partners.id"), nullable=False),
+        sa.Column("event_id", sa.String(36), nullable=False),
+        sa.Column("event_type", sa.String(100), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_status_code", sa.Integer(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("failed_at", sa.DateTime(), nullable=False),
+        sa.Column("replayed_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_partner_webhook_dead_letters_event_id", "partner_webhook_dead_letters", ["event_id"],
+    )
+    op.create_index(
+        "ix_partner_webhook_dead_letters_partner", "partner_webhook_dead_letters", ["partner_id", "replayed_at"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_partner_webhook_dead_letters_partner", table_name="partner_webhook_dead_letters")
+    op.drop_index("ix_partner_webhook_dead_letters_event_id", table_name="partner_webhook_dead_letters")
+    op.drop_table("partner_webhook_dead_letters")
+    op.drop_index("ix_partner_webhook_deliveries_due", table_name="partner_webhook_deliveries")
+    op.drop_index("ix_partner_webhook_deliveries_lane", table_name="partner_webhook_deliveries")
+    op.drop_table("partner_webhook_deliveries")
+    op.drop_column("partners", "webhook_batch_size")
@@ -0,0 +1,138 @@
+"""Move monitored stations to the DB and add hour-of-week occupancy totals
+
+The availability collector's station list becomes the monitored_stations
+table (seeded with the stations it polled until now). Each station is linked
+to the charger at its address where one exists, and existing snapshots of
+linked stations are re-keyed from the synthetic station id to that
+charger's id, so occupancy patterns and forecasts line up with chargers.
+charger_occupancy_hour_of_week keeps running occupancy totals per charger
+and hour of week so pattern queries don't scan charger_availability_snapshots;
+on PostgreSQL it is backfilled from the existing snapshots.
+
+Revision ID: 130
+Revises: 129
+"""
+import re
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "130"
+down_revision = "129"
+branch_labels = None
+depends_on = None
+
+SEED_STATIONS = [
+    ("tomtom_domain_1", "ChargePoint @ 11505 Domain Dr", "a70292d8-fde5-41eb-b9c0-61829cda02c0", "austin"),
+    ("tomtom_domain_2", "ChargePoint @ 11811 Domain Dr", "3b359414-28af-48c6-9554-29bd34aee61c", "austin"),
+    ("tomtom_domain_3", "ChargePoint @ 11600 Alterra Pkwy", "b0c3386d-89ba-4b46-95a8-58b0f6a44b44", "austin"),
+    ("tomtom_domain_4", "ChargePoint @ 3004 Palm Way (A)", "623d43b7-7768-4739-add0-4f9f859fbff7", "austin"),
+    ("tomtom_domain_5", "ChargePoint @ 3004 Palm Way (B)", "1283fbc0-6385-4b8b-8432-7ba103a7e5cf", "austin"),
+    ("tomtom_domain_6", "ChargePoint @ 3000 Kramer Ln", "b1e3f371-8538-4839-b940-d50673105ba4", "austin"),
+    ("tomtom_domain_7", "ChargePoint @ 11500 N MoPac", "edfce375-5a14-4943-ac46-32c582963b3b", "austin"),
+    ("tomtom_domain_8", "ChargePoint @ 11800 Alterra Pkwy", "3c75c68f-934b-40fa-926b-98d699cd7c47", "austin"),
+    ("tomtom_domain_9", "ChargePoint @ 11920 Domain Dr", "91e497ef-bbb5-476b-885f-2d220ee9e4de", "austin"),
+    ("tomtom_domain_10", "ChargePoint @ Domain Dr", "3f909562-f9b1-4377-890d-92265c55442c", "austin"),
+    ("tomtom_katy_1", "ChargePoint @ 23005 Katy Fwy", "2995cd98-7c1d-4076-a6ff-2a67408aac4c", "katy"),
+    ("tomtom_katy_2", "ChargePoint @ 23414 W Fernhurst Dr", "2fc1a596-24a1-4150-8aa4-c8ba12ac6fd9", "katy"),
+    ("tomtom_katy_3", "Premier at Katy @ Bella Dolce Ln", "dd0e0b0d-644e-4c7f-a4d1-d68534ef75b0", "katy"),
+    ("tomtom_katy_4", "Memorial Hermann Katy Hospital", "d0c82ee8-8f00-4bc4-af80-591eda5cfa41", "katy"),
+    ("tomtom_katy_5", "ChargePoint @ 107 New Hope Ln", "3d0ab5c6-a827-8878-98f2-a6bddc62d1e8", "katy"),
+    ("tomtom_katy_6", "ChargePoint @ 1330 Park West Green Dr", "40733c29-cf08-4251-8e10-efdd127b74c9", "katy"),
+    ("tomtom_katy_7", "ChargePoint @ 21001 Katy Fwy", "6a500a27-638f-4f91-8e4c-cf1758700f70", "katy"),
+    ("tomtom_katy_8", "Vineyard Apts REVS @ Provincial Blvd", "97e8ad5a-7e2a-41a1-9be9-d959d316383a", "katy"),
+    ("tomtom_katy_9", "ChargePoint @ 24932 Katy Ranch Rd", "1f3eb99d-899c-8d17-aaa8-e15541749770", "katy"),
+    ("tomtom_katy_10", "Seacrest Apts @ Provincial Blvd", "14f75fda-0d64-816d-bb9b-74f24ac036a9", "katy"),
+    ("tomtom_atx_downtown_1", "301 E 8th St (non-CP)", "2fea4e5e-0755-8f50-811b-eb1db2e893fa", "austin_downtown"),
+    ("tomtom_atx_downtown_2", "ChargePoint @ 701 Brazos St", "0d9640e0-9698-47ca-84f3-bb91f4fd1271", "austin_downtown"),
+    ("tomtom_atx_downtown_3", "ChargePoint @ 710 Trinity St", "593c807e-a046-4221-8935-86993c46a4ae", "austin_downtown"),
+    ("tomtom_atx_downtown_4", "ChargePoint @ 205 E 7th St", "8d059a15-9e93-445a-82a4-32bf3fc07cf0", "austin_downtown"),
+    ("tomtom_atx_downtown_5", "ChargePoint @ 515 Congress Ave", "69a49afb-8aa5-4a7b-bb88-7fca6f762dbe", "austin_downtown"),
+]
+
+
+def _find_charger(bind, chargers, station_name: str):
+    """The charger at a seeded station's street address (or named like it), if any."""
+    place = station_name.split(" @ ", 1)[-1]
+    place = re.sub(r"\s*\(.*\)$", "", place).lower()  # "3004 Palm Way (A)" -> "3004 palm way"
+    return bind.execute(
+        sa.select(chargers.c.id)
+        .where(sa.or_(
+            sa.func.lower(chargers.c.address).like(f"{place}%"),
+            sa.func.lower(chargers.c.name).like(f"%{place}%"),
+        ))
+        .order_by(chargers.c.id)
+        .limit(1)
+    ).scalar()
+
+
+def upgrade():
+    stations = op.create_table(
+        "monitored_stations",
+        sa.Column("station_id", sa.String(), primary_key=True),
+        sa.Column("charger_id", sa.String(), sa.ForeignKey("chargers.id"), nullable=True, index=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("tomtom_availability_id", sa.String(), nullable=False),
+        sa.Column("region", sa.String(50), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    bind = op.get_bind()
+    chargers = sa.table("chargers", sa.column("id"), sa.column("name"), sa.column("address"))
+    now = datetime.utcnow()
+    op.bulk_insert(stations, [
+        {"station_id": station_id, "charger_id": _find_charger(bind, chargers, name), "name": name,
+         "tomtom_availability_id": avail_id, "region": region, "is_active": True, "created_at": now}
+        for station_id, name, avail_id, region in SEED_STATIONS
+    ])
+    op.execute("""
+        UPDATE charger_availability_snapshots
+        SET charger_id = (
+            SELECT m.charger_id FROM monitored_stations m
+            WHERE m.station_id = charger_availability_snapshots.charger_id
+        )
+        WHERE charger_id IN (SELECT station_id FROM monitored_stations WHERE charger_id IS NOT NULL)
+    """)
+
+    op.create_table(
+        "charger_occupancy_hour_of_week",
+        sa.Column("charger_id", sa.String(), primary_key=True),
+        sa.Column("hour_of_week", sa.Integer(), primary_key=True),
+        sa.Column("samples", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("occupancy_sum", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("occupancy_sq_sum", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("full_samples", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("""
+            INSERT INTO charger_occupancy_hour_of_week
+                (charger_id, hour_of_week, samples, occupancy_sum, occupancy_sq_sum, full_samples, updated_at)
+            SELECT
+                charger_id,
+                ((EXTRACT(ISODOW FROM recorded_at)::int - 1) * 24 + EXTRACT(HOUR FROM recorded_at)::int),
+                COUNT(*),
+                SUM(occupied_ports::float / total_ports),
+                SUM(POWER(occupied_ports::float / total_ports, 2)),
+                SUM(CASE WHEN available_ports = 0 THEN 1 ELSE 0 END),
+                NOW()
+            FROM charger_availability_snapshots
+            WHERE total_ports > 0
+            GROUP BY 1, 2
+        """)
+
+
+def downgrade():
+    op.drop_table("charger_occupancy_hour_of_week")
+    op.execute("""
+        UPDATE charger_availability_snapshots
+        SET charger_id = (
+            SELECT m.station_id FROM monitored_stations m
+            WHERE m.tomtom_availability_id = charger_availability_snapshots.tomtom_availability_id
+        )
+        WHERE source = 'tomtom'
+          AND tomtom_availability_id IN (SELECT tomtom_availability_id FROM monitored_stations)
+    """)
+    op.drop_table("monitored_stations")
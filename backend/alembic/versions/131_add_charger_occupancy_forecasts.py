@@ -0,0 +1,30 @@
+"""Add charger_occupancy_forecasts
+
+One row per charger and hour of week holding the trained occupancy
+forecast, loaded into memory by each app process for request-time lookups.
+
+Revision ID: 131
+Revises: 130
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "131"
+down_revision = "130"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "charger_occupancy_forecasts",
+        sa.Column("charger_id", sa.String(), primary_key=True),
+        sa.Column("hour_of_week", sa.Integer(), primary_key=True),
+        sa.Column("predicted_occupancy", sa.Float(), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("trained_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("charger_occupancy_forecasts")
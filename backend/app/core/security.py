@@ -1,5 +1,7 @@
 from datetime import datetime, timedelta
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Tuple
+import hashlib
+import hmac
 import secrets
 from jose import jwt
 from passlib.context import CryptContext
@@ -91,6 +93,33 @@ def verify_refresh_token(plain: str, hashed: str) -> bool:
     """Verify a refresh token against its hash"""
     return refresh_token_context.verify(plain, hashed)
 
+# Refresh tokens are "<selector>.<verifier>": the selector is stored in clear
+# and indexed for lookup, the verifier only as a keyed hash. Legacy tokens
+# (no separator) are salted PBKDF2 hashes and can only be found by scanning.
+REFRESH_TOKEN_SEPARATOR = "."
+
+def generate_refresh_token_selector() -> str:
+    """Generate a random 96-bit lookup id for a refresh token"""
+    return secrets.token_urlsafe(12)
+
+def split_refresh_token(token: str) -> Optional[Tuple[str, str]]:
+    """(selector, verifier) of a selector/verifier token, None for a legacy token"""
+    selector, sep, verifier = token.partition(REFRESH_TOKEN_SEPARATOR)
+    if not sep or not selector or not verifier:
+        return None
+    return selector, verifier
+
+def hash_refresh_token_verifier(verifier: str) -> str:
+    """
+    Keyed hash of a refresh token verifier. The verifier carries 256 random
+    bits, so a fast HMAC is enough - no slow KDF needed.
+    """
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), verifier.encode("utf-8"), hashlib.sha256).hexdigest()
+
+def verify_refresh_token_verifier(verifier: str, hashed: str) -> bool:
+    """Constant-time check of a verifier against its stored keyed hash"""
+    return hmac.compare_digest(hash_refresh_token_verifier(verifier), hashed)
+
 def create_smartcar_state_jwt(user_public_id: str, nonce: Optional[str] = None) -> str:
     """
     Create a signed state JWT for Smartcar OAuth flow.
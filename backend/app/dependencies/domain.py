@@ -13,6 +13,7 @@ from ..db import get_db
 from ..models import User
 from ..models.admin_role import AdminRole, has_permission
 from ..services.auth_service import AuthService
+from ..services.principal_cache import load_user
 from ..core.config import settings
 from ..core.env import is_local_env
 
@@ -86,7 +87,7 @@ def get_current_user(
     db: Session = Depends(get_db)
 ) -> User:
     """Get current user object by public_id"""
-    user = AuthService.get_user_by_public_id(db, public_id)
+    user = load_user(db, public_id)
     
     # Dev fallback: create default user if it doesn't exist
     if not user and DEV_ALLOW_ANON_USER_ENABLED:
@@ -174,7 +175,7 @@ def get_current_user_optional(
         )
         public_id = payload.get("sub")
         if public_id:
-            user = AuthService.get_user_by_public_id(db, public_id)
+            user = load_user(db, public_id)
             if user and user.is_active:
                 return user
     except Exception:
@@ -14,6 +14,7 @@ from ..core.config import settings
 from ..core.env import is_local_env
 from .domain import oauth2_scheme
 from ..services.auth_service import AuthService
+from ..services.principal_cache import principal_cache
 
 DEV_ALLOW_ANON_DRIVER_ENABLED = (
     os.getenv("NERAVA_DEV_ALLOW_ANON_DRIVER", "false").lower() == "true" 
@@ -64,10 +65,10 @@ def get_current_driver_id(
             public_id = payload.get("sub")
             if public_id:
                 # public_id is a UUID string, not an integer
-                # Lookup user by public_id to get integer id
-                user = AuthService.get_user_by_public_id(db, public_id)
-                if user:
-                    return user.id
+                # Resolve to the integer id via the principal cache
+                principal = principal_cache.get(db, public_id)
+                if principal:
+                    return principal.user_id
         except jwt.ExpiredSignatureError:
             # Token expired - fall through to dev fallback or raise
             pass
@@ -114,7 +115,8 @@ def get_current_driver(
     Raises:
         HTTPException: 401 if user not found or inactive
     """
-    user = AuthService.get_user_by_id(db, driver_id)
+    # By primary key: no query if another dependency already loaded the row
+    user = db.get(User, driver_id)
     
     # Dev fallback: create default driver user if it doesn't exist
     if not user and DEV_ALLOW_ANON_DRIVER_ENABLED and driver_id == 1:
@@ -187,7 +189,7 @@ def get_current_driver_optional(
         # Try to get driver ID
         driver_id = get_current_driver_id(request, token, db)
         # If we got a driver ID, get the user
-        user = AuthService.get_user_by_id(db, driver_id)
+        user = db.get(User, driver_id)
         if user and user.is_active:
             return user
     except HTTPException:
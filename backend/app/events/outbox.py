@@ -5,7 +5,7 @@ Helper functions for storing domain events in the outbox.
 """
 import json
 import logging
-from typing import Optional
+from typing import List, Optional
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 from .domain import DomainEvent
@@ -46,3 +46,34 @@ def store_outbox_event(db: Session, event: DomainEvent) -> None:
 
 
 
+
+
+def store_outbox_events(db: Session, events: List[DomainEvent]) -> None:
+    """
+    Store many domain events in the outbox with a single multi-row INSERT.
+
+    Unlike store_outbox_event, this does not commit: the rows are written inside
+    a SAVEPOINT in the caller's transaction, so they become visible atomically
+    with the state change they describe. Fail-open like store_outbox_event.
+
+    Args:
+        db: Database session
+        events: Domain events to store
+    """
+    if not events:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(text("""
+                INSERT INTO outbox_events (event_type, payload_json, created_at)
+                VALUES (:event_type, :payload_json, :created_at)
+            """), [
+                {
+                    "event_type": event.event_type,
+                    "payload_json": json.dumps(event.__dict__, default=str),
+                    "created_at": event.timestamp,
+                }
+                for event in events
+            ])
+    except Exception as e:
+        logger.warning(f"Failed to store {len(events)} outbox events: {e}", exc_info=True)
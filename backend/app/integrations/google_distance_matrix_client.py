@@ -3,8 +3,8 @@ Google Distance Matrix API client
 https://developers.google.com/maps/documentation/distance-matrix
 """
 import logging
-import httpx
 from typing import List, Tuple, Dict, Optional
+from app.services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -47,7 +47,7 @@ async def get_walk_times(
     }
     
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        async with http_clients.client("google_maps") as client:
             response = await client.get(GOOGLE_DISTANCE_MATRIX_BASE_URL, params=params)
             response.raise_for_status()
             data = response.json()
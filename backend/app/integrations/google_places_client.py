@@ -5,7 +5,6 @@ https://developers.google.com/maps/documentation/places/web-service
 import json
 import logging
 import os
-import httpx
 import asyncio
 import time
 from typing import List, Dict, Optional, Tuple
@@ -13,6 +12,7 @@ from typing import List, Dict, Optional, Tuple
 from app.core.retry import retry_with_backoff
 from app.cache.layers import LayeredCache
 from app.config import settings
+from app.services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -220,7 +220,7 @@ async def _nearby_search(
 
         try:
             logger.error("[PLACES] 🔍 Making request to Google Places API: %s", f"{GOOGLE_PLACES_BASE_URL}/nearbysearch/json")
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_clients.client("google_places") as client:
                 response = await client.get(
                     f"{GOOGLE_PLACES_BASE_URL}/nearbysearch/json",
                     params=params,
@@ -389,7 +389,7 @@ async def _text_search(
     )
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_clients.client("google_places") as client:
             response = await client.get(
                 f"{GOOGLE_PLACES_BASE_URL}/textsearch/json",
                 params=params,
@@ -502,7 +502,7 @@ async def get_place_details(place_id: str) -> Optional[Dict]:
 
     async def _fetch_place_details():
         """Internal function to fetch place details with retry"""
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_clients.client("google_places") as client:
             response = await client.get(
                 f"{GOOGLE_PLACES_BASE_URL}/details/json",
                 params=params,
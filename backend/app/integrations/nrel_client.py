@@ -3,7 +3,6 @@ NREL Alternative Fuels Data Center API client
 https://developer.nrel.gov/docs/transportation/alt-fuel-stations-v1/
 """
 import logging
-import httpx
 import json
 from typing import List, Dict, Optional, Tuple
 from math import radians, cos
@@ -11,6 +10,7 @@ from math import radians, cos
 from app.core.retry import retry_with_backoff
 from app.cache.layers import LayeredCache
 from app.config import settings
+from app.services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -103,7 +103,7 @@ async def fetch_chargers_in_bbox(
     
     async def _fetch_chargers():
         """Internal function to fetch chargers with retry"""
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_clients.client("nrel") as client:
             response = await client.get(f"{NREL_BASE_URL}/nearest.json", params=params)
             logger.debug(f"[WhileYouCharge] NREL API response status: {response.status_code}")
             
@@ -8,6 +8,7 @@ import logging
 import asyncio
 import httpx
 from typing import List, Dict, Optional
+from app.services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -90,11 +91,12 @@ class OverpassClient:
         """Execute an Overpass QL query and return normalized results."""
         await self._throttle()
 
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
+        async with http_clients.client("overpass") as client:
             try:
                 response = await client.post(
                     self.BASE_URL,
                     data={"data": overpass_ql},
+                    timeout=self._timeout,
                 )
                 if response.status_code == 429:
                     logger.warning("[Overpass] Rate limited, waiting 10s")
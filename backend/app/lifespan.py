@@ -9,12 +9,20 @@ from contextlib import asynccontextmanager
 from sqlalchemy import text
 from app.config import settings
 from app.services.async_wallet import async_wallet
+from app.services.apple_pass_push import pass_update_scheduler
 from app.services.cache import cache
 from app.workers.outbox_relay import outbox_relay
 from app.workers.prewarm import cache_prewarmer
 from app.workers.scheduled_polls import scheduled_poll_worker
+from app.workers.tesla_token_refresher import tesla_token_refresher
+from app.services.webhook_delivery_service import webhook_dispatcher
 from app.workers.weekly_merchant_report import weekly_merchant_report_worker
 from app.analytics.batch_writer import analytics_batch_writer
+from app.services.merchant_cache_writer import merchant_cache_writer
+from app.services.analytics_rollup import analytics_rollup_worker
+from app.services.admin_overview import admin_overview_refresher
+from app.services.charger_stats import charger_stats_reconciler
+from app.services.occupancy_forecast import occupancy_forecast_worker
 from app.subscribers.wallet_credit import *  # Import to register subscribers
 
 logger = logging.getLogger(__name__)
@@ -71,18 +79,52 @@ async def lifespan(app):
         logger.info("Analytics batch writer started")
         print("[STARTUP] Analytics batch writer started", flush=True)
 
+        # Start admin analytics rollup worker (recomputes dirty days)
+        await analytics_rollup_worker.start()
+        logger.info("Analytics rollup worker started")
+
+        # Start admin overview snapshot refresher
+        await admin_overview_refresher.start()
+        logger.info("Admin overview refresher started")
+
+        # Start nightly charger stats reconciliation
+        await charger_stats_reconciler.start()
+        logger.info("Charger stats reconciler started")
+
+        # Start merchant cache write-behind (intent capture)
+        await merchant_cache_writer.start()
+        logger.info("Merchant cache writer started")
+
         # Start scheduled poll worker (smart polling verification)
         print("[STARTUP] Starting scheduled poll worker...", flush=True)
         await scheduled_poll_worker.start()
         logger.info("Scheduled poll worker started")
         print("[STARTUP] Scheduled poll worker started", flush=True)
 
+        # Start proactive Tesla token refresher
+        await tesla_token_refresher.start()
+        logger.info("Tesla token refresher started")
+
+        # Start occupancy forecast worker (retrains and loads forecasts)
+        await occupancy_forecast_worker.start()
+        logger.info("Occupancy forecast worker started")
+
+        # Start partner webhook dispatcher (delivers queued events)
+        await webhook_dispatcher.start()
+        logger.info("Webhook dispatcher started")
+
         # Start weekly merchant report worker
         print("[STARTUP] Starting weekly merchant report worker...", flush=True)
         await weekly_merchant_report_worker.start()
         logger.info("Weekly merchant report worker started")
         print("[STARTUP] Weekly merchant report worker started", flush=True)
 
+        # Start PassKit update scheduler (debounced Apple Wallet pushes)
+        print("[STARTUP] Starting pass update scheduler...", flush=True)
+        await pass_update_scheduler.start()
+        logger.info("Pass update scheduler started")
+        print("[STARTUP] Pass update scheduler started", flush=True)
+
         # One-time exclusive title fix (safe to remove after first deploy)
         try:
             from app.db import SessionLocal
@@ -216,10 +258,26 @@ async def lifespan(app):
     logger.info("Shutting down Nerava Backend v9...")
     
     try:
+        # Stop pass update scheduler (flushes pending pushes)
+        await pass_update_scheduler.stop()
+        logger.info("Pass update scheduler stopped")
+
         # Stop weekly merchant report worker
         await weekly_merchant_report_worker.stop()
         logger.info("Weekly merchant report worker stopped")
 
+        # Stop occupancy forecast worker
+        await occupancy_forecast_worker.stop()
+        logger.info("Occupancy forecast worker stopped")
+
+        # Stop partner webhook dispatcher (undelivered events stay queued)
+        await webhook_dispatcher.stop()
+        logger.info("Webhook dispatcher stopped")
+
+        # Stop proactive Tesla token refresher
+        await tesla_token_refresher.stop()
+        logger.info("Tesla token refresher stopped")
+
         # Stop scheduled poll worker
         await scheduled_poll_worker.stop()
         logger.info("Scheduled poll worker stopped")
@@ -227,6 +285,22 @@ async def lifespan(app):
         # Stop analytics batch writer
         await analytics_batch_writer.stop()
         logger.info("Analytics batch writer stopped")
+
+        # Stop admin overview refresher
+        await admin_overview_refresher.stop()
+        logger.info("Admin overview refresher stopped")
+
+        # Stop charger stats reconciler
+        await charger_stats_reconciler.stop()
+        logger.info("Charger stats reconciler stopped")
+
+        # Stop analytics rollup worker
+        await analytics_rollup_worker.stop()
+        logger.info("Analytics rollup worker stopped")
+
+        # Stop merchant cache writer (flushes pending entries)
+        await merchant_cache_writer.stop()
+        logger.info("Merchant cache writer stopped")
         
         # Stop cache prewarmer
         await cache_prewarmer.stop()
@@ -239,7 +313,17 @@ async def lifespan(app):
         # Stop async wallet processor
         await async_wallet.stop_worker()
         logger.info("Async wallet processor stopped")
+
+        # Close pooled outbound HTTP clients
+        from app.services.http_clients import http_clients
+        await http_clients.aclose()
+        logger.info("Outbound HTTP clients closed")
         
+        # Flush reward proof ledger (fsync any batched appends)
+        from app.services.ledger import ledger
+        ledger.close()
+        logger.info("Reward proof ledger flushed")
+
         # Close database connections
         from app.db import get_engine
         engine = get_engine()
@@ -80,9 +80,9 @@ from .campaign import Campaign
 from .session_event import SessionEvent, IncentiveGrant
 from .driver_wallet import Payout, WalletLedger
 from .merchant_oauth_token import MerchantOAuthToken
-from .merchant_subscription import MerchantSubscription
+from .merchant_subscription import MerchantSubscription, SubscriptionInvoicePayment
 from .ad_impression import AdImpression
-from .partner import Partner, PartnerAPIKey
+from .partner import Partner, PartnerAPIKey, PartnerWebhookDeadLetter, PartnerWebhookDelivery
 from .merchant_reward import (
     MerchantJoinRequest,
     RewardClaim,
@@ -91,8 +91,25 @@ from .merchant_reward import (
     ReceiptStatus,
 )
 from .loyalty import LoyaltyCard, LoyaltyProgress
+from .wallet_timeline import WalletTimelineEvent
+from .analytics_rollup import (
+    AnalyticsDailyRollup,
+    AnalyticsCampaignDailyRollup,
+    AnalyticsChargerDailyRollup,
+    AnalyticsDirtyDay,
+)
+from .admin_overview import AdminOverviewSnapshot
+from .weekly_report import WeeklyReportRun, WeeklyReportDelivery
+from .charger_stats import ChargerSessionStats
+from .charger_availability import (
+    ChargerAvailabilitySnapshot,
+    ChargerOccupancyForecast,
+    ChargerOccupancyHourOfWeek,
+    MonitoredStation,
+)
 from .extra import (
     CreditLedger,
+    WalletCreditJob,
     IncentiveRule,
     UtilityEvent,
     Follow,
@@ -183,6 +200,7 @@ __all__ = [
     "IncentiveGrant",
     # Extra models
     "CreditLedger",
+    "WalletCreditJob",
     "IncentiveRule",
     "UtilityEvent",
     "Follow",
@@ -196,12 +214,33 @@ __all__ = [
     # Merchant overhaul models
     "MerchantOAuthToken",
     "MerchantSubscription",
+    "SubscriptionInvoicePayment",
     "AdImpression",
     # Partner models
     "Partner",
     "PartnerAPIKey",
+    "PartnerWebhookDelivery",
+    "PartnerWebhookDeadLetter",
     # Loyalty models
     "LoyaltyCard",
     "LoyaltyProgress",
+    # Wallet timeline feed
+    "WalletTimelineEvent",
+    # Admin analytics rollups
+    "AnalyticsDailyRollup",
+    "AnalyticsCampaignDailyRollup",
+    "AnalyticsChargerDailyRollup",
+    "AnalyticsDirtyDay",
+    "AdminOverviewSnapshot",
+    # Weekly merchant report checkpoints
+    "WeeklyReportRun",
+    "WeeklyReportDelivery",
+    # Per-charger session stats
+    "ChargerSessionStats",
+    # Charger availability collection
+    "ChargerAvailabilitySnapshot",
+    "ChargerOccupancyForecast",
+    "ChargerOccupancyHourOfWeek",
+    "MonitoredStation",
 ]
 
@@ -0,0 +1,15 @@
+"""Precomputed admin console overview (recomputed by a background job)."""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, JSON, String
+
+from ..db import Base
+
+
+class AdminOverviewSnapshot(Base):
+    """Latest overview statistics, one row per snapshot name (currently just "overview")."""
+    __tablename__ = "admin_overview_snapshots"
+
+    name = Column(String(50), primary_key=True)
+    payload = Column(JSON, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    compute_ms = Column(Integer, nullable=True)
@@ -0,0 +1,61 @@
+"""
+Daily rollups behind the admin analytics endpoints.
+
+Rows are recomputed a whole day at a time by the analytics rollup worker
+(app/services/analytics_rollup.py) for every day listed in
+``analytics_dirty_days``; writes to SessionEvent, IncentiveGrant and Payout
+mark the days they touch as dirty.
+"""
+from datetime import datetime
+from sqlalchemy import Column, Date, DateTime, Float, Integer, String
+
+from ..db import Base
+from ..core.uuid_type import UUIDType
+
+
+class AnalyticsDailyRollup(Base):
+    """Platform-wide totals for one UTC day."""
+    __tablename__ = "analytics_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    # SessionEvent, bucketed by session_start
+    session_count = Column(Integer, nullable=False, default=0)
+    total_kwh = Column(Float, nullable=False, default=0.0)
+    active_drivers = Column(Integer, nullable=False, default=0)
+    new_drivers = Column(Integer, nullable=False, default=0)  # first-ever session on this day
+    # IncentiveGrant, bucketed by granted_at
+    grant_count = Column(Integer, nullable=False, default=0)
+    grants_cents = Column(Integer, nullable=False, default=0)
+    # Paid Payouts, bucketed by created_at
+    payout_count = Column(Integer, nullable=False, default=0)
+    payouts_cents = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AnalyticsCampaignDailyRollup(Base):
+    """Grants per campaign for one UTC day (bucketed by created_at, any status)."""
+    __tablename__ = "analytics_campaign_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    campaign_id = Column(UUIDType(), primary_key=True)
+    grant_count = Column(Integer, nullable=False, default=0)
+    grants_cents = Column(Integer, nullable=False, default=0)
+
+
+class AnalyticsChargerDailyRollup(Base):
+    """Sessions per charger for one UTC day (bucketed by session_start)."""
+    __tablename__ = "analytics_charger_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    charger_id = Column(String, primary_key=True)
+    session_count = Column(Integer, nullable=False, default=0)
+    total_kwh = Column(Float, nullable=False, default=0.0)
+    active_drivers = Column(Integer, nullable=False, default=0)
+
+
+class AnalyticsDirtyDay(Base):
+    """A day whose rollups are stale and must be recomputed."""
+    __tablename__ = "analytics_dirty_days"
+
+    day = Column(Date, primary_key=True)
+    marked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,7 +1,7 @@
 """Charger real-time availability snapshot model."""
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, Float, DateTime, JSON, Index
+from sqlalchemy import Boolean, Column, ForeignKey, String, Integer, Float, DateTime, JSON, Index
 from app.db import Base
 
 
@@ -23,3 +23,52 @@ class ChargerAvailabilitySnapshot(Base):
     __table_args__ = (
         Index("ix_avail_charger_recorded", "charger_id", "recorded_at"),
     )
+
+
+class MonitoredStation(Base):
+    """
+    A TomTom availability station the collector polls. Snapshots (and so
+    occupancy patterns and forecasts) are keyed by the linked charger's id,
+    or by station_id while the station is not linked to a charger.
+    """
+    __tablename__ = "monitored_stations"
+
+    station_id = Column(String, primary_key=True)  # e.g. "tomtom_domain_1"
+    charger_id = Column(String, ForeignKey("chargers.id"), nullable=True, index=True)
+    name = Column(String, nullable=False)
+    tomtom_availability_id = Column(String, nullable=False)
+    region = Column(String(50), nullable=True)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ChargerOccupancyHourOfWeek(Base):
+    """
+    Running occupancy totals per charger and hour of week (UTC, Monday 00:00
+    = 0 ... Sunday 23:00 = 167), accumulated by the collector as it writes
+    snapshots, so occupancy patterns never need a scan of the raw snapshots.
+    """
+    __tablename__ = "charger_occupancy_hour_of_week"
+
+    charger_id = Column(String, primary_key=True)
+    hour_of_week = Column(Integer, primary_key=True)
+    samples = Column(Integer, nullable=False, default=0)  # Snapshots with total_ports > 0
+    occupancy_sum = Column(Float, nullable=False, default=0.0)  # Sum of occupied/total
+    occupancy_sq_sum = Column(Float, nullable=False, default=0.0)  # Sum of (occupied/total)^2
+    full_samples = Column(Integer, nullable=False, default=0)  # Snapshots with no port available
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ChargerOccupancyForecast(Base):
+    """
+    Precomputed occupancy forecast (0-1) per charger and UTC hour of week
+    for the week after trained_at; written by the forecast trainer and
+    served from memory (see services/occupancy_forecast.py).
+    """
+    __tablename__ = "charger_occupancy_forecasts"
+
+    charger_id = Column(String, primary_key=True)
+    hour_of_week = Column(Integer, primary_key=True)
+    predicted_occupancy = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False, default=0)  # History behind this hour's seasonal baseline
+    trained_at = Column(DateTime, nullable=False)
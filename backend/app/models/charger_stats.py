@@ -0,0 +1,38 @@
+"""
+Per-charger session statistics behind charger detail and the Nerava Score.
+
+One row per charger, kept up to date whenever one of the charger's sessions
+starts, ends or changes (same transaction as the write), and reconciled
+against the raw table nightly so the rolling 7d/30d windows also age out on
+chargers with no new activity.
+"""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Float, Integer, String
+
+from ..db import Base
+
+
+class ChargerSessionStats(Base):
+    __tablename__ = "charger_session_stats"
+
+    charger_id = Column(String, primary_key=True)
+
+    # Rolling windows, by session_start
+    sessions_7d = Column(Integer, nullable=False, default=0)
+    sessions_30d = Column(Integer, nullable=False, default=0)
+    drivers_30d = Column(Integer, nullable=False, default=0)
+    avg_duration_30d = Column(Float, nullable=False, default=0.0)
+
+    # Completed sessions (session_end set), all time
+    completed_sessions = Column(Integer, nullable=False, default=0)
+    completed_over_5min = Column(Integer, nullable=False, default=0)
+    completed_drivers = Column(Integer, nullable=False, default=0)
+    avg_completed_duration = Column(Float, nullable=False, default=0.0)  # over durations > 0
+    # Running count and sum behind avg_completed_duration, so writes can update it incrementally
+    completed_timed_sessions = Column(Integer, nullable=False, default=0)
+    completed_duration_total = Column(Float, nullable=False, default=0.0)
+
+    # Sessions with no session_end yet
+    open_sessions = Column(Integer, nullable=False, default=0)
+
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
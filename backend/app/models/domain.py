@@ -162,6 +162,11 @@ class ApplePassRegistration(Base):
     last_seen_at = Column(DateTime, nullable=True)
     is_active = Column(Boolean, nullable=False, default=True, index=True)
 
+    # PassKit push delivery outcome (per push token)
+    last_push_at = Column(DateTime, nullable=True)
+    last_push_status = Column(String(64), nullable=True)  # "Success" or APNs reason
+    push_failure_count = Column(Integer, nullable=False, default=0)
+
     # Relationships
     driver_wallet = relationship("DriverWallet", foreign_keys=[driver_wallet_id])
 
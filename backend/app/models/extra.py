@@ -1,5 +1,5 @@
 from datetime import datetime, time
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Time, Index
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Time, Index, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.sqlite import JSON as SQLITE_JSON
 from ..db import Base
@@ -27,6 +27,23 @@ class CreditLedger(Base):
     meta = Column(JSON, default=dict)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+class WalletCreditJob(Base):
+    """Durable queue of pending credit_ledger credits (one row per charging session)."""
+    __tablename__ = "wallet_credit_queue"
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String, unique=True, nullable=False)  # idempotency key
+    user_ref = Column(String, nullable=False)
+    amount_cents = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending / applied / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    enqueued_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    applied_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_wallet_credit_queue_status_id", "status", "id"),
+    )
+
 class IncentiveRule(Base):
     __tablename__ = "incentive_rules"
     id = Column(Integer, primary_key=True)
@@ -31,6 +31,9 @@ class MerchantCache(Base):
     
     # Photo URL (if available)
     photo_url = Column(String, nullable=True)
+
+    # sha256 of merchant_data; unchanged payloads skip the write
+    content_hash = Column(String(64), nullable=True)
     
     # Cache metadata
     cached_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -2,7 +2,7 @@
 MerchantSubscription model — tracks Stripe subscriptions for Pro tier and Nerava Ads.
 """
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Index
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
 from ..db import Base
 from ..core.uuid_type import UUIDType
 
@@ -32,3 +32,20 @@ class MerchantSubscription(Base):
     __table_args__ = (
         Index("ix_merchant_sub_account_plan", "merchant_account_id", "plan"),
     )
+
+
+class SubscriptionInvoicePayment(Base):
+    """
+    Paid Stripe invoice for a merchant subscription, recorded from the
+    invoice.paid webhook (one row per invoice).
+    """
+    __tablename__ = "subscription_invoice_payments"
+
+    id = Column(UUIDType(), primary_key=True)
+    stripe_invoice_id = Column(String, nullable=False, unique=True)
+    stripe_customer_id = Column(String, nullable=True, index=True)
+    stripe_subscription_id = Column(String, nullable=True, index=True)
+    amount_paid_cents = Column(Integer, nullable=False, default=0)
+    currency = Column(String(3), nullable=True)
+    paid_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -3,6 +3,8 @@ Partner & Partner API Key Models
 
 Partner: An external integration partner (charging network, driver app, fleet platform, etc.)
 PartnerAPIKey: API key for partner authentication. Key stored as SHA-256 hash.
+PartnerWebhookDelivery / PartnerWebhookDeadLetter: durable webhook queue and
+its dead letters (see services/webhook_delivery_service.py).
 
 Key format: nrv_pk_{32_hex_chars} — plaintext returned once on creation only.
 """
@@ -44,6 +46,8 @@ class Partner(Base):
     webhook_url = Column(String(500), nullable=True)
     webhook_secret = Column(String(200), nullable=True)
     webhook_enabled = Column(Boolean, default=False, nullable=False)
+    # Events per webhook POST; partners that opt in (>1) receive {"events": [...]} batches
+    webhook_batch_size = Column(Integer, default=1, nullable=False)
 
     rate_limit_rpm = Column(Integer, default=60, nullable=False)
     default_verification_method = Column(String(50), default="partner_app_signal", nullable=False)
@@ -79,3 +83,51 @@ class PartnerAPIKey(Base):
     __table_args__ = (
         Index("ix_partner_api_keys_partner", "partner_id", "is_active"),
     )
+
+
+class PartnerWebhookDelivery(Base):
+    """
+    A webhook event queued for a partner. Each partner's pending rows form
+    an ordered lane, delivered in id order.
+    """
+    __tablename__ = "partner_webhook_deliveries"
+
+    id = Column(Integer, primary_key=True)
+    partner_id = Column(UUIDType(), ForeignKey("partners.id"), nullable=False)
+    event_id = Column(String(36), nullable=False, unique=True)
+    event_type = Column(String(100), nullable=False)
+    body = Column(Text, nullable=False)  # Signed and sent as-is
+    status = Column(String(20), nullable=False, default="pending")  # pending / delivered
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)  # Lane claimed by a dispatcher until then
+    last_status_code = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    delivered_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_partner_webhook_deliveries_lane", "partner_id", "status", "id"),
+        Index("ix_partner_webhook_deliveries_due", "status", "next_attempt_at"),
+    )
+
+
+class PartnerWebhookDeadLetter(Base):
+    """A webhook event that exhausted its delivery attempts; replayable by admins."""
+    __tablename__ = "partner_webhook_dead_letters"
+
+    id = Column(Integer, primary_key=True)
+    partner_id = Column(UUIDType(), ForeignKey("partners.id"), nullable=False)
+    event_id = Column(String(36), nullable=False, index=True)
+    event_type = Column(String(100), nullable=False)
+    body = Column(Text, nullable=False)
+    attempts = Column(Integer, nullable=False)
+    last_status_code = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)  # When the event was first queued
+    failed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    replayed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_partner_webhook_dead_letters_partner", "partner_id", "replayed_at"),
+    )
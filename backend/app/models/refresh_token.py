@@ -12,6 +12,8 @@ class RefreshToken(Base):
     
     id = Column(UUID_TYPE, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Lookup id of a selector/verifier token; NULL for legacy tokens
+    selector = Column(String(32), unique=True, nullable=True, index=True)
     token_hash = Column(String, unique=True, nullable=False, index=True)
     expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
     revoked = Column(Boolean, nullable=False, default=False, index=True)
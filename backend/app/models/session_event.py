@@ -116,8 +116,12 @@ class SessionEvent(Base):
 
     __table_args__ = (
         Index("ix_session_events_driver_start", "driver_user_id", "session_start"),
-        Index("ix_session_events_charger_start", "charger_id", "session_start"),
+        Index(
+            "ix_session_events_charger_start", "charger_id", "session_start",
+            postgresql_include=["session_end", "duration_minutes", "driver_user_id"],
+        ),
         Index("ix_session_events_partner_start", "partner_id", "session_start"),
+        Index("ix_session_events_charger_driver", "charger_id", "driver_user_id"),
         UniqueConstraint("source", "source_session_id", name="uq_session_source"),
     )
 
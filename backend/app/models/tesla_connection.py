@@ -28,6 +28,9 @@ class TeslaConnection(Base):
     access_token = Column(Text, nullable=False)
     refresh_token = Column(Text, nullable=False)
     token_expires_at = Column(DateTime, nullable=False)
+    # Held by the worker currently refreshing the tokens (see tesla_oauth.get_valid_access_token)
+    refresh_lease_owner = Column(String(64), nullable=True)
+    refresh_lease_until = Column(DateTime, nullable=True)
 
     # Tesla account info
     tesla_user_id = Column(String(100), nullable=True)
@@ -56,6 +59,7 @@ class TeslaConnection(Base):
     __table_args__ = (
         Index("idx_tesla_connection_user", "user_id"),
         Index("idx_tesla_connection_vehicle", "vehicle_id"),
+        Index("idx_tesla_connection_active_expiry", "is_active", "token_expires_at"),
     )
 
 
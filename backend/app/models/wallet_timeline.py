@@ -0,0 +1,37 @@
+"""Materialized wallet timeline feed (one row per EARNED/SPENT event)."""
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
+from app.db import Base
+
+
+class WalletTimelineEvent(Base):
+    """
+    Append-only per-driver wallet feed, written at grant/redeem time.
+
+    Rows mirror what get_wallet_timeline used to assemble from NovaTransaction
+    (driver_earn) and MerchantRedemption, so reading a page is a single range
+    scan on (driver_user_id, created_at desc, sort_rank, id).
+    """
+    __tablename__ = "wallet_timeline_events"
+
+    id = Column(String, primary_key=True)  # "earn_<txn_id>" / "spent_<redemption_id>"
+    driver_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    event_type = Column(String(10), nullable=False)  # EARNED | SPENT
+    # Tie-breaker within equal timestamps: SPENT (0) before EARNED (1)
+    sort_rank = Column(Integer, nullable=False)
+    amount_cents = Column(Integer, nullable=False)
+    title = Column(String, nullable=False)
+    subtitle = Column(String, nullable=False)
+    merchant_id = Column(String, nullable=True)
+    redemption_id = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_wallet_timeline_driver_created",
+            "driver_user_id",
+            created_at.desc(),
+            "sort_rank",
+            "id",
+        ),
+    )
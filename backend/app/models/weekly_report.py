@@ -0,0 +1,30 @@
+"""Checkpoints for the weekly merchant report run."""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from ..db import Base
+
+
+class WeeklyReportRun(Base):
+    """One row per ISO week; the stats window is fixed when the run first starts."""
+    __tablename__ = "weekly_report_runs"
+
+    week_key = Column(String(10), primary_key=True)  # "2026-W42"
+    window_end = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+
+
+class WeeklyReportDelivery(Base):
+    """Per-merchant delivery state within a run (what a resumed run skips)."""
+    __tablename__ = "weekly_report_deliveries"
+
+    week_key = Column(String(10), primary_key=True)
+    merchant_id = Column(String(36), primary_key=True)
+    status = Column(String(20), nullable=False, default="sending")  # sending / sent / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    claimed_at = Column(DateTime, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
@@ -3,21 +3,23 @@ Admin Analytics Router — Time-series endpoints for the admin dashboard.
 
 Provides daily aggregations for sessions, drivers, revenue, and campaigns.
 All endpoints require admin auth and accept a `days` query parameter.
+
+Settled days are read from the daily rollup tables maintained by
+app/services/analytics_rollup.py; only the current (live) day is aggregated
+from the raw SessionEvent / IncentiveGrant / Payout tables.
 """
 from datetime import datetime, timedelta
 from typing import Optional, List
 
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
-from sqlalchemy import func, distinct, case
 from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app.models import User
-from app.models.session_event import SessionEvent, IncentiveGrant
 from app.models.campaign import Campaign
-from app.models.driver_wallet import Payout
 from app.dependencies_domain import require_admin
+from app.services.analytics_rollup import campaign_grant_totals, charger_totals, daily_totals
 
 
 router = APIRouter(prefix="/v1/admin/analytics", tags=["admin-analytics"])
@@ -56,20 +58,16 @@ class CampaignSummary(BaseModel):
     sponsor_name: str
 
 
+class ChargerSummary(BaseModel):
+    charger_id: str
+    sessions: int
+    total_kwh: float
+
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _date_trunc_expr(col):
-    """
-    Return a date-truncation expression that works on both PostgreSQL and SQLite.
-
-    PostgreSQL: func.date(column) returns a DATE type.
-    SQLite:     func.date(column) also works (returns 'YYYY-MM-DD' text).
-    """
-    return func.date(col)
-
-
 def _cutoff(days: int) -> datetime:
     return datetime.utcnow() - timedelta(days=days)
 
@@ -85,28 +83,15 @@ def analytics_sessions(
     admin: User = Depends(require_admin),
 ):
     """Daily session counts and total kWh for a given period."""
-    cutoff = _cutoff(days)
-    date_col = _date_trunc_expr(SessionEvent.session_start)
-
-    rows = (
-        db.query(
-            date_col.label("date"),
-            func.count(SessionEvent.id).label("count"),
-            func.coalesce(func.sum(SessionEvent.kwh_delivered), 0).label("total_kwh"),
-        )
-        .filter(SessionEvent.session_start >= cutoff)
-        .group_by(date_col)
-        .order_by(date_col)
-        .all()
-    )
-
+    totals = daily_totals(db, _cutoff(days).date(), sessions=True)
     return [
         DailySessionCount(
-            date=str(row.date),
-            count=row.count,
-            total_kwh=round(float(row.total_kwh), 2),
+            date=t.day.isoformat(),
+            count=t.session_count,
+            total_kwh=round(t.total_kwh, 2),
         )
-        for row in rows
+        for t in totals
+        if t.session_count
     ]
 
 
@@ -121,53 +106,15 @@ def analytics_drivers(
     admin: User = Depends(require_admin),
 ):
     """Daily active driver count and new-driver count (first session that day)."""
-    cutoff = _cutoff(days)
-    date_col = _date_trunc_expr(SessionEvent.session_start)
-
-    # Active drivers per day
-    active_rows = (
-        db.query(
-            date_col.label("date"),
-            func.count(distinct(SessionEvent.driver_user_id)).label("active_drivers"),
-        )
-        .filter(SessionEvent.session_start >= cutoff)
-        .group_by(date_col)
-        .order_by(date_col)
-        .all()
-    )
-    active_map = {str(r.date): r.active_drivers for r in active_rows}
-
-    # First-ever session date for each driver (computed once)
-    first_session_subq = (
-        db.query(
-            SessionEvent.driver_user_id,
-            func.min(_date_trunc_expr(SessionEvent.session_start)).label("first_date"),
-        )
-        .group_by(SessionEvent.driver_user_id)
-        .subquery()
-    )
-
-    # New drivers per day (their first_date falls in the window)
-    new_rows = (
-        db.query(
-            first_session_subq.c.first_date.label("date"),
-            func.count(first_session_subq.c.driver_user_id).label("new_drivers"),
-        )
-        .filter(first_session_subq.c.first_date >= func.date(cutoff))
-        .group_by(first_session_subq.c.first_date)
-        .all()
-    )
-    new_map = {str(r.date): r.new_drivers for r in new_rows}
-
-    # Merge into a single list keyed on date
-    all_dates = sorted(set(list(active_map.keys()) + list(new_map.keys())))
+    totals = daily_totals(db, _cutoff(days).date(), drivers=True)
     return [
         DailyDriverCount(
-            date=d,
-            active_drivers=active_map.get(d, 0),
-            new_drivers=new_map.get(d, 0),
+            date=t.day.isoformat(),
+            active_drivers=t.active_drivers,
+            new_drivers=t.new_drivers,
         )
-        for d in all_dates
+        for t in totals
+        if t.active_drivers
     ]
 
 
@@ -182,44 +129,15 @@ def analytics_revenue(
     admin: User = Depends(require_admin),
 ):
     """Daily revenue: campaign grant totals and payout totals."""
-    cutoff = _cutoff(days)
-
-    # Grants grouped by day
-    grant_date_col = _date_trunc_expr(IncentiveGrant.granted_at)
-    grant_rows = (
-        db.query(
-            grant_date_col.label("date"),
-            func.coalesce(func.sum(IncentiveGrant.amount_cents), 0).label("grants_cents"),
-        )
-        .filter(IncentiveGrant.granted_at >= cutoff)
-        .filter(IncentiveGrant.granted_at.isnot(None))
-        .group_by(grant_date_col)
-        .all()
-    )
-    grant_map = {str(r.date): int(r.grants_cents) for r in grant_rows}
-
-    # Payouts grouped by day (only completed payouts)
-    payout_date_col = _date_trunc_expr(Payout.created_at)
-    payout_rows = (
-        db.query(
-            payout_date_col.label("date"),
-            func.coalesce(func.sum(Payout.amount_cents), 0).label("payouts_cents"),
-        )
-        .filter(Payout.created_at >= cutoff)
-        .filter(Payout.status == "paid")
-        .group_by(payout_date_col)
-        .all()
-    )
-    payout_map = {str(r.date): int(r.payouts_cents) for r in payout_rows}
-
-    all_dates = sorted(set(list(grant_map.keys()) + list(payout_map.keys())))
+    totals = daily_totals(db, _cutoff(days).date(), revenue=True)
     return [
         DailyRevenue(
-            date=d,
-            grants_cents=grant_map.get(d, 0),
-            payouts_cents=payout_map.get(d, 0),
+            date=t.day.isoformat(),
+            grants_cents=t.grants_cents,
+            payouts_cents=t.payouts_cents,
         )
-        for d in all_dates
+        for t in totals
+        if t.grant_count or t.payout_count
     ]
 
 
@@ -237,33 +155,12 @@ def analytics_campaigns(
     """Campaign summary with grant counts. Optionally filter by status."""
     cutoff = _cutoff(days)
 
-    # Aggregate grant data per campaign
-    grant_agg = (
-        db.query(
-            IncentiveGrant.campaign_id,
-            func.coalesce(func.sum(IncentiveGrant.amount_cents), 0).label("total_granted_cents"),
-            func.count(IncentiveGrant.id).label("grant_count"),
-        )
-        .group_by(IncentiveGrant.campaign_id)
-        .subquery()
-    )
-
-    query = (
-        db.query(
-            Campaign,
-            func.coalesce(grant_agg.c.total_granted_cents, 0).label("total_granted_cents"),
-            func.coalesce(grant_agg.c.grant_count, 0).label("grant_count"),
-        )
-        .outerjoin(grant_agg, Campaign.id == grant_agg.c.campaign_id)
-        .filter(Campaign.created_at >= cutoff)
-    )
-
+    query = db.query(Campaign).filter(Campaign.created_at >= cutoff)
     if status:
         query = query.filter(Campaign.status == status)
+    campaigns = query.order_by(Campaign.created_at.desc()).all()
 
-    query = query.order_by(Campaign.created_at.desc())
-    rows = query.all()
-
+    grant_totals = campaign_grant_totals(db) if campaigns else {}
     return [
         CampaignSummary(
             id=str(campaign.id),
@@ -271,11 +168,29 @@ def analytics_campaigns(
             status=campaign.status,
             budget_cents=campaign.budget_cents,
             spent_cents=campaign.spent_cents,
-            grant_count=grant_count,
+            grant_count=grant_totals.get(campaign.id, (0, 0))[0],
             created_at=campaign.created_at.isoformat() if campaign.created_at else "",
             sponsor_name=campaign.sponsor_name or "",
         )
-        for campaign, total_granted_cents, grant_count in rows
+        for campaign in campaigns
+    ]
+
+
+# ---------------------------------------------------------------------------
+# 5. Top chargers
+# ---------------------------------------------------------------------------
+
+@router.get("/chargers", response_model=List[ChargerSummary])
+def analytics_chargers(
+    days: int = Query(default=30, ge=1, le=365),
+    limit: int = Query(default=20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """Chargers with the most sessions in the period."""
+    return [
+        ChargerSummary(charger_id=charger_id, sessions=sessions, total_kwh=round(kwh, 2))
+        for charger_id, sessions, kwh in charger_totals(db, _cutoff(days).date(), limit)
     ]
 
 
@@ -320,6 +235,21 @@ def get_charger_availability_history(
     }
 
 
+@router.get("/availability/{charger_id}/hour-of-week")
+def get_charger_occupancy_hour_of_week(
+    charger_id: str,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """Get a charger's weekly occupancy histogram (UTC hour of week, Monday 00:00 = 0)."""
+    from app.services.charger_occupancy import occupancy_by_hour_of_week
+
+    return {
+        "charger_id": charger_id,
+        "hours": occupancy_by_hour_of_week(db, charger_id),
+    }
+
+
 @router.get("/availability")
 def get_all_availability_latest(
     db: Session = Depends(get_db),
@@ -48,6 +48,17 @@ class GrantNovaRequest(BaseModel):
     idempotency_key: Optional[str] = None  # Optional idempotency key for deduplication
 
 
+class BulkGrantItem(BaseModel):
+    driver_user_id: int
+    amount: int = Field(..., gt=0)
+    idempotency_key: Optional[str] = None
+
+
+class BulkGrantNovaRequest(BaseModel):
+    grants: List[BulkGrantItem] = Field(..., min_length=1, max_length=5000)
+    reason: str
+
+
 class RevenueBreakdown(BaseModel):
     campaign_gross_cents: int = 0
     campaign_platform_fees_cents: int = 0
@@ -74,6 +85,8 @@ class AdminOverviewResponse(BaseModel):
     total_tesla_connections: int = 0
     total_stripe_express_onboarded: int = 0
     revenue: Optional[RevenueBreakdown] = None
+    snapshot_computed_at: Optional[str] = None
+    snapshot_age_seconds: Optional[float] = None
 
 
 @router.get("/health")
@@ -138,174 +151,42 @@ def get_admin_health(
     )
 
 
+def _overview_response(snapshot) -> AdminOverviewResponse:
+    age = (datetime.utcnow() - snapshot.computed_at).total_seconds()
+    return AdminOverviewResponse(
+        **snapshot.payload,
+        snapshot_computed_at=snapshot.computed_at.isoformat(),
+        snapshot_age_seconds=round(max(age, 0.0), 1),
+    )
+
+
 @router.get("/overview", response_model=AdminOverviewResponse)
-async def get_overview(
+def get_overview(
     admin: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """Get admin overview statistics"""
-    # Count drivers (users with driver role)
-    total_drivers = db.query(User).filter(
-        User.role_flags.contains("driver")
-    ).count()
-    
-    # Count merchants (While You Charge merchants — the real ones with perks)
-    from app.models.while_you_charge import Merchant as WYCMerchant, Charger as WYCCharger
-    total_merchants = db.query(WYCMerchant).count()
-
-    # Count chargers
-    total_chargers = db.query(WYCCharger).count()
-
-    # Count total charging sessions
-    from app.models.session_event import SessionEvent
-    total_charging_sessions = db.query(SessionEvent).count()
-
-    # Count active campaigns
-    from app.models.campaign import Campaign
-    from datetime import datetime as dt
-    now = dt.utcnow()
-    active_campaigns = db.query(Campaign).filter(
-        Campaign.status == "active",
-        Campaign.start_date <= now,
-        Campaign.spent_cents < Campaign.budget_cents,
-    ).count()
-    
-    # Sum driver Nova balances
-    driver_nova_result = db.query(func.sum(DriverWallet.nova_balance)).scalar()
-    total_driver_nova = int(driver_nova_result) if driver_nova_result else 0
-    
-    # Sum merchant Nova balances
-    merchant_nova_result = db.query(func.sum(DomainMerchant.nova_balance)).scalar()
-    total_merchant_nova = int(merchant_nova_result) if merchant_nova_result else 0
-    
-    # Total outstanding Nova
-    total_nova_outstanding = total_driver_nova + total_merchant_nova
-    
-    # --- Revenue breakdown ---
-    from app.models.campaign import Campaign
-    from app.core.config import settings
-
-    # 1. Campaign revenue — ALL campaigns that have been active (not just funding_status='funded')
-    # Some campaigns may have been activated without going through Stripe checkout
-    active_statuses = ("active", "paused", "exhausted", "completed")
-    campaigns_with_revenue = db.query(Campaign).filter(
-        or_(
-            Campaign.funding_status == "funded",
-            Campaign.status.in_(active_statuses),
-            Campaign.spent_cents > 0,
-        )
-    ).all()
+    """
+    Get admin overview statistics.
 
-    campaign_gross = 0
-    campaign_fees = 0
-    campaign_driver_rewards = 0
-    fee_bps = getattr(settings, 'PLATFORM_FEE_BPS', 2000)
-
-    for c in campaigns_with_revenue:
-        # Use stored values if available, otherwise calculate from budget
-        if c.gross_funding_cents:
-            campaign_gross += c.gross_funding_cents
-            campaign_fees += c.platform_fee_cents or 0
-        elif c.budget_cents:
-            # Campaign was funded without fee extraction — gross = budget
-            campaign_gross += c.budget_cents
-            # Calculate implied platform fee
-            campaign_fees += int(c.budget_cents * fee_bps / (10000 + fee_bps))
-        campaign_driver_rewards += c.spent_cents or 0
-
-    # 2. Merchant subscription revenue (amounts stored in Stripe, not DB)
-    from app.models.merchant_subscription import MerchantSubscription
-    import stripe as stripe_module
-
-    active_subs = db.query(MerchantSubscription).filter(
-        MerchantSubscription.status == "active",
-    ).all()
+    Served from the snapshot kept fresh by the admin overview refresher;
+    snapshot_age_seconds says how old the numbers are.
+    """
+    from app.services.admin_overview import get_or_create_snapshot
 
-    subscription_revenue = 0
-    for sub in active_subs:
-        if sub.stripe_customer_id:
-            try:
-                invoices = stripe_module.Invoice.list(
-                    customer=sub.stripe_customer_id,
-                    status="paid",
-                    limit=100,
-                )
-                for inv in invoices.data:
-                    subscription_revenue += inv.amount_paid or 0
-            except Exception as e:
-                logger.debug("Stripe invoice fetch failed for %s: %s", sub.stripe_customer_id, e)
-
-    # 3. Legacy Nova sales (merchant Stripe checkout for Nova)
-    nova_sales = db.query(func.sum(StripePayment.amount_usd)).filter(
-        StripePayment.status == "paid",
-    ).scalar()
-    nova_sales = int(nova_sales) if nova_sales else 0
-
-    # 4. Merchant redemption fees (15% of Nova redeemed)
-    from app.models_domain import MerchantFeeLedger
-    merchant_fees = db.query(func.sum(MerchantFeeLedger.fee_cents)).filter(
-        MerchantFeeLedger.status.in_(["invoiced", "paid"]),
-    ).scalar()
-    merchant_fees = int(merchant_fees) if merchant_fees else 0
-
-    # 5. Arrival billing fees
-    from app.models.billing_event import BillingEvent
-    arrival_billing = db.query(func.sum(BillingEvent.billable_cents)).filter(
-        BillingEvent.status == "paid",
-    ).scalar()
-    arrival_billing = int(arrival_billing) if arrival_billing else 0
-
-    total_realized = campaign_gross + subscription_revenue + nova_sales + merchant_fees + arrival_billing
-
-    # Driver payouts (outflow)
-    from app.models.driver_wallet import Payout
-    driver_payouts = db.query(func.sum(Payout.amount_cents)).filter(
-        Payout.status.in_(["paid", "processing"]),
-    ).scalar()
-    driver_payouts = int(driver_payouts) if driver_payouts else 0
-
-    revenue = RevenueBreakdown(
-        campaign_gross_cents=campaign_gross,
-        campaign_platform_fees_cents=campaign_fees,
-        campaign_driver_rewards_cents=campaign_driver_rewards,
-        merchant_subscriptions_cents=subscription_revenue,
-        active_subscriptions=len(active_subs),
-        nova_sales_cents=nova_sales,
-        merchant_fees_cents=merchant_fees,
-        arrival_billing_cents=arrival_billing,
-        total_realized_cents=total_realized,
-        total_driver_payouts_cents=driver_payouts,
-    )
+    snapshot, _ = get_or_create_snapshot(db)
+    return _overview_response(snapshot)
 
-    # Keep legacy field populated with total for backward compat
-    total_stripe_usd = total_realized
-    
-    # Count active Tesla connections (cars on the network)
-    from app.models.tesla_connection import TeslaConnection
-    total_tesla_connections = db.query(TeslaConnection).filter(
-        TeslaConnection.is_active == True
-    ).count()
 
-    # Count completed Stripe Express onboardings
-    total_stripe_express = db.query(DriverWallet).filter(
-        DriverWallet.stripe_account_id.isnot(None),
-        DriverWallet.stripe_onboarding_complete == True,
-    ).count()
+@router.post("/overview/refresh", response_model=AdminOverviewResponse)
+def refresh_overview(
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """Recompute the admin overview snapshot now and return it."""
+    from app.services.admin_overview import refresh_snapshot
 
-    return AdminOverviewResponse(
-        total_drivers=total_drivers,
-        total_merchants=total_merchants,
-        total_chargers=total_chargers,
-        total_charging_sessions=total_charging_sessions,
-        active_campaigns=active_campaigns,
-        total_driver_nova=total_driver_nova,
-        total_merchant_nova=total_merchant_nova,
-        total_nova_outstanding=total_nova_outstanding,
-        total_stripe_usd=total_stripe_usd,
-        total_tesla_connections=total_tesla_connections,
-        total_stripe_express_onboarded=total_stripe_express,
-        revenue=revenue,
-    )
+    snapshot = refresh_snapshot(db)
+    return _overview_response(snapshot)
 
 
 @router.get("/sessions/history")
@@ -593,6 +474,60 @@ def grant_nova(
         )
 
 
+@router.post("/nova/grant/bulk")
+def grant_nova_bulk(
+    request: BulkGrantNovaRequest,
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """Grant Nova to many drivers in one transaction (admin only)"""
+    from app.core.env import is_local_env
+
+    grants = []
+    for i, item in enumerate(request.grants):
+        idempotency_key = item.idempotency_key
+        if not idempotency_key:
+            if not is_local_env():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"grants[{i}].idempotency_key is required in non-local environment"
+                )
+            # In local, generate deterministic fallback for dev only
+            idempotency_key = f"grant_driver_{item.driver_user_id}_{item.amount}_{i}"
+        grants.append({
+            "driver_id": item.driver_user_id,
+            "amount": item.amount,
+            "type": "admin_grant",
+            "idempotency_key": idempotency_key,
+            "metadata": {"reason": request.reason, "granted_by": admin.id},
+        })
+
+    transactions = NovaService.grant_many(db, grants, auto_commit=False)
+
+    # P1-1: Admin audit log (one entry for the batch)
+    log_admin_action(
+        db=db,
+        actor_id=admin.id,
+        action="admin_grant_driver_bulk",
+        target_type="wallet",
+        target_id=f"bulk:{len(grants)}",
+        metadata={
+            "reason": request.reason,
+            "count": len(grants),
+            "total_amount": sum(g["amount"] for g in grants),
+            "transaction_ids": [str(t.id) for t in transactions],
+        }
+    )
+    db.commit()
+
+    return {
+        "success": True,
+        "count": len(transactions),
+        "total_amount": sum(g["amount"] for g in grants),
+        "transaction_ids": [str(t.id) for t in transactions],
+    }
+
+
 @router.post("/payments/{payment_id}/reconcile")
 async def reconcile_payment(
     payment_id: str,
@@ -4,11 +4,14 @@ Admin Partner Management Router — JWT-authenticated admin endpoints.
 Allows admins to register partners, manage API keys, and view partner details.
 """
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.dependencies import get_db
 from app.dependencies_domain import require_admin
+from app.models.partner import PartnerWebhookDeadLetter
 from app.models.user import User
 from app.schemas.partner import (
     PartnerCreateRequest,
@@ -19,6 +22,7 @@ from app.schemas.partner import (
     PartnerAPIKeyResponse,
 )
 from app.services.partner_service import PartnerService
+from app.services.webhook_delivery_service import webhook_dispatcher
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/v1/admin/partners", tags=["admin-partners"])
@@ -36,6 +40,7 @@ def _partner_to_response(p) -> dict:
         "contact_email": p.contact_email,
         "webhook_url": p.webhook_url,
         "webhook_enabled": p.webhook_enabled,
+        "webhook_batch_size": p.webhook_batch_size or 1,
         "rate_limit_rpm": p.rate_limit_rpm,
         "quality_score_modifier": p.quality_score_modifier,
         "created_at": p.created_at.isoformat() if p.created_at else None,
@@ -173,3 +178,48 @@ def revoke_api_key(
     if not success:
         raise HTTPException(status_code=404, detail="API key not found")
     return {"ok": True}
+
+
+@router.get("/{partner_id}/webhooks/dead-letters")
+def list_webhook_dead_letters(
+    partner_id: str,
+    include_replayed: bool = False,
+    limit: int = 100,
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """List webhook events that exhausted their delivery attempts."""
+    query = db.query(PartnerWebhookDeadLetter).filter(PartnerWebhookDeadLetter.partner_id == partner_id)
+    if not include_replayed:
+        query = query.filter(PartnerWebhookDeadLetter.replayed_at.is_(None))
+    letters = query.order_by(PartnerWebhookDeadLetter.id.desc()).limit(min(limit, 500)).all()
+    return [
+        {
+            "id": d.id,
+            "event_id": d.event_id,
+            "event_type": d.event_type,
+            "attempts": d.attempts,
+            "last_status_code": d.last_status_code,
+            "last_error": d.last_error,
+            "created_at": d.created_at.isoformat() if d.created_at else None,
+            "failed_at": d.failed_at.isoformat() if d.failed_at else None,
+            "replayed_at": d.replayed_at.isoformat() if d.replayed_at else None,
+        }
+        for d in letters
+    ]
+
+
+@router.post("/{partner_id}/webhooks/replay")
+def replay_webhook_dead_letters(
+    partner_id: str,
+    ids: Optional[List[int]] = Body(default=None, embed=True),
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Re-queue dead-lettered webhook events (all unreplayed ones, or just ids)."""
+    partner = PartnerService.get_partner(db, partner_id)
+    if not partner:
+        raise HTTPException(status_code=404, detail="Partner not found")
+    replayed = webhook_dispatcher.replay_dead_letters(db, partner_id, ids)
+    db.commit()
+    return {"ok": True, "replayed": replayed}
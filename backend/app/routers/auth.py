@@ -14,6 +14,7 @@ from ..dependencies.domain import get_current_user
 from ..core.security import create_access_token
 from ..core.config import settings
 from ..services.refresh_token_service import RefreshTokenService
+from ..services.principal_cache import principal_cache
 from ..services.analytics import get_analytics_client
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -180,6 +181,8 @@ async def logout(
         # Revoke all tokens for current user
         RefreshTokenService.revoke_all_user_tokens(db, current_user.id)
         db.commit()
+    if current_user:
+        principal_cache.invalidate(current_user.public_id)
     
     return LogoutResponse(ok=True)
 
@@ -1,5 +1,5 @@
 # app/routers/chargers.py
-from datetime import datetime, timedelta
+from datetime import datetime
 from fastapi import APIRouter, Depends, Query, HTTPException, Header
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
@@ -10,10 +10,10 @@ from app.db import SessionLocal, get_db
 from app.models import User
 from app.models.while_you_charge import Charger, Merchant, ChargerMerchant
 from app.models.favorite_charger import FavoriteCharger
-from app.models.session_event import SessionEvent
 from app.models.campaign import Campaign
 from app.dependencies.driver import get_current_driver
 from app.services.google_places_new import _haversine_distance
+from app.services.occupancy_forecast import occupancy_forecasts
 import math
 import json
 import logging
@@ -125,6 +125,7 @@ class DiscoveryChargerResponse(BaseModel):
     campaign_reward_cents: Optional[int] = None
     has_merchant_perk: bool = False
     pricing_per_kwh: Optional[float] = None
+    predicted_occupancy: Optional[float] = None  # 0-1 for the current hour, where forecast
 
 
 class DiscoveryResponse(BaseModel):
@@ -150,11 +151,12 @@ async def nearby(
 
 
 @router.get("/discovery", response_model=DiscoveryResponse)
-async def discovery(
+def discovery(
     lat: float = Query(..., ge=-90, le=90),
     lng: float = Query(..., ge=-180, le=180),
     radius_km: float = Query(50.0, ge=1.0, le=200.0),
     limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
 ):
     """
     Get charger discovery data with nearby merchants.
@@ -163,7 +165,6 @@ async def discovery(
     Sets within_radius=True if user is within 400m of nearest charger.
     Uses SQL bounding-box pre-filter for performance (~50K chargers → ~500 candidates).
     """
-    db = SessionLocal()
     try:
         # SQL bounding-box pre-filter + haversine sort
         charger_distances = _query_nearby_chargers(db, lat, lng, radius_km, limit)
@@ -286,6 +287,7 @@ async def discovery(
                 campaign_reward_cents=reward_cents,
                 has_merchant_perk=has_perk,
                 pricing_per_kwh=getattr(charger, 'pricing_per_kwh', None),
+                predicted_occupancy=occupancy_forecasts.predicted_occupancy(charger.id, now),
             ))
 
         return DiscoveryResponse(
@@ -297,8 +299,6 @@ async def discovery(
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"discovery_failed: {e}")
-    finally:
-        db.close()
 
 
 class ChargerDetailResponse(BaseModel):
@@ -329,15 +329,15 @@ class ChargerDetailResponse(BaseModel):
 
 
 @router.get("/{charger_id}/detail", response_model=ChargerDetailResponse)
-async def charger_detail(
+def charger_detail(
     charger_id: str,
     lat: float = Query(0.0, ge=-90, le=90),
     lng: float = Query(0.0, ge=-180, le=180),
+    db: Session = Depends(get_db),
 ):
     """
     Get detailed charger info with session stats and nearby merchants.
     """
-    db = SessionLocal()
     try:
         charger = db.query(Charger).filter(Charger.id == charger_id).first()
         if not charger:
@@ -347,20 +347,12 @@ async def charger_detail(
         distance_m = _haversine_distance(lat, lng, charger.lat, charger.lng) if lat and lng else 0.0
         drive_time_min = max(1, math.ceil(distance_m / 500))
 
-        # Session stats (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        stats = db.query(
-            func.count(SessionEvent.id),
-            func.count(func.distinct(SessionEvent.driver_user_id)),
-            func.coalesce(func.avg(SessionEvent.duration_minutes), 0),
-        ).filter(
-            SessionEvent.charger_id == charger_id,
-            SessionEvent.session_start >= thirty_days_ago,
-        ).first()
-
-        total_sessions_30d = stats[0] if stats else 0
-        unique_drivers_30d = stats[1] if stats else 0
-        avg_duration_min = round(float(stats[2]), 1) if stats else 0.0
+        # Session stats (last 30 days), one primary-key lookup
+        from app.services.charger_stats import get_charger_stats
+        stats = get_charger_stats(db, charger_id)
+        total_sessions_30d = stats.sessions_30d
+        unique_drivers_30d = stats.drivers_30d
+        avg_duration_min = round(float(stats.avg_duration_30d), 1)
 
         # Active campaign reward for this charger
         active_reward_cents = None
@@ -449,17 +441,14 @@ async def charger_detail(
             ))
 
         # Drivers currently charging at this station
-        drivers_now = db.query(func.count(SessionEvent.id)).filter(
-            SessionEvent.charger_id == charger_id,
-            SessionEvent.session_end.is_(None),
-        ).scalar() or 0
+        drivers_now = stats.open_sessions
 
         # Nerava Score — use cached value or compute fresh
         nerava_score = getattr(charger, 'nerava_score', None)
         if nerava_score is None and total_sessions_30d >= 5:
             try:
-                from app.services.charger_score import compute_nerava_score
-                nerava_score = compute_nerava_score(charger_id, db)
+                from app.services.charger_score import score_from_stats
+                nerava_score = score_from_stats(stats)
                 # Cache on the charger row
                 charger.nerava_score = nerava_score
                 db.commit()
@@ -496,8 +485,6 @@ async def charger_detail(
     except Exception as e:
         logger.error(f"charger_detail failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"charger_detail_failed: {e}")
-    finally:
-        db.close()
 
 
 # ==================== Charger Favorites ====================
@@ -18,6 +18,7 @@ from app.models.verified_visit import VerifiedVisit
 from app.models.session_event import SessionEvent
 from app.dependencies.driver import get_current_driver, get_current_driver_optional
 from app.services.geo import haversine_m
+from app.services.exclusive_resolver import resident_directory, resolve_activation
 from app.core.config import settings
 from app.core.env import is_local_env
 from app.utils.exclusive_logging import log_event
@@ -230,6 +231,20 @@ def _enrich_session_response(
     )
 
 
+def _charger_not_found(charger_id: str) -> HTTPException:
+    logger.warning(
+        f"Charger {charger_id} not found",
+        extra={"requested_charger_id": charger_id}
+    )
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail={
+            "error": "charger_not_found",
+            "message": f"Charger not found: {charger_id}. Please run bootstrap endpoint first.",
+        }
+    )
+
+
 def validate_charger_radius(
     db: Session,
     charger_id: str,
@@ -244,21 +259,7 @@ def validate_charger_radius(
     """
     charger = db.query(Charger).filter(Charger.id == charger_id).first()
     if not charger:
-        # Log available chargers for debugging
-        all_chargers = db.query(Charger).limit(10).all()
-        charger_ids = [c.id for c in all_chargers]
-        logger.warning(
-            f"Charger {charger_id} not found. Available chargers: {charger_ids}",
-            extra={"requested_charger_id": charger_id, "available_charger_ids": charger_ids}
-        )
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={
-                "error": "charger_not_found",
-                "message": f"Charger not found: {charger_id}. Please run bootstrap endpoint first.",
-                "available_chargers": charger_ids[:5]  # Show first 5 for debugging
-            }
-        )
+        raise _charger_not_found(charger_id)
     
     distance_m = haversine_m(lat, lng, charger.lat, charger.lng)
     is_within_radius = distance_m <= CHARGER_RADIUS_M
@@ -288,12 +289,20 @@ async def activate_exclusive(
                 detail="OTP_REQUIRED"
             )
         
-        # Idempotency check (P0 fix)
+        # Idempotency key, active sessions, charger and merchant in one lookup
         idempotency_key = http_request.headers.get("X-Idempotency-Key")
+        lookup = resolve_activation(
+            db,
+            driver_id=driver.id,
+            charger_id=request.charger_id,
+            merchant_id=request.merchant_id,
+            merchant_place_id=request.merchant_place_id,
+            idempotency_key=idempotency_key,
+        )
+
+        # Idempotency check (P0 fix)
         if idempotency_key:
-            existing_session = db.query(ExclusiveSession).filter(
-                ExclusiveSession.idempotency_key == idempotency_key
-            ).first()
+            existing_session = lookup.idempotent_session
             if existing_session:
                 remaining_seconds = max(0, int((existing_session.expires_at - datetime.now(timezone.utc)).total_seconds()))
                 return ActivateExclusiveResponse(
@@ -320,10 +329,7 @@ async def activate_exclusive(
             )
         
         # Check for existing active session
-        existing_active = db.query(ExclusiveSession).filter(
-            ExclusiveSession.driver_id == driver.id,
-            ExclusiveSession.status == ExclusiveSessionStatus.ACTIVE
-        ).first()
+        existing_active = lookup.active_session
         
         if existing_active:
             # Check if expired
@@ -363,9 +369,10 @@ async def activate_exclusive(
             )
         
         # Location validation: lat/lng are required, enforce charger radius
-        distance_m, is_within_radius = validate_charger_radius(
-            db, request.charger_id, request.lat, request.lng
-        )
+        if lookup.charger is None:
+            raise _charger_not_found(request.charger_id)
+        distance_m = haversine_m(request.lat, request.lng, lookup.charger.lat, lookup.charger.lng)
+        is_within_radius = distance_m <= CHARGER_RADIUS_M
         if not is_within_radius:
             logger.warning(
                 f"Activation rejected: outside charger radius distance={distance_m:.0f}m, required={CHARGER_RADIUS_M}m",
@@ -392,31 +399,13 @@ async def activate_exclusive(
                 }
             )
         
-        # Resolve merchant_id to WYC merchant ID (FK constraint requires it)
-        resolved_merchant_id = request.merchant_id
-        if resolved_merchant_id:
-            wyc_merchant = db.query(Merchant).filter(Merchant.id == resolved_merchant_id).first()
-            if not wyc_merchant and request.merchant_place_id:
-                wyc_merchant = db.query(Merchant).filter(Merchant.place_id == request.merchant_place_id).first()
-            if not wyc_merchant:
-                # Try place_id as merchant_id (common when frontend sends place_id)
-                wyc_merchant = db.query(Merchant).filter(Merchant.place_id == resolved_merchant_id).first()
-            if wyc_merchant:
-                resolved_merchant_id = wyc_merchant.id
-        elif request.merchant_place_id:
-            wyc_merchant = db.query(Merchant).filter(Merchant.place_id == request.merchant_place_id).first()
-            if wyc_merchant:
-                resolved_merchant_id = wyc_merchant.id
-
-        # Find the driver's active charging session (if any) for post-charge expiry
-        active_charging_session = db.query(SessionEvent).filter(
-            SessionEvent.driver_user_id == driver.id,
-            SessionEvent.session_end.is_(None),  # Still active (no end time)
-        ).order_by(SessionEvent.session_start.desc()).first()
-
-        charging_session_id = None
-        if active_charging_session:
-            charging_session_id = active_charging_session.id
+        # Resolved WYC merchant ID (FK constraint requires it): by id, then
+        # merchant_place_id, then merchant_id as a place_id
+        merchant_ref = lookup.merchant
+        resolved_merchant_id = merchant_ref.id if merchant_ref else request.merchant_id
+
+        # The driver's active charging session (if any) for post-charge expiry
+        charging_session_id = lookup.charging_session_id
 
         # Create exclusive session
         now = datetime.now(timezone.utc)
@@ -433,8 +422,13 @@ async def activate_exclusive(
         
         # Generate verification code eagerly (for QR code display)
         verification_code = None
-        if resolved_merchant_id:
-            wyc_m = db.query(Merchant).filter(Merchant.id == resolved_merchant_id).first()
+        refreshed_merchant_ref = None
+        if merchant_ref and merchant_ref.short_code:
+            short_code = merchant_ref.short_code
+            region_code = merchant_ref.region_code or "ATX"
+        elif merchant_ref:
+            short_code = region_code = None
+            wyc_m = db.query(Merchant).filter(Merchant.id == merchant_ref.id).first()
             if wyc_m:
                 if not wyc_m.short_code:
                     base_code = ''.join(c for c in wyc_m.name.upper() if c.isalnum())[:6]
@@ -448,16 +442,21 @@ async def activate_exclusive(
                     wyc_m.short_code = base_code
                     wyc_m.region_code = wyc_m.region_code or "ATX"
                     db.flush()
+                short_code = wyc_m.short_code
                 region_code = wyc_m.region_code or "ATX"
-                from sqlalchemy import func as sa_func
-                from datetime import date
-                today_start = datetime.combine(date.today(), datetime.min.time())
-                max_visit = db.query(sa_func.max(VerifiedVisit.visit_number)).filter(
-                    VerifiedVisit.merchant_id == wyc_m.id,
-                    VerifiedVisit.verified_at >= today_start
-                ).scalar()
-                visit_number = (max_visit or 0) + 1
-                verification_code = f"{region_code}-{wyc_m.short_code}-{str(visit_number).zfill(3)}"
+                refreshed_merchant_ref = merchant_ref._replace(
+                    short_code=short_code, region_code=wyc_m.region_code,
+                )
+        if merchant_ref and short_code:
+            from sqlalchemy import func as sa_func
+            from datetime import date
+            today_start = datetime.combine(date.today(), datetime.min.time())
+            max_visit = db.query(sa_func.max(VerifiedVisit.visit_number)).filter(
+                VerifiedVisit.merchant_id == merchant_ref.id,
+                VerifiedVisit.verified_at >= today_start
+            ).scalar()
+            visit_number = (max_visit or 0) + 1
+            verification_code = f"{region_code}-{short_code}-{str(visit_number).zfill(3)}"
 
         session = ExclusiveSession(
             id=generate_session_id(),
@@ -486,6 +485,9 @@ async def activate_exclusive(
             db.add(session)
             db.commit()
             db.refresh(session)
+            if refreshed_merchant_ref:
+                # Short code is persisted now; later activations skip the merchant read
+                resident_directory.remember_merchant(refreshed_merchant_ref)
         except HTTPException:
             raise
         except Exception as e:
@@ -586,13 +588,7 @@ async def activate_exclusive(
         # Send push notification for exclusive confirmation (best-effort)
         try:
             from app.services.push_service import send_exclusive_confirmed_push
-            merchant_name = request.merchant_id or "a nearby merchant"
-            # Try to resolve merchant name from DB
-            if request.merchant_id:
-                from app.models.while_you_charge import Merchant as WYCMerchant
-                m = db.query(WYCMerchant).filter(WYCMerchant.id == request.merchant_id).first()
-                if m:
-                    merchant_name = m.name
+            merchant_name = merchant_ref.name if merchant_ref else (request.merchant_id or "a nearby merchant")
             send_exclusive_confirmed_push(db, driver.id, merchant_name)
         except Exception as push_err:
             logger.debug("Push notification failed (non-fatal): %s", push_err)
@@ -726,8 +722,11 @@ async def complete_exclusive(
             detail="Failed to complete exclusive session"
         )
     
-    # Calculate duration
-    duration_seconds = int((now - session.activated_at).total_seconds())
+    # Calculate duration (SQLite hands back timezone=True columns naive)
+    activated_at = session.activated_at
+    if activated_at.tzinfo is None:
+        activated_at = activated_at.replace(tzinfo=timezone.utc)
+    duration_seconds = int((now - activated_at).total_seconds())
     
     # Log completion event (both structured log and standard logger)
     log_event("exclusive_completed", {
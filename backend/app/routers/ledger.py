@@ -54,18 +54,28 @@ async def ledger_status():
     import os
     from ..services.ledger import ledger
     
-    ledger_exists = os.path.exists(ledger.ledger_path)
-    ledger_size = 0
-    
-    if ledger_exists:
-        with open(ledger.ledger_path, "r") as f:
-            ledger_size = sum(1 for line in f)
+    stats = ledger.stats()
     
     return {
         "enabled": True,  # LEDGER_ENABLED from config
         "ledger_path": ledger.ledger_path,
-        "exists": ledger_exists,
-        "entries": ledger_size,
+        "exists": os.path.exists(ledger.ledger_path) or stats["entries"] > 0,
+        "entries": stats["entries"],
+        "segments": stats["segments"],
+        "chain_tip": stats["chain_tip"],
+        "fsync_policy": stats["fsync_policy"],
         "provider": "local_jsonl",  # Could be "polygon", "filecoin", etc.
         "description": "Local append-only ledger. Can be swapped for blockchain providers."
     }
+
+@router.get("/audit")
+async def ledger_audit(
+    full: bool = Query(False, description="Re-verify from the first entry instead of the last checkpoint")
+):
+    """Verify the proof hash chain incrementally (entries since the last audit)."""
+    from ..services.ledger import ledger
+    
+    try:
+        return ledger.audit(full=full)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to audit ledger: {str(e)}")
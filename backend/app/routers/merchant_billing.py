@@ -22,6 +22,7 @@ from app.services.merchant_subscription_service import (
     handle_checkout_completed,
     handle_subscription_updated,
     handle_subscription_deleted,
+    handle_invoice_paid,
     get_subscription,
     cancel_subscription,
 )
@@ -361,6 +362,8 @@ async def stripe_merchant_webhook(request: Request, db: Session = Depends(get_db
         handle_subscription_updated(db, data_object)
     elif event_type == "customer.subscription.deleted":
         handle_subscription_deleted(db, data_object)
+    elif event_type in ("invoice.paid", "invoice.payment_succeeded"):
+        handle_invoice_paid(db, data_object)
     else:
         logger.debug(f"Unhandled merchant billing event: {event_type}")
 
@@ -309,16 +309,10 @@ def get_merchant_insights(
                 if dist <= 500:
                     nearby_charger_ids.append(c.id)
 
-            # Also check tomtom IDs
-            tomtom_ids = [f"tomtom_katy_{i}" for i in range(1, 11)] + [f"tomtom_domain_{i}" for i in range(1, 11)]
-            all_monitor_ids = nearby_charger_ids + [tid for tid in tomtom_ids if any(
-                tid.replace("tomtom_", "").startswith(cid.replace("nrel_", "")[:5]) for cid in nearby_charger_ids
-            )]
-
-            if nearby_charger_ids or all_monitor_ids:
-                # Get latest snapshots for any nearby monitored chargers
+            if nearby_charger_ids:
+                # Get latest snapshots for any nearby monitored chargers (keyed by charger id)
                 snapshots = db.query(ChargerAvailabilitySnapshot).filter(
-                    ChargerAvailabilitySnapshot.charger_id.in_(all_monitor_ids),
+                    ChargerAvailabilitySnapshot.charger_id.in_(nearby_charger_ids),
                     ChargerAvailabilitySnapshot.recorded_at >= since,
                 ).all()
 
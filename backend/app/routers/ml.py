@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Query, HTTPException
 from typing import List, Dict, Any
-from ..services.ml_ranker import rank_hubs_and_perks, score_hub, score_perk
+from ..services.ml_ranker import rank_candidates, score_hub, score_perk
 from ..services import hubs_dynamic
 
 router = APIRouter(prefix="/v1/ml", tags=["ml"])
@@ -18,11 +18,11 @@ async def recommend_hubs(
         hubs = await hubs_dynamic.build_dynamic_hubs(lat=lat, lng=lng, radius_km=5.0, max_results=20)
         
         # Get recommendations
-        result = rank_hubs_and_perks(user_id, lat, lng, hubs, [])
+        result = rank_candidates(user_id, lat, lng, hubs, [], hub_limit=limit)
         
         return {
             'user_id': user_id,
-            'recommendations': result['ranked_hubs'][:limit],
+            'recommendations': result['ranked_hubs'],
             'context': result['user_context']
         }
         
@@ -64,12 +64,12 @@ async def recommend_perks(
         ]
         
         # Get recommendations
-        result = rank_hubs_and_perks(user_id, 0, 0, [], mock_perks)
+        result = rank_candidates(user_id, 0, 0, [], mock_perks, perk_limit=limit)
         
         return {
             'user_id': user_id,
             'hub_id': hub_id,
-            'recommendations': result['ranked_perks'][:limit],
+            'recommendations': result['ranked_perks'],
             'context': result['user_context']
         }
         
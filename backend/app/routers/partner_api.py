@@ -7,7 +7,7 @@ Supports candidate/pending sessions, webhook delivery, and reward breakdowns.
 import logging
 from typing import Optional, Tuple
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app.dependencies import get_db
@@ -27,23 +27,11 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/v1/partners", tags=["partner-api"])
 
 
-async def _fire_session_webhook(partner, session_data):
-    """Fire partner.session.resolved webhook in background."""
-    try:
-        from app.services.webhook_delivery_service import WebhookDeliveryService
-        await WebhookDeliveryService.deliver(
-            partner, "partner.session.resolved", session_data
-        )
-    except Exception as e:
-        logger.error(f"Webhook delivery failed for partner {partner.slug}: {e}")
-
-
 # --- Session Endpoints ---
 
 @router.post("/sessions", status_code=202)
 def ingest_session(
     req: PartnerSessionIngestRequest,
-    background_tasks: BackgroundTasks,
     partner_and_key: Tuple[Partner, PartnerAPIKey] = Depends(require_partner_scope("sessions:write")),
     db: Session = Depends(get_db),
 ):
@@ -81,10 +69,6 @@ def ingest_session(
     # Remove internal field
     is_new = result.pop("_is_new", True)
 
-    # Fire webhook for completed sessions
-    if is_new and result.get("status") == "completed" and partner.webhook_enabled:
-        background_tasks.add_task(_fire_session_webhook, partner, result)
-
     if not is_new:
         # Idempotent return — existing session
         return result  # 200 (FastAPI default for non-new)
@@ -126,7 +110,6 @@ def get_session(
 def update_session(
     partner_session_id: str,
     req: PartnerSessionUpdateRequest,
-    background_tasks: BackgroundTasks,
     partner_and_key: Tuple[Partner, PartnerAPIKey] = Depends(require_partner_scope("sessions:write")),
     db: Session = Depends(get_db),
 ):
@@ -145,12 +128,7 @@ def update_session(
     if not result:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    is_new = result.pop("_is_new", None)
-
-    # Fire webhook when session transitions to completed
-    if result.get("status") == "completed" and partner.webhook_enabled:
-        background_tasks.add_task(_fire_session_webhook, partner, result)
-
+    result.pop("_is_new", None)
     return result
 
 
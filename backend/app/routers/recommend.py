@@ -2,15 +2,16 @@ from fastapi import APIRouter, Query
 from typing import Dict
 from app.services.seed_hubs import list_hubs
 from app.services.db_user import get_prefs_dict
-from app.services.routing import recommend_hub
+from app.services.ml_ranker import route_hub
 
 router = APIRouter()
 
 @router.get("/recommend", response_model=Dict)
 def rec(lat: float = Query(...), lng: float = Query(...), user_id: str = Query("anon@nerava.app")):
     prefs = get_prefs_dict(user_id)
-    hubs = list_hubs()
-    best, meta = recommend_hub(lat, lng, prefs, hubs)
-    out = dict(best)
-    out.update(meta)
+    best = route_hub(lat, lng, list_hubs(), prefs)
+    if best is None:
+        return {}
+    out = dict(best["hub"])
+    out.update({key: best[key] for key in ("score", "distance_m", "reason_tags")})
     return out
@@ -692,6 +692,12 @@ async def stripe_webhook(
                 handle_subscription_deleted(db, event_data)
             return {"ok": True, "handler": "merchant_subscription", "event_type": event_type}
 
+        # Paid subscription invoices feed the local revenue ledger
+        if event_type in ("invoice.paid", "invoice.payment_succeeded"):
+            from app.services.merchant_subscription_service import handle_invoice_paid
+            recorded = handle_invoice_paid(db, event_data)
+            return {"ok": True, "handler": "subscription_invoice", "recorded": recorded}
+
         logger.debug(f"Unhandled Stripe event type: {event_type}")
         return {"ok": True, "message": f"Event type acknowledged: {event_type}"}
 
@@ -19,6 +19,8 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/v1/stripe", tags=["stripe_webhooks"])
 
+INVOICE_PAID_EVENTS = ("invoice.paid", "invoice.payment_succeeded")
+
 
 def _construct_event(payload: bytes, sig_header: str) -> stripe.Event:
     """Verify Stripe signature and construct event object."""
@@ -52,6 +54,7 @@ async def stripe_webhooks(request: Request, db: Session = Depends(get_db)):
     Handles:
     - checkout.session.completed (campaign funding, merchant subscriptions)
     - customer.subscription.updated / deleted (merchant subscriptions)
+    - invoice.paid / invoice.payment_succeeded (subscription revenue ledger)
     - transfer.created / transfer.reversed (driver payouts)
     - payout.paid / payout.failed (driver payouts)
 
@@ -74,6 +77,9 @@ async def stripe_webhooks(request: Request, db: Session = Depends(get_db)):
         elif event_type in ("customer.subscription.updated", "customer.subscription.deleted"):
             return _handle_subscription_event(db, event_type, data_object)
 
+        elif event_type in INVOICE_PAID_EVENTS:
+            return _handle_invoice_paid(db, data_object)
+
         elif event_type in ("transfer.created", "transfer.reversed"):
             return _handle_transfer_event(db, event_type, data_object)
 
@@ -139,6 +145,15 @@ def _handle_subscription_event(db: Session, event_type: str, data_object: dict)
     return {"received": True, "handler": "merchant_subscription", "event_type": event_type}
 
 
+def _handle_invoice_paid(db: Session, data_object: dict) -> dict:
+    """Record a paid subscription invoice in the local revenue ledger."""
+    from app.services.merchant_subscription_service import handle_invoice_paid
+
+    recorded = handle_invoice_paid(db, data_object)
+    logger.info(f"Invoice event processed: invoice={data_object.get('id')} recorded={recorded}")
+    return {"received": True, "handler": "subscription_invoice", "recorded": recorded}
+
+
 def _handle_transfer_event(db: Session, event_type: str, data_object: dict) -> dict:
     """Handle transfer events for driver payouts."""
     from app.services.payout_service import PayoutService
@@ -15,7 +15,7 @@ from app.models import User
 from app.models.domain import DriverWallet, ApplePassRegistration
 from app.models.vehicle import VehicleAccount
 from app.dependencies.driver import get_current_driver
-from app.services.wallet_timeline import get_wallet_timeline
+from app.services.wallet_timeline import get_wallet_timeline_page
 from app.services.apple_wallet_pass import create_pkpass_bundle, refresh_pkpass_bundle, _ensure_wallet_pass_token
 from app.services.google_wallet_service import (
     ensure_google_wallet_class,
@@ -292,7 +292,9 @@ class PreviewHeaderError(BaseModel):
 
 @router.get("/timeline", response_model=List[TimelineEvent])
 def get_timeline(
+    response: Response,
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header"),
     user: User = Depends(get_current_driver),
     db: Session = Depends(get_db)
 ):
@@ -302,10 +304,20 @@ def get_timeline(
     Returns unified timeline of wallet activity:
     - EARNED events from NovaTransaction (driver_earn)
     - SPENT events from MerchantRedemption (excludes NovaTransaction driver_redeem to avoid duplicates)
+
+    When more events exist, the X-Next-Cursor response header carries the
+    cursor for the next page.
     """
     try:
-        events = get_wallet_timeline(db, driver_user_id=user.id, limit=limit)
+        events, next_cursor = get_wallet_timeline_page(db, driver_user_id=user.id, limit=limit, cursor=cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return events
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "INVALID_CURSOR", "message": str(e)}
+        )
     except Exception as e:
         logger.error(f"Failed to get wallet timeline for user {user.id}: {e}", exc_info=True)
         raise HTTPException(
@@ -111,6 +111,7 @@ class PartnerUpdateRequest(BaseModel):
     contact_email: Optional[str] = None
     webhook_url: Optional[str] = None
     webhook_enabled: Optional[bool] = None
+    webhook_batch_size: Optional[int] = Field(default=None, ge=1, le=100)
     rate_limit_rpm: Optional[int] = Field(default=None, ge=1, le=10000)
     quality_score_modifier: Optional[int] = None
 
@@ -126,6 +127,7 @@ class PartnerResponse(BaseModel):
     contact_email: Optional[str] = None
     webhook_url: Optional[str] = None
     webhook_enabled: bool
+    webhook_batch_size: int = 1
     rate_limit_rpm: int
     quality_score_modifier: int
     created_at: str
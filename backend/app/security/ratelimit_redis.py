@@ -1,13 +1,28 @@
 """
-Redis-backed rate limiting utilities.
-Falls back to in-memory rate limiting if Redis is unavailable (local dev only).
+Sliding-window rate limiting shared across workers through Redis.
+
+Each key counts requests in fixed windows, and a request is admitted while
+``previous_window * (unelapsed fraction) + current_window`` stays under the
+limit. That weighted sum slides with time, so bursts straddling a window
+boundary are not admitted twice as a plain fixed window would.
+
+Every Redis decision is one atomic script call (EVALSHA) on an async
+client. When plenty of the limit is left, the script grants a small batch
+of slots instead of one; this process spends them locally without touching
+Redis until the window ends, so clearly-under-limit traffic costs one round
+trip per batch. Near the limit slots are granted one at a time, and granted
+slots are already counted in Redis, so batching never over-admits.
+
+Falls back to the same algorithm in process memory while Redis is
+unavailable (retried every REDIS_RETRY_SECONDS).
 """
+import asyncio
+import math
 import os
 import time
-from typing import Optional, Dict, Tuple
-from fastapi import HTTPException
-from threading import Lock
-from collections import defaultdict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from cachetools import TTLCache
 
 logger = None
 try:
@@ -17,166 +32,140 @@ except Exception:
     import logging
     logger = logging.getLogger(__name__)
 
-# In-memory fallback (used when Redis unavailable in local dev)
-_memory_rate_limits = defaultdict(lambda: {"tokens": 0, "last_refill": time.time()})
-_memory_lock = Lock()
-
-# Redis client (lazy initialization)
-_redis_client = None
-_redis_available = None
-
-
-def _get_redis_client():
-    """Get Redis client, lazily initialized"""
-    global _redis_client, _redis_available
-    
-    if _redis_available is not None:
-        # Already checked - return cached result
-        return _redis_client if _redis_available else None
-    
-    try:
-        from app.config import settings
-        import redis
-        
-        redis_url = os.getenv("REDIS_URL", settings.redis_url)
-        if not redis_url or redis_url.startswith("redis://localhost") and "REDIS_URL" not in os.getenv("DATABASE_URL", ""):
-            # No Redis URL explicitly set - check if we should use Redis
-            env = os.getenv("ENV", "dev").lower()
-            if env not in {"local", "dev"}:
-                # In non-local env without Redis URL, we should warn but allow in-memory fallback for now
-                pass
-        
-        _redis_client = redis.from_url(redis_url, decode_responses=True, socket_connect_timeout=3, socket_timeout=3)
-        # Test connection
-        _redis_client.ping()
-        _redis_available = True
-        if logger:
-            logger.info(f"Redis rate limiting enabled: {redis_url}")
-        return _redis_client
-    except Exception as e:
-        _redis_available = False
-        if logger:
-            logger.warning(f"Redis not available for rate limiting, using in-memory fallback: {e}")
-        return None
-
-
-def _is_local_env() -> bool:
-    """Check if running in local environment"""
-    env = os.getenv("ENV", "dev").lower()
-    return env in {"local", "dev"}
+REDIS_RETRY_SECONDS = 30
+
+# KEYS[1]: current window counter, KEYS[2]: previous window counter
+# ARGV[1]: limit, ARGV[2]: previous window weight (parts per million),
+# ARGV[3]: slots wanted, ARGV[4]: counter TTL (ms)
+# Returns {slots granted, used including the grant}
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local used = current + math.floor(previous * tonumber(ARGV[2]) / 1000000)
+local free = limit - used
+if free <= 0 then
+    return {0, used}
+end
+local grant = tonumber(ARGV[3])
+if free * 2 < limit then
+    grant = 1
+end
+if grant > free then
+    grant = free
+end
+redis.call('INCRBY', KEYS[1], grant)
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[4]))
+return {grant, used + grant}
+"""
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_at: int  # Unix time the current window ends
 
 
 def _get_rate_limit_key(endpoint: str, client_id: str) -> str:
     """Generate Redis key for rate limiting"""
-    # Key format: rl:{endpoint}:{client_id}
-    # Sanitize endpoint (remove leading /, replace / with :)
+    # Key format: rl:{endpoint:client_id}; the hash tag keeps both window
+    # counters on one cluster slot, as a script's keys must be
     endpoint_clean = endpoint.lstrip("/").replace("/", ":")
-    return f"rl:{endpoint_clean}:{client_id}"
-
-
-def _redis_rate_limit(key: str, limit_per_min: int) -> bool:
-    """
-    Rate limit using Redis (fixed window algorithm).
-    
-    Returns True if request is allowed, False if rate limit exceeded.
-    """
-    redis_client = _get_redis_client()
-    if not redis_client:
-        return None  # Signal to use fallback
-    
-    try:
-        window_seconds = 60
-        current_window = int(time.time() // window_seconds)
-        redis_key = f"{key}:{current_window}"
-        
-        # Use INCR to atomically increment counter
-        count = redis_client.incr(redis_key)
-        
-        # Set expiration on first increment (race condition safe: EXPIRE is idempotent)
-        if count == 1:
-            redis_client.expire(redis_key, window_seconds)
-        
-        # Check if limit exceeded
-        if count > limit_per_min:
-            return False
-        
-        return True
-    except Exception as e:
-        if logger:
-            logger.error(f"Redis rate limit error: {e}", exc_info=True)
-        return None  # Signal to use fallback
-
-
-def _memory_rate_limit(key: str, limit_per_min: int) -> bool:
-    """Fallback in-memory rate limiting"""
-    with _memory_lock:
-        now = time.time()
-        window_seconds = 60
-        current_window = int(now // window_seconds)
-        memory_key = f"{key}:{current_window}"
-        
-        # Get or create rate limit entry
-        entry = _memory_rate_limits[memory_key]
-        
-        # Refill tokens if needed
-        time_since_refill = now - entry["last_refill"]
-        if time_since_refill >= window_seconds:
-            entry["tokens"] = limit_per_min
-            entry["last_refill"] = now
-        else:
-            # Add tokens based on time passed
-            tokens_to_add = int(time_since_refill * limit_per_min / window_seconds)
-            entry["tokens"] = min(limit_per_min, entry["tokens"] + tokens_to_add)
-            entry["last_refill"] = now
-        
-        # Check if we have tokens
-        if entry["tokens"] <= 0:
-            return False
-        
-        # Consume a token
-        entry["tokens"] -= 1
-        return True
-
-
-def rate_limit(endpoint: str, client_id: str, limit_per_min: int) -> bool:
-    """
-    Rate limit a request.
-    
-    Args:
-        endpoint: API endpoint path
-        client_id: Client identifier (IP or user ID)
-        limit_per_min: Requests per minute limit
-    
-    Returns:
-        True if request is allowed, False if rate limit exceeded
-    
-    Raises:
-        HTTPException: 429 if rate limit exceeded
-        RuntimeError: In non-local env if Redis is required but unavailable
-    """
-    key = _get_rate_limit_key(endpoint, client_id)
-    
-    # Try Redis first
-    result = _redis_rate_limit(key, limit_per_min)
-    
-    if result is None:
-        # Redis unavailable - use in-memory fallback
-        if logger:
-            logger.warning("Redis unavailable for rate limiting, using in-memory fallback")
-        result = _memory_rate_limit(key, limit_per_min)
-    
-    if not result:
-        raise HTTPException(
-            status_code=429,
-            detail=f"Rate limit exceeded: {limit_per_min} requests per minute"
-        )
-    
-    return True
-
-
-
-
-
-
-
-
+    return f"rl:{{{endpoint_clean}:{client_id}}}"
+
+
+class SlidingWindowLimiter:
+    """Per-key sliding-window limiter; Redis-backed with an in-memory fallback"""
+
+    def __init__(
+        self,
+        window_seconds: int = 60,
+        redis_url: Optional[str] = None,
+        batch_fraction: float = 0.1,
+        max_keys: int = 50000,
+    ):
+        self.window_seconds = window_seconds
+        self.redis_url = redis_url
+        self.batch_fraction = batch_fraction
+        # key -> [window index, slots left, remaining at grant]; slots Redis granted this process
+        self._reserved: TTLCache = TTLCache(maxsize=max_keys, ttl=window_seconds)
+        # key -> {window index: count}; used while Redis is unavailable
+        self._memory: TTLCache = TTLCache(maxsize=max_keys, ttl=2 * window_seconds)
+        self._redis: Optional[Tuple[asyncio.AbstractEventLoop, object, object]] = None
+        self._redis_retry_at = 0.0
+        self.stats = {"local": 0, "redis": 0, "memory": 0}
+
+    def _window(self, now: float) -> Tuple[int, float]:
+        """Current window index and the weight still carried by the previous window"""
+        index, elapsed = divmod(now, self.window_seconds)
+        return int(index), 1 - elapsed / self.window_seconds
+
+    async def hit(self, key: str, limit: int, now: Optional[float] = None) -> RateLimitDecision:
+        """Count one request against key, returning whether it is admitted"""
+        now = time.time() if now is None else now
+        index, previous_weight = self._window(now)
+        reset_at = (index + 1) * self.window_seconds
+
+        reserved = self._reserved.get(key)
+        if reserved is not None and reserved[0] == index and reserved[1] > 0:
+            reserved[1] -= 1
+            self.stats["local"] += 1
+            return RateLimitDecision(True, limit, reserved[2], reset_at)
+
+        redis_call = await self._script()
+        if redis_call is not None:
+            want = max(1, int(limit * self.batch_fraction))
+            try:
+                granted, used = await redis_call(
+                    keys=[f"{key}:{index}", f"{key}:{index - 1}"],
+                    args=[limit, int(previous_weight * 1_000_000), want, self.window_seconds * 2000],
+                )
+            except Exception as e:
+                if logger:
+                    logger.warning(f"Redis rate limiting failed, falling back to in-memory: {e}")
+                self._redis = None
+                self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+            else:
+                self.stats["redis"] += 1
+                granted, remaining = int(granted), max(0, limit - int(used))
+                if granted > 1:
+                    self._reserved[key] = [index, granted - 1, remaining]
+                return RateLimitDecision(granted > 0, limit, remaining, reset_at)
+
+        self.stats["memory"] += 1
+        return self._memory_hit(key, limit, index, previous_weight, reset_at)
+
+    def _memory_hit(self, key: str, limit: int, index: int, previous_weight: float, reset_at: int) -> RateLimitDecision:
+        counts: Dict[int, int] = self._memory.get(key) or {}
+        current, previous = counts.get(index, 0), counts.get(index - 1, 0)
+        used = current + math.floor(previous * previous_weight)
+        if used >= limit:
+            return RateLimitDecision(False, limit, 0, reset_at)
+        self._memory[key] = {index - 1: previous, index: current + 1}
+        return RateLimitDecision(True, limit, limit - used - 1, reset_at)
+
+    async def _script(self):
+        """The sliding-window script bound to this loop's Redis client, or None while Redis is unavailable"""
+        loop = asyncio.get_running_loop()
+        if self._redis is not None and self._redis[0] is loop:
+            return self._redis[2]
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            import redis.asyncio as redis
+            from app.config import settings
+
+            client = redis.from_url(
+                self.redis_url or os.getenv("REDIS_URL", settings.redis_url),
+                decode_responses=True, socket_connect_timeout=3, socket_timeout=3,
+            )
+            await client.ping()
+        except Exception as e:
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+            if logger:
+                logger.warning(f"Redis not available for rate limiting, using in-memory fallback: {e}")
+            return None
+        script = client.register_script(SLIDING_WINDOW_SCRIPT)
+        self._redis = (loop, client, script)
+        return script
@@ -0,0 +1,260 @@
+"""
+Admin overview snapshot.
+
+The admin console overview aggregates over most of the database (drivers,
+merchants, chargers, sessions, wallets, campaigns and every revenue source).
+It is computed off the request path by ``AdminOverviewRefresher`` and stored
+in ``admin_overview_snapshots``; GET /v1/admin/overview serves the stored
+snapshot along with its age.
+
+Subscription revenue is summed from the local ``subscription_invoice_payments``
+ledger (filled by the Stripe invoice.paid webhook) instead of listing
+invoices from Stripe for every active subscription.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import SessionLocal
+from app.models.admin_overview import AdminOverviewSnapshot
+from app.models.billing_event import BillingEvent
+from app.models.campaign import Campaign
+from app.models.driver_wallet import Payout
+from app.models.merchant_subscription import MerchantSubscription, SubscriptionInvoicePayment
+from app.models.session_event import SessionEvent
+from app.models.tesla_connection import TeslaConnection
+from app.models.user import User
+from app.models.while_you_charge import Charger, Merchant
+from app.models_domain import DomainMerchant, DriverWallet, MerchantFeeLedger, StripePayment
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_NAME = "overview"
+
+CAMPAIGN_REVENUE_STATUSES = ("active", "paused", "exhausted", "completed")
+
+
+def _count(model, *criteria):
+    stmt = select(func.count()).select_from(model)
+    if criteria:
+        stmt = stmt.where(*criteria)
+    return stmt.scalar_subquery()
+
+
+def _sum(column, *criteria):
+    stmt = select(func.coalesce(func.sum(column), 0))
+    if criteria:
+        stmt = stmt.where(*criteria)
+    return stmt.scalar_subquery()
+
+
+def compute_overview(db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Compute the overview payload (AdminOverviewResponse fields) from the database."""
+    now = now or datetime.utcnow()
+    active_customers = select(MerchantSubscription.stripe_customer_id).where(
+        MerchantSubscription.status == "active",
+        MerchantSubscription.stripe_customer_id.isnot(None),
+    )
+
+    # Every count and sum in one round-trip
+    totals = db.execute(select(
+        _count(User, User.role_flags.contains("driver")).label("drivers"),
+        _count(Merchant).label("merchants"),
+        _count(Charger).label("chargers"),
+        _count(SessionEvent).label("sessions"),
+        _count(
+            Campaign,
+            Campaign.status == "active",
+            Campaign.start_date <= now,
+            Campaign.spent_cents < Campaign.budget_cents,
+        ).label("active_campaigns"),
+        _sum(DriverWallet.nova_balance).label("driver_nova"),
+        _sum(DomainMerchant.nova_balance).label("merchant_nova"),
+        _count(MerchantSubscription, MerchantSubscription.status == "active").label("active_subscriptions"),
+        _sum(
+            SubscriptionInvoicePayment.amount_paid_cents,
+            SubscriptionInvoicePayment.stripe_customer_id.in_(active_customers),
+        ).label("subscription_revenue"),
+        _sum(StripePayment.amount_usd, StripePayment.status == "paid").label("nova_sales"),
+        _sum(MerchantFeeLedger.fee_cents, MerchantFeeLedger.status.in_(["invoiced", "paid"])).label("merchant_fees"),
+        _sum(BillingEvent.billable_cents, BillingEvent.status == "paid").label("arrival_billing"),
+        _sum(Payout.amount_cents, Payout.status.in_(["paid", "processing"])).label("driver_payouts"),
+        _count(TeslaConnection, TeslaConnection.is_active == True).label("tesla_connections"),  # noqa: E712
+        _count(
+            DriverWallet,
+            DriverWallet.stripe_account_id.isnot(None),
+            DriverWallet.stripe_onboarding_complete == True,  # noqa: E712
+        ).label("stripe_express"),
+    )).one()
+
+    # Campaign revenue — all campaigns that have been active (not just
+    # funding_status='funded'); some were activated without Stripe checkout
+    campaign_gross = 0
+    campaign_fees = 0
+    campaign_driver_rewards = 0
+    fee_bps = getattr(settings, "PLATFORM_FEE_BPS", 2000)
+    campaigns = db.execute(
+        select(
+            Campaign.gross_funding_cents,
+            Campaign.platform_fee_cents,
+            Campaign.budget_cents,
+            Campaign.spent_cents,
+        ).where(or_(
+            Campaign.funding_status == "funded",
+            Campaign.status.in_(CAMPAIGN_REVENUE_STATUSES),
+            Campaign.spent_cents > 0,
+        ))
+    ).all()
+    for gross, platform_fee, budget, spent in campaigns:
+        if gross:
+            campaign_gross += gross
+            campaign_fees += platform_fee or 0
+        elif budget:
+            # Funded without fee extraction — gross = budget, fee is implied
+            campaign_gross += budget
+            campaign_fees += int(budget * fee_bps / (10000 + fee_bps))
+        campaign_driver_rewards += spent or 0
+
+    subscription_revenue = int(totals.subscription_revenue)
+    nova_sales = int(totals.nova_sales)
+    merchant_fees = int(totals.merchant_fees)
+    arrival_billing = int(totals.arrival_billing)
+    total_realized = campaign_gross + subscription_revenue + nova_sales + merchant_fees + arrival_billing
+    total_driver_nova = int(totals.driver_nova)
+    total_merchant_nova = int(totals.merchant_nova)
+
+    return {
+        "total_drivers": totals.drivers,
+        "total_merchants": totals.merchants,
+        "total_chargers": totals.chargers,
+        "total_charging_sessions": totals.sessions,
+        "active_campaigns": totals.active_campaigns,
+        "total_driver_nova": total_driver_nova,
+        "total_merchant_nova": total_merchant_nova,
+        "total_nova_outstanding": total_driver_nova + total_merchant_nova,
+        # Legacy field: total realized revenue
+        "total_stripe_usd": total_realized,
+        "total_tesla_connections": totals.tesla_connections,
+        "total_stripe_express_onboarded": totals.stripe_express,
+        "revenue": {
+            "campaign_gross_cents": campaign_gross,
+            "campaign_platform_fees_cents": campaign_fees,
+            "campaign_driver_rewards_cents": campaign_driver_rewards,
+            "merchant_subscriptions_cents": subscription_revenue,
+            "active_subscriptions": totals.active_subscriptions,
+            "nova_sales_cents": nova_sales,
+            "merchant_fees_cents": merchant_fees,
+            "arrival_billing_cents": arrival_billing,
+            "total_realized_cents": total_realized,
+            "total_driver_payouts_cents": int(totals.driver_payouts),
+        },
+    }
+
+
+def refresh_snapshot(db: Session) -> AdminOverviewSnapshot:
+    """Recompute the overview and store it as the current snapshot (commits)."""
+    started = time.perf_counter()
+    payload = compute_overview(db)
+    compute_ms = int((time.perf_counter() - started) * 1000)
+
+    snapshot = db.get(AdminOverviewSnapshot, SNAPSHOT_NAME)
+    if snapshot is None:
+        snapshot = AdminOverviewSnapshot(name=SNAPSHOT_NAME)
+        db.add(snapshot)
+    snapshot.payload = payload
+    snapshot.computed_at = datetime.utcnow()
+    snapshot.compute_ms = compute_ms
+    db.commit()
+    logger.info("Admin overview snapshot refreshed in %d ms", compute_ms)
+    return snapshot
+
+
+def get_snapshot(db: Session) -> Optional[AdminOverviewSnapshot]:
+    return db.get(AdminOverviewSnapshot, SNAPSHOT_NAME)
+
+
+def get_or_create_snapshot(db: Session) -> Tuple[AdminOverviewSnapshot, bool]:
+    """Current snapshot, computing it first if none exists yet. Returns (snapshot, created)."""
+    snapshot = get_snapshot(db)
+    if snapshot is not None:
+        return snapshot, False
+    return refresh_snapshot(db), True
+
+
+class AdminOverviewRefresher:
+    """Background job that keeps the overview snapshot fresh"""
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.interval = (
+            interval
+            if interval is not None
+            else float(os.getenv("ADMIN_OVERVIEW_REFRESH_SECONDS", "300"))
+        )
+        self.session_factory = session_factory
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the refresher"""
+        if self.running:
+            logger.warning("Admin overview refresher is already running")
+            return
+        self.running = True
+        self.task = asyncio.create_task(self._run())
+        logger.info("Admin overview refresher started")
+
+    async def stop(self):
+        """Stop the refresher"""
+        if not self.running:
+            return
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Admin overview refresher stopped")
+
+    async def _run(self):
+        while self.running:
+            try:
+                await asyncio.to_thread(self.refresh_if_stale)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error refreshing admin overview: {e}")
+            await asyncio.sleep(self.interval)
+
+    def refresh_if_stale(self) -> bool:
+        """
+        Refresh unless another process already did within the interval.
+        Returns True if a refresh ran.
+        """
+        db = self.session_factory()
+        try:
+            snapshot = get_snapshot(db)
+            if snapshot is not None and (datetime.utcnow() - snapshot.computed_at).total_seconds() < self.interval:
+                return False
+            refresh_snapshot(db)
+            return True
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+# Global refresher
+admin_overview_refresher = AdminOverviewRefresher()
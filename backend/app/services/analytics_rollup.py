@@ -0,0 +1,501 @@
+"""
+Incremental daily rollups for the admin analytics endpoints.
+
+Flushes that insert, delete or change an aggregated column of a SessionEvent,
+IncentiveGrant or Payout mark the UTC days they touch in
+``analytics_dirty_days`` (same transaction as the write). The rollup worker
+recomputes only those days, a whole day at a time, into:
+
+- ``analytics_daily_rollups``           sessions, kWh, active/new drivers, grants, payouts
+- ``analytics_campaign_daily_rollups``  grants per campaign
+- ``analytics_charger_daily_rollups``   sessions per charger
+
+Days from ``live_since()`` onwards (today, plus yesterday for the first
+``settle_seconds`` after midnight so late commits are not missed) are never
+rolled up; readers compute them from the raw tables, which is a range scan
+over at most two days.
+
+Core-level bulk writes bypass the flush hook and must call
+``mark_days_dirty`` themselves.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, distinct, event, func, inspect, insert, select
+from sqlalchemy.orm import Session, aliased
+
+from app.db import SessionLocal
+from app.models.analytics_rollup import (
+    AnalyticsCampaignDailyRollup,
+    AnalyticsChargerDailyRollup,
+    AnalyticsDailyRollup,
+    AnalyticsDirtyDay,
+)
+from app.models.driver_wallet import Payout
+from app.models.session_event import IncentiveGrant, SessionEvent
+
+logger = logging.getLogger(__name__)
+
+SETTLE_SECONDS = float(os.getenv("ANALYTICS_ROLLUP_SETTLE_SECONDS", "300"))
+
+# model -> (timestamp columns that pick the day, other aggregated columns)
+_TRACKED = {
+    SessionEvent: (("session_start",), ("driver_user_id", "charger_id", "kwh_delivered")),
+    IncentiveGrant: (("created_at", "granted_at"), ("campaign_id", "amount_cents")),
+    Payout: (("created_at",), ("status", "amount_cents")),
+}
+
+
+def live_since(now: Optional[datetime] = None, settle_seconds: float = SETTLE_SECONDS) -> date:
+    """First day that is served from raw tables rather than rollups."""
+    now = now or datetime.utcnow()
+    return (now - timedelta(seconds=settle_seconds)).date()
+
+
+def _day_bounds(day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+# ---------------------------------------------------------------------------
+# Dirty-day tracking
+# ---------------------------------------------------------------------------
+
+def mark_days_dirty(db: Session, days: Iterable[date]) -> None:
+    """
+    Record days whose rollups need recomputing (idempotent).
+
+    Note:
+        Does not commit - caller should commit in their transaction pattern.
+    """
+    rows = [{"day": day, "marked_at": datetime.utcnow()} for day in sorted(set(days))]
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        db.execute(pg_insert(AnalyticsDirtyDay.__table__).on_conflict_do_nothing(index_elements=["day"]), rows)
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        db.execute(sqlite_insert(AnalyticsDirtyDay.__table__).on_conflict_do_nothing(index_elements=["day"]), rows)
+    else:
+        existing = set(db.scalars(
+            select(AnalyticsDirtyDay.day).where(AnalyticsDirtyDay.day.in_([r["day"] for r in rows]))
+        ))
+        missing = [r for r in rows if r["day"] not in existing]
+        if missing:
+            db.execute(insert(AnalyticsDirtyDay.__table__), missing)
+
+
+def _days_touched(obj, day_attrs, value_attrs, is_update: bool) -> Set[date]:
+    state = inspect(obj)
+    if is_update and not any(state.attrs[a].history.has_changes() for a in (*day_attrs, *value_attrs)):
+        return set()
+    days = set()
+    for attr in day_attrs:
+        values = [getattr(obj, attr, None)]
+        if is_update:
+            # An updated timestamp moves the row out of its old day too
+            values.extend(state.attrs[attr].history.deleted)
+        days.update(v.date() for v in values if isinstance(v, datetime))
+    return days
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_dirty_days(session: Session, flush_context) -> None:
+    days: Set[date] = set()
+    for objects, is_update in ((session.new, False), (session.deleted, False), (session.dirty, True)):
+        for obj in objects:
+            tracked = _TRACKED.get(type(obj))
+            if tracked:
+                days |= _days_touched(obj, *tracked, is_update=is_update)
+    if days:
+        mark_days_dirty(session, days)
+
+
+# ---------------------------------------------------------------------------
+# Aggregation over raw tables (one day / a partial range)
+# ---------------------------------------------------------------------------
+
+def _session_totals(db: Session, start: datetime, end: datetime) -> Tuple[int, float, int]:
+    row = db.execute(
+        select(
+            func.count(SessionEvent.id),
+            func.coalesce(func.sum(SessionEvent.kwh_delivered), 0),
+            func.count(distinct(SessionEvent.driver_user_id)),
+        ).where(SessionEvent.session_start >= start, SessionEvent.session_start < end)
+    ).one()
+    return int(row[0]), float(row[1]), int(row[2])
+
+
+def _new_drivers(db: Session, start: datetime, end: datetime) -> int:
+    """Drivers with a session in [start, end) and none before start."""
+    earlier = aliased(SessionEvent)
+    has_earlier = (
+        select(earlier.id)
+        .where(earlier.driver_user_id == SessionEvent.driver_user_id, earlier.session_start < start)
+        .exists()
+    )
+    return db.scalar(
+        select(func.count(distinct(SessionEvent.driver_user_id))).where(
+            SessionEvent.session_start >= start, SessionEvent.session_start < end, ~has_earlier,
+        )
+    ) or 0
+
+
+def _grant_totals(db: Session, start: datetime, end: datetime) -> Tuple[int, int]:
+    row = db.execute(
+        select(func.count(IncentiveGrant.id), func.coalesce(func.sum(IncentiveGrant.amount_cents), 0))
+        .where(IncentiveGrant.granted_at >= start, IncentiveGrant.granted_at < end)
+    ).one()
+    return int(row[0]), int(row[1])
+
+
+def _payout_totals(db: Session, start: datetime, end: datetime) -> Tuple[int, int]:
+    row = db.execute(
+        select(func.count(Payout.id), func.coalesce(func.sum(Payout.amount_cents), 0))
+        .where(Payout.created_at >= start, Payout.created_at < end, Payout.status == "paid")
+    ).one()
+    return int(row[0]), int(row[1])
+
+
+def _campaign_grants(db: Session, start: datetime, end: datetime) -> Dict[object, Tuple[int, int]]:
+    rows = db.execute(
+        select(
+            IncentiveGrant.campaign_id,
+            func.count(IncentiveGrant.id),
+            func.coalesce(func.sum(IncentiveGrant.amount_cents), 0),
+        )
+        .where(IncentiveGrant.created_at >= start, IncentiveGrant.created_at < end)
+        .group_by(IncentiveGrant.campaign_id)
+    ).all()
+    return {campaign_id: (int(count), int(cents)) for campaign_id, count, cents in rows}
+
+
+def _charger_sessions(db: Session, start: datetime, end: datetime) -> Dict[str, Tuple[int, float, int]]:
+    rows = db.execute(
+        select(
+            SessionEvent.charger_id,
+            func.count(SessionEvent.id),
+            func.coalesce(func.sum(SessionEvent.kwh_delivered), 0),
+            func.count(distinct(SessionEvent.driver_user_id)),
+        )
+        .where(
+            SessionEvent.session_start >= start,
+            SessionEvent.session_start < end,
+            SessionEvent.charger_id.isnot(None),
+        )
+        .group_by(SessionEvent.charger_id)
+    ).all()
+    return {charger_id: (int(c), float(kwh), int(d)) for charger_id, c, kwh, d in rows}
+
+
+def _following_first_days(db: Session, day: date) -> Set[date]:
+    """
+    For drivers whose first session is on ``day``, the day of their next
+    session - the day that counted them as new before an earlier session
+    was backfilled.
+    """
+    start, end = _day_bounds(day)
+    earlier = aliased(SessionEvent)
+    new_on_day = (
+        select(SessionEvent.driver_user_id)
+        .where(
+            SessionEvent.session_start >= start,
+            SessionEvent.session_start < end,
+            ~select(earlier.id)
+            .where(earlier.driver_user_id == SessionEvent.driver_user_id, earlier.session_start < start)
+            .exists(),
+        )
+    )
+    later = aliased(SessionEvent)
+    rows = db.execute(
+        select(func.min(later.session_start))
+        .where(later.driver_user_id.in_(new_on_day), later.session_start >= end)
+        .group_by(later.driver_user_id)
+    ).scalars()
+    return {ts.date() for ts in rows if ts is not None}
+
+
+# ---------------------------------------------------------------------------
+# Rollup maintenance
+# ---------------------------------------------------------------------------
+
+def recompute_day(db: Session, day: date) -> Set[date]:
+    """
+    Replace the rollup rows for ``day`` from the raw tables.
+
+    Returns later days whose new-driver count may have changed as a result
+    (only when this day's count did).
+
+    Note:
+        Does not commit - caller should commit in their transaction pattern.
+    """
+    start, end = _day_bounds(day)
+    previous_new = db.scalar(select(AnalyticsDailyRollup.new_drivers).where(AnalyticsDailyRollup.day == day)) or 0
+
+    session_count, total_kwh, active_drivers = _session_totals(db, start, end)
+    new_drivers = _new_drivers(db, start, end) if session_count else 0
+    grant_count, grants_cents = _grant_totals(db, start, end)
+    payout_count, payouts_cents = _payout_totals(db, start, end)
+    campaigns = _campaign_grants(db, start, end)
+    chargers = _charger_sessions(db, start, end)
+
+    for model in (AnalyticsDailyRollup, AnalyticsCampaignDailyRollup, AnalyticsChargerDailyRollup):
+        db.execute(delete(model).where(model.day == day))
+
+    if session_count or grant_count or payout_count:
+        db.execute(insert(AnalyticsDailyRollup), [{
+            "day": day,
+            "session_count": session_count,
+            "total_kwh": total_kwh,
+            "active_drivers": active_drivers,
+            "new_drivers": new_drivers,
+            "grant_count": grant_count,
+            "grants_cents": grants_cents,
+            "payout_count": payout_count,
+            "payouts_cents": payouts_cents,
+            "computed_at": datetime.utcnow(),
+        }])
+    if campaigns:
+        db.execute(insert(AnalyticsCampaignDailyRollup), [
+            {"day": day, "campaign_id": campaign_id, "grant_count": count, "grants_cents": cents}
+            for campaign_id, (count, cents) in campaigns.items()
+        ])
+    if chargers:
+        db.execute(insert(AnalyticsChargerDailyRollup), [
+            {"day": day, "charger_id": charger_id, "session_count": c, "total_kwh": kwh, "active_drivers": d}
+            for charger_id, (c, kwh, d) in chargers.items()
+        ])
+
+    if new_drivers != previous_new:
+        return _following_first_days(db, day)
+    return set()
+
+
+# ---------------------------------------------------------------------------
+# Readers (rollups for settled days + raw tables for the live range)
+# ---------------------------------------------------------------------------
+
+@dataclass
+class DailyTotals:
+    day: date
+    session_count: int = 0
+    total_kwh: float = 0.0
+    active_drivers: int = 0
+    new_drivers: int = 0
+    grant_count: int = 0
+    grants_cents: int = 0
+    payout_count: int = 0
+    payouts_cents: int = 0
+
+
+def _live_days(since: date, now: datetime) -> List[date]:
+    first = max(since, live_since(now))
+    return [first + timedelta(days=i) for i in range((now.date() - first).days + 1)]
+
+
+def daily_totals(
+    db: Session,
+    since: date,
+    *,
+    sessions: bool = False,
+    drivers: bool = False,
+    revenue: bool = False,
+    now: Optional[datetime] = None,
+) -> List[DailyTotals]:
+    """
+    Per-day totals from ``since`` to now, oldest first, with only the
+    requested groups of fields computed for the live days.
+    """
+    now = now or datetime.utcnow()
+    boundary = live_since(now)
+    totals = [
+        DailyTotals(
+            day=row.day,
+            session_count=row.session_count,
+            total_kwh=row.total_kwh,
+            active_drivers=row.active_drivers,
+            new_drivers=row.new_drivers,
+            grant_count=row.grant_count,
+            grants_cents=row.grants_cents,
+            payout_count=row.payout_count,
+            payouts_cents=row.payouts_cents,
+        )
+        for row in db.execute(
+            select(AnalyticsDailyRollup)
+            .where(AnalyticsDailyRollup.day >= since, AnalyticsDailyRollup.day < boundary)
+            .order_by(AnalyticsDailyRollup.day)
+        ).scalars()
+    ]
+
+    for day in _live_days(since, now):
+        start, end = _day_bounds(day)
+        live = DailyTotals(day=day)
+        if sessions or drivers:
+            live.session_count, live.total_kwh, live.active_drivers = _session_totals(db, start, end)
+        if drivers and live.session_count:
+            live.new_drivers = _new_drivers(db, start, end)
+        if revenue:
+            live.grant_count, live.grants_cents = _grant_totals(db, start, end)
+            live.payout_count, live.payouts_cents = _payout_totals(db, start, end)
+        totals.append(live)
+    return totals
+
+
+def campaign_grant_totals(db: Session, now: Optional[datetime] = None) -> Dict[object, Tuple[int, int]]:
+    """All-time (grant_count, grants_cents) per campaign_id."""
+    now = now or datetime.utcnow()
+    boundary = live_since(now)
+    totals: Dict[object, List[int]] = defaultdict(lambda: [0, 0])
+    rows = db.execute(
+        select(
+            AnalyticsCampaignDailyRollup.campaign_id,
+            func.sum(AnalyticsCampaignDailyRollup.grant_count),
+            func.sum(AnalyticsCampaignDailyRollup.grants_cents),
+        )
+        .where(AnalyticsCampaignDailyRollup.day < boundary)
+        .group_by(AnalyticsCampaignDailyRollup.campaign_id)
+    ).all()
+    for campaign_id, count, cents in rows:
+        totals[campaign_id][0] += int(count or 0)
+        totals[campaign_id][1] += int(cents or 0)
+    start, end = _day_bounds(boundary)[0], _day_bounds(now.date())[1]
+    for campaign_id, (count, cents) in _campaign_grants(db, start, end).items():
+        totals[campaign_id][0] += count
+        totals[campaign_id][1] += cents
+    return {campaign_id: (count, cents) for campaign_id, (count, cents) in totals.items()}
+
+
+def charger_totals(db: Session, since: date, limit: int, now: Optional[datetime] = None) -> List[Tuple[str, int, float]]:
+    """Top ``limit`` chargers by session count since ``since``: (charger_id, sessions, kwh)."""
+    now = now or datetime.utcnow()
+    boundary = live_since(now)
+    totals: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+    rows = db.execute(
+        select(
+            AnalyticsChargerDailyRollup.charger_id,
+            func.sum(AnalyticsChargerDailyRollup.session_count),
+            func.sum(AnalyticsChargerDailyRollup.total_kwh),
+        )
+        .where(AnalyticsChargerDailyRollup.day >= since, AnalyticsChargerDailyRollup.day < boundary)
+        .group_by(AnalyticsChargerDailyRollup.charger_id)
+    ).all()
+    for charger_id, count, kwh in rows:
+        totals[charger_id][0] += int(count or 0)
+        totals[charger_id][1] += float(kwh or 0)
+    start, end = _day_bounds(max(since, boundary))[0], _day_bounds(now.date())[1]
+    for charger_id, (count, kwh, _) in _charger_sessions(db, start, end).items():
+        totals[charger_id][0] += count
+        totals[charger_id][1] += kwh
+    ranked = sorted(totals.items(), key=lambda item: (-item[1][0], item[0]))[:limit]
+    return [(charger_id, int(count), kwh) for charger_id, (count, kwh) in ranked]
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+class AnalyticsRollupWorker:
+    """Background worker that recomputes dirty days"""
+
+    def __init__(
+        self,
+        poll_interval: Optional[float] = None,
+        batch_days: Optional[int] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.poll_interval = (
+            poll_interval
+            if poll_interval is not None
+            else float(os.getenv("ANALYTICS_ROLLUP_POLL_SECONDS", "60"))
+        )
+        self.batch_days = batch_days or int(os.getenv("ANALYTICS_ROLLUP_BATCH_DAYS", "31"))
+        self.session_factory = session_factory
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"days_recomputed": 0, "passes": 0}
+
+    async def start(self):
+        """Start the rollup worker"""
+        if self.running:
+            logger.warning("Analytics rollup worker is already running")
+            return
+        self.running = True
+        self.task = asyncio.create_task(self._run())
+        logger.info("Analytics rollup worker started")
+
+    async def stop(self):
+        """Stop the rollup worker"""
+        if not self.running:
+            return
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Analytics rollup worker stopped")
+
+    async def _run(self):
+        while self.running:
+            try:
+                await asyncio.to_thread(self._drain)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in analytics rollup worker: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def process_dirty(self, db: Session, now: Optional[datetime] = None) -> int:
+        """
+        Recompute up to ``batch_days`` settled dirty days, oldest first, one
+        commit per day. Returns the number of days recomputed.
+        """
+        boundary = live_since(now)
+        days = db.scalars(
+            select(AnalyticsDirtyDay.day)
+            .where(AnalyticsDirtyDay.day < boundary)
+            .order_by(AnalyticsDirtyDay.day)
+            .limit(self.batch_days)
+        ).all()
+        self.stats["passes"] += 1
+        for day in days:
+            try:
+                # Cleared first: a write marking the day again while we
+                # recompute re-creates the row and gets picked up next pass
+                db.execute(delete(AnalyticsDirtyDay).where(AnalyticsDirtyDay.day == day))
+                follow_up = recompute_day(db, day)
+                mark_days_dirty(db, (d for d in follow_up if d < boundary))
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            self.stats["days_recomputed"] += 1
+        return len(days)
+
+    def drain(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Process dirty days (including follow-ups they mark) until none are left."""
+        total = 0
+        while True:
+            processed = self.process_dirty(db, now)
+            if not processed:
+                return total
+            total += processed
+
+    def _drain(self) -> int:
+        db = self.session_factory()
+        try:
+            return self.drain(db)
+        finally:
+            db.close()
+
+
+# Global rollup worker
+analytics_rollup_worker = AnalyticsRollupWorker()
@@ -2,10 +2,18 @@
 Apple Wallet Pass Push Service (APNs for PassKit)
 
 Sends silent push notifications to prompt Apple Wallet to refresh passes.
+
+Wallet activity is coalesced per driver by ``pass_update_scheduler``: bursts of
+grants/redemptions inside the debounce window produce a single push per device,
+sent in batches over one persistent APNs (HTTP/2) connection.
 """
+import asyncio
 import logging
 import os
-from typing import Optional, Iterable
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
@@ -13,11 +21,21 @@ from app.models.domain import ApplePassRegistration, DriverWallet
 
 logger = logging.getLogger(__name__)
 
+# APNs reasons that mean the push token will never be valid again
+_DEAD_TOKEN_REASONS = {"Unregistered", "BadDeviceToken", "DeviceTokenNotForTopic"}
+
+_client_lock = threading.Lock()
+_cached_client: Optional[Tuple[object, str]] = None
+
+
+def _push_enabled() -> bool:
+    return os.getenv("APPLE_PASS_PUSH_ENABLED", "false").lower() == "true"
+
 
 def _apns_client():
     """
     Lazily import and construct an APNs client if configuration is present.
-    
+
     This function avoids importing heavy dependencies if push is disabled.
     """
     from apns2.client import APNsClient  # type: ignore
@@ -43,71 +61,284 @@ def _apns_client():
     return client, topic
 
 
-def send_pass_update(push_token: str) -> None:
+def _get_apns_client():
     """
-    Send a silent PassKit push notification for a single device push token.
-    
-    This should be fire-and-forget (errors are logged but not raised).
+    Return the process-wide APNs client, creating it on first use.
+
+    The client keeps its HTTP/2 connection open, so consecutive batches reuse
+    the same TLS session instead of reconnecting per push.
     """
-    if not push_token:
-        return
+    global _cached_client
+    with _client_lock:
+        if _cached_client is None:
+            _cached_client = _apns_client()
+        return _cached_client
 
-    if os.getenv("APPLE_PASS_PUSH_ENABLED", "false").lower() != "true":
-        return
+
+def _reset_apns_client() -> None:
+    """Drop the cached client so the next batch reconnects."""
+    global _cached_client
+    with _client_lock:
+        _cached_client = None
+
+
+def _result_status(result) -> str:
+    """Normalize an apns2 batch result ("Success", reason, or (reason, timestamp))."""
+    if isinstance(result, tuple):
+        return str(result[0])
+    return str(result)
+
+
+def send_push_batch(push_tokens: Iterable[str]) -> Dict[str, str]:
+    """
+    Send silent PassKit pushes to many tokens over one APNs connection.
+
+    Returns a mapping of push token -> status ("Success" or the APNs reason).
+    Errors are logged, never raised; tokens that could not be attempted are
+    reported with status "Error".
+    """
+    tokens = list(dict.fromkeys(t for t in push_tokens if t))
+    if not tokens or not _push_enabled():
+        return {}
 
     try:
-        client, topic = _apns_client()
+        client, topic = _get_apns_client()
     except Exception as e:
         logger.error(f"Apple Wallet APNs client init failed: {e}", exc_info=True)
-        return
+        return {token: "Error" for token in tokens}
 
     try:
+        from apns2.client import Notification  # type: ignore
         from apns2.payload import Payload  # type: ignore
 
         # Empty payload with content-available triggers a background update
         payload = Payload(content_available=True)
-        client.send_notification(push_token, payload, topic)
-        logger.info("Sent Apple Wallet PassKit push")
+        raw = client.send_notification_batch(
+            [Notification(token=token, payload=payload) for token in tokens],
+            topic,
+        )
     except Exception as e:
-        logger.error(f"Failed to send Apple Wallet pass update push: {e}", exc_info=True)
+        logger.error(f"Failed to send Apple Wallet pass update batch: {e}", exc_info=True)
+        # Connection is likely broken; reconnect on the next batch
+        _reset_apns_client()
+        return {token: "Error" for token in tokens}
+
+    results = {token: _result_status(raw.get(token, "Error")) for token in tokens}
+    sent = sum(1 for status in results.values() if status == "Success")
+    logger.info(f"Sent Apple Wallet PassKit pushes: {sent}/{len(tokens)} succeeded")
+    return results
+
+
+def send_pass_update(push_token: str) -> None:
+    """
+    Send a silent PassKit push notification for a single device push token.
+
+    This should be fire-and-forget (errors are logged but not raised).
+    """
+    if not push_token:
+        return
+    send_push_batch([push_token])
+
+
+def _record_push_outcomes(
+    regs: Iterable[ApplePassRegistration],
+    results: Dict[str, str],
+) -> None:
+    """Store per-token delivery outcome; deactivate registrations with dead tokens."""
+    now = datetime.utcnow()
+    for reg in regs:
+        status = results.get(reg.push_token)
+        if status is None:
+            continue
+        reg.last_push_at = now
+        reg.last_push_status = status
+        if status == "Success":
+            reg.push_failure_count = 0
+            continue
+        reg.push_failure_count = (reg.push_failure_count or 0) + 1
+        if status in _DEAD_TOKEN_REASONS:
+            reg.is_active = False
+            logger.info(
+                f"Deactivated ApplePassRegistration {reg.id} after APNs rejected token ({status})"
+            )
+
+
+def _active_registrations(db: Session, driver_ids: List[int]) -> List[ApplePassRegistration]:
+    return (
+        db.query(ApplePassRegistration)
+        .filter(
+            ApplePassRegistration.driver_wallet_id.in_(driver_ids),
+            ApplePassRegistration.is_active == True,  # noqa: E712
+            ApplePassRegistration.push_token.isnot(None),
+        )
+        .all()
+    )
+
+
+def send_updates_for_drivers(db: Session, driver_ids: Iterable[int]) -> Dict[str, str]:
+    """
+    Push pass updates for every active registration of the given drivers.
+
+    Registrations are loaded with one query and all tokens go out in one APNs
+    batch. Outcomes are written to the registrations; does not commit.
+    """
+    driver_ids = list(dict.fromkeys(driver_ids))
+    if not driver_ids or not _push_enabled():
+        return {}
+
+    try:
+        regs = _active_registrations(db, driver_ids)
+    except Exception as e:
+        logger.error(f"Failed to load ApplePassRegistration for {len(driver_ids)} wallets: {e}", exc_info=True)
+        return {}
+
+    results = send_push_batch(reg.push_token for reg in regs)
+    _record_push_outcomes(regs, results)
+    return results
 
 
 def send_updates_for_wallet(db: Session, wallet: DriverWallet) -> None:
     """
     Send silent PassKit push notifications for all active registrations for a wallet.
-    
+
     Non-blocking: all errors are caught and logged.
     """
-    if os.getenv("APPLE_PASS_PUSH_ENABLED", "false").lower() != "true":
+    if not _push_enabled():
         return
 
     try:
-        regs: Iterable[ApplePassRegistration] = (
-            db.query(ApplePassRegistration)
-            .filter(
-                ApplePassRegistration.driver_wallet_id == wallet.user_id,
-                ApplePassRegistration.is_active == True,  # noqa: E712
-                ApplePassRegistration.push_token.isnot(None),
-            )
-            .all()
-        )
+        send_updates_for_drivers(db, [wallet.user_id])
     except Exception as e:
-        logger.error(f"Failed to load ApplePassRegistration for wallet {wallet.user_id}: {e}", exc_info=True)
-        return
+        logger.error(f"Failed to send pass updates for wallet {wallet.user_id}: {e}", exc_info=True)
 
-    for reg in regs:
-        try:
-            send_pass_update(reg.push_token)
-        except Exception:
-            # send_pass_update already logs errors; continue
-            continue
 
+class PassUpdateScheduler:
+    """
+    Debounced scheduler for PassKit update pushes.
+
+    ``schedule(driver_id)`` only records activity (thread-safe, no I/O). A
+    driver becomes due ``debounce_seconds`` after their last activity, capped at
+    ``max_delay_seconds`` after the first, so steady activity still refreshes
+    the pass. The worker loop flushes all due drivers in one batch.
+    """
+
+    def __init__(
+        self,
+        debounce_seconds: Optional[float] = None,
+        max_delay_seconds: Optional[float] = None,
+        tick_seconds: float = 1.0,
+    ):
+        self.debounce_seconds = (
+            debounce_seconds
+            if debounce_seconds is not None
+            else float(os.getenv("APPLE_PASS_PUSH_DEBOUNCE_SECONDS", "10"))
+        )
+        self.max_delay_seconds = (
+            max_delay_seconds
+            if max_delay_seconds is not None
+            else float(os.getenv("APPLE_PASS_PUSH_MAX_DELAY_SECONDS", "60"))
+        )
+        self.tick_seconds = tick_seconds
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        # driver_id -> (first_activity, last_activity), monotonic seconds
+        self._pending: Dict[int, Tuple[float, float]] = {}
+        self.stats = {"scheduled": 0, "coalesced": 0, "flushes": 0, "pushed": 0, "failed": 0}
+
+    def schedule(self, driver_id: int, now: Optional[float] = None) -> None:
+        """Record wallet activity for a driver; the push is sent once the window settles."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.stats["scheduled"] += 1
+            entry = self._pending.get(driver_id)
+            if entry is None:
+                self._pending[driver_id] = (now, now)
+            else:
+                self.stats["coalesced"] += 1
+                self._pending[driver_id] = (entry[0], now)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def pop_due(self, now: Optional[float] = None) -> List[int]:
+        """Remove and return drivers whose debounce window has elapsed."""
+        now = time.monotonic() if now is None else now
+        due = []
+        with self._lock:
+            for driver_id, (first, last) in list(self._pending.items()):
+                if now - last >= self.debounce_seconds or now - first >= self.max_delay_seconds:
+                    due.append(driver_id)
+                    del self._pending[driver_id]
+        return due
+
+    def flush(self, driver_ids: List[int]) -> Dict[str, str]:
+        """Send pushes for the given drivers in one batch and persist outcomes."""
+        if not driver_ids:
+            return {}
+
+        from app.db import SessionLocal
+
+        db = SessionLocal()
+        try:
+            results = send_updates_for_drivers(db, driver_ids)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"PassKit push flush failed for {len(driver_ids)} drivers: {e}", exc_info=True)
+            return {}
+        finally:
+            db.close()
 
+        self.stats["flushes"] += 1
+        self.stats["pushed"] += sum(1 for s in results.values() if s == "Success")
+        self.stats["failed"] += sum(1 for s in results.values() if s != "Success")
+        return results
 
+    async def start(self):
+        """Start the scheduler loop"""
+        if self.running:
+            logger.warning("Pass update scheduler is already running")
+            return
 
+        self.running = True
+        self.task = asyncio.create_task(self._run())
+        logger.info("Pass update scheduler started")
 
+    async def stop(self):
+        """Stop the scheduler, flushing anything still pending"""
+        if not self.running:
+            return
 
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
 
+        remaining = self.pop_due(now=float("inf"))
+        if remaining:
+            await asyncio.to_thread(self.flush, remaining)
+        logger.info("Pass update scheduler stopped")
 
+    async def _run(self):
+        """Main scheduler loop"""
+        while self.running:
+            try:
+                await asyncio.sleep(self.tick_seconds)
+                due = self.pop_due()
+                if due:
+                    # apns2 is synchronous; keep it off the event loop
+                    await asyncio.to_thread(self.flush, due)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in pass update scheduler: {e}")
+                await asyncio.sleep(5)
 
 
+# Global scheduler instance
+pass_update_scheduler = PassUpdateScheduler()
@@ -1,20 +1,93 @@
+"""
+Asynchronous wallet credit processor.
+
+Charge rewards are queued in the ``wallet_credit_queue`` table (durable across
+restarts, one row per charging session) and a background worker applies them
+to ``credit_ledger`` in batches: each flush claims up to ``batch_size`` pending
+jobs and writes their ledger rows and status change in a single transaction.
+
+Delivery is at-least-once with idempotency by ``session_id``: re-queuing a
+session is a no-op, and a job only leaves "pending" in the same transaction
+that credits it. Jobs that keep failing are marked "failed" after
+``max_attempts``.
+"""
 import asyncio
-from typing import Dict, Any
-from app.config import settings
-import httpx
+import logging
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models.extra import CreditLedger, WalletCreditJob
+
+logger = logging.getLogger(__name__)
+
+CREDIT_REASON = "CHARGE_REWARD"
+
+WALLET_CREDIT_QUEUE_DEPTH = Gauge(
+    "wallet_credit_queue_depth",
+    "Pending jobs in the wallet credit queue",
+)
+WALLET_CREDIT_LATENCY = Histogram(
+    "wallet_credit_latency_seconds",
+    "Time from enqueue to the credit being applied",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+WALLET_CREDITS_APPLIED = Counter(
+    "wallet_credits_applied_total",
+    "Wallet credits applied to the credit ledger",
+)
+WALLET_CREDIT_FAILURES = Counter(
+    "wallet_credit_failures_total",
+    "Wallet credit jobs that failed to apply",
+    ["final"],
+)
+
+
+def _insert_ignore_duplicate(db: Session):
+    """INSERT for wallet_credit_queue that skips rows whose session_id already exists."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(WalletCreditJob.__table__).on_conflict_do_nothing(index_elements=["session_id"])
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(WalletCreditJob.__table__).on_conflict_do_nothing(index_elements=["session_id"])
+    return None
+
 
 class AsyncWalletProcessor:
-    def __init__(self):
-        self.credit_queue = asyncio.Queue()
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.batch_size = batch_size or int(os.getenv("WALLET_CREDIT_BATCH_SIZE", "200"))
+        self.poll_interval = (
+            poll_interval
+            if poll_interval is not None
+            else float(os.getenv("WALLET_CREDIT_POLL_SECONDS", "1.0"))
+        )
+        self.max_attempts = max_attempts or int(os.getenv("WALLET_CREDIT_MAX_ATTEMPTS", "5"))
+        self.session_factory = session_factory
         self.processing = False
         self.worker_task = None
-    
+        self._wake: Optional[asyncio.Event] = None
+        self.stats: Dict[str, int] = {"enqueued": 0, "duplicates": 0, "applied": 0, "failed": 0, "flushes": 0}
+
     async def start_worker(self):
         """Start the background worker"""
         if not self.processing:
             self.processing = True
+            self._wake = asyncio.Event()
             self.worker_task = asyncio.create_task(self._process_credits())
-    
+
     async def stop_worker(self):
         """Stop the background worker"""
         self.processing = False
@@ -24,49 +97,199 @@ class AsyncWalletProcessor:
                 await self.worker_task
             except asyncio.CancelledError:
                 pass
-    
-    async def queue_wallet_credit(self, user_id: str, amount_cents: int, session_id: str):
-        """Queue a wallet credit job"""
-        credit_request = {
-            'user_id': user_id,
-            'amount_cents': amount_cents,
-            'session_id': session_id,
-            'timestamp': asyncio.get_event_loop().time()
+            self.worker_task = None
+
+    async def queue_wallet_credit(self, user_id: str, amount_cents: int, session_id: str) -> bool:
+        """
+        Durably queue a wallet credit job.
+
+        Returns False if a job for this session_id was already queued.
+        """
+        def _enqueue() -> bool:
+            db = self.session_factory()
+            try:
+                created = self.enqueue(db, user_id, amount_cents, session_id)
+                db.commit()
+                return created
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        created = await asyncio.to_thread(_enqueue)
+        if self._wake is not None:
+            self._wake.set()
+        return created
+
+    # ---- sync core (also used directly by scripts and tests) --------------
+
+    def enqueue(self, db: Session, user_id: Any, amount_cents: int, session_id: str) -> bool:
+        """
+        Add a credit job unless one exists for session_id.
+
+        Note:
+            Does not commit - caller should commit in their transaction pattern.
+        """
+        row = {
+            "session_id": str(session_id),
+            "user_ref": str(user_id),
+            "amount_cents": int(amount_cents),
+            "status": "pending",
+            "attempts": 0,
+            "enqueued_at": datetime.utcnow(),
         }
-        await self.credit_queue.put(credit_request)
-    
+        stmt = _insert_ignore_duplicate(db)
+        if stmt is not None:
+            created = db.execute(stmt, row).rowcount == 1
+        else:
+            exists = (
+                db.query(WalletCreditJob.id)
+                .filter(WalletCreditJob.session_id == row["session_id"])
+                .first()
+            )
+            if not exists:
+                db.add(WalletCreditJob(**row))
+                db.flush()
+            created = not exists
+
+        self.stats["enqueued" if created else "duplicates"] += 1
+        if created:
+            WALLET_CREDIT_QUEUE_DEPTH.inc()
+        return created
+
+    def _claim(self, db: Session) -> List[WalletCreditJob]:
+        query = (
+            db.query(WalletCreditJob)
+            .filter(WalletCreditJob.status == "pending")
+            .order_by(WalletCreditJob.id)
+            .limit(self.batch_size)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            # Several workers can flush concurrently without double-claiming
+            query = query.with_for_update(skip_locked=True)
+        return query.all()
+
+    def _apply(self, db: Session, jobs: List[WalletCreditJob], now: datetime) -> None:
+        db.execute(insert(CreditLedger), [
+            {
+                "user_ref": job.user_ref,
+                "cents": job.amount_cents,
+                "reason": CREDIT_REASON,
+                "meta": {"session_id": job.session_id, "source": "async_wallet"},
+                "created_at": now,
+            }
+            for job in jobs
+        ])
+        for job in jobs:
+            job.status = "applied"
+            job.applied_at = now
+            job.attempts += 1
+            job.last_error = None
+
+    def flush_batch(self, db: Session) -> int:
+        """
+        Apply one batch of pending credits and commit once.
+
+        The batch is applied inside a savepoint; if it fails, its jobs are
+        retried one savepoint each (still holding the claim) so a single bad
+        job cannot hold back the rest.
+
+        Returns:
+            Number of credits applied
+        """
+        jobs = self._claim(db)
+        if not jobs:
+            return 0
+        self.stats["flushes"] += 1
+        # Captured up front: committing expires the instances
+        enqueued_at = {job.id: job.enqueued_at for job in jobs}
+        now = datetime.utcnow()
+
+        try:
+            with db.begin_nested():
+                self._apply(db, jobs, now)
+            applied = list(enqueued_at)
+        except Exception as e:
+            logger.warning("Wallet credit batch of %d failed, retrying individually: %s", len(jobs), e)
+            applied = self._apply_individually(db, jobs, now)
+        db.commit()
+
+        for job_id in applied:
+            WALLET_CREDIT_LATENCY.observe(max((now - enqueued_at[job_id]).total_seconds(), 0.0))
+        WALLET_CREDITS_APPLIED.inc(len(applied))
+        WALLET_CREDIT_QUEUE_DEPTH.dec(len(applied))
+        self.stats["applied"] += len(applied)
+        return len(applied)
+
+    def _apply_individually(self, db: Session, jobs: List[WalletCreditJob], now: datetime) -> List[int]:
+        applied = []
+        for job in jobs:
+            try:
+                with db.begin_nested():
+                    self._apply(db, [job], now)
+                applied.append(job.id)
+            except Exception as e:
+                job.attempts += 1
+                job.last_error = str(e)[:1000]
+                final = job.attempts >= self.max_attempts
+                if final:
+                    job.status = "failed"
+                    WALLET_CREDIT_QUEUE_DEPTH.dec()
+                    self.stats["failed"] += 1
+                WALLET_CREDIT_FAILURES.labels(final=str(final).lower()).inc()
+                logger.error("Wallet credit for session %s failed (attempt %d): %s", job.session_id, job.attempts, e)
+        return applied
+
+    def refresh_depth(self, db: Session) -> int:
+        """Re-sync the queue depth gauge from the table (e.g. after a restart)."""
+        depth = (
+            db.query(func.count(WalletCreditJob.id))
+            .filter(WalletCreditJob.status == "pending")
+            .scalar()
+        ) or 0
+        WALLET_CREDIT_QUEUE_DEPTH.set(depth)
+        return depth
+
+    # ---- worker ------------------------------------------------------------
+
+    def _drain(self) -> int:
+        """Flush batches until the queue is empty (runs in a worker thread)."""
+        db = self.session_factory()
+        try:
+            self.refresh_depth(db)
+            total = 0
+            while True:
+                applied = self.flush_batch(db)
+                total += applied
+                if applied < self.batch_size:
+                    return total
+        finally:
+            db.close()
+
     async def _process_credits(self):
-        """Background worker to process credit queue"""
+        """Background worker: drain the queue on wake-up or every poll interval."""
         while self.processing:
             try:
-                # Wait for credit request with timeout
-                credit_request = await asyncio.wait_for(
-                    self.credit_queue.get(), 
-                    timeout=1.0
-                )
-                await self._process_credit(credit_request)
-            except asyncio.TimeoutError:
-                continue
+                await asyncio.to_thread(self._drain)
+            except asyncio.CancelledError:
+                break
             except Exception as e:
-                print(f"Error processing credit: {e}")
-    
-    async def _process_credit(self, credit_request: Dict[str, Any]):
-        """Process a single credit request"""
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.post(
-                    "http://127.0.0.1:8000/v1/wallet/credit_qs",
-                    params={
-                        "user_id": credit_request["user_id"],
-                        "cents": credit_request["amount_cents"]
-                    }
-                )
-                if response.status_code == 200:
-                    print(f"Successfully credited {credit_request['amount_cents']} cents to {credit_request['user_id']}")
-                else:
-                    print(f"Failed to credit wallet: {response.status_code}")
-        except Exception as e:
-            print(f"Error crediting wallet: {e}")
+                logger.error(f"Error processing wallet credits: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Processor counters plus the current queue depth gauge."""
+        return {
+            **self.stats,
+            "queue_depth": int(WALLET_CREDIT_QUEUE_DEPTH._value.get()),
+            "batch_size": self.batch_size,
+            "running": self.processing,
+        }
 
 # Global async wallet processor
 async_wallet = AsyncWalletProcessor()
@@ -0,0 +1,103 @@
+"""
+Charger occupancy patterns from availability snapshots.
+
+The availability collector folds every snapshot it writes into
+``charger_occupancy_hour_of_week`` (running sums per charger and UTC hour of
+week), so a charger's weekly occupancy histogram is at most 168 row reads
+however many snapshots it has.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.charger_availability import ChargerOccupancyHourOfWeek
+
+HOURS_PER_WEEK = 168
+_SUM_FIELDS = ("samples", "occupancy_sum", "occupancy_sq_sum", "full_samples")
+
+
+def hour_of_week(ts: datetime) -> int:
+    """0 for Monday 00:00-00:59 UTC ... 167 for Sunday 23:00-23:59 UTC."""
+    return ts.weekday() * 24 + ts.hour
+
+
+def accumulate_hour_of_week(db: Session, snapshots: Iterable[dict], now: Optional[datetime] = None) -> int:
+    """
+    Fold snapshot rows (dicts with charger_id, recorded_at, total_ports,
+    occupied_ports, available_ports) into the hour-of-week totals. Snapshots
+    without ports are skipped. Returns the number of buckets touched.
+
+    Note:
+        Does not commit - caller should commit in their transaction pattern.
+    """
+    now = now or datetime.utcnow()
+    buckets: Dict[Tuple[str, int], dict] = defaultdict(lambda: dict.fromkeys(_SUM_FIELDS, 0))
+    for snapshot in snapshots:
+        total = snapshot.get("total_ports") or 0
+        if total <= 0:
+            continue
+        occupancy = min((snapshot.get("occupied_ports") or 0) / total, 1.0)
+        bucket = buckets[(snapshot["charger_id"], hour_of_week(snapshot["recorded_at"]))]
+        bucket["samples"] += 1
+        bucket["occupancy_sum"] += occupancy
+        bucket["occupancy_sq_sum"] += occupancy * occupancy
+        bucket["full_samples"] += 1 if snapshot.get("available_ports") == 0 else 0
+    if not buckets:
+        return 0
+
+    rows = [
+        {"charger_id": charger_id, "hour_of_week": how, "updated_at": now, **sums}
+        for (charger_id, how), sums in buckets.items()
+    ]
+    table = ChargerOccupancyHourOfWeek.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        set_ = {field: table.c[field] + stmt.excluded[field] for field in _SUM_FIELDS}
+        set_["updated_at"] = stmt.excluded.updated_at
+        db.execute(stmt.on_conflict_do_update(index_elements=["charger_id", "hour_of_week"], set_=set_), rows)
+        return len(rows)
+
+    for row in rows:
+        updated = db.query(ChargerOccupancyHourOfWeek).filter(
+            ChargerOccupancyHourOfWeek.charger_id == row["charger_id"],
+            ChargerOccupancyHourOfWeek.hour_of_week == row["hour_of_week"],
+        ).update(
+            {**{field: getattr(ChargerOccupancyHourOfWeek, field) + row[field] for field in _SUM_FIELDS},
+             "updated_at": now},
+            synchronize_session=False,
+        )
+        if not updated:
+            db.execute(insert(table), [row])
+    return len(rows)
+
+
+def occupancy_by_hour_of_week(db: Session, charger_id: str) -> List[Optional[dict]]:
+    """
+    A charger's weekly occupancy histogram: 168 entries indexed by hour of
+    week, each None (never observed) or a dict with samples, avg_occupancy
+    (0-1), stddev and full_pct (share of snapshots with no port free).
+    """
+    histogram: List[Optional[dict]] = [None] * HOURS_PER_WEEK
+    for row in db.scalars(
+        select(ChargerOccupancyHourOfWeek).where(ChargerOccupancyHourOfWeek.charger_id == charger_id)
+    ):
+        if not row.samples:
+            continue
+        mean = row.occupancy_sum / row.samples
+        variance = max(row.occupancy_sq_sum / row.samples - mean * mean, 0.0)
+        histogram[row.hour_of_week] = {
+            "samples": row.samples,
+            "avg_occupancy": round(mean, 4),
+            "stddev": round(math.sqrt(variance), 4),
+            "full_pct": round(row.full_samples / row.samples, 4),
+        }
+    return histogram
@@ -0,0 +1,424 @@
+"""
+Per-charger session statistics (``charger_session_stats``).
+
+Charger detail and the Nerava Score read one row per charger by primary key
+instead of scanning ``session_events`` with a different predicate per stat.
+
+A flush that inserts, deletes or changes a SessionEvent's charger, driver,
+start, end or duration updates the affected chargers' rows in the same
+transaction. The all-time counters are adjusted by each session's before /
+after contribution (the before values are read by primary key ahead of the
+flush); the distinct-driver count checks only the (charger, driver) pairs
+involved, and the 7d/30d windows are recomputed over the last 30 days only.
+A charger's first session write computes its row from scratch.
+
+The 7d/30d windows are relative to when a row was computed, so a charger
+with no new sessions would keep counting sessions that have aged out; the
+nightly reconciliation recomputes every row from the raw table (and logs
+rows that had drifted, e.g. after Core-level bulk writes, which bypass the
+flush hook).
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import bindparam, case, distinct, event, func, inspect, insert, select, union, update
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models.charger_stats import ChargerSessionStats
+from app.models.session_event import SessionEvent
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = 3600  # Check every hour
+CHARGER_ID_CHUNK = 500
+
+_STAT_FIELDS = (
+    "sessions_7d",
+    "sessions_30d",
+    "drivers_30d",
+    "avg_duration_30d",
+    "completed_sessions",
+    "completed_over_5min",
+    "completed_drivers",
+    "avg_completed_duration",
+    "open_sessions",
+    "completed_timed_sessions",
+    "completed_duration_total",
+)
+_FLOAT_FIELDS = {"avg_duration_30d", "avg_completed_duration", "completed_duration_total"}
+_WINDOW_FIELDS = ("sessions_7d", "sessions_30d", "drivers_30d", "avg_duration_30d")
+# SessionEvent columns the stats depend on
+_TRACKED_ATTRS = ("charger_id", "driver_user_id", "session_start", "session_end", "duration_minutes")
+# session.info key for the pre-flush values of sessions being updated or deleted
+_PREVIOUS_KEY = "charger_stats_previous"
+
+
+def compute_charger_stats(db: Session, charger_ids: Iterable[str], now: Optional[datetime] = None) -> Dict[str, dict]:
+    """
+    Stats for each charger id from ``session_events``, one grouped query.
+    Chargers without sessions get all-zero stats.
+    """
+    charger_ids = sorted(set(charger_ids))
+    if not charger_ids:
+        return {}
+    now = now or datetime.utcnow()
+    since_7d = now - timedelta(days=7)
+    since_30d = now - timedelta(days=30)
+    completed = SessionEvent.session_end.isnot(None)
+    in_30d = SessionEvent.session_start >= since_30d
+    timed = completed & (SessionEvent.duration_minutes > 0)
+
+    rows = db.execute(
+        select(
+            SessionEvent.charger_id,
+            func.sum(case((SessionEvent.session_start >= since_7d, 1), else_=0)),
+            func.sum(case((in_30d, 1), else_=0)),
+            func.count(distinct(case((in_30d, SessionEvent.driver_user_id)))),
+            func.avg(case((in_30d, SessionEvent.duration_minutes))),
+            func.sum(case((completed, 1), else_=0)),
+            func.sum(case((completed & (SessionEvent.duration_minutes > 5), 1), else_=0)),
+            func.count(distinct(case((completed, SessionEvent.driver_user_id)))),
+            func.avg(case((timed, SessionEvent.duration_minutes))),
+            func.sum(case((SessionEvent.session_end.is_(None), 1), else_=0)),
+            func.sum(case((timed, 1), else_=0)),
+            func.sum(case((timed, SessionEvent.duration_minutes), else_=0)),
+        )
+        .where(SessionEvent.charger_id.in_(charger_ids))
+        .group_by(SessionEvent.charger_id)
+    ).all()
+
+    stats = {charger_id: dict.fromkeys(_STAT_FIELDS, 0) for charger_id in charger_ids}
+    for charger_id, *values in rows:
+        stats[charger_id] = _typed(zip(_STAT_FIELDS, values))
+    return stats
+
+
+def _typed(pairs) -> dict:
+    return {field: (float(value or 0) if field in _FLOAT_FIELDS else int(value or 0)) for field, value in pairs}
+
+
+def _window_stats(db: Session, charger_ids: Iterable[str], now: datetime) -> Dict[str, dict]:
+    """The 7d/30d fields only: a range scan over the last 30 days of each charger."""
+    since_7d = now - timedelta(days=7)
+    rows = db.execute(
+        select(
+            SessionEvent.charger_id,
+            func.sum(case((SessionEvent.session_start >= since_7d, 1), else_=0)),
+            func.count(),
+            func.count(distinct(SessionEvent.driver_user_id)),
+            func.avg(SessionEvent.duration_minutes),
+        )
+        .where(
+            SessionEvent.charger_id.in_(list(charger_ids)),
+            SessionEvent.session_start >= now - timedelta(days=30),
+        )
+        .group_by(SessionEvent.charger_id)
+    ).all()
+    stats = {charger_id: dict.fromkeys(_WINDOW_FIELDS, 0) for charger_id in charger_ids}
+    for charger_id, *values in rows:
+        stats[charger_id] = _typed(zip(_WINDOW_FIELDS, values))
+    return stats
+
+
+def _upsert(db: Session, rows: List[dict]) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(ChargerSessionStats.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["charger_id"],
+            set_={field: stmt.excluded[field] for field in (*_STAT_FIELDS, "computed_at")},
+        )
+        db.execute(stmt, rows)
+        return
+    existing = set(db.scalars(
+        select(ChargerSessionStats.charger_id).where(
+            ChargerSessionStats.charger_id.in_([row["charger_id"] for row in rows])
+        )
+    ))
+    for row in rows:
+        if row["charger_id"] in existing:
+            db.query(ChargerSessionStats).filter(
+                ChargerSessionStats.charger_id == row["charger_id"]
+            ).update(row, synchronize_session=False)
+        else:
+            db.execute(insert(ChargerSessionStats.__table__), [row])
+
+
+def refresh_charger_stats(db: Session, charger_ids: Iterable[str], now: Optional[datetime] = None) -> Dict[str, dict]:
+    """
+    Recompute and store the stats rows for these chargers.
+
+    Note:
+        Does not commit - caller should commit in their transaction pattern.
+    """
+    now = now or datetime.utcnow()
+    stats = compute_charger_stats(db, charger_ids, now)
+    if stats:
+        _upsert(db, [{"charger_id": charger_id, **values, "computed_at": now} for charger_id, values in stats.items()])
+    return stats
+
+
+def get_charger_stats(db: Session, charger_id: str) -> ChargerSessionStats:
+    """
+    The charger's stats row (primary-key lookup).
+
+    A charger that has no row yet (no session written since the last
+    reconciliation) gets one computed in memory; reads never write.
+    """
+    stats = db.get(ChargerSessionStats, charger_id, populate_existing=True)
+    if stats is None:
+        now = datetime.utcnow()
+        values = compute_charger_stats(db, [charger_id], now)[charger_id]
+        stats = ChargerSessionStats(charger_id=charger_id, **values, computed_at=now)
+    return stats
+
+
+def _is_tracked_change(obj: SessionEvent) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[a].history.has_changes() for a in _TRACKED_ATTRS)
+
+
+def _contribution(values: Optional[tuple]) -> Optional[tuple]:
+    """
+    (charger_id, driver_user_id, completed, over_5min, timed, duration, open)
+    for one session's tracked values, or None if it counts towards no charger.
+    """
+    if values is None:
+        return None
+    charger_id, driver_user_id, _, session_end, duration = values
+    if not charger_id:
+        return None
+    completed = session_end is not None
+    timed = completed and (duration or 0) > 0
+    return (
+        charger_id, driver_user_id, int(completed), int(completed and (duration or 0) > 5),
+        int(timed), float(duration) if timed else 0.0, int(not completed),
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _capture_previous_values(session: Session, flush_context, instances) -> None:
+    """Read the stored tracked values of sessions about to be updated or deleted."""
+    session.info.pop(_PREVIOUS_KEY, None)
+    ids = [
+        obj.id for obj in session.deleted if isinstance(obj, SessionEvent)
+    ] + [
+        obj.id for obj in session.dirty if isinstance(obj, SessionEvent) and _is_tracked_change(obj)
+    ]
+    if not ids:
+        return
+    columns = [getattr(SessionEvent, attr) for attr in _TRACKED_ATTRS]
+    with session.no_autoflush:
+        rows = session.execute(select(SessionEvent.id, *columns).where(SessionEvent.id.in_(ids))).all()
+    session.info[_PREVIOUS_KEY] = {str(row[0]): tuple(row[1:]) for row in rows}
+
+
+@event.listens_for(Session, "after_flush")
+def _update_touched_chargers(session: Session, flush_context) -> None:
+    previous = session.info.pop(_PREVIOUS_KEY, {})
+    changes = []  # (before, after) contributions
+    for obj in session.new:
+        if isinstance(obj, SessionEvent):
+            changes.append((None, _contribution(tuple(getattr(obj, a) for a in _TRACKED_ATTRS))))
+    for obj in session.deleted:
+        if isinstance(obj, SessionEvent):
+            changes.append((_contribution(previous.get(str(obj.id))), None))
+    for obj in session.dirty:
+        if isinstance(obj, SessionEvent) and str(obj.id) in previous:
+            changes.append((
+                _contribution(previous[str(obj.id)]),
+                _contribution(tuple(getattr(obj, a) for a in _TRACKED_ATTRS)),
+            ))
+    charger_ids = {c[0] for change in changes for c in change if c is not None}
+    if charger_ids:
+        _apply_session_changes(session, changes, charger_ids)
+
+
+def _apply_session_changes(db: Session, changes: List[tuple], charger_ids: Set[str]) -> None:
+    """
+    Fold (before, after) session contributions into the stored rows.
+
+    Chargers without a row get one computed from scratch; the rest have
+    their all-time counters adjusted and their 7d/30d windows recomputed.
+    Called after the changes are flushed, so queries already see them.
+    """
+    now = datetime.utcnow()
+    existing = set(db.scalars(
+        select(ChargerSessionStats.charger_id).where(ChargerSessionStats.charger_id.in_(charger_ids))
+    ))
+    missing = charger_ids - existing
+    if missing:
+        refresh_charger_stats(db, missing, now)
+    if not existing:
+        return
+
+    deltas = {charger_id: [0, 0, 0, 0.0, 0] for charger_id in existing}
+    completed_by_pair: Dict[tuple, int] = {}
+    for before, after in changes:
+        for contribution, sign in ((before, -1), (after, 1)):
+            if contribution is None or contribution[0] not in existing:
+                continue
+            charger_id, driver_user_id, completed, *counters = contribution
+            delta = deltas[charger_id]
+            for i, value in enumerate((completed, *counters)):
+                delta[i] += sign * value
+            pair = (charger_id, driver_user_id)
+            completed_by_pair[pair] = completed_by_pair.get(pair, 0) + sign * completed
+
+    # A driver is added (or dropped) when their completed sessions at the charger go from zero (or to zero)
+    drivers_delta = dict.fromkeys(existing, 0)
+    changed_pairs = {pair: net for pair, net in completed_by_pair.items() if net}
+    if changed_pairs:
+        completed_now = {
+            (charger_id, driver_user_id): count
+            for charger_id, driver_user_id, count in db.execute(
+                select(SessionEvent.charger_id, SessionEvent.driver_user_id, func.count())
+                .where(
+                    SessionEvent.charger_id.in_({charger_id for charger_id, _ in changed_pairs}),
+                    SessionEvent.driver_user_id.in_({driver_user_id for _, driver_user_id in changed_pairs}),
+                    SessionEvent.session_end.isnot(None),
+                )
+                .group_by(SessionEvent.charger_id, SessionEvent.driver_user_id)
+            )
+        }
+        for pair, net in changed_pairs.items():
+            after = completed_now.get(pair, 0)
+            drivers_delta[pair[0]] += int(after > 0) - int(after - net > 0)
+
+    windows = _window_stats(db, existing, now)
+    table = ChargerSessionStats.__table__
+    timed = table.c.completed_timed_sessions + bindparam("d_timed")
+    total = table.c.completed_duration_total + bindparam("d_total")
+    db.execute(
+        update(table)
+        .where(table.c.charger_id == bindparam("b_charger_id"))
+        .values(
+            completed_sessions=table.c.completed_sessions + bindparam("d_completed"),
+            completed_over_5min=table.c.completed_over_5min + bindparam("d_over_5min"),
+            completed_drivers=table.c.completed_drivers + bindparam("d_drivers"),
+            open_sessions=table.c.open_sessions + bindparam("d_open"),
+            completed_timed_sessions=timed,
+            completed_duration_total=total,
+            avg_completed_duration=case((timed > 0, total / timed), else_=0.0),
+            **{field: bindparam(f"w_{field}") for field in _WINDOW_FIELDS},
+            computed_at=now,
+        ),
+        [
+            {
+                "b_charger_id": charger_id,
+                "d_completed": delta[0], "d_over_5min": delta[1], "d_timed": delta[2],
+                "d_total": delta[3], "d_open": delta[4], "d_drivers": drivers_delta[charger_id],
+                **{f"w_{field}": value for field, value in windows[charger_id].items()},
+            }
+            for charger_id, delta in deltas.items()
+        ],
+    )
+
+
+class ChargerStatsReconciler:
+    """Nightly job that recomputes every charger's stats from session_events"""
+
+    def __init__(
+        self,
+        hour_utc: Optional[int] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.hour_utc = hour_utc if hour_utc is not None else int(os.getenv("CHARGER_STATS_RECONCILE_HOUR_UTC", "4"))
+        self.session_factory = session_factory
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self._last_run_day = None
+        self.stats = {"runs": 0, "chargers": 0, "drifted": 0}
+
+    async def start(self):
+        """Start the reconciler"""
+        if self.running:
+            logger.warning("Charger stats reconciler is already running")
+            return
+        self.running = True
+        self.task = asyncio.create_task(self._run())
+        logger.info("Charger stats reconciler started")
+
+    async def stop(self):
+        """Stop the reconciler"""
+        if not self.running:
+            return
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Charger stats reconciler stopped")
+
+    async def _run(self):
+        while self.running:
+            try:
+                now = datetime.utcnow()
+                if now.hour >= self.hour_utc and self._last_run_day != now.date():
+                    await asyncio.to_thread(self._reconcile)
+                    self._last_run_day = now.date()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in charger stats reconciler: {e}")
+            await asyncio.sleep(CHECK_INTERVAL)
+
+    def reconcile(self, db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Recompute the stats of every charger that has sessions or a stats
+        row, CHARGER_ID_CHUNK chargers per commit. Returns counts of
+        chargers processed and of rows whose stored stats had drifted.
+        """
+        now = now or datetime.utcnow()
+        charger_ids = sorted(db.scalars(union(
+            select(SessionEvent.charger_id).where(SessionEvent.charger_id.isnot(None)).distinct(),
+            select(ChargerSessionStats.charger_id),
+        )))
+        drifted = 0
+        for i in range(0, len(charger_ids), CHARGER_ID_CHUNK):
+            chunk = charger_ids[i:i + CHARGER_ID_CHUNK]
+            stored = {
+                row.charger_id: {field: getattr(row, field) for field in _STAT_FIELDS}
+                for row in db.execute(
+                    select(ChargerSessionStats).where(ChargerSessionStats.charger_id.in_(chunk))
+                ).scalars()
+            }
+            try:
+                fresh = refresh_charger_stats(db, chunk, now)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            drifted += sum(
+                1 for charger_id, values in fresh.items()
+                if charger_id in stored and any(
+                    abs(float(stored[charger_id][field]) - float(values[field])) > 1e-6 for field in _STAT_FIELDS
+                )
+            )
+        self.stats["runs"] += 1
+        self.stats["chargers"] += len(charger_ids)
+        self.stats["drifted"] += drifted
+        if drifted:
+            logger.info(f"Charger stats reconciled: {len(charger_ids)} chargers, {drifted} drifted")
+        return {"chargers": len(charger_ids), "drifted": drifted}
+
+    def _reconcile(self) -> Dict[str, int]:
+        db = self.session_factory()
+        try:
+            return self.reconcile(db)
+        finally:
+            db.close()
+
+
+# Global reconciler
+charger_stats_reconciler = ChargerStatsReconciler()
@@ -1,6 +1,6 @@
 import time
 from enum import Enum
-from typing import Callable, Any, Optional
+from typing import Callable, Any, Optional, Tuple, Type
 import httpx
 
 class CircuitState(Enum):
@@ -8,6 +8,10 @@ class CircuitState(Enum):
     OPEN = "open"
     HALF_OPEN = "half_open"
 
+class CircuitOpenError(Exception):
+    """Raised instead of calling through while the circuit is open"""
+
+
 class CircuitBreaker:
     """Circuit breaker pattern implementation"""
     
@@ -15,11 +19,14 @@ class CircuitBreaker:
         self,
         failure_threshold: int = 5,
         timeout: int = 60,
-        success_threshold: int = 3
+        success_threshold: int = 3,
+        failure_types: Tuple[Type[BaseException], ...] = (Exception,),
     ):
         self.failure_threshold = failure_threshold
         self.timeout = timeout
         self.success_threshold = success_threshold
+        # Only these exceptions count as failures; others pass through uncounted
+        self.failure_types = failure_types
         
         self.failure_count = 0
         self.success_count = 0
@@ -33,13 +40,13 @@ class CircuitBreaker:
                 self.state = CircuitState.HALF_OPEN
                 self.success_count = 0
             else:
-                raise Exception("Circuit breaker is OPEN")
+                raise CircuitOpenError("Circuit breaker is OPEN")
         
         try:
             result = await func(*args, **kwargs)
             self._on_success()
             return result
-        except Exception as e:
+        except self.failure_types as e:
             self._on_failure()
             raise e
     
@@ -1,10 +1,11 @@
 from __future__ import annotations
 import base64
 import json
-from math import radians, cos, sin, asin, sqrt
+from math import cos, radians
 from typing import List, Optional, Tuple
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 from app.db import SessionLocal
+from app.services.geo import M_PER_DEG, bounding_box, haversine_m
 
 
 ALLOWED_FIELDS = {
@@ -24,28 +25,20 @@ ALLOWED_FIELDS = {
 }
 
 
-def _haversine_m(a_lat: float, a_lng: float, b_lat: float, b_lng: float) -> float:
-    R = 6371000.0
-    dlat = radians(b_lat - a_lat)
-    dlng = radians(b_lng - a_lng)
-    lat1 = radians(a_lat)
-    lat2 = radians(b_lat)
-    h = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlng / 2) ** 2
-    return 2 * R * asin(sqrt(h))
+def _encode_cursor(dist2: float, key: str, total: Optional[int]) -> str:
+    """Keyset cursor: position after (dist2, key), plus the first page's total."""
+    return base64.urlsafe_b64encode(json.dumps({"d": dist2, "k": key, "t": total}).encode()).decode()
 
 
-def _encode_cursor(offset: int) -> str:
-    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode()).decode()
-
-
-def _decode_cursor(cursor: Optional[str]) -> int:
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[float, str, Optional[int]]]:
     if not cursor:
-        return 0
+        return None
     try:
         data = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
-        return int(data.get("o", 0))
+        return float(data["d"]), str(data["k"]), data.get("t")
     except Exception:
-        return 0
+        # Unknown/legacy (offset) cursors restart from the first page
+        return None
 
 
 def _apply_fields(item: dict, fields: Optional[List[str]]) -> dict:
@@ -69,148 +62,117 @@ def _apply_fields(item: dict, fields: Optional[List[str]]) -> dict:
 
 def _has_table(db, name: str) -> bool:
     try:
-        res = db.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name=:n"), {"n": name}).first()
-        if res:
-            return True
+        return inspect(db.get_bind()).has_table(name)
     except Exception:
-        pass
-    return False
-
-
-def _fetch_events(db, lat: float, lng: float, radius_m: int) -> List[dict]:
-    rows = db.execute(
-        text(
-            """
-            SELECT id, title, starts_at, ends_at, lat, lng
-            FROM events2
-            WHERE ABS(lat-:lat) < 0.1 AND ABS(lng-:lng) < 0.1
-        """
-        ),
-        {"lat": lat, "lng": lng},
-    ).mappings()
-    items = []
-    for r in rows:
-        dist = _haversine_m(lat, lng, r["lat"], r["lng"])
-        if dist <= radius_m:
-            items.append(
-                {
-                    "id": f"event:{r['id']}",
-                    "kind": "event",
-                    "title": r.get("title"),
-                    "name": r.get("title"),
-                    "category": "event",
-                    "lat": r.get("lat"),
-                    "lng": r.get("lng"),
-                    "distance_m": round(dist, 1),
-                    "starts_at": r.get("starts_at"),
-                    "ends_at": r.get("ends_at"),
-                    "green_window": None,
-                    "offer": None,
-                    "cta": {"join_event_id": str(r["id"]), "verify_url": None},
-                }
-            )
-    return items
-
-
-def _fetch_merchants(db, lat: float, lng: float, radius_m: int) -> List[dict]:
-    rows = db.execute(
-        text(
-            """
-            SELECT id, name, category, lat, lng
-            FROM merchants
-            WHERE ABS(lat-:lat) < 0.1 AND ABS(lng-:lng) < 0.1
-        """
-        ),
-        {"lat": lat, "lng": lng},
-    ).mappings()
-    items = []
-    for r in rows:
-        dist = _haversine_m(lat, lng, r["lat"], r["lng"])
-        if dist <= radius_m:
-            offer_row = db.execute(
-                text(
-                    """
-                    SELECT title, reward_cents
-                    FROM offers
-                    WHERE merchant_id = :mid AND active = 1
-                    ORDER BY created_at DESC LIMIT 1
-                """
-                ),
-                {"mid": r["id"]},
-            ).mappings().first()
-            offer = None
-            if offer_row:
-                offer = {
-                    "title": offer_row.get("title"),
-                    "est_reward_cents": offer_row.get("reward_cents"),
-                }
-            items.append(
-                {
-                    "id": f"merchant:{r['id']}",
-                    "kind": "merchant",
-                    "title": r.get("name"),
-                    "name": r.get("name"),
-                    "category": r.get("category"),
-                    "lat": r.get("lat"),
-                    "lng": r.get("lng"),
-                    "distance_m": round(dist, 1),
-                    "starts_at": None,
-                    "ends_at": None,
-                    "green_window": None,
-                    "offer": offer,
-                    "cta": {"join_event_id": None, "verify_url": None},
-                }
-            )
-    return items
-
-
-def _fetch_chargers(db, lat: float, lng: float, radius_m: int) -> List[dict]:
-    if not _has_table(db, "chargers_openmap"):
-        return []
-    rows = db.execute(
-        text(
-            """
-            SELECT id, name, lat, lng
-            FROM chargers_openmap
-            WHERE ABS(lat-:lat) < 0.1 AND ABS(lng-:lng) < 0.1
-        """
-        ),
-        {"lat": lat, "lng": lng},
-    ).mappings()
-    items = []
-    for r in rows:
-        dist = _haversine_m(lat, lng, r["lat"], r["lng"])
-        if dist <= radius_m:
-            items.append(
-                {
-                    "id": f"charger:{r['id']}",
-                    "kind": "ev_charging",
-                    "title": r.get("name"),
-                    "name": r.get("name"),
-                    "category": "ev_charging",
-                    "lat": r.get("lat"),
-                    "lng": r.get("lng"),
-                    "distance_m": round(dist, 1),
-                    "starts_at": None,
-                    "ends_at": None,
-                    "green_window": None,
-                    "offer": None,
-                    "cta": {"join_event_id": None, "verify_url": None},
-                }
-            )
-    return items
-
-
-def _fetch_ranked(db, lat: float, lng: float, radius_m: int, categories: List[str]) -> List[dict]:
-    items: List[dict] = []
-    if "event" in categories:
-        items.extend(_fetch_events(db, lat, lng, radius_m))
-    if "merchant" in categories:
-        items.extend(_fetch_merchants(db, lat, lng, radius_m))
-    if "ev_charging" in categories:
-        items.extend(_fetch_chargers(db, lat, lng, radius_m))
-    items.sort(key=lambda x: x.get("distance_m", 0))
-    return items
+        return False
+
+
+# Squared equirectangular distance in m^2 (accurate to well under 0.1% at
+# discover radii). Plain arithmetic, so it runs in SQL on any dialect and
+# gives a stable ordering key for keyset pagination.
+def _dist2_sql(alias: str) -> str:
+    return (
+        f"(({alias}.lat - :lat) * :ky) * (({alias}.lat - :lat) * :ky)"
+        f" + (({alias}.lng - :lng) * :kx) * (({alias}.lng - :lng) * :kx)"
+    )
+
+
+def _bbox_sql(alias: str) -> str:
+    # Range predicates on bare columns: served by the (lat, lng) geo indexes
+    return f"{alias}.lat BETWEEN :south AND :north AND {alias}.lng BETWEEN :west AND :east"
+
+
+def _events_sql() -> str:
+    return f"""
+        SELECT 'event:' || CAST(e.id AS VARCHAR) AS item_key, 'event' AS kind,
+               CAST(e.id AS VARCHAR) AS ref_id, e.title AS title, 'event' AS category,
+               e.lat AS lat, e.lng AS lng, e.starts_at AS starts_at, e.ends_at AS ends_at,
+               NULL AS offer_title, NULL AS offer_reward_cents,
+               {_dist2_sql("e")} AS dist2
+        FROM events2 e
+        WHERE {_bbox_sql("e")}
+    """
+
+
+def _merchants_sql(with_offers: bool) -> str:
+    if with_offers:
+        # Latest active offer per merchant, resolved in the same statement
+        offer_cols = "o.title AS offer_title, o.reward_cents AS offer_reward_cents"
+        offer_join = """
+        LEFT JOIN offers o ON o.id = (
+            SELECT o2.id FROM offers o2
+            WHERE o2.merchant_id = m.id AND o2.active = :active
+            ORDER BY o2.created_at DESC, o2.id DESC
+            LIMIT 1
+        )"""
+    else:
+        offer_cols = "NULL AS offer_title, NULL AS offer_reward_cents"
+        offer_join = ""
+    return f"""
+        SELECT 'merchant:' || CAST(m.id AS VARCHAR) AS item_key, 'merchant' AS kind,
+               CAST(m.id AS VARCHAR) AS ref_id, m.name AS title, m.category AS category,
+               m.lat AS lat, m.lng AS lng, NULL AS starts_at, NULL AS ends_at,
+               {offer_cols},
+               {_dist2_sql("m")} AS dist2
+        FROM merchants m{offer_join}
+        WHERE {_bbox_sql("m")}
+    """
+
+
+def _chargers_sql() -> str:
+    return f"""
+        SELECT 'charger:' || CAST(c.id AS VARCHAR) AS item_key, 'ev_charging' AS kind,
+               CAST(c.id AS VARCHAR) AS ref_id, c.name AS title, 'ev_charging' AS category,
+               c.lat AS lat, c.lng AS lng, NULL AS starts_at, NULL AS ends_at,
+               NULL AS offer_title, NULL AS offer_reward_cents,
+               {_dist2_sql("c")} AS dist2
+        FROM chargers_openmap c
+        WHERE {_bbox_sql("c")}
+    """
+
+
+def _geo_index_sql(db, categories: List[str]) -> Optional[str]:
+    """
+    UNION ALL of the geo-indexed sources for the requested categories.
+
+    Each branch is bounded by a lat/lng box so the planner can range-scan the
+    source's (lat, lng) index; missing tables are skipped.
+    """
+    branches = []
+    if "event" in categories and _has_table(db, "events2"):
+        branches.append(_events_sql())
+    if "merchant" in categories and _has_table(db, "merchants"):
+        branches.append(_merchants_sql(_has_table(db, "offers")))
+    if "ev_charging" in categories and _has_table(db, "chargers_openmap"):
+        branches.append(_chargers_sql())
+    if not branches:
+        return None
+    return " UNION ALL ".join(branches)
+
+
+def _to_item(r, lat: float, lng: float) -> dict:
+    kind = r["kind"]
+    offer = None
+    if r["offer_title"] is not None:
+        offer = {"title": r["offer_title"], "est_reward_cents": r["offer_reward_cents"]}
+    return {
+        "id": r["item_key"],
+        "kind": kind,
+        "title": r["title"],
+        "name": r["title"],
+        "category": r["category"],
+        "lat": r["lat"],
+        "lng": r["lng"],
+        "distance_m": round(haversine_m(lat, lng, r["lat"], r["lng"]), 1),
+        "starts_at": r["starts_at"],
+        "ends_at": r["ends_at"],
+        "green_window": None,
+        "offer": offer,
+        "cta": {
+            "join_event_id": r["ref_id"] if kind == "event" else None,
+            "verify_url": None,
+        },
+    }
 
 
 def search(
@@ -222,20 +184,68 @@ def search(
     limit: int,
     cursor: Optional[str],
     fields: Optional[List[str]],
+    db=None,
 ) -> Tuple[List[dict], Optional[str], Optional[int]]:
+    """
+    Nearest-first discover results with keyset pagination.
+
+    Pages continue from the (distance, id) encoded in the cursor, so page N is
+    the same bounded index scan + top-``limit`` as page 1. The total is only
+    counted for the first page and carried forward in the cursor.
+    """
     selected_categories = categories or ["ev_charging", "event"]
-    db = SessionLocal()
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal()
     try:
-        results = _fetch_ranked(db, lat, lng, radius_m, selected_categories)
-        total = len(results)
-        start = _decode_cursor(cursor)
-        start = max(0, min(start, total))
-        end = min(start + limit, total)
-        page = results[start:end]
-        page = [_apply_fields(item, fields) for item in page]
-        next_cursor = _encode_cursor(end) if end < total else None
+        union_sql = _geo_index_sql(db, selected_categories)
+        if union_sql is None:
+            return [], None, 0
+
+        south, north, west, east = bounding_box(lat, lng, radius_m)
+        params = {
+            "lat": lat,
+            "lng": lng,
+            "ky": M_PER_DEG,
+            "kx": M_PER_DEG * cos(radians(lat)),
+            "south": south,
+            "north": north,
+            "west": west,
+            "east": east,
+            "r2": float(radius_m) * float(radius_m),
+            "active": True,
+        }
+
+        position = _decode_cursor(cursor)
+        if position is None:
+            total = db.execute(
+                text(f"SELECT COUNT(*) FROM ({union_sql}) u WHERE u.dist2 <= :r2"),
+                params,
+            ).scalar()
+            keyset = ""
+        else:
+            params["after_d"], params["after_k"], total = position
+            keyset = "AND (u.dist2 > :after_d OR (u.dist2 = :after_d AND u.item_key > :after_k))"
+
+        rows = db.execute(
+            text(
+                f"""
+                SELECT * FROM ({union_sql}) u
+                WHERE u.dist2 <= :r2 {keyset}
+                ORDER BY u.dist2, u.item_key
+                LIMIT :page_size
+                """
+            ),
+            {**params, "page_size": limit + 1},
+        ).mappings().all()
+
+        page_rows = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page_rows[-1]
+            next_cursor = _encode_cursor(last["dist2"], last["item_key"], total)
+        page = [_apply_fields(_to_item(r, lat, lng), fields) for r in page_rows]
         return page, next_cursor, total
     finally:
-        db.close()
-
-
+        if owns_session:
+            db.close()
@@ -2,22 +2,51 @@
 EV Telemetry polling service
 Polls Smartcar for vehicle telemetry and stores it
 """
+import asyncio
 import logging
+import os
+import random
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 import uuid
 
+from prometheus_client import Gauge, Histogram
+
 from app.models_vehicle import VehicleAccount, VehicleTelemetry, VehicleToken
 from app.services.smartcar_service import (
     refresh_tokens,
+    renew_token,
+    token_needs_refresh,
     get_vehicle_charge,
     get_vehicle_location,
 )
-from sqlalchemy import desc
+from sqlalchemy import desc, func
 
 logger = logging.getLogger(__name__)
 
+# A vehicle is idle between samples if it isn't charging, its SOC moved less
+# than this, and it moved less than roughly 100 m
+IDLE_SOC_DELTA_PCT = 0.5
+IDLE_MOVE_DEGREES = 0.001
+
+EV_TELEMETRY_SWEEP_SECONDS = Histogram(
+    "ev_telemetry_sweep_seconds",
+    "Time to poll all due vehicles in one sweep",
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+EV_TELEMETRY_STALENESS_SECONDS = Histogram(
+    "ev_telemetry_staleness_seconds",
+    "Age of each active vehicle's newest telemetry after a sweep",
+    buckets=(60, 300, 900, 1800, 3600, 7200, 21600, 86400),
+)
+EV_TELEMETRY_MAX_STALENESS_SECONDS = Gauge(
+    "ev_telemetry_max_staleness_seconds",
+    "Age of the stalest active vehicle's newest telemetry after the last sweep",
+)
+
 
 async def poll_vehicle_telemetry_for_account(
     db: Session, account: VehicleAccount
@@ -47,7 +76,25 @@ async def poll_vehicle_telemetry_for_account(
     
     # Get valid access token (refresh if needed)
     token = await refresh_tokens(db, account)
+    telemetry = await _fetch_telemetry(account, token)
     
+    db.add(telemetry)
+    db.commit()
+    db.refresh(telemetry)
+    
+    logger.info(f"Polled telemetry for vehicle account {account.id}: SOC={telemetry.soc_pct}%, state={telemetry.charging_state}")
+    
+    return telemetry
+
+
+async def _fetch_telemetry(
+    account: VehicleAccount, token: VehicleToken, budget: Optional["_RateBudget"] = None
+) -> VehicleTelemetry:
+    """
+    Fetch charge and location from Smartcar into an unsaved VehicleTelemetry.
+
+    Makes no database calls, so it is safe to run concurrently.
+    """
     # Decrypt access token before using (P0 security fix)
     from app.services.token_encryption import decrypt_token
     try:
@@ -57,6 +104,8 @@ async def poll_vehicle_telemetry_for_account(
         decrypted_access_token = token.access_token
     
     # Poll charge and location
+    if budget is not None:
+        await budget.acquire(2)
     charge_data = await get_vehicle_charge(decrypted_access_token, account.provider_vehicle_id)
     location_data = await get_vehicle_location(decrypted_access_token, account.provider_vehicle_id)
     
@@ -103,40 +152,228 @@ async def poll_vehicle_telemetry_for_account(
             "location": location_data,
         },
     )
-    
-    db.add(telemetry)
-    db.commit()
-    db.refresh(telemetry)
-    
-    logger.info(f"Polled telemetry for vehicle account {account.id}: SOC={soc_pct}%, state={charging_state}")
-    
     return telemetry
 
 
+class _RateBudget:
+    """Token bucket shared by every poll against one provider."""
+
+    def __init__(self, rate_per_second: float, burst: Optional[float] = None):
+        self.rate = rate_per_second
+        self.capacity = burst if burst is not None else max(rate_per_second, 2)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, cost: float = 1) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                await asyncio.sleep((cost - self.tokens) / self.rate)
+
+
+@dataclass
+class _VehicleState:
+    """What the last sweeps saw of one vehicle."""
+    sample: Optional[Tuple] = None  # (soc_pct, charging_state, latitude, longitude)
+    idle_streak: int = 0
+    next_poll_at: float = 0.0  # time.monotonic()
+
+
+class TelemetrySweeper:
+    """
+    Polls every active vehicle account with bounded concurrency.
+
+    - At most ``concurrency`` vehicles are polled at once, and each provider
+      has a request budget (token bucket) shared by all of them.
+    - Vehicles seen idle (not charging, same SOC, not moved) on consecutive
+      sweeps are skipped for exponentially longer, up to ``idle_max_seconds``;
+      any change resets them. Next-poll times are jittered so backed-off
+      vehicles don't all come due in the same sweep.
+    - The polls never touch the Session: latest tokens are loaded before
+      they start, and refreshed tokens and telemetry rows are written in one
+      commit after they all finish. Token refreshes count against the
+      provider budget like any other request.
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        idle_backoff_seconds: Optional[float] = None,
+        idle_max_seconds: Optional[float] = None,
+    ):
+        self.concurrency = concurrency or int(os.getenv("EV_TELEMETRY_POLL_CONCURRENCY", "10"))
+        self.rate_per_second = rate_per_second or float(os.getenv("EV_TELEMETRY_RATE_PER_SECOND", "5"))
+        self.idle_backoff_seconds = (
+            idle_backoff_seconds if idle_backoff_seconds is not None
+            else float(os.getenv("EV_TELEMETRY_IDLE_BACKOFF_SECONDS", "300"))
+        )
+        self.idle_max_seconds = (
+            idle_max_seconds if idle_max_seconds is not None
+            else float(os.getenv("EV_TELEMETRY_IDLE_MAX_SECONDS", "3600"))
+        )
+        self._budgets: Dict[str, _RateBudget] = {}
+        self._vehicles: Dict[str, _VehicleState] = {}
+        self.stats = {"sweeps": 0, "polled": 0, "skipped_idle": 0, "failed": 0}
+
+    def budget(self, provider: str) -> _RateBudget:
+        budget = self._budgets.get(provider)
+        if budget is None:
+            budget = self._budgets[provider] = _RateBudget(self.rate_per_second)
+        return budget
+
+    async def sweep(self, db: Session) -> List[VehicleTelemetry]:
+        """Poll every due active vehicle and store the results. Returns the rows stored."""
+        start = time.perf_counter()
+        accounts = (
+            db.query(VehicleAccount)
+            .filter(VehicleAccount.is_active == True)
+            .all()
+        )
+        now = time.monotonic()
+        due = []
+        for account in accounts:
+            state = self._vehicles.setdefault(str(account.id), _VehicleState())
+            if state.next_poll_at <= now:
+                due.append(account)
+        self.stats["skipped_idle"] += len(accounts) - len(due)
+        random.shuffle(due)
+
+        tokens = _latest_tokens(db, [account.id for account in due])
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def poll(account: VehicleAccount) -> Tuple[Optional[VehicleTelemetry], Optional[VehicleToken]]:
+            new_token = None
+            async with limit:
+                try:
+                    token = tokens.get(str(account.id))
+                    if token is None:
+                        raise ValueError(f"No token found for vehicle account {account.id}")
+                    budget = self.budget(account.provider)
+                    if token_needs_refresh(token):
+                        await budget.acquire(1)
+                        token = new_token = await renew_token(account, token)
+                    return await _fetch_telemetry(account, token, budget), new_token
+                except Exception as e:
+                    logger.error(f"Failed to poll vehicle {account.id}: {e}", exc_info=True)
+                    # Continue with other vehicles; keep a refreshed token even if the poll failed
+                    return None, new_token
+
+        polled = await asyncio.gather(*(poll(account) for account in due))
+        results = [telemetry for telemetry, _ in polled if telemetry is not None]
+        new_tokens = [token for _, token in polled if token is not None]
+        if results or new_tokens:
+            try:
+                db.add_all(new_tokens + results)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        for telemetry in results:
+            self._observe(str(telemetry.vehicle_account_id), telemetry)
+
+        self._export_staleness(db, [account.id for account in accounts])
+        elapsed = time.perf_counter() - start
+        EV_TELEMETRY_SWEEP_SECONDS.observe(elapsed)
+        self.stats["sweeps"] += 1
+        self.stats["polled"] += len(results)
+        self.stats["failed"] += len(due) - len(results)
+        logger.info(
+            "Telemetry sweep: %d/%d vehicles polled, %d idle skipped in %.2fs",
+            len(results), len(due), len(accounts) - len(due), elapsed,
+        )
+        return results
+
+    def _observe(self, account_id: str, telemetry: VehicleTelemetry) -> None:
+        """Update a vehicle's idle streak and schedule its next poll."""
+        state = self._vehicles.setdefault(account_id, _VehicleState())
+        sample = (telemetry.soc_pct, telemetry.charging_state, telemetry.latitude, telemetry.longitude)
+        if state.sample is not None and telemetry.charging_state != "CHARGING" and _same_place_and_charge(state.sample, sample):
+            state.idle_streak += 1
+        else:
+            state.idle_streak = 0
+        state.sample = sample
+        if state.idle_streak == 0:
+            state.next_poll_at = 0.0
+        else:
+            delay = min(self.idle_backoff_seconds * 2 ** (state.idle_streak - 1), self.idle_max_seconds)
+            state.next_poll_at = time.monotonic() + delay * random.uniform(0.8, 1.2)
+
+    def _export_staleness(self, db: Session, account_ids: List[str]) -> None:
+        """Observe how old each active vehicle's newest telemetry is."""
+        if not account_ids:
+            return
+        now = datetime.utcnow()
+        latest = dict(
+            db.query(VehicleTelemetry.vehicle_account_id, func.max(VehicleTelemetry.recorded_at))
+            .filter(VehicleTelemetry.vehicle_account_id.in_([str(a) for a in account_ids]))
+            .group_by(VehicleTelemetry.vehicle_account_id)
+            .all()
+        )
+        worst = 0.0
+        for account_id in account_ids:
+            recorded_at = latest.get(str(account_id))
+            if recorded_at is None:
+                continue
+            staleness = (now - recorded_at).total_seconds()
+            EV_TELEMETRY_STALENESS_SECONDS.observe(staleness)
+            worst = max(worst, staleness)
+        EV_TELEMETRY_MAX_STALENESS_SECONDS.set(worst)
+
+
+def _latest_tokens(db: Session, account_ids: List[str]) -> Dict[str, VehicleToken]:
+    """Newest token of each vehicle account, keyed by account id."""
+    if not account_ids:
+        return {}
+    newest = (
+        db.query(VehicleToken.vehicle_account_id, func.max(VehicleToken.created_at).label("created_at"))
+        .filter(VehicleToken.vehicle_account_id.in_([str(a) for a in account_ids]))
+        .group_by(VehicleToken.vehicle_account_id)
+        .subquery()
+    )
+    rows = (
+        db.query(VehicleToken)
+        .join(
+            newest,
+            (VehicleToken.vehicle_account_id == newest.c.vehicle_account_id)
+            & (VehicleToken.created_at == newest.c.created_at),
+        )
+        .all()
+    )
+    return {str(token.vehicle_account_id): token for token in rows}
+
+
+def _same_place_and_charge(previous: Tuple, current: Tuple) -> bool:
+    soc, state, lat, lng = current
+    prev_soc, prev_state, prev_lat, prev_lng = previous
+    if state != prev_state or None in (soc, prev_soc) or abs(soc - prev_soc) > IDLE_SOC_DELTA_PCT:
+        return False
+    if None in (lat, lng, prev_lat, prev_lng):
+        return lat == prev_lat and lng == prev_lng
+    return abs(lat - prev_lat) < IDLE_MOVE_DEGREES and abs(lng - prev_lng) < IDLE_MOVE_DEGREES
+
+
+# Global sweeper; keeps per-vehicle idle state and provider budgets between sweeps
+telemetry_sweeper = TelemetrySweeper()
+
+
 async def poll_all_active_vehicles(db: Session) -> list[VehicleTelemetry]:
     """
     Poll all active vehicle accounts
     
+    Vehicles are polled concurrently within per-provider rate budgets;
+    vehicles seen idle are polled less often (see TelemetrySweeper).
+    
     Args:
         db: Database session
         
     Returns:
         List of VehicleTelemetry records created
     """
-    accounts = (
-        db.query(VehicleAccount)
-        .filter(VehicleAccount.is_active == True)
-        .all()
-    )
-    
-    results = []
-    for account in accounts:
-        try:
-            telemetry = await poll_vehicle_telemetry_for_account(db, account)
-            results.append(telemetry)
-        except Exception as e:
-            logger.error(f"Failed to poll vehicle {account.id}: {e}", exc_info=True)
-            # Continue with other vehicles
-    
-    return results
-
+    return await telemetry_sweeper.sweep(db)
@@ -0,0 +1,215 @@
+"""
+Consolidated lookup for exclusive activation.
+
+Activation used to issue a separate query for the idempotency key, the
+driver's active exclusive session, the charger, up to three merchant
+lookups and the open charging session. ``resolve_activation`` gathers all
+of it in one statement:
+
+- chargers and merchants come from resident id maps (read-through, refreshed
+  every ``EXCLUSIVE_DIRECTORY_REFRESH_SECONDS``); on a miss they are
+  outer-joined into the same statement instead of queried separately
+- the idempotent / active exclusive sessions and the open SessionEvent are
+  read together from a one-row anchor
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.exclusive_session import ExclusiveSession, ExclusiveSessionStatus
+from app.models.session_event import SessionEvent
+from app.models.while_you_charge import Charger, Merchant
+
+
+class ChargerRef(NamedTuple):
+    id: str
+    name: str
+    lat: float
+    lng: float
+
+
+class MerchantRef(NamedTuple):
+    id: str
+    place_id: Optional[str]
+    name: str
+    short_code: Optional[str]
+    region_code: Optional[str]
+
+
+class ResidentDirectory:
+    """Read-through in-memory maps of chargers and merchants by id / place_id."""
+
+    def __init__(self, refresh_seconds: Optional[float] = None):
+        self.refresh_seconds = (
+            refresh_seconds
+            if refresh_seconds is not None
+            else float(os.getenv("EXCLUSIVE_DIRECTORY_REFRESH_SECONDS", "300"))
+        )
+        self._lock = threading.Lock()
+        self._chargers: Dict[str, ChargerRef] = {}
+        self._merchants: Dict[str, MerchantRef] = {}
+        self._merchant_ids_by_place: Dict[str, str] = {}
+        self._loaded_at = time.monotonic()
+
+    def _expire_if_stale(self) -> None:
+        if time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            with self._lock:
+                self._chargers = {}
+                self._merchants = {}
+                self._merchant_ids_by_place = {}
+                self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Drop every cached entry."""
+        self._loaded_at = float("-inf")
+        self._expire_if_stale()
+
+    def get_charger(self, charger_id: str) -> Optional[ChargerRef]:
+        self._expire_if_stale()
+        return self._chargers.get(charger_id)
+
+    def get_merchant(self, merchant_id: Optional[str], merchant_place_id: Optional[str]) -> Optional[MerchantRef]:
+        """
+        Resolve like activation always has: merchant_id as an id, then
+        merchant_place_id as a place_id, then merchant_id as a place_id.
+        """
+        self._expire_if_stale()
+        if merchant_id and merchant_id in self._merchants:
+            return self._merchants[merchant_id]
+        for place_id in (merchant_place_id, merchant_id):
+            if place_id and place_id in self._merchant_ids_by_place:
+                return self._merchants.get(self._merchant_ids_by_place[place_id])
+        return None
+
+    def remember_charger(self, charger: ChargerRef) -> None:
+        with self._lock:
+            self._chargers[charger.id] = charger
+
+    def remember_merchant(self, merchant: MerchantRef) -> None:
+        with self._lock:
+            self._merchants[merchant.id] = merchant
+            if merchant.place_id:
+                self._merchant_ids_by_place[merchant.place_id] = merchant.id
+
+
+# Global directory (one per worker process)
+resident_directory = ResidentDirectory()
+
+
+@dataclass
+class ActivationLookup:
+    charger: Optional[ChargerRef]
+    merchant: Optional[MerchantRef]
+    idempotent_session: Optional[ExclusiveSession]
+    active_session: Optional[ExclusiveSession]
+    charging_session_id: Optional[object]
+
+
+def _pick_merchant(
+    candidates: List[MerchantRef],
+    merchant_id: Optional[str],
+    merchant_place_id: Optional[str],
+) -> Optional[MerchantRef]:
+    by_id = {m.id: m for m in candidates}
+    by_place = {m.place_id: m for m in candidates if m.place_id}
+    if merchant_id and merchant_id in by_id:
+        return by_id[merchant_id]
+    for place_id in (merchant_place_id, merchant_id):
+        if place_id and place_id in by_place:
+            return by_place[place_id]
+    return None
+
+
+def resolve_activation(
+    db: Session,
+    *,
+    driver_id: int,
+    charger_id: str,
+    merchant_id: Optional[str] = None,
+    merchant_place_id: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+    directory: ResidentDirectory = resident_directory,
+) -> ActivationLookup:
+    """Everything activate_exclusive needs to decide, in one round-trip."""
+    charger = directory.get_charger(charger_id) if charger_id else None
+    merchant = directory.get_merchant(merchant_id, merchant_place_id)
+
+    open_charging = (
+        select(SessionEvent.id)
+        .where(SessionEvent.driver_user_id == driver_id, SessionEvent.session_end.is_(None))
+        .order_by(SessionEvent.session_start.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    anchor = select(open_charging.label("charging_session_id")).subquery("anchor")
+
+    session_match = and_(
+        ExclusiveSession.driver_id == driver_id,
+        ExclusiveSession.status == ExclusiveSessionStatus.ACTIVE,
+    )
+    if idempotency_key:
+        session_match = or_(ExclusiveSession.idempotency_key == idempotency_key, session_match)
+
+    stmt = (
+        select(anchor.c.charging_session_id, ExclusiveSession)
+        .select_from(anchor)
+        .outerjoin(ExclusiveSession, session_match)
+    )
+
+    load_charger = charger is None and bool(charger_id)
+    if load_charger:
+        stmt = stmt.add_columns(
+            Charger.id.label("c_id"), Charger.name.label("c_name"),
+            Charger.lat.label("c_lat"), Charger.lng.label("c_lng"),
+        ).outerjoin(Charger, Charger.id == charger_id)
+
+    merchant_keys = [key for key in (merchant_id, merchant_place_id) if key]
+    load_merchant = merchant is None and bool(merchant_keys)
+    if load_merchant:
+        merchant_match = Merchant.place_id.in_(merchant_keys)
+        if merchant_id:
+            merchant_match = or_(Merchant.id == merchant_id, merchant_match)
+        stmt = stmt.add_columns(
+            Merchant.id.label("m_id"), Merchant.place_id.label("m_place_id"),
+            Merchant.name.label("m_name"), Merchant.short_code.label("m_short_code"),
+            Merchant.region_code.label("m_region_code"),
+        ).outerjoin(Merchant, merchant_match)
+
+    rows = db.execute(stmt).all()
+
+    charging_session_id = rows[0].charging_session_id if rows else None
+    idempotent_session = None
+    active_session = None
+    merchant_candidates: Dict[str, MerchantRef] = {}
+    for row in rows:
+        session = row.ExclusiveSession
+        if session is not None:
+            if idempotency_key and session.idempotency_key == idempotency_key:
+                idempotent_session = session
+            if session.driver_id == driver_id and session.status == ExclusiveSessionStatus.ACTIVE:
+                active_session = session
+        if load_charger and charger is None and row.c_id is not None:
+            charger = ChargerRef(row.c_id, row.c_name, row.c_lat, row.c_lng)
+            directory.remember_charger(charger)
+        if load_merchant and row.m_id is not None:
+            merchant_candidates[row.m_id] = MerchantRef(
+                row.m_id, row.m_place_id, row.m_name, row.m_short_code, row.m_region_code,
+            )
+
+    if load_merchant:
+        for candidate in merchant_candidates.values():
+            directory.remember_merchant(candidate)
+        merchant = _pick_merchant(list(merchant_candidates.values()), merchant_id, merchant_place_id)
+
+    return ActivationLookup(
+        charger=charger,
+        merchant=merchant,
+        idempotent_session=idempotent_session,
+        active_session=active_session,
+        charging_session_id=charging_session_id,
+    )
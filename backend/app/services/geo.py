@@ -1,7 +1,8 @@
 """
 Geographic utility functions
 """
-from math import radians, sin, cos, asin, sqrt
+from math import radians, sin, cos, asin, sqrt, floor
+from typing import Dict, Hashable, List, Tuple
 
 
 def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -27,3 +28,55 @@ def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     
     return R * c
 
+
+
+# Metres per degree of latitude (and of longitude at the equator)
+M_PER_DEG = 111320.0
+
+
+def bounding_box(lat: float, lng: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """
+    Lat/lng box enclosing a circle, for index-friendly range predicates.
+
+    ``lat BETWEEN south AND north AND lng BETWEEN west AND east`` can use a
+    (lat, lng) index, unlike ``ABS(lat - :lat) < d``.
+
+    Returns:
+        (south, north, west, east)
+    """
+    lat_delta = radius_m / M_PER_DEG
+    lng_delta = radius_m / (M_PER_DEG * max(cos(radians(lat)), 0.01))
+    return (lat - lat_delta, lat + lat_delta, lng - lng_delta, lng + lng_delta)
+
+
+class GridIndex:
+    """
+    In-memory uniform lat/lng grid for repeated radius lookups.
+
+    Points are bucketed into ``cell_deg`` cells; ``within`` only visits the
+    cells overlapping the query's bounding box, then filters by haversine.
+    """
+
+    def __init__(self, cell_deg: float = 0.01):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Tuple[int, int], List[Tuple[Hashable, float, float]]] = {}
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (floor(lat / self.cell_deg), floor(lng / self.cell_deg))
+
+    def add(self, key: Hashable, lat: float, lng: float) -> None:
+        self._cells.setdefault(self._cell(lat, lng), []).append((key, lat, lng))
+
+    def within(self, lat: float, lng: float, radius_m: float) -> List[Tuple[Hashable, float]]:
+        """(key, distance_m) for every point within radius_m, nearest first."""
+        south, north, west, east = bounding_box(lat, lng, radius_m)
+        (row_lo, col_lo), (row_hi, col_hi) = self._cell(south, west), self._cell(north, east)
+        hits = []
+        for row in range(row_lo, row_hi + 1):
+            for col in range(col_lo, col_hi + 1):
+                for key, p_lat, p_lng in self._cells.get((row, col), ()):
+                    distance = haversine_m(lat, lng, p_lat, p_lng)
+                    if distance <= radius_m:
+                        hits.append((key, distance))
+        hits.sort(key=lambda hit: hit[1])
+        return hits
@@ -3,8 +3,8 @@ Google Geocoding API service for resolving addresses/places to lat/lng.
 Uses the existing GOOGLE_PLACES_API_KEY from config.
 """
 import os
-import httpx
 import logging
+from app.services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +21,7 @@ async def geocode_address(query: str):
         return None
 
     try:
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("google_maps") as client:
             resp = await client.get(
                 "https://maps.googleapis.com/maps/api/geocode/json",
                 params={"address": query, "key": api_key},
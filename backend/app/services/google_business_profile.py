@@ -6,11 +6,11 @@ Supports mock mode for local development.
 """
 import logging
 import secrets
-import httpx
 from typing import List, Dict, Optional
 from urllib.parse import urlencode
 
 from app.core.config import settings
+from app.services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -65,7 +65,7 @@ async def exchange_oauth_code(code: str, redirect_uri: str) -> Dict[str, str]:
     if not client_id or not client_secret:
         raise ValueError("Google OAuth not configured (GOOGLE_OAUTH_CLIENT_ID or GOOGLE_OAUTH_CLIENT_SECRET missing)")
 
-    async with httpx.AsyncClient() as client:
+    async with http_clients.client("google_business") as client:
         response = await client.post(
             GOOGLE_TOKEN_URL,
             data={
@@ -92,7 +92,7 @@ async def refresh_access_token(refresh_token: str) -> Dict[str, str]:
     client_id = settings.GOOGLE_OAUTH_CLIENT_ID or settings.GOOGLE_CLIENT_ID
     client_secret = settings.GOOGLE_OAUTH_CLIENT_SECRET
 
-    async with httpx.AsyncClient() as client:
+    async with http_clients.client("google_business") as client:
         response = await client.post(
             GOOGLE_TOKEN_URL,
             data={
@@ -115,7 +115,7 @@ async def get_user_info(access_token: str) -> Dict[str, str]:
             "id": "mock_google_id_123",
         }
 
-    async with httpx.AsyncClient() as client:
+    async with http_clients.client("google_business") as client:
         response = await client.get(
             GOOGLE_USERINFO_URL,
             headers={"Authorization": f"Bearer {access_token}"},
@@ -129,7 +129,7 @@ async def list_accounts(access_token: str) -> List[Dict]:
     if settings.MERCHANT_AUTH_MOCK:
         return [{"name": "accounts/mock_account_1", "accountName": "Mock Business"}]
 
-    async with httpx.AsyncClient() as client:
+    async with http_clients.client("google_business") as client:
         response = await client.get(
             GBP_ACCOUNTS_URL,
             headers={"Authorization": f"Bearer {access_token}"},
@@ -171,7 +171,7 @@ async def list_locations(access_token: str, account_id: Optional[str] = None) ->
     if not account_id.startswith("accounts/"):
         account_id = f"accounts/{account_id}"
 
-    async with httpx.AsyncClient() as client:
+    async with http_clients.client("google_business") as client:
         url = f"{GBP_LOCATIONS_URL}/{account_id}/locations"
         response = await client.get(
             url,
@@ -12,6 +12,7 @@ from app.core.config import settings as core_settings
 from app.config import settings
 from app.cache.layers import LayeredCache
 from app.core.retry import retry_with_backoff
+from app.services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -179,7 +180,7 @@ async def search_nearby(
     )
     
     async def _make_request():
-        async with httpx.AsyncClient(timeout=12.0) as client:
+        async with http_clients.client("google_places") as client:
             response = await client.post(url, json=payload, headers=headers)
             response.raise_for_status()
             return response.json()
@@ -319,7 +320,7 @@ async def get_photo_url(photo_reference: str, max_width: int = 400) -> Optional[
     }
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_clients.client("google_places") as client:
             response = await client.get(url, params=params, headers=headers)
             response.raise_for_status()
             data = response.json()
@@ -420,7 +421,7 @@ async def place_details(place_id: str) -> Optional[Dict]:
     logger.info(f"[GooglePlacesNew] Fetching place details: {normalized_place_id}")
     
     async def _make_request():
-        async with httpx.AsyncClient(timeout=12.0) as client:
+        async with http_clients.client("google_places") as client:
             response = await client.get(url, headers=headers)
             response.raise_for_status()
             return response.json()
@@ -499,7 +500,7 @@ async def search_text(
     logger.info(f"[GooglePlacesNew] Text search: query='{query}', location_bias={location_bias}")
     
     async def _make_request():
-        async with httpx.AsyncClient(timeout=12.0) as client:
+        async with http_clients.client("google_places") as client:
             response = await client.post(url, json=payload, headers=headers)
             response.raise_for_status()
             return response.json()
@@ -597,7 +598,7 @@ async def get_open_status(place_id: str) -> Optional[Dict]:
     }
     
     async def _make_request():
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_clients.client("google_places") as client:
             response = await client.get(url, headers=headers)
             response.raise_for_status()
             return response.json()
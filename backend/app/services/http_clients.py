@@ -0,0 +1,293 @@
+"""
+Long-lived, pooled HTTP clients for outbound integrations.
+
+Opening an ``httpx.AsyncClient`` per call pays a DNS lookup and TLS handshake
+on every request. Instead each upstream (Tesla, Smartcar, Google, Square,
+Toast, partner webhooks, ...) gets one client per event loop, created on
+first use and closed on app shutdown, whose connections are kept alive and
+reused (HTTP/2 where the ``h2`` package is installed).
+
+Every request made through a registry client goes through
+``_UpstreamTransport``, which adds, per upstream:
+
+- a per-host concurrency limit (requests beyond it wait for a slot)
+- a circuit breaker per host (``CircuitBreaker``), tripped only by timeouts
+  and network errors - a 5xx from one endpoint doesn't take the host down
+  for every caller; while open, requests fail fast with
+  ``UpstreamUnavailable``, an ``httpx.TransportError``, so callers' existing
+  network-error handling applies
+- retries with backoff (``retry_with_backoff``) for idempotent methods on
+  timeouts, network errors and 5xx responses
+- latency, error, in-flight and pool-saturation metrics on ``/metrics``
+
+Call sites replace ``async with httpx.AsyncClient(timeout=...) as client:``
+with ``async with http_clients.client("<upstream>") as client:``; leaving the
+block does not close the shared client.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+import httpx
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.retry import retry_with_backoff
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Failures that say the host itself is unreachable; only these trip its breaker
+HOST_FAILURES = (httpx.TimeoutException, httpx.NetworkError)
+
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "Outbound request latency to response headers, per upstream",
+    ["upstream"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+UPSTREAM_REQUEST_ERRORS = Counter(
+    "upstream_request_errors_total",
+    "Outbound requests that failed, per upstream and kind",
+    ["upstream", "kind"],
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "upstream_requests_in_flight",
+    "Outbound requests awaiting a response, per upstream",
+    ["upstream"],
+)
+UPSTREAM_POOL_SATURATION = Gauge(
+    "upstream_pool_saturation",
+    "In-flight requests as a fraction of the upstream's connection pool",
+    ["upstream"],
+)
+
+
+class UpstreamUnavailable(httpx.TransportError):
+    """Raised without contacting the upstream while its circuit is open."""
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    timeout: float = 10.0
+    max_connections: int = 50
+    max_keepalive: int = 20
+    keepalive_expiry: float = 30.0
+    max_per_host: int = 20
+    http2: bool = True
+    retry_attempts: int = 2
+    retry_initial_delay: float = 0.25
+    failure_threshold: int = 5
+    open_seconds: int = 30
+
+
+# Timeouts match what each integration used with its per-call clients
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    "tesla": UpstreamConfig(timeout=30.0),
+    "smartcar": UpstreamConfig(timeout=30.0),
+    "google_places": UpstreamConfig(timeout=12.0),
+    "google_maps": UpstreamConfig(timeout=15.0),
+    "google_business": UpstreamConfig(timeout=10.0),
+    "square": UpstreamConfig(timeout=30.0),
+    "toast": UpstreamConfig(timeout=30.0),
+    "nrel": UpstreamConfig(timeout=10.0),
+    "overpass": UpstreamConfig(timeout=30.0, max_per_host=4),
+    "tomtom": UpstreamConfig(timeout=10.0, max_per_host=5),
+    # Partner endpoints: many hosts, few requests each; the webhook dispatcher
+    # runs its own retry schedule
+    "webhooks": UpstreamConfig(timeout=10.0, max_connections=100, max_per_host=5,
+                               http2=False, retry_attempts=1),
+}
+
+
+class _UpstreamTransport(httpx.AsyncBaseTransport):
+    def __init__(self, upstream: "UpstreamClient", transport: httpx.AsyncBaseTransport):
+        self._upstream = upstream
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        upstream = self._upstream
+        host = request.url.host
+        breaker = upstream.breaker(host)
+        attempts = upstream.config.retry_attempts if request.method in IDEMPOTENT_METHODS else 1
+        failed: list = []
+
+        async def attempt() -> httpx.Response:
+            # Release the previous attempt's 5xx before retrying
+            while failed:
+                await failed.pop().aclose()
+            response = await breaker.call(upstream.send_limited, self._transport, request)
+            if response.status_code >= 500:
+                failed.append(response)
+                # Retried like any 5xx
+                raise httpx.HTTPStatusError(
+                    f"{upstream.name} returned {response.status_code}", request=request, response=response,
+                )
+            return response
+
+        try:
+            return await retry_with_backoff(
+                attempt,
+                max_attempts=attempts,
+                initial_delay=upstream.config.retry_initial_delay,
+                max_delay=5.0,
+            )
+        except CircuitOpenError:
+            UPSTREAM_REQUEST_ERRORS.labels(upstream.name, "circuit_open").inc()
+            raise UpstreamUnavailable(f"{upstream.name} circuit open for {host}", request=request)
+        except httpx.HTTPStatusError as exc:
+            # Retries exhausted: hand the caller the last response as httpx would
+            failed.clear()
+            return exc.response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class UpstreamClient:
+    """One upstream's pooled client, breakers and concurrency limits."""
+
+    def __init__(
+        self,
+        name: str,
+        config: UpstreamConfig,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        client_factory: Callable[..., Any] = httpx.AsyncClient,
+    ):
+        self.name = name
+        self.config = config
+        # Underlying transport; a pooled AsyncHTTPTransport per client unless given
+        self._transport = transport
+        self.client_factory = client_factory
+        self.in_flight = 0
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # (event loop, client); a client is bound to the loop it was opened on
+        self._client: Optional[Tuple[asyncio.AbstractEventLoop, Any]] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(
+                failure_threshold=self.config.failure_threshold, timeout=self.config.open_seconds,
+                failure_types=HOST_FAILURES,
+            )
+        return breaker
+
+    async def _open(self) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._client is not None:
+            client_loop, client = self._client
+            if client_loop is loop:
+                return client
+        config = self.config
+        transport = self._transport or httpx.AsyncHTTPTransport(
+            http2=config.http2 and _H2_AVAILABLE and os.getenv("HTTP_CLIENT_HTTP2", "true").lower() == "true",
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+        )
+        client = await self.client_factory(
+            transport=_UpstreamTransport(self, transport), timeout=config.timeout,
+        ).__aenter__()
+        self._client = (loop, client)
+        self._host_limits = {}
+        return client
+
+    @asynccontextmanager
+    async def client(self) -> AsyncIterator[httpx.AsyncClient]:
+        yield await self._open()
+
+    async def send_limited(self, transport: httpx.AsyncBaseTransport, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.config.max_per_host)
+        async with limit:
+            self._track(1)
+            start = time.perf_counter()
+            try:
+                return await transport.handle_async_request(request)
+            except httpx.TimeoutException:
+                UPSTREAM_REQUEST_ERRORS.labels(self.name, "timeout").inc()
+                raise
+            except httpx.NetworkError:
+                UPSTREAM_REQUEST_ERRORS.labels(self.name, "connect").inc()
+                raise
+            except Exception:
+                UPSTREAM_REQUEST_ERRORS.labels(self.name, "other").inc()
+                raise
+            finally:
+                UPSTREAM_REQUEST_DURATION.labels(self.name).observe(time.perf_counter() - start)
+                self._track(-1)
+
+    def _track(self, delta: int) -> None:
+        self.in_flight += delta
+        UPSTREAM_IN_FLIGHT.labels(self.name).set(self.in_flight)
+        UPSTREAM_POOL_SATURATION.labels(self.name).set(self.in_flight / self.config.max_connections)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "pool_saturation": round(self.in_flight / self.config.max_connections, 3),
+            "open_circuits": sorted(h for h, b in self._breakers.items() if b.state != CircuitState.CLOSED),
+        }
+
+    async def aclose(self) -> None:
+        if self._client is None:
+            return
+        client_loop, client = self._client
+        self._client = None
+        if client_loop is asyncio.get_running_loop():
+            await client.__aexit__(None, None, None)
+
+
+class HTTPClientRegistry:
+    def __init__(
+        self,
+        upstreams: Optional[Dict[str, UpstreamConfig]] = None,
+        client_factory: Callable[..., Any] = httpx.AsyncClient,
+    ):
+        self._configs = dict(upstreams if upstreams is not None else UPSTREAMS)
+        self.client_factory = client_factory
+        self._clients: Dict[str, UpstreamClient] = {}
+
+    def get(self, name: str) -> UpstreamClient:
+        upstream = self._clients.get(name)
+        if upstream is None:
+            if name not in self._configs:
+                raise KeyError(f"Unknown upstream: {name}")
+            upstream = self._clients[name] = UpstreamClient(
+                name, self._configs[name], client_factory=self.client_factory,
+            )
+        return upstream
+
+    def client(self, name: str):
+        """Async context manager yielding the upstream's shared client."""
+        return self.get(name).client()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: upstream.stats() for name, upstream in self._clients.items()}
+
+    async def aclose(self) -> None:
+        for upstream in self._clients.values():
+            try:
+                await upstream.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing {upstream.name} HTTP client: {e}")
+
+
+# Global registry, closed on app shutdown
+http_clients = HTTPClientRegistry()
@@ -4,14 +4,16 @@ Handles intent capture logic: confidence tier assignment, charger lookup, sessio
 """
 import logging
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, List, Dict, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from app.models import IntentSession, Charger, MerchantCache
+from app.models import IntentSession, Charger
 from app.core.config import settings
 from app.services.google_places_new import _get_geo_cell
+from app.services.merchant_cache_writer import merchant_cache_writer
+from app.services.placement_rule_cache import placement_rule_cache
 
 logger = logging.getLogger(__name__)
 
@@ -309,68 +311,18 @@ async def get_merchants_for_intent(
     if not merchants:
         logger.info(f"No database merchants linked for charger_id={charger_id} at lat={lat}, lng={lng}")
     
-    # Cache merchants in database — batch query to reduce DB round trips
+    # Cache merchants write-behind: unchanged payloads are dropped, the rest
+    # are flushed in batches off the request path
     geo_cell_lat, geo_cell_lng = _get_geo_cell(lat, lng)
-    expires_at = datetime.utcnow() + timedelta(seconds=settings.MERCHANT_CACHE_TTL_SECONDS)
-
-    # Collect all place_ids in a single pass
-    place_ids_to_cache = [m.get("place_id") for m in merchants if m.get("place_id")]
-
-    if place_ids_to_cache:
-        # Single IN query to fetch all existing cache entries at once
-        existing_entries = (
-            db.query(MerchantCache)
-            .filter(
-                MerchantCache.place_id.in_(place_ids_to_cache),
-                MerchantCache.geo_cell_lat == geo_cell_lat,
-                MerchantCache.geo_cell_lng == geo_cell_lng,
-            )
-            .all()
-        )
-        existing_by_place_id = {entry.place_id: entry for entry in existing_entries}
-
-        # Bulk upsert: update existing, insert new
-        for merchant in merchants:
-            place_id = merchant.get("place_id")
-            if not place_id:
-                continue
-
-            cached = existing_by_place_id.get(place_id)
-            if cached:
-                # Update existing cache entry
-                cached.merchant_data = merchant
-                cached.photo_url = merchant.get("photo_url")
-                cached.expires_at = expires_at
-                cached.updated_at = datetime.utcnow()
-            else:
-                # Create new cache entry
-                cache_entry = MerchantCache(
-                    place_id=place_id,
-                    geo_cell_lat=geo_cell_lat,
-                    geo_cell_lng=geo_cell_lng,
-                    merchant_data=merchant,
-                    photo_url=merchant.get("photo_url"),
-                    expires_at=expires_at,
-                )
-                db.add(cache_entry)
-
-        db.commit()
-    
-    # Query placement rules for all merchants
-    from app.models import MerchantPlacementRule
-    place_ids = [m.get("place_id") for m in merchants if m.get("place_id")]
-    placement_rules = {}
-    if place_ids:
-        rules = (
-            db.query(MerchantPlacementRule)
-            .filter(
-                MerchantPlacementRule.place_id.in_(place_ids),
-                MerchantPlacementRule.status == "ACTIVE",
-            )
-            .all()
-        )
-        placement_rules = {rule.place_id: rule for rule in rules}
-    
+    if merchant_cache_writer.submit(merchants, geo_cell_lat, geo_cell_lng) and not merchant_cache_writer.running:
+        # No background writer (scripts, tests): write through
+        merchant_cache_writer.flush(db)
+
+    # Placement rules come from the resident ACTIVE-rule map
+    placement_rules = placement_rule_cache.get_many(
+        db, [m.get("place_id") for m in merchants if m.get("place_id")]
+    )
+
     # Apply placement rules and calculate boosted scores
     merchants_with_scores = []
     for merchant in merchants:
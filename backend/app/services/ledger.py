@@ -1,33 +1,215 @@
 import json
 import hashlib
+import mmap
 import os
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from ..models_extra import RewardEvent
 
+GENESIS_HASH = "0" * 64
+
+# Segment files roll over once they reach this size
+DEFAULT_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _entry_hash(entry: Dict[str, Any]) -> str:
+    """Hash of an entry without its own "hash" field (canonical, sorted-key JSON)."""
+    entry_copy = {k: v for k, v in entry.items() if k != "hash"}
+    entry_json = json.dumps(entry_copy, sort_keys=True)
+    return hashlib.sha256(entry_json.encode()).hexdigest()
+
+
+class _Location:
+    """Where an entry lives, plus the chain data needed to verify it in O(1)."""
+    __slots__ = ("segment", "offset", "length", "seq", "hash", "prev_hash")
+
+    def __init__(self, segment: int, offset: int, length: int, seq: int, hash: str, prev_hash: Optional[str]):
+        self.segment = segment
+        self.offset = offset
+        self.length = length
+        self.seq = seq
+        self.hash = hash
+        self.prev_hash = prev_hash
+
+
 class LedgerService:
-    """Local append-only ledger for reward proofs. Can be swapped for blockchain later."""
-    
-    def __init__(self, ledger_path: str = "data/ledger.jsonl"):
+    """
+    Local append-only ledger for reward proofs. Can be swapped for blockchain later.
+
+    Layout: the original ``ledger.jsonl`` is kept read-only as segment 0; new
+    proofs are appended to ``ledger.000001.jsonl``, ``ledger.000002.jsonl``...
+    An in-memory side index (event_id / proof_id -> segment, offset) is rebuilt
+    by scanning segments on startup, and lookups read the entry through a
+    memory map instead of re-reading the file.
+
+    New entries carry ``prev_hash`` (hash of the previous entry), forming a hash
+    chain: a single proof verifies in O(1) against its indexed predecessor, and
+    ``audit()`` checks the whole chain incrementally from its last checkpoint.
+
+    Durability is controlled by ``fsync_policy`` (LEDGER_FSYNC):
+    - "always": fsync after every append
+    - "interval": fsync at most every ``fsync_interval_ms`` (LEDGER_FSYNC_INTERVAL_MS)
+    - "never": leave flushing to the OS
+    """
+
+    def __init__(
+        self,
+        ledger_path: str = "data/ledger.jsonl",
+        *,
+        segment_max_bytes: int = DEFAULT_SEGMENT_MAX_BYTES,
+        fsync_policy: Optional[str] = None,
+        fsync_interval_ms: Optional[int] = None,
+    ):
         self.ledger_path = ledger_path
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_policy = (fsync_policy or os.getenv("LEDGER_FSYNC", "interval")).lower()
+        self.fsync_interval_ms = (
+            fsync_interval_ms
+            if fsync_interval_ms is not None
+            else int(os.getenv("LEDGER_FSYNC_INTERVAL_MS", "1000"))
+        )
         self.ensure_ledger_dir()
-    
+
+        self._lock = threading.RLock()
+        self._by_event: Dict[Any, _Location] = {}
+        self._by_proof: Dict[str, _Location] = {}
+        self._by_seq: List[_Location] = []
+        self._maps: Dict[int, Tuple[mmap.mmap, int]] = {}
+        self._active_segment = 1
+        self._active_file = None
+        self._last_hash = GENESIS_HASH
+        self._last_fsync = 0.0
+        self._audit_checkpoint = 0  # next seq to audit
+        self._audit_hash = GENESIS_HASH
+        self.rebuild_index()
+
     def ensure_ledger_dir(self):
         """Ensure the ledger directory exists."""
-        os.makedirs(os.path.dirname(self.ledger_path), exist_ok=True)
-    
-    def record_reward_proof(self, event: RewardEvent) -> Dict[str, Any]:
-        """
-        Record a reward proof in the append-only ledger.
-        
-        Args:
-            event: RewardEvent instance
-            
-        Returns:
-            Dict with proof_id and hash
-        """
-        # Create proof entry
-        proof_entry = {
+        os.makedirs(os.path.dirname(self.ledger_path) or ".", exist_ok=True)
+
+    # ---- segments -------------------------------------------------------
+
+    def segment_path(self, segment: int) -> str:
+        """Path of a segment; segment 0 is the original single-file ledger."""
+        if segment == 0:
+            return self.ledger_path
+        base, ext = os.path.splitext(self.ledger_path)
+        return f"{base}.{segment:06d}{ext or '.jsonl'}"
+
+    def _segments(self) -> List[int]:
+        segments = [0] if os.path.exists(self.ledger_path) else []
+        n = 1
+        while os.path.exists(self.segment_path(n)):
+            segments.append(n)
+            n += 1
+        return segments
+
+    def rebuild_index(self) -> None:
+        """Scan all segments and rebuild the side index and chain tip."""
+        with self._lock:
+            self._close_maps()
+            self._by_event.clear()
+            self._by_proof.clear()
+            self._by_seq = []
+            self._last_hash = GENESIS_HASH
+            self._audit_checkpoint = 0
+            self._audit_hash = GENESIS_HASH
+
+            segments = self._segments()
+            for segment in segments:
+                offset = 0
+                with open(self.segment_path(segment), "rb") as f:
+                    for raw in f:
+                        length = len(raw)
+                        try:
+                            entry = json.loads(raw)
+                        except json.JSONDecodeError:
+                            offset += length
+                            continue
+                        self._index_entry(entry, segment, offset, length)
+                        offset += length
+
+            self._active_segment = max([s for s in segments if s > 0], default=1)
+
+    def _index_entry(self, entry: Dict[str, Any], segment: int, offset: int, length: int) -> _Location:
+        loc = _Location(
+            segment, offset, length, len(self._by_seq),
+            entry.get("hash", ""), entry.get("prev_hash"),
+        )
+        self._by_seq.append(loc)
+        # get_proof returns the first proof recorded for an event
+        self._by_event.setdefault(entry.get("event_id"), loc)
+        if entry.get("id"):
+            self._by_proof[entry["id"]] = loc
+        self._last_hash = loc.hash
+        return loc
+
+    def _open_active(self):
+        if self._active_file is None:
+            self._active_file = open(self.segment_path(self._active_segment), "ab")
+        elif self._active_file.tell() >= self.segment_max_bytes:
+            self._active_file.flush()
+            os.fsync(self._active_file.fileno())
+            self._active_file.close()
+            self._active_segment += 1
+            self._active_file = open(self.segment_path(self._active_segment), "ab")
+        return self._active_file
+
+    def _maybe_fsync(self, f, force: bool = False) -> None:
+        if self.fsync_policy == "never" and not force:
+            return
+        now = time.monotonic()
+        if (
+            force
+            or self.fsync_policy == "always"
+            or (now - self._last_fsync) * 1000 >= self.fsync_interval_ms
+        ):
+            os.fsync(f.fileno())
+            self._last_fsync = now
+
+    def flush(self) -> None:
+        """Force buffered appends to disk regardless of fsync policy."""
+        with self._lock:
+            if self._active_file is not None:
+                self._active_file.flush()
+                self._maybe_fsync(self._active_file, force=True)
+
+    def close(self) -> None:
+        """Flush and release file handles and memory maps."""
+        with self._lock:
+            if self._active_file is not None:
+                self.flush()
+                self._active_file.close()
+                self._active_file = None
+            self._close_maps()
+
+    def _close_maps(self) -> None:
+        for mm, _ in self._maps.values():
+            mm.close()
+        self._maps.clear()
+
+    def _read(self, loc: _Location) -> Dict[str, Any]:
+        """Read an indexed entry through the segment's memory map."""
+        end = loc.offset + loc.length
+        mapped = self._maps.get(loc.segment)
+        if mapped is None or mapped[1] < end:
+            # Segment grew past the mapped region (or is unmapped): remap
+            if mapped is not None:
+                mapped[0].close()
+            if loc.segment == self._active_segment and self._active_file is not None:
+                self._active_file.flush()
+            with open(self.segment_path(loc.segment), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                mapped = (mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ), size)
+            self._maps[loc.segment] = mapped
+        return json.loads(mapped[0][loc.offset:end])
+
+    # ---- writes ---------------------------------------------------------
+
+    def _proof_entry(self, event: RewardEvent) -> Dict[str, Any]:
+        return {
             "id": f"proof_{event.id}_{int(datetime.utcnow().timestamp())}",
             "timestamp": datetime.utcnow().isoformat(),
             "event_id": event.id,
@@ -38,74 +220,137 @@ class LedgerService:
             "source": event.source,
             "meta": event.meta or {}
         }
-        
-        # Create hash of the entry
-        entry_json = json.dumps(proof_entry, sort_keys=True)
-        entry_hash = hashlib.sha256(entry_json.encode()).hexdigest()
-        proof_entry["hash"] = entry_hash
-        
-        # Append to ledger
-        with open(self.ledger_path, "a") as f:
-            f.write(json.dumps(proof_entry) + "\n")
-        
-        return {
-            "proof_id": proof_entry["id"],
-            "hash": entry_hash,
-            "timestamp": proof_entry["timestamp"]
-        }
-    
+
+    def record_reward_proofs(self, events: Iterable[RewardEvent]) -> List[Dict[str, Any]]:
+        """
+        Record several reward proofs with one write and (at most) one fsync.
+
+        Args:
+            events: RewardEvent instances
+
+        Returns:
+            List of dicts with proof_id, hash and timestamp, in input order
+        """
+        results = []
+        with self._lock:
+            f = self._open_active()
+            offset = f.tell()
+            segment = self._active_segment
+            chunks = []
+            for event in events:
+                proof_entry = self._proof_entry(event)
+                proof_entry["prev_hash"] = self._last_hash
+                entry_hash = _entry_hash(proof_entry)
+                proof_entry["hash"] = entry_hash
+                line = (json.dumps(proof_entry) + "\n").encode()
+                chunks.append(line)
+                self._index_entry(proof_entry, segment, offset, len(line))
+                offset += len(line)
+                results.append({
+                    "proof_id": proof_entry["id"],
+                    "hash": entry_hash,
+                    "timestamp": proof_entry["timestamp"]
+                })
+            if chunks:
+                f.write(b"".join(chunks))
+                f.flush()
+                self._maybe_fsync(f)
+        return results
+
+    def record_reward_proof(self, event: RewardEvent) -> Dict[str, Any]:
+        """
+        Record a reward proof in the append-only ledger.
+
+        Args:
+            event: RewardEvent instance
+
+        Returns:
+            Dict with proof_id and hash
+        """
+        return self.record_reward_proofs([event])[0]
+
+    # ---- reads / verification -------------------------------------------
+
     def get_proof(self, event_id: int) -> Optional[Dict[str, Any]]:
         """
         Get a proof by event ID.
-        
+
         Args:
             event_id: Event ID to look up
-            
+
         Returns:
             Proof entry or None if not found
         """
-        if not os.path.exists(self.ledger_path):
-            return None
-        
-        with open(self.ledger_path, "r") as f:
-            for line in f:
-                try:
-                    entry = json.loads(line.strip())
-                    if entry.get("event_id") == event_id:
-                        return entry
-                except json.JSONDecodeError:
-                    continue
-        
-        return None
-    
+        with self._lock:
+            loc = self._by_event.get(event_id)
+            return self._read(loc) if loc else None
+
+    def _verify_location(self, loc: _Location, expected_prev: Optional[str]) -> bool:
+        entry = self._read(loc)
+        stored_hash = entry.get("hash")
+        if not stored_hash or stored_hash != _entry_hash(entry) or stored_hash != loc.hash:
+            return False
+        # Chained entries must point at their predecessor's hash
+        if "prev_hash" in entry and entry["prev_hash"] != expected_prev:
+            return False
+        return True
+
     def verify_proof(self, proof_id: str) -> bool:
         """
-        Verify a proof by checking its hash.
-        
+        Verify a proof by checking its hash and its link to the previous entry.
+
         Args:
             proof_id: Proof ID to verify
-            
+
         Returns:
             True if proof is valid, False otherwise
         """
-        if not os.path.exists(self.ledger_path):
-            return False
-        
-        with open(self.ledger_path, "r") as f:
-            for line in f:
-                try:
-                    entry = json.loads(line.strip())
-                    if entry.get("id") == proof_id:
-                        # Recalculate hash
-                        entry_copy = entry.copy()
-                        stored_hash = entry_copy.pop("hash")
-                        entry_json = json.dumps(entry_copy, sort_keys=True)
-                        calculated_hash = hashlib.sha256(entry_json.encode()).hexdigest()
-                        return stored_hash == calculated_hash
-                except json.JSONDecodeError:
-                    continue
-        
-        return False
+        with self._lock:
+            loc = self._by_proof.get(proof_id)
+            if not loc:
+                return False
+            expected_prev = self._by_seq[loc.seq - 1].hash if loc.seq > 0 else GENESIS_HASH
+            return self._verify_location(loc, expected_prev)
+
+    def audit(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Verify the hash chain from the last audit checkpoint to the tip.
+
+        Each call only checks entries appended since the previous call unless
+        ``full`` is set.
+
+        Returns:
+            Dict with ok, checked count, total entries and first bad proof id
+        """
+        with self._lock:
+            if full:
+                self._audit_checkpoint = 0
+                self._audit_hash = GENESIS_HASH
+            checked = 0
+            for loc in self._by_seq[self._audit_checkpoint:]:
+                if not self._verify_location(loc, self._audit_hash):
+                    entry = self._read(loc)
+                    return {
+                        "ok": False,
+                        "checked": checked,
+                        "entries": len(self._by_seq),
+                        "first_invalid": entry.get("id"),
+                    }
+                self._audit_hash = loc.hash
+                self._audit_checkpoint = loc.seq + 1
+                checked += 1
+            return {"ok": True, "checked": checked, "entries": len(self._by_seq), "first_invalid": None}
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry/segment counts and chain tip, without touching the files."""
+        with self._lock:
+            return {
+                "entries": len(self._by_seq),
+                "segments": len(self._segments()),
+                "active_segment": self.segment_path(self._active_segment),
+                "chain_tip": self._last_hash,
+                "fsync_policy": self.fsync_policy,
+            }
 
 # Global ledger instance
 ledger = LedgerService()
@@ -2,17 +2,92 @@
 Merchant analytics and summary services
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import text, func
+from sqlalchemy import bindparam, text, func
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from calendar import monthrange
+from math import floor
 
 from app.utils.log import get_logger
 from app.core.config import settings
+from app.services.geo import GridIndex, bounding_box, haversine_m
 
 logger = get_logger(__name__)
 
 
+# Verified sessions within this distance of a merchant count towards it
+NEARBY_RADIUS_M = 600
+# merchant_summaries reads sessions per cluster of merchants in cells this
+# size (~11 km), so sparse merchants don't pull in everything between them
+CLUSTER_CELL_DEG = 0.1
+
+
+def _verified_at_hour(verified_at) -> Optional[int]:
+    if not verified_at:
+        return None
+    try:
+        if isinstance(verified_at, str):
+            return datetime.fromisoformat(verified_at.replace('Z', '+00:00')[:19]).hour
+        return verified_at.hour
+    except (ValueError, AttributeError):
+        return None
+
+
+def _verified_sessions_in_box(
+    db: Session,
+    box: Tuple[float, float, float, float],
+    from_time: datetime,
+    to_time: datetime,
+):
+    """(lat, lng, verified_at) of verified sessions inside a lat/lng box."""
+    south, north, west, east = box
+    return db.execute(text("""
+        SELECT lat, lng, verified_at FROM sessions
+        WHERE status = 'verified'
+        AND lat BETWEEN :south AND :north
+        AND lng BETWEEN :west AND :east
+        AND verified_at >= :from_time
+        AND verified_at <= :to_time
+    """), {
+        "south": south, "north": north, "west": west, "east": east,
+        "from_time": from_time,
+        "to_time": to_time
+    })
+
+
+def _purchase_event(row) -> Dict[str, Any]:
+    return {
+        "type": "purchase",
+        "id": str(row.id),
+        "amount_cents": row.amount_cents,
+        "created_at": str(row.created_at) if row.created_at else None,
+        "claimed": bool(row.claimed) if row.claimed else False
+    }
+
+
+def _default_window(from_time: Optional[datetime], to_time: Optional[datetime]) -> Tuple[datetime, datetime]:
+    # Default to last 30 days
+    now = datetime.utcnow()
+    return from_time or now - timedelta(days=30), to_time or now
+
+
+def _summary(merchant_id, from_time: datetime, to_time: datetime, verified_sessions: int,
+             purchase_rewards: int, total_rewards_paid: int, top_hours: Dict[int, int],
+             last_events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "merchant_id": merchant_id,
+        "verified_sessions": verified_sessions,
+        "purchase_rewards": purchase_rewards,
+        "total_rewards_paid": total_rewards_paid,
+        "top_hours": top_hours,
+        "last_events": last_events,
+        "period": {
+            "from": from_time.isoformat(),
+            "to": to_time.isoformat()
+        }
+    }
+
+
 def merchant_summary(
     db: Session,
     merchant_id: int,
@@ -21,7 +96,11 @@ def merchant_summary(
 ) -> Dict[str, Any]:
     """
     Generate merchant analytics summary.
-    
+
+    Sessions are selected with a lat/lng bounding box around the merchant
+    (so the (status, lat, lng) index bounds the scan to local activity)
+    and then filtered to NEARBY_RADIUS_M by haversine.
+
     Returns:
         {
             "merchant_id": int,
@@ -32,73 +111,38 @@ def merchant_summary(
             "last_events": List[dict]
         }
     """
-    # Default to last 30 days
-    if not from_time:
-        from_time = datetime.utcnow() - timedelta(days=30)
-    if not to_time:
-        to_time = datetime.utcnow()
-    
+    from_time, to_time = _default_window(from_time, to_time)
+
     # Get merchant location
     merchant_result = db.execute(text("""
         SELECT lat, lng FROM merchants WHERE id = :merchant_id
     """), {"merchant_id": merchant_id}).first()
-    
+
     if not merchant_result:
         return {
             "merchant_id": merchant_id,
             "error": "Merchant not found"
         }
-    
+
     merchant_lat = float(merchant_result[0]) if merchant_result[0] else None
     merchant_lng = float(merchant_result[1]) if merchant_result[1] else None
-    
-    # 1. Verified sessions within 600m (using haversine)
-    # We'll approximate by checking sessions that are close enough
-    # For production, use PostGIS or similar, but for now use simple bounding box + haversine filter
+
+    # 1. Verified sessions within 600m and their hour histogram, in one pass
     verified_sessions = 0
+    hours_hist: Dict[int, int] = {}
     if merchant_lat and merchant_lng:
-        # Get all verified sessions in time window
-        sessions_result = db.execute(text("""
-            SELECT id, lat, lng, started_at FROM sessions
-            WHERE status = 'verified'
-            AND verified_at >= :from_time
-            AND verified_at <= :to_time
-            AND lat IS NOT NULL AND lng IS NOT NULL
-        """), {
-            "from_time": from_time,
-            "to_time": to_time
-        })
-        
-        from app.services.geo import haversine_m
-        
-        for row in sessions_result:
-            session_lat = float(row[1])
-            session_lng = float(row[2])
-            distance = haversine_m(
-                merchant_lat, merchant_lng,
-                session_lat, session_lng
-            )
-            if distance <= 600:  # 600m radius
-                verified_sessions += 1
-    
-    # 2. Purchase rewards tied to this merchant
-    purchase_rewards_count = db.execute(text("""
-        SELECT COUNT(*) FROM payments
-        WHERE merchant_id = :merchant_id
-        AND status = 'confirmed'
-        AND claimed = 1
-        AND created_at >= :from_time
-        AND created_at <= :to_time
-    """), {
-        "merchant_id": merchant_id,
-        "from_time": from_time,
-        "to_time": to_time
-    }).scalar()
-    purchase_rewards_count = int(purchase_rewards_count) if purchase_rewards_count else 0
-    
-    # 3. Total rewards paid (sum of purchase rewards for this merchant)
-    total_rewards_result = db.execute(text("""
-        SELECT COALESCE(SUM(amount_cents), 0) FROM payments
+        box = bounding_box(merchant_lat, merchant_lng, NEARBY_RADIUS_M)
+        for session_lat, session_lng, verified_at in _verified_sessions_in_box(db, box, from_time, to_time):
+            if haversine_m(merchant_lat, merchant_lng, float(session_lat), float(session_lng)) > NEARBY_RADIUS_M:
+                continue
+            verified_sessions += 1
+            hour = _verified_at_hour(verified_at)
+            if hour is not None:
+                hours_hist[hour] = hours_hist.get(hour, 0) + 1
+
+    # 2-3. Purchase rewards tied to this merchant: count and total paid
+    purchase_rewards_count, total_rewards_paid = db.execute(text("""
+        SELECT COUNT(*), COALESCE(SUM(amount_cents), 0) FROM payments
         WHERE merchant_id = :merchant_id
         AND status = 'confirmed'
         AND claimed = 1
@@ -108,90 +152,156 @@ def merchant_summary(
         "merchant_id": merchant_id,
         "from_time": from_time,
         "to_time": to_time
-    }).scalar()
-    total_rewards_paid = int(total_rewards_result) if total_rewards_result else 0
-    
-    # 4. Top hours histogram (from sessions near merchant)
-    hours_hist = {}
-    if merchant_lat and merchant_lng:
-        from app.services.geo import haversine_m
-        
-        sessions_result = db.execute(text("""
-            SELECT lat, lng, verified_at FROM sessions
-            WHERE status = 'verified'
-            AND verified_at >= :from_time
-            AND verified_at <= :to_time
-            AND lat IS NOT NULL AND lng IS NOT NULL
+    }).one()
+
+    # 4. Last 10 events (purchases)
+    last_events = [
+        _purchase_event(row) for row in db.execute(text("""
+            SELECT id, amount_cents, created_at, claimed
+            FROM payments
+            WHERE merchant_id = :merchant_id
+            AND created_at >= :from_time
+            AND created_at <= :to_time
+            ORDER BY created_at DESC
+            LIMIT 10
         """), {
+            "merchant_id": merchant_id,
             "from_time": from_time,
             "to_time": to_time
         })
-        
-        for row in sessions_result:
-            session_lat = float(row[0])
-            session_lng = float(row[1])
-            verified_at = row[2]
-            
-            # Only count sessions within 600m
-            distance = haversine_m(
-                merchant_lat, merchant_lng,
-                session_lat, session_lng
-            )
-            
-            if distance <= 600 and verified_at:
-                try:
-                    if isinstance(verified_at, str):
-                        dt = datetime.fromisoformat(verified_at.replace('Z', '+00:00')[:19])
-                    else:
-                        dt = verified_at
-                    hour = dt.hour
-                    hours_hist[hour] = hours_hist.get(hour, 0) + 1
-                except:
-                    pass
-    
-    # 5. Last 10 events (purchases and verify rewards)
-    last_events = []
-    
-    # Purchases
-    purchases_result = db.execute(text("""
-        SELECT id, amount_cents, created_at, claimed
+    ]
+
+    return _summary(
+        merchant_id, from_time, to_time,
+        verified_sessions=verified_sessions,
+        purchase_rewards=int(purchase_rewards_count or 0),
+        total_rewards_paid=int(total_rewards_paid or 0),
+        top_hours=hours_hist,
+        last_events=last_events,
+    )
+
+
+def merchant_summaries(
+    db: Session,
+    merchant_ids: Optional[List[Any]] = None,
+    from_time: Optional[datetime] = None,
+    to_time: Optional[datetime] = None
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    ``merchant_summary`` for many merchants (default: all) in one pass.
+
+    Merchants are clustered into CLUSTER_CELL_DEG cells. For each cluster the
+    verified sessions inside its merchants' bounding box are read once and
+    credited, through a GridIndex, to every merchant of the cluster within
+    NEARBY_RADIUS_M. Payment totals and the last 10 purchases per merchant
+    come from one grouped / windowed query each, restricted to the requested
+    merchants.
+
+    Returns:
+        {merchant_id: summary}, each summary shaped like ``merchant_summary``
+        (including the "Merchant not found" entry for unknown requested ids).
+    """
+    from_time, to_time = _default_window(from_time, to_time)
+
+    merchant_query = "SELECT id, lat, lng FROM merchants"
+    params: Dict[str, Any] = {}
+    if merchant_ids is not None:
+        if not merchant_ids:
+            return {}
+        merchant_query += " WHERE id IN :merchant_ids"
+        params["merchant_ids"] = list(merchant_ids)
+    stmt = text(merchant_query)
+    if merchant_ids is not None:
+        stmt = stmt.bindparams(bindparam("merchant_ids", expanding=True))
+    merchants = db.execute(stmt, params).all()
+
+    # Original ids are kept as keys; lookups go through str() since the
+    # column type and the caller's id type may differ
+    keys = {str(merchant_id): merchant_id for merchant_id in (merchant_ids or [])}
+    keys.update({str(row.id): keys.get(str(row.id), row.id) for row in merchants})
+    counts: Dict[str, int] = {str(row.id): 0 for row in merchants}
+    hours: Dict[str, Dict[int, int]] = {str(row.id): {} for row in merchants}
+    purchases: Dict[str, Tuple[int, int]] = {}
+    events: Dict[str, List[Dict[str, Any]]] = {}
+
+    # 1. Verified sessions near each merchant, one bounding box per cluster
+    clusters: Dict[Tuple[int, int], List[Any]] = {}
+    for row in merchants:
+        if row.lat and row.lng:
+            cell = (floor(float(row.lat) / CLUSTER_CELL_DEG), floor(float(row.lng) / CLUSTER_CELL_DEG))
+            clusters.setdefault(cell, []).append(row)
+    for cluster in clusters.values():
+        grid = GridIndex()
+        boxes = []
+        for row in cluster:
+            grid.add(str(row.id), float(row.lat), float(row.lng))
+            boxes.append(bounding_box(float(row.lat), float(row.lng), NEARBY_RADIUS_M))
+        box = (
+            min(b[0] for b in boxes), max(b[1] for b in boxes),
+            min(b[2] for b in boxes), max(b[3] for b in boxes),
+        )
+        for session_lat, session_lng, verified_at in _verified_sessions_in_box(db, box, from_time, to_time):
+            hour = _verified_at_hour(verified_at)
+            for merchant_key, _ in grid.within(float(session_lat), float(session_lng), NEARBY_RADIUS_M):
+                counts[merchant_key] += 1
+                if hour is not None:
+                    hours[merchant_key][hour] = hours[merchant_key].get(hour, 0) + 1
+
+    payment_params: Dict[str, Any] = {"from_time": from_time, "to_time": to_time}
+    merchant_filter = ""
+    if merchant_ids is not None:
+        merchant_filter = "AND merchant_id IN :merchant_ids"
+        payment_params["merchant_ids"] = [row.id for row in merchants]
+
+    def _payments_query(sql: str):
+        stmt = text(sql.replace("{merchant_filter}", merchant_filter))
+        if merchant_filter:
+            stmt = stmt.bindparams(bindparam("merchant_ids", expanding=True))
+        return db.execute(stmt, payment_params)
+
+    # 2-3. Purchase rewards per merchant
+    for row in _payments_query("""
+        SELECT merchant_id, COUNT(*) AS purchase_rewards, COALESCE(SUM(amount_cents), 0) AS total_paid
         FROM payments
-        WHERE merchant_id = :merchant_id
+        WHERE status = 'confirmed'
+        AND claimed = 1
         AND created_at >= :from_time
         AND created_at <= :to_time
-        ORDER BY created_at DESC
-        LIMIT 10
-    """), {
-        "merchant_id": merchant_id,
-        "from_time": from_time,
-        "to_time": to_time
-    })
-    
-    for row in purchases_result:
-        last_events.append({
-            "type": "purchase",
-            "id": str(row[0]),
-            "amount_cents": row[1],
-            "created_at": str(row[2]) if row[2] else None,
-            "claimed": bool(row[3]) if row[3] else False
-        })
-    
-    # Sort by created_at DESC and limit to 10
-    last_events.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-    last_events = last_events[:10]
-    
-    return {
-        "merchant_id": merchant_id,
-        "verified_sessions": verified_sessions,
-        "purchase_rewards": purchase_rewards_count,
-        "total_rewards_paid": total_rewards_paid,
-        "top_hours": hours_hist,
-        "last_events": last_events,
-        "period": {
-            "from": from_time.isoformat(),
-            "to": to_time.isoformat()
-        }
-    }
+        {merchant_filter}
+        GROUP BY merchant_id
+    """):
+        purchases[str(row.merchant_id)] = (int(row.purchase_rewards or 0), int(row.total_paid or 0))
+
+    # 4. Last 10 purchases per merchant
+    for row in _payments_query("""
+        SELECT merchant_id, id, amount_cents, created_at, claimed FROM (
+            SELECT merchant_id, id, amount_cents, created_at, claimed,
+                   ROW_NUMBER() OVER (PARTITION BY merchant_id ORDER BY created_at DESC) AS rn
+            FROM payments
+            WHERE created_at >= :from_time
+            AND created_at <= :to_time
+            {merchant_filter}
+        ) AS ranked
+        WHERE rn <= 10
+        ORDER BY merchant_id, rn
+    """):
+        events.setdefault(str(row.merchant_id), []).append(_purchase_event(row))
+
+    summaries: Dict[Any, Dict[str, Any]] = {}
+    for merchant_key, merchant_id in keys.items():
+        if merchant_key not in counts:
+            summaries[merchant_id] = {"merchant_id": merchant_id, "error": "Merchant not found"}
+            continue
+        purchase_rewards, total_paid = purchases.get(merchant_key, (0, 0))
+        summaries[merchant_id] = _summary(
+            merchant_id, from_time, to_time,
+            verified_sessions=counts[merchant_key],
+            purchase_rewards=purchase_rewards,
+            total_rewards_paid=total_paid,
+            top_hours=hours[merchant_key],
+            last_events=events.get(merchant_key, []),
+        )
+    return summaries
 
 
 def merchant_offers(db: Session, merchant_id: int) -> Dict[str, List[Dict[str, Any]]]:
@@ -0,0 +1,221 @@
+"""
+Write-behind writer for MerchantCache rows.
+
+Intent capture submits the merchants it served; the writer coalesces them by
+(place_id, geo cell) and flushes them to ``merchant_cache`` in batches from a
+background task, so the request path never opens a write transaction.
+
+Writes are skipped when the content hash matches what was last written and
+the cached row is still more than half-way from expiry; a row whose content
+is unchanged only has its ``expires_at`` extended.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import SessionLocal
+from app.models import MerchantCache
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, float, float]  # (place_id, geo_cell_lat, geo_cell_lng)
+
+
+def content_hash(merchant: Dict[str, Any]) -> str:
+    """Stable hash of a merchant payload (sorted-key JSON)."""
+    return hashlib.sha256(json.dumps(merchant, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class MerchantCacheWriter:
+    """Coalescing, batched write-behind for merchant_cache"""
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 5.0, max_tracked: int = 50000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_tracked = max_tracked
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[CacheKey, Tuple[Dict[str, Any], str]] = {}
+        # Last written (hash, expires_at) per key, LRU-bounded
+        self._written: "OrderedDict[CacheKey, Tuple[str, datetime]]" = OrderedDict()
+        self.stats = {"submitted": 0, "skipped": 0, "written": 0, "refreshed": 0, "flushes": 0}
+
+    async def start(self):
+        """Start the background flush loop"""
+        if self.running:
+            logger.warning("Merchant cache writer is already running")
+            return
+        self.running = True
+        self.task = asyncio.create_task(self._run())
+        logger.info("Merchant cache writer started")
+
+    async def stop(self):
+        """Stop the loop and flush whatever is still pending"""
+        if not self.running:
+            return
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.to_thread(self.flush)
+        logger.info("Merchant cache writer stopped")
+
+    async def _run(self):
+        while self.running:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                if self._pending:
+                    await asyncio.to_thread(self.flush)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in merchant cache writer: {e}")
+
+    def submit(
+        self,
+        merchants: Iterable[Dict[str, Any]],
+        geo_cell_lat: float,
+        geo_cell_lng: float,
+        now: Optional[datetime] = None,
+    ) -> int:
+        """
+        Queue merchants for caching; returns how many were queued.
+
+        Unchanged payloads whose cached row is still fresh are dropped here,
+        without touching the database.
+        """
+        now = now or datetime.utcnow()
+        half_ttl = timedelta(seconds=settings.MERCHANT_CACHE_TTL_SECONDS / 2)
+        queued = 0
+        with self._lock:
+            for merchant in merchants:
+                place_id = merchant.get("place_id")
+                if not place_id:
+                    continue
+                self.stats["submitted"] += 1
+                key = (place_id, geo_cell_lat, geo_cell_lng)
+                digest = content_hash(merchant)
+                written = self._written.get(key)
+                if written and written[0] == digest and written[1] - now > half_ttl:
+                    self.stats["skipped"] += 1
+                    continue
+                self._pending[key] = (merchant, digest)
+                queued += 1
+        return queued
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _take_batch(self) -> Dict[CacheKey, Tuple[Dict[str, Any], str]]:
+        with self._lock:
+            keys = list(self._pending)[: self.batch_size]
+            return {key: self._pending.pop(key) for key in keys}
+
+    def _requeue(self, batch: Dict[CacheKey, Tuple[Dict[str, Any], str]]) -> None:
+        with self._lock:
+            for key, item in batch.items():
+                # Newer submissions win over the failed batch
+                self._pending.setdefault(key, item)
+
+    def _remember(self, key: CacheKey, digest: str, expires_at: datetime) -> None:
+        self._written[key] = (digest, expires_at)
+        self._written.move_to_end(key)
+        while len(self._written) > self.max_tracked:
+            self._written.popitem(last=False)
+
+    def _write_batch(self, db: Session, batch: Dict[CacheKey, Tuple[Dict[str, Any], str]]) -> None:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=settings.MERCHANT_CACHE_TTL_SECONDS)
+
+        # One query for every existing row in the batch
+        existing_rows = (
+            db.query(MerchantCache)
+            .filter(or_(*[
+                and_(
+                    MerchantCache.place_id == place_id,
+                    MerchantCache.geo_cell_lat == cell_lat,
+                    MerchantCache.geo_cell_lng == cell_lng,
+                )
+                for place_id, cell_lat, cell_lng in batch
+            ]))
+            .all()
+        )
+        existing = {(row.place_id, row.geo_cell_lat, row.geo_cell_lng): row for row in existing_rows}
+
+        new_entries: List[MerchantCache] = []
+        for key, (merchant, digest) in batch.items():
+            cached = existing.get(key)
+            if cached is None:
+                new_entries.append(MerchantCache(
+                    place_id=key[0],
+                    geo_cell_lat=key[1],
+                    geo_cell_lng=key[2],
+                    merchant_data=merchant,
+                    photo_url=merchant.get("photo_url"),
+                    content_hash=digest,
+                    expires_at=expires_at,
+                ))
+                self.stats["written"] += 1
+            elif cached.content_hash == digest:
+                # Unchanged content: only extend the TTL
+                cached.expires_at = expires_at
+                self.stats["refreshed"] += 1
+            else:
+                cached.merchant_data = merchant
+                cached.photo_url = merchant.get("photo_url")
+                cached.content_hash = digest
+                cached.expires_at = expires_at
+                cached.updated_at = now
+                self.stats["written"] += 1
+
+        db.add_all(new_entries)
+        db.commit()
+        with self._lock:
+            for key, (_, digest) in batch.items():
+                self._remember(key, digest, expires_at)
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """
+        Write all pending entries, one transaction per batch.
+
+        Uses ``db`` if given (caller's session is committed), otherwise opens
+        its own session. Returns the number of entries flushed.
+        """
+        owns_session = db is None
+        if owns_session:
+            db = SessionLocal()
+        flushed = 0
+        try:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return flushed
+                try:
+                    self._write_batch(db, batch)
+                except Exception as e:
+                    db.rollback()
+                    self._requeue(batch)
+                    logger.error(f"Error flushing merchant cache batch: {e}")
+                    return flushed
+                self.stats["flushes"] += 1
+                flushed += len(batch)
+        finally:
+            if owns_session:
+                db.close()
+
+
+# Global writer instance
+merchant_cache_writer = MerchantCacheWriter()
@@ -7,9 +7,10 @@ import logging
 import uuid
 from datetime import datetime
 from typing import Optional, Dict
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.models.merchant_subscription import MerchantSubscription
+from app.models.merchant_subscription import MerchantSubscription, SubscriptionInvoicePayment
 from app.models import MerchantAccount
 from app.core.config import settings
 
@@ -175,6 +176,44 @@ def handle_subscription_deleted(db: Session, stripe_sub: Dict) -> None:
     logger.info(f"Subscription {sub.id} canceled")
 
 
+def handle_invoice_paid(db: Session, invoice: Dict) -> bool:
+    """
+    Handle invoice.paid / invoice.payment_succeeded webhooks.
+
+    Records the invoice in the local subscription revenue ledger (idempotent
+    by invoice id - Stripe sends both events and retries). Returns False if
+    the invoice was already recorded or is not a subscription invoice.
+    """
+    if not invoice.get("subscription") or not invoice.get("id"):
+        return False
+    exists = (
+        db.query(SubscriptionInvoicePayment.id)
+        .filter(SubscriptionInvoicePayment.stripe_invoice_id == invoice["id"])
+        .first()
+    )
+    if exists:
+        return False
+
+    paid_ts = (invoice.get("status_transitions") or {}).get("paid_at") or invoice.get("created")
+    db.add(SubscriptionInvoicePayment(
+        id=str(uuid.uuid4()),
+        stripe_invoice_id=invoice["id"],
+        stripe_customer_id=invoice.get("customer"),
+        stripe_subscription_id=invoice.get("subscription"),
+        amount_paid_cents=invoice.get("amount_paid") or 0,
+        currency=invoice.get("currency"),
+        paid_at=datetime.utcfromtimestamp(paid_ts) if paid_ts else datetime.utcnow(),
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Concurrent delivery of the same invoice
+        db.rollback()
+        return False
+    logger.info(f"Recorded subscription invoice {invoice['id']} amount={invoice.get('amount_paid')}")
+    return True
+
+
 def is_pro(db: Session, merchant_account_id: str, place_id: Optional[str] = None) -> bool:
     """Check if merchant has an active 'pro' subscription."""
     query = db.query(MerchantSubscription).filter(
@@ -1,131 +1,404 @@
-from typing import List, Dict, Any, Optional
+"""
+Hub and perk ranking.
+
+Candidates are scored in batches: each list of hubs or perks is turned into
+feature columns (distance, value, availability, forecast occupancy,
+preference match, time of day, perk value) once, and every score comes from
+one pass over those columns with the weights of a RankerModel. The model is
+loaded once per process (defaults, or the JSON file at ML_RANKER_WEIGHTS_PATH)
+and can be swapped with set_model().
+
+score_hub/score_perk score a single candidate through the same batch path.
+
+route_hub is the distance-first choice behind /recommend: the nearest hub,
+weighted by free ports and by preference matches among the places around it.
+"""
+import heapq
+import json
+import logging
 import math
+import os
+from dataclasses import dataclass, fields, replace
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+from app.services.occupancy_forecast import occupancy_forecasts
+from app.services.places_google import search_nearby
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371
+
+# Perk keywords that match a user preference (db_user.DEFAULT_PREFS keys)
+PREF_KEYWORDS = {
+    "pref_coffee": ("coffee", "espresso", "cafe", "tea"),
+    "pref_food": ("lunch", "food", "pastry", "meal", "pizza", "taco", "burger"),
+    "pref_dog": ("dog", "pet"),
+    "pref_kid": ("kid", "family", "play"),
+    "pref_shopping": ("shop", "store", "retail", "parking"),
+    "pref_exercise": ("gym", "yoga", "fitness", "run"),
+}
+
+
+@dataclass(frozen=True)
+class RankerModel:
+    """
+    Weights for hub and perk scoring. Defaults are the original hand-tuned
+    values, plus a busy-ports penalty.
+    """
+
+    # Hub value: reward, merchant and social components (per-hub values override the defaults)
+    hub_expected_reward: float = 100.0
+    hub_merchant_value: float = 50.0
+    hub_social_presence: float = 25.0
+    reward_weight: float = 1.0
+    merchant_weight: float = 1.0
+    social_weight: float = 1.0
+    # Value is divided by max(1, distance_km * distance_cost_per_km)
+    distance_cost_per_km: float = 0.1
+    # Multiplicative penalties: share of the score lost when fully busy
+    busy_ports_penalty: float = 0.2
+    occupancy_penalty: float = 0.5
+
+    perk_base: float = 50.0
+    perk_time_bonus: float = 30.0
+    perk_value_per_cent: float = 0.1
+    perk_value_cap: float = 50.0
+    perk_pref_bonus: float = 20.0
+    coffee_hours: Tuple[int, int] = (6, 10)
+    lunch_hours: Tuple[int, int] = (11, 14)
+
+    # route_hub: cost in meters grows by this share when fully busy (or port counts are unknown)
+    route_busy_penalty: float = 0.2
+    # ... and shrinks by this share when a nearby place matches a user preference
+    route_pref_discount: float = 0.05
+    route_places_radius_m: int = 450
+
+    @classmethod
+    def from_file(cls, path: str) -> "RankerModel":
+        """Load weights from a JSON object of field overrides."""
+        with open(path) as f:
+            overrides = json.load(f)
+        known = {field.name for field in fields(cls)}
+        unknown = set(overrides) - known
+        if unknown:
+            raise ValueError(f"Unknown ranker weights: {sorted(unknown)}")
+        for key in ("coffee_hours", "lunch_hours"):
+            if key in overrides:
+                overrides[key] = tuple(overrides[key])
+        return replace(cls(), **overrides)
+
+
+_model: Optional[RankerModel] = None
+
+
+def get_model() -> RankerModel:
+    """The process-wide ranker model, loaded on first use."""
+    global _model
+    if _model is None:
+        path = os.getenv("ML_RANKER_WEIGHTS_PATH")
+        if path:
+            try:
+                _model = RankerModel.from_file(path)
+                logger.info(f"Loaded ranker weights from {path}")
+            except Exception as e:
+                logger.error(f"Failed to load ranker weights from {path}, using defaults: {e}")
+        if _model is None:
+            _model = RankerModel()
+    return _model
+
+
+def set_model(model: Optional[RankerModel]) -> None:
+    """Replace the process-wide model (None reloads it on next use)."""
+    global _model
+    _model = model
+
+
+def _distances_km(lat: float, lng: float, lats: Sequence[float], lngs: Sequence[float]) -> List[float]:
+    """Haversine distance from one point to every candidate, in one pass."""
+    lat_r = math.radians(lat)
+    cos_lat = math.cos(lat_r)
+    radians, sin, cos, asin, sqrt = math.radians, math.sin, math.cos, math.asin, math.sqrt
+    out = []
+    for c_lat, c_lng in zip(lats, lngs):
+        c_lat_r = radians(c_lat)
+        half_dlat = (c_lat_r - lat_r) / 2
+        half_dlng = radians(c_lng - lng) / 2
+        a = sin(half_dlat) ** 2 + cos_lat * cos(c_lat_r) * sin(half_dlng) ** 2
+        out.append(2 * EARTH_RADIUS_KM * asin(sqrt(min(a, 1.0))))
+    return out
+
+
+def _active_prefs(prefs: Optional[Dict[str, Any]]) -> List[str]:
+    return [key for key, on in (prefs or {}).items() if on]
+
+
+def _busy_share(hub: Dict[str, Any], unknown: float) -> float:
+    """Share of a hub's ports in use (0-1), or ``unknown`` without port counts."""
+    total = hub.get('total_ports') or 0
+    if total <= 0:
+        return unknown
+    return min(max(1 - (hub.get('free_ports') or 0) / total, 0.0), 1.0)
+
+
+def hub_features(hubs: Sequence[Dict[str, Any]], context: Dict[str, Any], model: RankerModel) -> Dict[str, List[float]]:
+    """Feature columns for a batch of hubs."""
+    distance_km = _distances_km(
+        context.get('user_lat', 0), context.get('user_lng', 0),
+        [hub.get('lat', 0) for hub in hubs], [hub.get('lng', 0) for hub in hubs],
+    )
+    value = [
+        model.reward_weight * hub.get('expected_reward', model.hub_expected_reward)
+        + model.merchant_weight * hub.get('merchant_value', model.hub_merchant_value)
+        + model.social_weight * hub.get('social_presence', model.hub_social_presence)
+        for hub in hubs
+    ]
+    busy = [_busy_share(hub, 0.0) for hub in hubs]
+    ts = context.get('ts')
+    occupancy = [predicted_hub_occupancy(hub, ts) or 0.0 for hub in hubs]
+
+    return {
+        'distance_km': distance_km,
+        'value': value,
+        'busy': busy,
+        'occupancy': occupancy,
+    }
+
+
+def score_hubs(
+    hubs: Sequence[Dict[str, Any]],
+    user_id: str,
+    context: Dict[str, Any],
+    model: Optional[RankerModel] = None,
+) -> Tuple[List[float], Dict[str, List[float]]]:
+    """
+    Score a batch of hubs (higher is better) on expected reward, merchant
+    value, social presence, distance, availability and forecast occupancy.
+    Returns the scores and the feature columns behind them.
+    """
+    model = model or get_model()
+    features = hub_features(hubs, context, model)
+    distance_cost_per_km = model.distance_cost_per_km
+    busy_penalty, occupancy_penalty = model.busy_ports_penalty, model.occupancy_penalty
+    scores = [
+        value / max(1, distance_km * distance_cost_per_km)
+        * (1 - busy_penalty * busy)
+        * (1 - occupancy_penalty * occupancy)
+        for value, distance_km, busy, occupancy in zip(
+            features['value'], features['distance_km'], features['busy'], features['occupancy'],
+        )
+    ]
+    return scores, features
+
+
+def score_perks(
+    perks: Sequence[Dict[str, Any]],
+    user_id: str,
+    context: Dict[str, Any],
+    model: Optional[RankerModel] = None,
+) -> List[float]:
+    """Score a batch of perks (higher is better) on value, time of day and user preferences."""
+    model = model or get_model()
+    hour = context.get('hour', 12)
+    coffee_time = model.coffee_hours[0] <= hour <= model.coffee_hours[1]
+    lunch_time = model.lunch_hours[0] <= hour <= model.lunch_hours[1]
+    keywords = [PREF_KEYWORDS.get(key, ()) for key in _active_prefs(context.get('prefs'))]
+
+    scores = []
+    for perk in perks:
+        name = perk.get('name', '').lower()
+        score = model.perk_base
+        # Time-based scoring (coffee in morning, etc.)
+        if coffee_time and 'coffee' in name:
+            score += model.perk_time_bonus
+        elif lunch_time and 'lunch' in name:
+            score += model.perk_time_bonus
+        # Value-based scoring
+        value = perk.get('value_cents', 0)
+        if value > 0:
+            score += min(model.perk_value_cap, value * model.perk_value_per_cent)
+        if keywords:
+            text = name + ' ' + perk.get('description', '').lower()
+            if any(word in text for words in keywords for word in words):
+                score += model.perk_pref_bonus
+        scores.append(score)
+    return scores
+
 
 def score_hub(hub: Dict[str, Any], user_id: str, context: Dict[str, Any]) -> float:
     """
     Score a hub based on expected reward, merchant value, social presence, and distance.
-    
+
     Args:
         hub: Hub data with lat, lng, name, etc.
         user_id: Current user ID
         context: Context like user_lat, user_lng, preferences
-    
+
     Returns:
         Score (higher is better)
     """
-    # Base score components
-    expected_reward = 100  # Base reward expectation
-    merchant_value = 50   # Merchant partnership value
-    social_presence = 25  # Social activity around hub
-    
-    # Distance penalty (closer is better)
-    user_lat = context.get('user_lat', 0)
-    user_lng = context.get('user_lng', 0)
-    hub_lat = hub.get('lat', 0)
-    hub_lng = hub.get('lng', 0)
-    
-    distance_km = haversine_distance(user_lat, user_lng, hub_lat, hub_lng)
-    distance_cost = max(1, distance_km * 0.1)  # Penalty per km
-    
-    # Calculate final score
-    score = (expected_reward + merchant_value + social_presence) / distance_cost
-    
-    return score
+    return score_hubs([hub], user_id, context)[0][0]
+
 
 def score_perk(perk: Dict[str, Any], user_id: str, context: Dict[str, Any]) -> float:
     """
     Score a perk based on user preferences and value.
-    
+
     Args:
         perk: Perk data with name, description, value, etc.
         user_id: Current user ID
         context: Context like user preferences, time of day
-    
+
     Returns:
         Score (higher is better)
     """
-    base_score = 50
-    
-    # Time-based scoring (coffee in morning, etc.)
-    hour = context.get('hour', 12)
-    if 'coffee' in perk.get('name', '').lower() and 6 <= hour <= 10:
-        base_score += 30
-    elif 'lunch' in perk.get('name', '').lower() and 11 <= hour <= 14:
-        base_score += 30
-    
-    # Value-based scoring
-    value = perk.get('value_cents', 0)
-    if value > 0:
-        base_score += min(50, value / 10)  # Cap at 50 bonus points
-    
-    return base_score
-
-def rank_hubs_and_perks(user_id: str, lat: float, lng: float, 
-                        hubs: List[Dict[str, Any]], 
+    return score_perks([perk], user_id, context)[0]
+
+
+def predicted_hub_occupancy(hub: Dict[str, Any], ts=None) -> Optional[float]:
+    """Mean forecast occupancy (0-1) of a hub's member chargers, or None if none are forecast."""
+    forecasts = [
+        occupancy_forecasts.predicted_occupancy(charger_id, ts)
+        for charger_id in hub.get('members') or [hub.get('id')]
+        if charger_id
+    ]
+    forecasts = [f for f in forecasts if f is not None]
+    return sum(forecasts) / len(forecasts) if forecasts else None
+
+
+def _nearby_pref_reason(hub: Dict[str, Any], prefs: Dict[str, Any], radius_m: int) -> Optional[str]:
+    """Badge of the first place near the hub that matches a user preference, if any."""
+    for place in search_nearby(hub['lat'], hub['lng'], radius_m)[:8]:
+        hits = place.get('pref_hits') or {}
+        if any(on and hits.get(key) for key, on in prefs.items()):
+            return place.get('nerava_badge', 'Nearby')
+    return None
+
+
+def route_hub(
+    lat: float,
+    lng: float,
+    hubs: Sequence[Dict[str, Any]],
+    prefs: Optional[Dict[str, Any]] = None,
+    model: Optional[RankerModel] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    The hub to drive to: lowest cost = distance (m) x availability penalty x
+    preference discount. Nearby places are only looked up for hubs the
+    discount could still make the cheapest.
+
+    Returns {'hub', 'score' (the cost, lower is better), 'distance_m',
+    'reason_tags'}, or None without hubs.
+    """
+    if not hubs:
+        return None
+    model = model or get_model()
+    distance_km = _distances_km(lat, lng, [hub['lat'] for hub in hubs], [hub['lng'] for hub in hubs])
+    costs = [
+        km * 1000 * (1 + model.route_busy_penalty * _busy_share(hub, 1.0))
+        for km, hub in zip(distance_km, hubs)
+    ]
+
+    pref_reasons: Dict[int, str] = {}
+    if _active_prefs(prefs):
+        floor = min(costs)
+        discount = 1 - model.route_pref_discount
+        for i in sorted(range(len(hubs)), key=costs.__getitem__):
+            if costs[i] * discount > floor:
+                break  # Cannot beat the cheapest hub even with the discount
+            reason = _nearby_pref_reason(hubs[i], prefs, model.route_places_radius_m)
+            if reason is not None:
+                pref_reasons[i] = reason
+                costs[i] *= discount
+
+    best = min(range(len(hubs)), key=costs.__getitem__)
+    hub = hubs[best]
+    distance_m = distance_km[best] * 1000
+    reason_tags = ["closest" if distance_m < 300 else "nearby", f'{hub.get("free_ports", 0)}-ports-free']
+    if best in pref_reasons:
+        reason_tags.append(pref_reasons[best].lower().replace(" ", "-"))
+    return {
+        'hub': hub,
+        'score': round(costs[best], 2),
+        'distance_m': int(distance_m),
+        'reason_tags': reason_tags[:3],
+    }
+
+
+def rank_candidates(
+    user_id: str,
+    lat: float,
+    lng: float,
+    hubs: Sequence[Dict[str, Any]],
+    perks: Sequence[Dict[str, Any]],
+    prefs: Optional[Dict[str, Any]] = None,
+    hour: int = 12,
+    hub_limit: int = 5,
+    perk_limit: int = 3,
+    model: Optional[RankerModel] = None,
+) -> Dict[str, Any]:
+    """
+    Score a set of hub and perk candidates in one batch each and return the
+    top hub_limit hubs and perk_limit perks, best first.
+    """
+    model = model or get_model()
+    context = {
+        'user_lat': lat,
+        'user_lng': lng,
+        'hour': hour,
+        'prefs': prefs,
+    }
+
+    hub_scores, features = score_hubs(hubs, user_id, context, model)
+    distance_km = features['distance_km']
+    top_hubs = heapq.nlargest(hub_limit, range(len(hubs)), key=hub_scores.__getitem__)
+    ranked_hubs = [
+        {
+            'hub': hubs[i],
+            'score': hub_scores[i],
+            'distance_km': distance_km[i],
+            'reason': "High value hub with good rewards and proximity",
+        }
+        for i in top_hubs
+    ]
+
+    perk_scores = score_perks(perks, user_id, context, model)
+    top_perks = heapq.nlargest(perk_limit, range(len(perks)), key=perk_scores.__getitem__)
+    ranked_perks = [
+        {
+            'perk': perks[i],
+            'score': perk_scores[i],
+            'reason': f"Great value perk with {perks[i].get('name', 'unknown')}",
+        }
+        for i in top_perks
+    ]
+
+    context.pop('prefs')
+    return {
+        'ranked_hubs': ranked_hubs,
+        'ranked_perks': ranked_perks,
+        'user_context': context,
+    }
+
+
+def rank_hubs_and_perks(user_id: str, lat: float, lng: float,
+                        hubs: List[Dict[str, Any]],
                         perks: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Rank hubs and perks for a user.
-    
+
     Args:
         user_id: Current user ID
         lat: User latitude
         lng: User longitude
         hubs: List of available hubs
         perks: List of available perks
-        
+
     Returns:
         Dict with ranked hubs and perks with reasons
     """
-    context = {
-        'user_lat': lat,
-        'user_lng': lng,
-        'hour': 12  # Could be dynamic based on current time
-    }
-    
-    # Score and rank hubs
-    hub_scores = []
-    for hub in hubs:
-        score = score_hub(hub, user_id, context)
-        hub_scores.append({
-            'hub': hub,
-            'score': score,
-            'reason': f"High value hub with good rewards and proximity"
-        })
-    
-    # Sort by score (highest first)
-    hub_scores.sort(key=lambda x: x['score'], reverse=True)
-    
-    # Score and rank perks
-    perk_scores = []
-    for perk in perks:
-        score = score_perk(perk, user_id, context)
-        perk_scores.append({
-            'perk': perk,
-            'score': score,
-            'reason': f"Great value perk with {perk.get('name', 'unknown')}"
-        })
-    
-    # Sort by score (highest first)
-    perk_scores.sort(key=lambda x: x['score'], reverse=True)
-    
-    return {
-        'ranked_hubs': hub_scores[:5],  # Top 5
-        'ranked_perks': perk_scores[:3],  # Top 3
-        'user_context': context
-    }
+    return rank_candidates(user_id, lat, lng, hubs, perks)
+
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance between two points in kilometers."""
-    R = 6371  # Earth's radius in km
-    
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    
-    a = (math.sin(dlat/2) * math.sin(dlat/2) + 
-         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * 
-         math.sin(dlon/2) * math.sin(dlon/2))
-    
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    distance = R * c
-    
-    return distance
+    return _distances_km(lat1, lon1, [lat2], [lon2])[0]
@@ -2,9 +2,9 @@
 Nova Service - Nova balance management and transactions
 for Domain Charge Party MVP
 """
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, insert, text
 from sqlalchemy.exc import OperationalError
 import uuid
 from datetime import datetime
@@ -19,7 +19,8 @@ from app.models_domain import (
     DomainChargingSession,
     StripePayment
 )
-from app.services.wallet_activity import mark_wallet_activity
+from app.services.wallet_activity import mark_wallet_activity, mark_wallet_activity_many
+from app.services.wallet_timeline import append_timeline_for_transactions
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +63,82 @@ def compute_payload_hash(payload: dict) -> str:
     return hash_obj.hexdigest()[:16]
 
 
+# Rows per statement for set-wise wallet writes (keeps bind params well under driver limits)
+_WALLET_BATCH_SIZE = 500
+
+
+def _ensure_wallets(db: Session, driver_ids: List[int]) -> None:
+    """Create missing driver wallets with one INSERT ... ON CONFLICT DO NOTHING."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    for start in range(0, len(driver_ids), _WALLET_BATCH_SIZE):
+        chunk = driver_ids[start:start + _WALLET_BATCH_SIZE]
+        if dialect_insert is None:
+            found = {
+                row[0] for row in
+                db.query(DriverWallet.driver_id).filter(DriverWallet.driver_id.in_(chunk)).all()
+            }
+            chunk = [driver_id for driver_id in chunk if driver_id not in found]
+            if chunk:
+                db.execute(insert(DriverWallet.__table__), [
+                    {"driver_id": driver_id, "nova_balance": 0, "energy_reputation_score": 0}
+                    for driver_id in chunk
+                ])
+            continue
+        db.execute(
+            dialect_insert(DriverWallet.__table__).on_conflict_do_nothing(index_elements=["driver_id"]),
+            [
+                {"driver_id": driver_id, "nova_balance": 0, "energy_reputation_score": 0}
+                for driver_id in chunk
+            ],
+        )
+
+
+def _apply_wallet_deltas(db: Session, deltas: Dict[int, List[int]]) -> Dict[int, int]:
+    """
+    Apply per-driver (nova, reputation) deltas with UPDATE ... FROM (VALUES ...).
+
+    Row locks are taken by the UPDATE itself, so concurrent grants serialize on
+    the wallet rows. Returns driver_id -> new nova_balance.
+    """
+    now = datetime.utcnow()
+    balances: Dict[int, int] = {}
+    driver_ids = list(deltas)
+    for start in range(0, len(driver_ids), _WALLET_BATCH_SIZE):
+        chunk = driver_ids[start:start + _WALLET_BATCH_SIZE]
+        params: Dict[str, Any] = {"now": now}
+        values = []
+        for i, driver_id in enumerate(chunk):
+            params[f"d{i}"] = driver_id
+            params[f"a{i}"] = deltas[driver_id][0]
+            params[f"r{i}"] = deltas[driver_id][1]
+            values.append(f"(:d{i}, :a{i}, :r{i})")
+        result = db.execute(text(f"""
+            WITH v(driver_id, amount, rep) AS (VALUES {", ".join(values)})
+            UPDATE driver_wallets
+            SET nova_balance = driver_wallets.nova_balance + v.amount,
+                energy_reputation_score = COALESCE(driver_wallets.energy_reputation_score, 0) + v.rep,
+                updated_at = :now
+            FROM v
+            WHERE driver_wallets.driver_id = v.driver_id
+            RETURNING driver_wallets.driver_id, driver_wallets.nova_balance
+        """), params)
+        for driver_id, balance in result:
+            balances[driver_id] = balance
+
+    # Wallets already in the identity map are now stale
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, DriverWallet) and obj.driver_id in deltas:
+            db.expire(obj)
+    return balances
+
+
 class NovaService:
     """Service for Nova balance and transaction management"""
     
@@ -212,6 +289,189 @@ class NovaService:
         
         return transaction
     
+    @staticmethod
+    def grant_many(
+        db: Session,
+        grants: List[Dict[str, Any]],
+        *,
+        auto_commit: bool = True,
+    ) -> List[NovaTransaction]:
+        """
+        Grant Nova to many drivers in a single transaction.
+
+        Each grant is a dict of grant_to_driver keyword arguments: ``driver_id``
+        and ``amount``, plus optional ``type``, ``session_id``, ``event_id``,
+        ``metadata`` and ``idempotency_key``. The result matches calling
+        grant_to_driver in a loop, but the work is done set-wise:
+
+        - one query resolves every idempotency key (conflicts raise 409)
+        - one INSERT ... ON CONFLICT DO NOTHING creates missing wallets
+        - one UPDATE ... FROM (VALUES ...) applies per-driver balance deltas
+        - one bulk INSERT writes the NovaTransaction rows
+        - one multi-row INSERT stores the nova_earned outbox events
+
+        Args:
+            grants: Grant specs
+            auto_commit: Commit once at the end (otherwise only flush)
+
+        Returns:
+            One NovaTransaction per input grant, in input order. Idempotent
+            replays return the existing transaction.
+        """
+        if not grants:
+            return []
+
+        from fastapi import HTTPException
+
+        items = []
+        for grant in grants:
+            item = {
+                "driver_id": grant["driver_id"],
+                "amount": grant["amount"],
+                "type": grant.get("type", "driver_earn"),
+                "session_id": grant.get("session_id"),
+                "event_id": grant.get("event_id"),
+                "metadata": grant.get("metadata") or {},
+                "idempotency_key": grant.get("idempotency_key"),
+            }
+            item["payload_hash"] = compute_payload_hash({
+                "driver_id": item["driver_id"],
+                "amount": item["amount"],
+                "type": item["type"],
+                "session_id": item["session_id"],
+                "event_id": item["event_id"],
+            })
+            items.append(item)
+
+        # Resolve all idempotency keys with one query
+        keys = {item["idempotency_key"] for item in items if item["idempotency_key"]}
+        existing: Dict[str, NovaTransaction] = {}
+        if keys:
+            for txn in db.query(NovaTransaction).filter(NovaTransaction.idempotency_key.in_(keys)).all():
+                existing[txn.idempotency_key] = txn
+
+        def _conflict():
+            return HTTPException(
+                status_code=409,
+                detail="Idempotency key conflict: same key with different payload"
+            )
+
+        results: List[Optional[NovaTransaction]] = [None] * len(items)
+        first_by_key: Dict[str, Dict[str, Any]] = {}
+        replays = []  # (index, key) repeated within this batch
+        new_items = []  # (index, item)
+        for idx, item in enumerate(items):
+            key = item["idempotency_key"]
+            if key:
+                prior = existing.get(key)
+                if prior is not None:
+                    prior_hash = getattr(prior, "payload_hash", None)
+                    if prior.type != item["type"] or (prior_hash and prior_hash != item["payload_hash"]):
+                        raise _conflict()
+                    results[idx] = prior
+                    continue
+                if key in first_by_key:
+                    if first_by_key[key]["payload_hash"] != item["payload_hash"]:
+                        raise _conflict()
+                    replays.append((idx, key))
+                    continue
+                first_by_key[key] = item
+            new_items.append((idx, item))
+
+        if not new_items:
+            logger.info(f"Idempotent Nova grant_many: all {len(items)} grants already applied")
+            return results
+
+        # Per-driver balance and reputation deltas (1 Nova = 1 rep for driver_earn)
+        deltas: Dict[int, List[int]] = {}
+        for _, item in new_items:
+            delta = deltas.setdefault(item["driver_id"], [0, 0])
+            delta[0] += item["amount"]
+            if item["type"] == "driver_earn":
+                delta[1] += item["amount"]
+
+        _ensure_wallets(db, list(deltas))
+        balances = _apply_wallet_deltas(db, deltas)
+
+        rows = []
+        for _, item in new_items:
+            row = {
+                "id": str(uuid.uuid4()),
+                "type": item["type"],
+                "driver_user_id": item["driver_id"],
+                "amount": item["amount"],
+                "session_id": item["session_id"],
+                "event_id": item["event_id"],
+                "transaction_meta": item["metadata"],
+                "idempotency_key": item["idempotency_key"],
+                "created_at": datetime.utcnow(),
+            }
+            if hasattr(NovaTransaction, "payload_hash"):
+                row["payload_hash"] = item["payload_hash"]
+            rows.append(row)
+
+        try:
+            transactions = db.scalars(
+                insert(NovaTransaction).returning(NovaTransaction, sort_by_parameter_order=True),
+                rows,
+            ).all()
+        except OperationalError as e:
+            if "no such column" in str(e).lower() and "payload_hash" in str(e).lower():
+                db.rollback()
+                raise HTTPException(
+                    status_code=500,
+                    detail="Database schema is out of date. Run: alembic upgrade head (and ensure you're pointing at the same DB file)."
+                )
+            raise
+
+        # Bulk INSERT bypasses the flush hook that maintains the timeline feed
+        append_timeline_for_transactions(db, transactions)
+
+        by_key: Dict[str, NovaTransaction] = {}
+        for (idx, item), transaction in zip(new_items, transactions):
+            results[idx] = transaction
+            if item["idempotency_key"]:
+                by_key[item["idempotency_key"]] = transaction
+        for idx, key in replays:
+            results[idx] = by_key[key]
+
+        # Running balance per grant, walking back from each driver's final balance
+        remaining = dict(balances)
+        new_balances: Dict[int, int] = {}
+        for idx, item in reversed(new_items):
+            driver_id = item["driver_id"]
+            new_balances[idx] = remaining.get(driver_id, 0)
+            remaining[driver_id] = new_balances[idx] - item["amount"]
+
+        mark_wallet_activity_many(db, list(deltas))
+
+        try:
+            from app.events.domain import NovaEarnedEvent
+            from app.events.outbox import store_outbox_events
+            store_outbox_events(db, [
+                NovaEarnedEvent(
+                    user_id=str(item["driver_id"]),
+                    amount_cents=item["amount"],
+                    session_id=item["session_id"] or "",
+                    new_balance_cents=new_balances[idx],
+                    earned_at=datetime.utcnow()
+                )
+                for idx, item in new_items
+            ])
+        except Exception as e:
+            logger.warning(f"Failed to emit nova_earned events: {e}")
+
+        if auto_commit:
+            db.commit()
+        else:
+            db.flush()
+
+        logger.info(
+            f"Granted Nova in bulk: {len(new_items)} transactions for {len(deltas)} drivers "
+            f"({len(items) - len(new_items)} idempotent replays)"
+        )
+        return results
+
     @staticmethod
     def redeem_from_driver(
         db: Session,
@@ -0,0 +1,265 @@
+"""
+Charger occupancy forecasts from availability history.
+
+Training (offline, every FORECAST_TRAIN_INTERVAL_SECONDS) runs over all
+monitored chargers at once:
+
+1. Seasonal baseline: each charger's hour-of-week mean occupancy from the
+   running totals in charger_occupancy_hour_of_week, shrunk toward the
+   charger's overall mean where an hour has few samples.
+2. Exponential smoothing: the last HISTORY_WEEKS of snapshots, oldest first,
+   update a per-charger level (recent deviation from the baseline) and the
+   seasonal profile (additive Holt-Winters without trend), so recent weeks
+   outweigh the all-time baseline.
+3. Forecast: for each of the 168 hours after training,
+   ``seasonal[hour] + level * LEVEL_DAMPING ** hours_ahead``, clamped to 0-1,
+   written to charger_occupancy_forecasts.
+
+Every process keeps the forecast table in memory (refreshed by
+OccupancyForecastWorker), so predicted_occupancy(charger_id, ts) is a dict
+and list lookup with no database work on the request path.
+"""
+import asyncio
+import logging
+import os
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models.charger_availability import (
+    ChargerAvailabilitySnapshot,
+    ChargerOccupancyForecast,
+    ChargerOccupancyHourOfWeek,
+)
+from app.services.charger_occupancy import HOURS_PER_WEEK, hour_of_week
+
+logger = logging.getLogger(__name__)
+
+HISTORY_WEEKS = 8
+PRIOR_SAMPLES = 2  # Pseudo-samples of the charger mean blended into each hour's baseline
+LEVEL_SMOOTHING = 0.3  # alpha
+SEASONAL_SMOOTHING = 0.1  # gamma
+LEVEL_DAMPING = 0.9  # Per hour ahead
+SNAPSHOT_BATCH = 5000
+
+
+def _seasonal_baselines(db: Session) -> Dict[str, tuple]:
+    """charger_id -> (seasonal list[168], samples list[168]) from the hour-of-week totals."""
+    sums: Dict[str, list] = {}
+    counts: Dict[str, list] = {}
+    for charger_id, how, samples, occupancy_sum in db.execute(
+        select(
+            ChargerOccupancyHourOfWeek.charger_id,
+            ChargerOccupancyHourOfWeek.hour_of_week,
+            ChargerOccupancyHourOfWeek.samples,
+            ChargerOccupancyHourOfWeek.occupancy_sum,
+        ).where(ChargerOccupancyHourOfWeek.samples > 0)
+    ):
+        sums.setdefault(charger_id, [0.0] * HOURS_PER_WEEK)[how] = occupancy_sum
+        counts.setdefault(charger_id, [0] * HOURS_PER_WEEK)[how] = samples
+
+    baselines = {}
+    for charger_id, charger_sums in sums.items():
+        charger_counts = counts[charger_id]
+        mean = sum(charger_sums) / sum(charger_counts)
+        seasonal = [
+            (s + PRIOR_SAMPLES * mean) / (n + PRIOR_SAMPLES)
+            for s, n in zip(charger_sums, charger_counts)
+        ]
+        baselines[charger_id] = (seasonal, charger_counts)
+    return baselines
+
+
+def train_occupancy_forecasts(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Retrain every charger's forecast and replace charger_occupancy_forecasts.
+    Returns the number of chargers forecast.
+
+    Note:
+        Does not commit - caller should commit in their transaction pattern.
+    """
+    now = now or datetime.utcnow()
+    baselines = _seasonal_baselines(db)
+    levels = dict.fromkeys(baselines, 0.0)
+
+    snapshots = db.execute(
+        select(
+            ChargerAvailabilitySnapshot.charger_id,
+            ChargerAvailabilitySnapshot.recorded_at,
+            ChargerAvailabilitySnapshot.occupied_ports,
+            ChargerAvailabilitySnapshot.total_ports,
+        )
+        .where(
+            ChargerAvailabilitySnapshot.recorded_at >= now - timedelta(weeks=HISTORY_WEEKS),
+            ChargerAvailabilitySnapshot.recorded_at <= now,
+            ChargerAvailabilitySnapshot.total_ports > 0,
+        )
+        .order_by(ChargerAvailabilitySnapshot.recorded_at)
+        .execution_options(yield_per=SNAPSHOT_BATCH)
+    )
+    for charger_id, recorded_at, occupied, total in snapshots:
+        baseline = baselines.get(charger_id)
+        if baseline is None:
+            continue
+        seasonal = baseline[0]
+        how = hour_of_week(recorded_at)
+        observed = min((occupied or 0) / total, 1.0)
+        level = levels[charger_id]
+        level += LEVEL_SMOOTHING * (observed - level - seasonal[how])
+        seasonal[how] += SEASONAL_SMOOTHING * (observed - level - seasonal[how])
+        levels[charger_id] = level
+
+    start = now.replace(minute=0, second=0, microsecond=0)
+    start_how = hour_of_week(start)
+    damping = [LEVEL_DAMPING ** ahead for ahead in range(HOURS_PER_WEEK)]
+    rows = []
+    for charger_id, (seasonal, samples) in baselines.items():
+        level = levels[charger_id]
+        for ahead in range(HOURS_PER_WEEK):
+            how = (start_how + ahead) % HOURS_PER_WEEK
+            rows.append({
+                "charger_id": charger_id,
+                "hour_of_week": how,
+                "predicted_occupancy": round(min(max(seasonal[how] + level * damping[ahead], 0.0), 1.0), 4),
+                "samples": samples[how],
+                "trained_at": now,
+            })
+
+    db.execute(delete(ChargerOccupancyForecast))
+    if rows:
+        db.execute(insert(ChargerOccupancyForecast), rows)
+    logger.info("Trained occupancy forecasts for %d chargers", len(baselines))
+    return len(baselines)
+
+
+class OccupancyForecastCache:
+    """In-process copy of charger_occupancy_forecasts"""
+
+    def __init__(self):
+        self._forecasts: Dict[str, array] = {}
+        self.trained_at: Optional[datetime] = None
+
+    def load(self, db: Session) -> int:
+        """Replace the cached forecasts with the table's. Returns the number of chargers."""
+        forecasts: Dict[str, array] = {}
+        trained_at = None
+        for charger_id, how, predicted, row_trained_at in db.execute(select(
+            ChargerOccupancyForecast.charger_id,
+            ChargerOccupancyForecast.hour_of_week,
+            ChargerOccupancyForecast.predicted_occupancy,
+            ChargerOccupancyForecast.trained_at,
+        )):
+            forecast = forecasts.get(charger_id)
+            if forecast is None:
+                forecast = forecasts[charger_id] = array("d", [float("nan")]) * HOURS_PER_WEEK
+            forecast[how] = predicted
+            trained_at = max(trained_at or row_trained_at, row_trained_at)
+        self._forecasts = forecasts  # Swapped whole, so readers never see a partial load
+        self.trained_at = trained_at
+        return len(forecasts)
+
+    def predicted_occupancy(self, charger_id: str, ts: Optional[datetime] = None) -> Optional[float]:
+        """Forecast occupancy (0-1) of a charger at ts (naive = UTC), or None if it has no forecast."""
+        forecast = self._forecasts.get(charger_id)
+        if forecast is None:
+            return None
+        if ts is None:
+            ts = datetime.utcnow()
+        elif ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+        predicted = forecast[hour_of_week(ts)]
+        return None if predicted != predicted else predicted  # NaN: hour missing from the table
+
+    def __contains__(self, charger_id: str) -> bool:
+        return charger_id in self._forecasts
+
+
+# Global forecast cache, kept fresh by occupancy_forecast_worker
+occupancy_forecasts = OccupancyForecastCache()
+
+
+def predicted_occupancy(charger_id: str, ts: Optional[datetime] = None) -> Optional[float]:
+    """Forecast occupancy (0-1) of a charger at ts, from memory; None if unknown."""
+    return occupancy_forecasts.predicted_occupancy(charger_id, ts)
+
+
+class OccupancyForecastWorker:
+    """Retrains forecasts when they are stale and reloads them into this process"""
+
+    def __init__(
+        self,
+        refresh_seconds: Optional[int] = None,
+        train_interval_seconds: Optional[int] = None,
+        cache: OccupancyForecastCache = occupancy_forecasts,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.refresh_seconds = refresh_seconds or int(os.getenv("FORECAST_REFRESH_SECONDS", "900"))
+        self.train_interval = timedelta(
+            seconds=train_interval_seconds or int(os.getenv("FORECAST_TRAIN_INTERVAL_SECONDS", "21600"))
+        )
+        self.cache = cache
+        self.session_factory = session_factory
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"trained": 0, "loaded": 0}
+
+    async def start(self):
+        """Start the worker"""
+        if self.running:
+            logger.warning("Occupancy forecast worker is already running")
+            return
+        self.running = True
+        self.task = asyncio.create_task(self._run())
+        logger.info("Occupancy forecast worker started")
+
+    async def stop(self):
+        """Stop the worker"""
+        if not self.running:
+            return
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Occupancy forecast worker stopped")
+
+    async def _run(self):
+        while self.running:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in occupancy forecast worker: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def refresh(self, now: Optional[datetime] = None) -> int:
+        """Retrain if the stored forecasts are older than the train interval, then load them."""
+        now = now or datetime.utcnow()
+        db = self.session_factory()
+        try:
+            trained_at = db.scalar(select(func.max(ChargerOccupancyForecast.trained_at)))
+            if trained_at is None or now - trained_at >= self.train_interval:
+                try:
+                    train_occupancy_forecasts(db, now)
+                    db.commit()
+                    self.stats["trained"] += 1
+                except Exception as e:
+                    # Most likely another process retrained at the same time
+                    db.rollback()
+                    logger.warning(f"Occupancy forecast training failed: {e}")
+            loaded = self.cache.load(db)
+            self.stats["loaded"] += 1
+            return loaded
+        finally:
+            db.close()
+
+
+# Global worker instance
+occupancy_forecast_worker = OccupancyForecastWorker()
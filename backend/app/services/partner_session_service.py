@@ -19,6 +19,7 @@ from app.models.session_event import SessionEvent, IncentiveGrant
 from app.models.user import User
 from app.models.while_you_charge import Charger
 from app.services.incentive_engine import IncentiveEngine
+from app.services.webhook_delivery_service import WebhookDeliveryService, webhook_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -136,11 +137,14 @@ class PartnerSessionService:
                 grant.reward_destination = "partner_managed"
                 db.flush()
 
-        db.commit()
+        # --- Webhooks, queued in this transaction ---
+        queued = False
+        if status == "completed":
+            queued = PartnerSessionService._queue_webhooks(db, partner, session_event, grant)
 
-        # --- Webhook delivery for grant events ---
-        if grant and partner.webhook_enabled:
-            PartnerSessionService._deliver_grant_webhook(partner, session_event, grant)
+        db.commit()
+        if queued:
+            webhook_dispatcher.notify()
 
         return PartnerSessionService._build_response(db, session_event, is_new=True)
 
@@ -176,6 +180,8 @@ class PartnerSessionService:
         if battery_end_pct is not None:
             session_event.battery_end_pct = battery_end_pct
 
+        was_completed = PartnerSessionService._status(session_event) == "completed"
+
         # Handle status transitions
         if status:
             old_status = session_event.partner_status
@@ -210,15 +216,18 @@ class PartnerSessionService:
                         grant.reward_destination = "partner_managed"
 
         session_event.updated_at = datetime.utcnow()
-        db.commit()
 
-        # --- Webhook delivery for grant events on status transitions ---
-        if status == "completed" and partner.webhook_enabled:
+        # --- Webhooks on the transition to completed, queued in this transaction ---
+        queued = False
+        if status == "completed" and not was_completed:
             existing_grant = db.query(IncentiveGrant).filter(
                 IncentiveGrant.session_event_id == session_event.id
             ).first()
-            if existing_grant:
-                PartnerSessionService._deliver_grant_webhook(partner, session_event, existing_grant)
+            queued = PartnerSessionService._queue_webhooks(db, partner, session_event, existing_grant)
+
+        db.commit()
+        if queued:
+            webhook_dispatcher.notify()
 
         return PartnerSessionService._build_response(db, session_event, is_new=False)
 
@@ -309,22 +318,39 @@ class PartnerSessionService:
         return user
 
     @staticmethod
-    def _deliver_grant_webhook(partner: Partner, session_event: SessionEvent, grant: IncentiveGrant) -> None:
-        """Fire a grant.created webhook to the partner (best-effort, non-blocking of response)."""
-        try:
-            from app.services.partner_webhook_service import deliver_webhook
+    def _queue_webhooks(
+        db: Session, partner: Partner, session_event: SessionEvent, grant: Optional[IncentiveGrant]
+    ) -> bool:
+        """
+        Queue grant.created (if there is a grant) and partner.session.resolved
+        for a completed session. Returns True if anything was queued.
 
-            payload = {
+        Note:
+            Does not commit - the events are delivered only if the session change commits.
+        """
+        if not partner.webhook_enabled:
+            return False
+        queued = False
+        if grant:
+            queued |= WebhookDeliveryService.enqueue(db, partner, "grant.created", {
                 "session_event_id": session_event.id,
                 "partner_session_id": session_event.source_session_id,
                 "grant_id": grant.id,
                 "campaign_id": grant.campaign_id,
                 "amount_cents": grant.amount_cents,
                 "reward_destination": grant.reward_destination,
-            }
-            deliver_webhook(partner, "grant.created", payload)
-        except Exception as e:
-            logger.error(f"Failed to deliver grant webhook to partner {partner.slug}: {e}")
+            }) is not None
+        resolved = PartnerSessionService._build_response(db, session_event, is_new=False)
+        resolved.pop("_is_new")
+        queued |= WebhookDeliveryService.enqueue(db, partner, "partner.session.resolved", resolved) is not None
+        return queued
+
+    @staticmethod
+    def _status(session_event: SessionEvent) -> str:
+        """partner_status if set, otherwise derived from session_end."""
+        if session_event.partner_status:
+            return session_event.partner_status
+        return "completed" if session_event.session_end else "charging"
 
     @staticmethod
     def _find_charger(db: Session, lat: float, lng: float) -> Optional[str]:
@@ -362,11 +388,7 @@ class PartnerSessionService:
                 "reward_destination": grant.reward_destination,
             }
 
-        # Derive status: use partner_status if set, otherwise derive from session_end
-        if session_event.partner_status:
-            status = session_event.partner_status
-        else:
-            status = "completed" if session_event.session_end else "charging"
+        status = PartnerSessionService._status(session_event)
 
         response = {
             "session_event_id": session_event.id,
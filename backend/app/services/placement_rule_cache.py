@@ -0,0 +1,93 @@
+"""
+Resident map of ACTIVE merchant placement rules.
+
+Intent capture ranks merchants with placement rules on every request; the
+rules change rarely, so they are held in memory keyed by place_id. The map is
+reloaded (one indexed query on status) when a MerchantPlacementRule is
+committed in this process, and at least every ``refresh_seconds`` to pick up
+changes made by other workers.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import MerchantPlacementRule
+
+logger = logging.getLogger(__name__)
+
+
+class PlacementRule(NamedTuple):
+    place_id: str
+    boost_weight: float
+    perks_enabled: bool
+    daily_cap_cents: int
+
+
+class PlacementRuleCache:
+    def __init__(self, refresh_seconds: Optional[float] = None):
+        self.refresh_seconds = (
+            refresh_seconds
+            if refresh_seconds is not None
+            else float(os.getenv("PLACEMENT_RULES_REFRESH_SECONDS", "60"))
+        )
+        self._lock = threading.Lock()
+        self._rules: Dict[str, PlacementRule] = {}
+        self._loaded_at: Optional[float] = None
+
+    def invalidate(self) -> None:
+        """Force a reload on next access."""
+        self._loaded_at = None
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds
+
+    def reload(self, db: Session) -> None:
+        rules = (
+            db.query(MerchantPlacementRule)
+            .filter(MerchantPlacementRule.status == "ACTIVE")
+            .all()
+        )
+        self._rules = {
+            rule.place_id: PlacementRule(
+                rule.place_id, rule.boost_weight or 0.0, bool(rule.perks_enabled), rule.daily_cap_cents,
+            )
+            for rule in rules
+        }
+        self._loaded_at = time.monotonic()
+
+    def get_many(self, db: Session, place_ids: Iterable[str]) -> Dict[str, PlacementRule]:
+        """ACTIVE rules for the given place_ids (reloading first if stale)."""
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    self.reload(db)
+        rules = self._rules
+        return {place_id: rules[place_id] for place_id in place_ids if place_id in rules}
+
+
+# Global rule cache
+placement_rule_cache = PlacementRuleCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _note_placement_rule_changes(session: Session, flush_context) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, MerchantPlacementRule):
+            session.info["placement_rules_changed"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    if session.info.pop("placement_rules_changed", False):
+        placement_rule_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop("placement_rules_changed", None)
@@ -0,0 +1,129 @@
+"""
+Short-lived cache of authenticated principals, keyed by JWT subject.
+
+Every authenticated request resolves the token's ``sub`` (the user's
+public_id) to a user id. That mapping changes rarely, so it is held in
+memory for ``ttl_seconds`` and a request that only needs the driver id
+issues no user query at all. Dependencies that need the ``User`` row (role,
+admin role and active checks) load it by primary key through the request's
+session, so the row is read at most once per request however many
+dependencies ask for it.
+
+Entries are dropped when a User's public_id changes (or the user is deleted)
+and that commit lands in this process, and on logout. Other workers pick
+changes up within ``ttl_seconds``.
+"""
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.models import User
+
+# User columns a cached principal depends on
+_TRACKED_ATTRS = ("public_id",)
+
+
+class Principal(NamedTuple):
+    user_id: int
+    public_id: str
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: int = 50000):
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+        )
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Principal, float]] = {}
+
+    def get(self, db: Session, public_id: str) -> Optional[Principal]:
+        """The principal for a public_id, read through to the users table on a miss."""
+        entry = self._entries.get(public_id)
+        if entry and time.monotonic() - entry[1] < self.ttl_seconds:
+            return entry[0]
+        row = db.execute(
+            select(User.id, User.public_id).where(User.public_id == public_id)
+        ).first()
+        if row is None:
+            self._entries.pop(public_id, None)
+            return None
+        principal = Principal(row.id, str(row.public_id))
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict_expired()
+            self._entries[public_id] = (principal, time.monotonic())
+        return principal
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (_, loaded_at) in self._entries.items() if now - loaded_at >= self.ttl_seconds]:
+            del self._entries[key]
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+
+    def invalidate(self, public_id: Optional[str] = None) -> None:
+        """Drop one principal, or every principal when no public_id is given."""
+        with self._lock:
+            if public_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(public_id), None)
+
+
+# Global principal cache
+principal_cache = PrincipalCache()
+
+
+def load_user(db: Session, public_id: str) -> Optional[User]:
+    """
+    The User for a JWT subject: principal from the cache, row by primary key
+    (answered from the session's identity map when already loaded this
+    request).
+    """
+    principal = principal_cache.get(db, public_id)
+    if principal is None:
+        return None
+    user = db.get(User, principal.user_id)
+    if user is None or str(user.public_id) != principal.public_id:
+        # Cached id no longer belongs to this subject
+        principal_cache.invalidate(public_id)
+        return db.query(User).filter(User.public_id == public_id).first()
+    return user
+
+
+@event.listens_for(Session, "after_flush")
+def _note_principal_changes(session: Session, flush_context) -> None:
+    changed = session.info.setdefault("principals_changed", set())
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(str(obj.public_id))
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            for attr in _TRACKED_ATTRS:
+                history = state.attrs[attr].history
+                if history.has_changes():
+                    changed.add(str(obj.public_id))
+                    # A changed public_id invalidates the old subject too
+                    if attr == "public_id":
+                        changed.update(str(value) for value in history.deleted if value)
+    if not changed:
+        session.info.pop("principals_changed", None)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals_on_commit(session: Session) -> None:
+    for public_id in session.info.pop("principals_changed", ()):
+        principal_cache.invalidate(public_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_changes(session: Session) -> None:
+    session.info.pop("principals_changed", None)
@@ -2,16 +2,32 @@
 Refresh token service for token rotation and management
 """
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
 from ..models import RefreshToken, User
-from ..core.security import generate_refresh_token, hash_refresh_token, verify_refresh_token, create_access_token
+from ..core.security import (
+    REFRESH_TOKEN_SEPARATOR,
+    generate_refresh_token,
+    generate_refresh_token_selector,
+    hash_refresh_token_verifier,
+    split_refresh_token,
+    verify_refresh_token,
+    verify_refresh_token_verifier,
+    create_access_token,
+)
 from ..core.config import settings
 
 
+def _as_naive_utc(value: datetime) -> datetime:
+    # expires_at is timezone-aware on Postgres, naive on SQLite
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 class RefreshTokenService:
     """Service for managing refresh tokens with rotation"""
     
@@ -23,15 +39,17 @@ class RefreshTokenService:
         Returns:
             Tuple of (plain_token_string, RefreshToken_model)
         """
-        plain_token = generate_refresh_token()
-        token_hash = hash_refresh_token(plain_token)
+        selector = generate_refresh_token_selector()
+        verifier = generate_refresh_token()
+        plain_token = f"{selector}{REFRESH_TOKEN_SEPARATOR}{verifier}"
         
         expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
         
         refresh_token = RefreshToken(
             id=str(uuid.uuid4()),
             user_id=user.id,
-            token_hash=token_hash,
+            selector=selector,
+            token_hash=hash_refresh_token_verifier(verifier),
             expires_at=expires_at,
             revoked=False
         )
@@ -44,18 +62,40 @@ class RefreshTokenService:
     @staticmethod
     def validate_refresh_token(db: Session, plain_token: str) -> Optional[RefreshToken]:
         """
-        Validate a refresh token and return the token record if valid.
+        Look up a refresh token and return its record if it matches and hasn't expired.
+        
+        Selector/verifier tokens are found by their indexed selector and
+        checked with one keyed hash. A revoked token is still returned so the
+        caller can detect reuse; callers must check ``token.revoked`` before
+        accepting it. (Legacy tokens without a selector are only matched
+        while unrevoked.)
         
         Returns:
-            RefreshToken if valid, None if invalid
+            RefreshToken if the token matches and hasn't expired (possibly
+            revoked), None if it is unknown, doesn't verify or has expired
+        """
+        parts = split_refresh_token(plain_token)
+        if parts is None:
+            return RefreshTokenService._validate_legacy_token(db, plain_token)
+        
+        selector, verifier = parts
+        token = db.query(RefreshToken).filter(RefreshToken.selector == selector).first()
+        if not token or not verify_refresh_token_verifier(verifier, token.token_hash):
+            return None
+        if _as_naive_utc(token.expires_at) <= datetime.utcnow():
+            return None
+        return token
+    
+    @staticmethod
+    def _validate_legacy_token(db: Session, plain_token: str) -> Optional[RefreshToken]:
+        """
+        Tokens issued before selectors have a salted hash that can't be looked
+        up, so the live legacy tokens are scanned. The set only shrinks: each
+        is replaced by a selector token when rotated, or expires.
         """
-        # Find token by hash (we need to check all tokens for this user)
-        # Since we can't query by hash directly, we'll need to check tokens for all users
-        # This is inefficient but necessary for security. In production with Redis, we'd cache this.
-        
-        # Get all non-expired, non-revoked tokens
         tokens = db.query(RefreshToken).filter(
             and_(
+                RefreshToken.selector.is_(None),
                 RefreshToken.revoked == False,
                 RefreshToken.expires_at > datetime.utcnow()
             )
@@ -103,17 +143,12 @@ class RefreshTokenService:
     @staticmethod
     def revoke_all_user_tokens(db: Session, user_id: int) -> None:
         """Revoke all refresh tokens for a user (e.g., on logout)"""
-        tokens = db.query(RefreshToken).filter(
+        db.query(RefreshToken).filter(
             and_(
                 RefreshToken.user_id == user_id,
                 RefreshToken.revoked == False
             )
-        ).all()
-        
-        for token in tokens:
-            token.revoked = True
-            token.updated_at = datetime.utcnow()
-        
+        ).update({"revoked": True, "updated_at": datetime.utcnow()}, synchronize_session="fetch")
         db.flush()
     
     @staticmethod
@@ -12,6 +12,7 @@ from sqlalchemy import desc
 from ..config import settings
 from ..models.vehicle import VehicleAccount, VehicleToken
 from ..core.retry import retry_with_backoff
+from .http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +53,7 @@ async def exchange_code_for_tokens(code: str) -> Dict[str, Any]:
     
     async def _exchange_tokens():
         """Internal function for token exchange with retry"""
-        async with httpx.AsyncClient(timeout=SMARTCAR_TIMEOUT) as client:
+        async with http_clients.client("smartcar") as client:
             response = await client.post(url, data=data)
             response.raise_for_status()
             return response.json()
@@ -94,12 +95,35 @@ async def refresh_tokens(db: Session, vehicle_account: VehicleAccount) -> Vehicl
     if not latest_token:
         raise ValueError(f"No token found for vehicle account {vehicle_account.id}")
     
-    # Check if token expires in more than 5 minutes
-    if latest_token.expires_at > datetime.utcnow() + timedelta(minutes=5):
+    if not token_needs_refresh(latest_token):
         logger.debug(f"Token for vehicle {vehicle_account.id} still valid, returning existing token")
         return latest_token
     
-    # Refresh the token
+    new_token = await renew_token(vehicle_account, latest_token)
+    db.add(new_token)
+    db.commit()
+    db.refresh(new_token)
+    
+    logger.info(f"Refreshed token for vehicle account {vehicle_account.id}")
+    return new_token
+
+
+def token_needs_refresh(token: VehicleToken) -> bool:
+    """True if the access token expires within 5 minutes."""
+    return token.expires_at <= datetime.utcnow() + timedelta(minutes=5)
+
+
+async def renew_token(vehicle_account: VehicleAccount, latest_token: VehicleToken) -> VehicleToken:
+    """
+    Exchange a vehicle's refresh token with Smartcar for a new token pair.
+    
+    Makes no database calls: returns a new, unsaved VehicleToken (tokens
+    encrypted) for the caller to add and commit.
+    
+    Raises:
+        SmartcarTokenExpiredError: If the refresh token is expired or revoked
+        httpx.HTTPStatusError: If Smartcar API returns an error
+    """
     url = f"{settings.smartcar_auth_url}/oauth/token"
     
     # Decrypt refresh token before using (P0 security fix)
@@ -120,7 +144,7 @@ async def refresh_tokens(db: Session, vehicle_account: VehicleAccount) -> Vehicl
     # Log validation info (no secrets)
     logger.debug(f"Token refresh request: grant_type={data['grant_type']}, client_id={data['client_id'][:8]}...")
     
-    async with httpx.AsyncClient(timeout=SMARTCAR_TIMEOUT) as client:
+    async with http_clients.client("smartcar") as client:
         try:
             response = await client.post(url, data=data)
             response.raise_for_status()
@@ -177,7 +201,7 @@ async def refresh_tokens(db: Session, vehicle_account: VehicleAccount) -> Vehicl
     
     # Create new token record with encrypted tokens
     import uuid
-    new_token = VehicleToken(
+    return VehicleToken(
         id=str(uuid.uuid4()),
         vehicle_account_id=vehicle_account.id,
         access_token=encrypted_access_token,
@@ -186,13 +210,6 @@ async def refresh_tokens(db: Session, vehicle_account: VehicleAccount) -> Vehicl
         expires_at=datetime.utcnow() + timedelta(seconds=token_data.get("expires_in", 3600)),
         scope=token_data.get("scope", latest_token.scope),
     )
-    
-    db.add(new_token)
-    db.commit()
-    db.refresh(new_token)
-    
-    logger.info(f"Refreshed token for vehicle account {vehicle_account.id}")
-    return new_token
 
 
 async def list_vehicles(access_token: str) -> Dict[str, Any]:
@@ -215,7 +232,7 @@ async def list_vehicles(access_token: str) -> Dict[str, Any]:
         "Content-Type": "application/json",
     }
     
-    async with httpx.AsyncClient(timeout=SMARTCAR_TIMEOUT) as client:
+    async with http_clients.client("smartcar") as client:
         try:
             response = await client.get(url, headers=headers)
             response.raise_for_status()
@@ -250,7 +267,7 @@ async def get_vehicle_location(access_token: str, vehicle_id: str) -> Dict[str,
         "Content-Type": "application/json",
     }
     
-    async with httpx.AsyncClient(timeout=SMARTCAR_TIMEOUT) as client:
+    async with http_clients.client("smartcar") as client:
         try:
             response = await client.get(url, headers=headers)
             response.raise_for_status()
@@ -285,7 +302,7 @@ async def get_vehicle_charge(access_token: str, vehicle_id: str) -> Dict[str, An
         "Content-Type": "application/json",
     }
     
-    async with httpx.AsyncClient(timeout=SMARTCAR_TIMEOUT) as client:
+    async with http_clients.client("smartcar") as client:
         try:
             response = await client.get(url, headers=headers)
             response.raise_for_status()
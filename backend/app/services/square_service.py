@@ -5,7 +5,6 @@ All HTTP calls are mockable for tests.
 """
 from typing import Optional
 from pydantic import BaseModel
-import httpx
 import os
 import logging
 from urllib.parse import urlencode
@@ -18,6 +17,7 @@ from datetime import datetime, timedelta
 import secrets
 import uuid
 from typing import NamedTuple
+from .http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -140,7 +140,7 @@ async def exchange_square_oauth_code(code: str) -> SquareOAuthResult:
     
     # Square OAuth token request
     # Note: redirect_uri must match the one used in the authorization request
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with http_clients.client("square") as client:
         response = await client.post(
             token_url,
             json={
@@ -211,7 +211,7 @@ async def _fetch_primary_location_id(access_token: str, base_url: str) -> str:
     """
     locations_url = f"{base_url}/v2/locations"
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with http_clients.client("square") as client:
         response = await client.get(
             locations_url,
             headers={
@@ -268,7 +268,7 @@ async def fetch_square_location_stats(access_token: str, location_id: str) -> Sq
         from datetime import datetime, timedelta
         start_date = (datetime.utcnow() - timedelta(days=30)).isoformat() + "Z"
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_clients.client("square") as client:
             response = await client.post(
                 orders_url,
                 json={
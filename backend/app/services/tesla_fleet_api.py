@@ -10,6 +10,7 @@ from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 
 from app.core.config import settings
+from app.services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -77,7 +78,7 @@ class TeslaFleetAPIClient:
             "Content-Type": "application/json",
         }
         
-        async with httpx.AsyncClient(timeout=TESLA_FLEET_TIMEOUT) as client:
+        async with http_clients.client("tesla") as client:
             try:
                 response = await client.get(url, headers=headers)
                 response.raise_for_status()
@@ -109,7 +110,7 @@ class TeslaFleetAPIClient:
             "Content-Type": "application/json",
         }
         
-        async with httpx.AsyncClient(timeout=TESLA_FLEET_TIMEOUT) as client:
+        async with http_clients.client("tesla") as client:
             try:
                 response = await client.get(url, headers=headers)
                 response.raise_for_status()
@@ -142,7 +143,7 @@ class TeslaFleetAPIClient:
             "Content-Type": "application/json",
         }
         
-        async with httpx.AsyncClient(timeout=TESLA_FLEET_TIMEOUT) as client:
+        async with http_clients.client("tesla") as client:
             try:
                 response = await client.post(url, headers=headers)
                 response.raise_for_status()
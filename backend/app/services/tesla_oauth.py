@@ -5,16 +5,20 @@ Handles the complete OAuth2 flow for connecting user's Tesla account.
 """
 import asyncio
 import logging
+import os
+import socket
 import httpx
 import secrets
 from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from urllib.parse import urlencode
+from sqlalchemy import or_, update
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.token_encryption import encrypt_token, decrypt_token
 from app.models.tesla_connection import TeslaConnection
+from app.services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +39,17 @@ TESLA_SCOPES = [
     "vehicle_charging_cmds",
 ]
 
+# Request paths refresh tokens expiring within this margin; the proactive
+# refresher (workers/tesla_token_refresher.py) renews well before it
+REFRESH_MARGIN = timedelta(minutes=5)
+# How long a worker may hold a connection's refresh lease before another takes over
+REFRESH_LEASE_SECONDS = int(os.getenv("TESLA_REFRESH_LEASE_SECONDS", "45"))
+_LEASE_POLL_SECONDS = 0.25
+_LEASE_OWNER = f"{socket.gethostname()}:{os.getpid()}"[:64]
+
+# Connection id -> refresh in flight in this process
+_inflight_refreshes: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+
 
 class TeslaOAuthService:
     """Service for Tesla OAuth2 authentication."""
@@ -86,7 +101,7 @@ class TeslaOAuthService:
             "redirect_uri": redirect_uri or self.redirect_uri,
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_clients.client("tesla") as client:
             response = await client.post(
                 TESLA_TOKEN_URL,
                 data=data,
@@ -115,7 +130,7 @@ class TeslaOAuthService:
             "refresh_token": refresh_token,
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_clients.client("tesla") as client:
             response = await client.post(
                 TESLA_TOKEN_URL,
                 data=data,
@@ -143,7 +158,7 @@ class TeslaOAuthService:
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_clients.client("tesla") as client:
             response = await client.get(url, headers=headers)
             response.raise_for_status()
             data = response.json()
@@ -169,7 +184,7 @@ class TeslaOAuthService:
             "endpoints": "charge_state;drive_state;location_data;vehicle_config"
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_clients.client("tesla") as client:
             response = await client.get(url, headers=headers, params=params)
             response.raise_for_status()
             data = response.json()
@@ -201,7 +216,7 @@ class TeslaOAuthService:
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_clients.client("tesla") as client:
             response = await client.post(url, headers=headers)
             response.raise_for_status()
             data = response.json()
@@ -418,24 +433,100 @@ def generate_ev_code() -> str:
 async def get_valid_access_token(
     db: Session,
     connection: TeslaConnection,
-    oauth_service: TeslaOAuthService
+    oauth_service: TeslaOAuthService,
+    refresh_margin: timedelta = REFRESH_MARGIN,
 ) -> Optional[str]:
     """
-    Get a valid access token, refreshing if expired.
+    Get a valid access token, refreshing if it expires within refresh_margin.
+
+    Concurrent refreshes of one connection are coalesced: callers in this
+    process share a single in-flight refresh, and across processes the
+    refresh lease on the connection row admits one refresher while the
+    others wait for its result. Tesla rotates the refresh token on use, so
+    parallel refreshes would otherwise invalidate each other.
 
     Args:
         db: Database session
         connection: TeslaConnection record
         oauth_service: OAuth service instance
+        refresh_margin: Refresh when the token expires sooner than this
 
     Returns:
         Valid access token or None if refresh fails
     """
-    # Check if token is still valid (with 5 min buffer)
-    if connection.token_expires_at > datetime.utcnow() + timedelta(minutes=5):
+    if connection.token_expires_at > datetime.utcnow() + refresh_margin:
         return decrypt_token(connection.access_token)
 
-    # Token expired, refresh it
+    loop = asyncio.get_running_loop()
+    key = connection.id
+    pending = _inflight_refreshes.get(key)
+    if pending is not None and pending.get_loop() is loop:
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            # The refreshing caller was cancelled; refresh here instead
+
+    future = loop.create_future()
+    _inflight_refreshes[key] = future
+    try:
+        token = await _refresh_under_lease(db, connection, oauth_service, refresh_margin)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Waiters re-raise it; nothing to log if there are none
+        raise
+    else:
+        future.set_result(token)
+        return token
+    finally:
+        if _inflight_refreshes.get(key) is future:
+            del _inflight_refreshes[key]
+
+
+async def _refresh_under_lease(
+    db: Session,
+    connection: TeslaConnection,
+    oauth_service: TeslaOAuthService,
+    refresh_margin: timedelta,
+) -> Optional[str]:
+    """Claim the connection's refresh lease, or wait for its holder, then refresh."""
+    while True:
+        now = datetime.utcnow()
+        claimed = db.execute(
+            update(TeslaConnection)
+            .where(
+                TeslaConnection.id == connection.id,
+                or_(
+                    TeslaConnection.refresh_lease_until.is_(None),
+                    TeslaConnection.refresh_lease_until < now,
+                ),
+            )
+            .values(
+                refresh_lease_owner=_LEASE_OWNER,
+                refresh_lease_until=now + timedelta(seconds=REFRESH_LEASE_SECONDS),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        db.commit()
+        db.refresh(connection)
+
+        if not connection.is_active:
+            # Revoked by whichever worker refreshed it
+            return None
+        if connection.token_expires_at > datetime.utcnow() + refresh_margin:
+            # Refreshed by another worker since this caller looked
+            if claimed:
+                _release_refresh_lease(connection)
+                db.commit()
+            return decrypt_token(connection.access_token)
+        if claimed:
+            break
+        await asyncio.sleep(_LEASE_POLL_SECONDS)
+
     try:
         raw_refresh = decrypt_token(connection.refresh_token)
         token_response = await oauth_service.refresh_access_token(raw_refresh)
@@ -448,11 +539,13 @@ async def get_valid_access_token(
             seconds=token_response.get("expires_in", 3600)
         )
         connection.updated_at = datetime.utcnow()
+        _release_refresh_lease(connection)
         db.commit()
 
         return decrypt_token(connection.access_token)
 
     except httpx.HTTPStatusError as e:
+        _release_refresh_lease(connection)
         if e.response.status_code in (401, 403):
             # Token revoked — mark connection inactive
             logger.warning(f"Tesla token revoked for user (HTTP {e.response.status_code})")
@@ -460,14 +553,23 @@ async def get_valid_access_token(
             connection.updated_at = datetime.utcnow()
             db.commit()
             return None
+        db.commit()
         # Transient error (5xx, timeout) — raise so caller can return 502
         logger.error(f"Tesla API temporarily unavailable: {e}")
         raise
     except Exception as e:
         logger.error(f"Failed to refresh Tesla token: {e}")
+        db.rollback()
+        _release_refresh_lease(connection)
+        db.commit()
         return None
 
 
+def _release_refresh_lease(connection: TeslaConnection) -> None:
+    connection.refresh_lease_owner = None
+    connection.refresh_lease_until = None
+
+
 # Singleton instance
 _tesla_oauth_service: Optional[TeslaOAuthService] = None
 
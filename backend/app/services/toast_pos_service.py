@@ -9,7 +9,6 @@ Uses MerchantOAuthToken model with provider="toast" for token storage.
 import logging
 import secrets
 import uuid
-import httpx
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any
 from sqlalchemy.orm import Session
@@ -17,6 +16,7 @@ from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.core.token_encryption import encrypt_token, decrypt_token
 from app.models.merchant_oauth_token import MerchantOAuthToken
+from app.services.http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -147,7 +147,7 @@ async def exchange_code(
     if not TOAST_CLIENT_ID or not TOAST_CLIENT_SECRET:
         raise ValueError("Toast API credentials not configured (TOAST_CLIENT_ID / TOAST_CLIENT_SECRET)")
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    async with http_clients.client("toast") as client:
         response = await client.post(
             TOAST_TOKEN_URL,
             json={
@@ -294,7 +294,7 @@ async def refresh_token_if_needed(db: Session, merchant_account_id: str) -> Opti
     refresh_tok = decrypt_token(token_row.refresh_token_encrypted)
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_clients.client("toast") as client:
             response = await client.post(
                 TOAST_TOKEN_URL,
                 json={
@@ -333,7 +333,7 @@ async def refresh_token_if_needed(db: Session, merchant_account_id: str) -> Opti
 
 async def _fetch_restaurant_info(access_token: str, restaurant_guid: str) -> Dict[str, Any]:
     """Fetch restaurant details from Toast API."""
-    async with httpx.AsyncClient(timeout=15.0) as client:
+    async with http_clients.client("toast") as client:
         response = await client.get(
             f"{TOAST_API_BASE}/restaurants/v1/restaurants/{restaurant_guid}",
             headers={
@@ -410,7 +410,7 @@ async def get_recent_orders(
 
     orders = []
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with http_clients.client("toast") as client:
             # Paginate through orders day by day (Toast API returns by business date)
             current = start_date
             while current <= end_date:
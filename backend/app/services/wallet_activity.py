@@ -3,11 +3,18 @@ Wallet Activity Service
 
 Helper functions to mark wallet activity for pass refresh tracking.
 """
+import os
+from typing import Iterable
+
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from app.models.domain import DriverWallet
-from app.services.apple_pass_push import send_updates_for_wallet
+from app.services.apple_pass_push import (
+    pass_update_scheduler,
+    send_updates_for_drivers,
+    send_updates_for_wallet,
+)
 from app.services.google_wallet_service import update_google_wallet_object_on_activity
 
 
@@ -41,13 +48,15 @@ def mark_wallet_activity(db: Session, driver_user_id: int) -> None:
     wallet.wallet_activity_updated_at = datetime.utcnow()
     # Note: updated_at is handled by SQLAlchemy onupdate
 
-    import os
-
     # Optionally trigger PassKit silent push (non-blocking)
     if os.getenv("APPLE_PASS_PUSH_ENABLED", "false").lower() == "true":
         try:
-            # Fire-and-forget; errors are logged inside send_updates_for_wallet
-            send_updates_for_wallet(db, wallet)
+            if pass_update_scheduler.running:
+                # Debounced: bursts of activity coalesce into one push per device
+                pass_update_scheduler.schedule(wallet.user_id)
+            else:
+                # No scheduler (scripts, one-off jobs); errors are logged inside
+                send_updates_for_wallet(db, wallet)
         except Exception:
             # Never block wallet activity on push failures
             pass
@@ -60,3 +69,45 @@ def mark_wallet_activity(db: Session, driver_user_id: int) -> None:
         except Exception:
             # Never block wallet activity on Google Wallet failures
             pass
+
+
+def mark_wallet_activity_many(db: Session, driver_user_ids: Iterable[int]) -> None:
+    """
+    Batch variant of mark_wallet_activity for bulk grants.
+
+    Wallets must already exist (grant_many creates them). Apple Wallet pushes
+    are scheduled per driver, or sent as one APNs batch when no scheduler is
+    running; Google Wallet objects are updated per wallet as before.
+
+    Note:
+        Does not commit - caller should commit in their transaction pattern.
+    """
+    driver_user_ids = list(dict.fromkeys(driver_user_ids))
+    if not driver_user_ids:
+        return
+
+    if os.getenv("APPLE_PASS_PUSH_ENABLED", "false").lower() == "true":
+        try:
+            if pass_update_scheduler.running:
+                for driver_user_id in driver_user_ids:
+                    pass_update_scheduler.schedule(driver_user_id)
+            else:
+                send_updates_for_drivers(db, driver_user_ids)
+        except Exception:
+            # Never block wallet activity on push failures
+            pass
+
+    if os.getenv("GOOGLE_WALLET_ENABLED", "false").lower() == "true":
+        wallets = (
+            db.query(DriverWallet)
+            .filter(DriverWallet.user_id.in_(driver_user_ids))
+            .all()
+        )
+        for wallet in wallets:
+            try:
+                pass_token = getattr(wallet, "wallet_pass_token", None)
+                if pass_token:
+                    update_google_wallet_object_on_activity(db, wallet, pass_token)
+            except Exception:
+                # Never block wallet activity on Google Wallet failures
+                pass
@@ -3,35 +3,233 @@ Wallet Timeline Service
 
 Provides a unified timeline of wallet activity (earned/spent events)
 with explicit duplicate prevention rules.
+
+The timeline is materialized in ``wallet_timeline_events``: a row is appended
+whenever a driver_earn NovaTransaction or a MerchantRedemption is flushed
+(see ``_append_timeline_on_flush``), so reads are a single keyset range scan
+instead of two queries plus an in-Python merge.
 """
-from typing import List, Dict, Any, Optional
+import base64
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from sqlalchemy import and_, event, insert, or_
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
 from datetime import datetime
 
-from app.models.domain import NovaTransaction, MerchantRedemption, DriverWallet
+from app.models.domain import NovaTransaction, MerchantRedemption, DomainMerchant
+from app.models.wallet_timeline import WalletTimelineEvent
+
+# Tie-breaker within equal timestamps: SPENT before EARNED
+_SORT_RANK = {"SPENT": 0, "EARNED": 1}
+
+
+def _earned_title(meta: Optional[Dict[str, Any]]) -> str:
+    if meta:
+        if meta.get("source") == "charging_session":
+            return "Charging Reward"
+        if meta.get("event_id"):
+            return "Event Reward"
+    return "Off-Peak Charging"
+
+
+def _merchant_title(merchant_id: Optional[str], merchant_name: Optional[str]) -> str:
+    if merchant_name:
+        return merchant_name
+    if merchant_id:
+        return f"Merchant {merchant_id[:8]}"
+    return "Merchant"
+
+
+def earned_event_row(
+    txn_id: str,
+    driver_user_id: int,
+    amount: int,
+    meta: Optional[Dict[str, Any]],
+    merchant_id: Optional[str],
+    created_at: datetime,
+) -> Dict[str, Any]:
+    """Timeline row for a driver_earn NovaTransaction."""
+    return {
+        "id": f"earn_{txn_id}",
+        "driver_user_id": driver_user_id,
+        "event_type": "EARNED",
+        "sort_rank": _SORT_RANK["EARNED"],
+        "amount_cents": amount,
+        "title": _earned_title(meta),
+        "subtitle": "Nova issued",
+        "merchant_id": merchant_id,
+        "redemption_id": None,
+        "created_at": created_at,
+    }
+
+
+def spent_event_row(
+    redemption_id: str,
+    driver_user_id: int,
+    nova_spent_cents: int,
+    merchant_id: Optional[str],
+    merchant_name: Optional[str],
+    created_at: datetime,
+) -> Dict[str, Any]:
+    """Timeline row for a MerchantRedemption (the only source of SPENT events)."""
+    return {
+        "id": f"spent_{redemption_id}",
+        "driver_user_id": driver_user_id,
+        "event_type": "SPENT",
+        "sort_rank": _SORT_RANK["SPENT"],
+        "amount_cents": nova_spent_cents,
+        "title": _merchant_title(merchant_id, merchant_name),
+        "subtitle": "Nova applied",
+        "merchant_id": merchant_id,
+        "redemption_id": redemption_id,
+        "created_at": created_at,
+    }
+
+
+def append_timeline_for_transactions(db: Session, transactions: Iterable[NovaTransaction]) -> None:
+    """
+    Append feed rows for transactions written outside the ORM unit of work
+    (e.g. NovaService.grant_many's bulk INSERT), with one multi-row INSERT.
+    """
+    rows = [
+        earned_event_row(
+            str(txn.id), txn.driver_user_id, txn.amount, txn.transaction_meta,
+            txn.merchant_id, txn.created_at,
+        )
+        for txn in transactions
+        if txn.type == "driver_earn" and txn.driver_user_id is not None
+    ]
+    if rows:
+        db.execute(insert(WalletTimelineEvent), rows)
+
+
+@event.listens_for(Session, "before_flush")
+def _append_timeline_on_flush(session: Session, flush_context, instances) -> None:
+    """Write timeline rows in the same flush as the ledger rows they mirror."""
+    new_events = []
+    for obj in list(session.new):
+        if isinstance(obj, NovaTransaction):
+            # driver_redeem is EXCLUDED: MerchantRedemption is the SPENT source
+            if obj.type != "driver_earn" or obj.driver_user_id is None or obj.id is None:
+                continue
+            if obj.created_at is None:
+                obj.created_at = datetime.utcnow()
+            new_events.append(earned_event_row(
+                str(obj.id), obj.driver_user_id, obj.amount, obj.transaction_meta,
+                obj.merchant_id, obj.created_at,
+            ))
+        elif isinstance(obj, MerchantRedemption):
+            if obj.id is None:
+                continue
+            if obj.created_at is None:
+                obj.created_at = datetime.utcnow()
+            merchant_name = None
+            if obj.merchant_id:
+                with session.no_autoflush:
+                    merchant = obj.merchant or session.get(DomainMerchant, obj.merchant_id)
+                merchant_name = merchant.name if merchant else None
+            new_events.append(spent_event_row(
+                str(obj.id), obj.driver_user_id, obj.nova_spent_cents, obj.merchant_id,
+                merchant_name, obj.created_at,
+            ))
+
+    for row in new_events:
+        session.add(WalletTimelineEvent(**row))
+
+
+def encode_cursor(event_row: WalletTimelineEvent) -> str:
+    """Opaque keyset cursor for the position after ``event_row``."""
+    raw = f"{event_row.created_at.isoformat()}|{event_row.sort_rank}|{event_row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    """Inverse of encode_cursor. Raises ValueError on malformed input."""
+    try:
+        created_at, sort_rank, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 2)
+        return datetime.fromisoformat(created_at), int(sort_rank), event_id
+    except Exception as e:
+        raise ValueError(f"Invalid timeline cursor: {cursor}") from e
+
+
+def _to_dict(row: WalletTimelineEvent) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "type": row.event_type,
+        "amount_cents": row.amount_cents,
+        "title": row.title,
+        "subtitle": row.subtitle,
+        "created_at": row.created_at.isoformat(),
+        "merchant_id": row.merchant_id,
+        "redemption_id": row.redemption_id,
+    }
+
+
+def get_wallet_timeline_page(
+    db: Session,
+    driver_user_id: int,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Get one page of the wallet timeline plus the cursor for the next page.
+
+    Keyset pagination on (created_at desc, sort_rank, id): every page is a
+    single index range scan, independent of history size.
+
+    Returns:
+        (events, next_cursor) - next_cursor is None on the last page
+    """
+    query = db.query(WalletTimelineEvent).filter(
+        WalletTimelineEvent.driver_user_id == driver_user_id
+    )
+    if cursor:
+        created_at, sort_rank, event_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            WalletTimelineEvent.created_at < created_at,
+            and_(
+                WalletTimelineEvent.created_at == created_at,
+                or_(
+                    WalletTimelineEvent.sort_rank > sort_rank,
+                    and_(
+                        WalletTimelineEvent.sort_rank == sort_rank,
+                        WalletTimelineEvent.id > event_id,
+                    ),
+                ),
+            ),
+        ))
+
+    rows = query.order_by(
+        WalletTimelineEvent.created_at.desc(),
+        WalletTimelineEvent.sort_rank.asc(),
+        WalletTimelineEvent.id.asc(),
+    ).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return [_to_dict(row) for row in rows[:limit]], next_cursor
 
 
 def get_wallet_timeline(
     db: Session,
     driver_user_id: int,
-    limit: int = 20
+    limit: int = 20,
+    cursor: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """
     Get unified wallet timeline for a driver.
-    
+
     Rules:
     - EARNED events = NovaTransaction rows where type == "driver_earn"
     - SPENT events = MerchantRedemption rows ONLY
     - Explicitly EXCLUDE NovaTransaction rows where type == "driver_redeem" to avoid duplicates
     - Ordering: newest first across both sources
     - Tie-breaker: when timestamps equal, order by type (SPENT before EARNED) then id
-    
+
     Args:
         db: Database session
         driver_user_id: Driver user ID
         limit: Maximum number of events to return
-        
+        cursor: Optional keyset cursor from get_wallet_timeline_page
+
     Returns:
         List of normalized event dicts with fields:
         - id: str
@@ -43,133 +241,5 @@ def get_wallet_timeline(
         - merchant_id: optional str
         - redemption_id: optional str
     """
-    events: List[Dict[str, Any]] = []
-    
-    # 1. Get EARNED events from NovaTransaction (driver_earn only)
-    earned_txns = db.query(NovaTransaction).filter(
-        and_(
-            NovaTransaction.driver_user_id == driver_user_id,
-            NovaTransaction.type == "driver_earn"
-        )
-    ).order_by(NovaTransaction.created_at.desc()).limit(limit * 2).all()
-    
-    for txn in earned_txns:
-        # Get merchant name if available
-        merchant_name = None
-        if txn.merchant:
-            merchant_name = txn.merchant.name
-        elif txn.merchant_id:
-            # Fallback: just use merchant_id if relationship not loaded
-            merchant_name = f"Merchant {txn.merchant_id[:8]}"
-        
-        # Determine title/subtitle
-        title = "Off-Peak Charging"
-        subtitle = "Nova issued"
-        
-        # Check metadata for better labels
-        if txn.transaction_meta:
-            if txn.transaction_meta.get("source") == "charging_session":
-                title = "Charging Reward"
-            elif txn.transaction_meta.get("event_id"):
-                title = "Event Reward"
-        
-        events.append({
-            "id": f"earn_{txn.id}",
-            "type": "EARNED",
-            "amount_cents": txn.amount,
-            "title": title,
-            "subtitle": subtitle,
-            "created_at": txn.created_at.isoformat(),
-            "merchant_id": txn.merchant_id,
-            "redemption_id": None
-        })
-    
-    # 2. Get SPENT events from MerchantRedemption (ONLY source for spent)
-    # Use explicit column selection to avoid loading reward_id relationship if column doesn't exist
-    try:
-        spent_redemptions = db.query(MerchantRedemption).filter(
-            MerchantRedemption.driver_user_id == driver_user_id
-        ).order_by(MerchantRedemption.created_at.desc()).limit(limit * 2).all()
-    except Exception as e:
-        # If query fails (e.g., reward_id column doesn't exist), try without relationship loading
-        import traceback
-        print(f"[WALLET_TIMELINE] Query failed, trying fallback: {e}")
-        print(traceback.format_exc())
-        # Fallback: query with explicit columns to avoid relationship issues
-        try:
-            from sqlalchemy import select
-            spent_redemptions = db.execute(
-                select(
-                    MerchantRedemption.id,
-                    MerchantRedemption.merchant_id,
-                    MerchantRedemption.driver_user_id,
-                    MerchantRedemption.nova_spent_cents,
-                    MerchantRedemption.created_at
-                ).where(
-                    MerchantRedemption.driver_user_id == driver_user_id
-                ).order_by(MerchantRedemption.created_at.desc()).limit(limit * 2)
-            ).all()
-        except Exception as e2:
-            print(f"[WALLET_TIMELINE] Fallback query also failed: {e2}")
-            # If all else fails, return empty list for spent events
-            spent_redemptions = []
-    
-    for redemption in spent_redemptions:
-        # Handle both ORM objects and row tuples
-        if isinstance(redemption, tuple) or hasattr(redemption, '_mapping'):
-            # Row tuple from explicit column selection
-            if hasattr(redemption, '_mapping'):
-                # SQLAlchemy Row object
-                redemption_id = redemption.id
-                merchant_id = redemption.merchant_id
-                nova_spent = redemption.nova_spent_cents
-                created_at = redemption.created_at
-            else:
-                # Plain tuple
-                redemption_id, merchant_id, driver_id, nova_spent, created_at = redemption
-            
-            merchant_name = f"Merchant {merchant_id[:8]}" if merchant_id else "Merchant"
-            events.append({
-                "id": f"spent_{redemption_id}",
-                "type": "SPENT",
-                "amount_cents": nova_spent,
-                "title": merchant_name,
-                "subtitle": "Nova applied",
-                "created_at": created_at.isoformat() if hasattr(created_at, 'isoformat') else str(created_at),
-                "merchant_id": merchant_id,
-                "redemption_id": redemption_id
-            })
-        else:
-            # ORM object
-            merchant_name = "Merchant"
-            try:
-                if redemption.merchant:
-                    merchant_name = redemption.merchant.name
-                elif redemption.merchant_id:
-                    merchant_name = f"Merchant {redemption.merchant_id[:8]}"
-            except Exception:
-                # If accessing merchant relationship fails, use merchant_id
-                merchant_name = f"Merchant {redemption.merchant_id[:8]}" if redemption.merchant_id else "Merchant"
-            
-            events.append({
-                "id": f"spent_{redemption.id}",
-                "type": "SPENT",
-                "amount_cents": redemption.nova_spent_cents,
-                "title": merchant_name,
-                "subtitle": "Nova applied",
-                "created_at": redemption.created_at.isoformat(),
-                "merchant_id": redemption.merchant_id,
-                "redemption_id": redemption.id
-            })
-    
-    # 3. Sort by created_at descending, with tie-breaker
-    # Tie-breaker: SPENT before EARNED when timestamps equal, then by id
-    def sort_key(event: Dict[str, Any]) -> tuple:
-        created_at = datetime.fromisoformat(event["created_at"].replace("Z", "+00:00"))
-        type_order = 0 if event["type"] == "SPENT" else 1  # SPENT first
-        return (-created_at.timestamp(), type_order, event["id"])
-    
-    events.sort(key=sort_key)
-    
-    # 4. Limit and return
-    return events[:limit]
+    events, _ = get_wallet_timeline_page(db, driver_user_id, limit=limit, cursor=cursor)
+    return events
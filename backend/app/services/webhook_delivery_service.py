@@ -1,73 +1,90 @@
 """
 Webhook Delivery Service — Delivers webhook events to partner endpoints.
 
-Sends HMAC-SHA256 signed payloads with retry logic and exponential backoff.
+Events are queued in ``partner_webhook_deliveries`` in the same transaction
+as the change they report (``WebhookDeliveryService.enqueue``), so a
+committed change always has its event. The background ``WebhookDispatcher``
+sends them outside the request path:
+
+- Each partner's pending events form a lane delivered strictly in order; a
+  dispatcher claims a lane by leasing its head row, so lanes for different
+  partners are sent concurrently and no lane is sent by two workers at once.
+- Failed sends are rescheduled with exponential backoff (5s, 25s, ... capped
+  at an hour); the lane waits behind its head. After ``max_attempts`` the
+  events move to ``partner_webhook_dead_letters``, from where admins can
+  replay them.
+- Partners with ``webhook_batch_size`` > 1 receive up to that many events
+  per POST as ``{"events": [...]}`` (X-Nerava-Event: batch).
+
+Payloads are HMAC-SHA256 signed with the partner's current secret at send
+time. POSTs go through the shared pooled "webhooks" HTTP client.
 """
 import asyncio
 import hashlib
 import hmac
 import json
 import logging
+import os
+import random
+import time
 import uuid
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
 
-import httpx
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.orm import Session
 
-logger = logging.getLogger(__name__)
+from app.db import SessionLocal
+from app.models.partner import Partner, PartnerWebhookDeadLetter, PartnerWebhookDelivery
+from app.services.http_clients import http_clients
 
+logger = logging.getLogger(__name__)
 
-class WebhookDeliveryService:
-    """Delivers webhook events to partner endpoints with HMAC-SHA256 signing."""
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_FACTOR = 5
+BACKOFF_MAX_SECONDS = 3600
+LANE_LEASE_SECONDS = 60
+DELIVERED_RETENTION = timedelta(days=7)
 
-    MAX_RETRIES = 3
-    TIMEOUT_SECONDS = 10
+PARTNER_WEBHOOK_QUEUE_DEPTH = Gauge(
+    "partner_webhook_queue_depth",
+    "Webhook events waiting to be delivered",
+)
+PARTNER_WEBHOOK_LATENCY = Histogram(
+    "partner_webhook_delivery_seconds",
+    "Webhook POST latency per partner",
+    ["partner"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+PARTNER_WEBHOOK_DELIVERED = Counter(
+    "partner_webhook_events_delivered_total",
+    "Webhook events delivered per partner",
+    ["partner"],
+)
+PARTNER_WEBHOOK_FAILURES = Counter(
+    "partner_webhook_failures_total",
+    "Failed webhook sends per partner; final when the events were dead-lettered",
+    ["partner", "final"],
+)
 
-    @staticmethod
-    async def deliver(partner, event_type: str, payload: dict):
-        """Fire-and-forget webhook delivery with retries."""
-        if not partner.webhook_enabled or not partner.webhook_url:
-            return
 
-        event_id = str(uuid.uuid4())
-        body = json.dumps({
-            "event_id": event_id,
-            "event_type": event_type,
-            "partner_id": str(partner.id),
-            "occurred_at": datetime.utcnow().isoformat() + "Z",
-            "data": payload,
-        }, default=str)
-
-        # Sign with HMAC-SHA256
-        signature = ""
-        if partner.webhook_secret:
-            signature = hmac.new(
-                partner.webhook_secret.encode(),
-                body.encode(),
-                hashlib.sha256,
-            ).hexdigest()
-
-        headers = {
-            "Content-Type": "application/json",
-            "X-Nerava-Event": event_type,
-            "X-Nerava-Signature": f"sha256={signature}",
-            "X-Nerava-Event-Id": event_id,
-        }
-
-        for attempt in range(1, WebhookDeliveryService.MAX_RETRIES + 1):
-            try:
-                async with httpx.AsyncClient(timeout=WebhookDeliveryService.TIMEOUT_SECONDS) as client:
-                    resp = await client.post(partner.webhook_url, content=body, headers=headers)
-                if resp.status_code < 300:
-                    logger.info(f"Webhook delivered to {partner.slug}: {event_type} (attempt {attempt})")
-                    return
-                logger.warning(f"Webhook {event_type} to {partner.slug} returned {resp.status_code} (attempt {attempt})")
-            except Exception as e:
-                logger.warning(f"Webhook {event_type} to {partner.slug} failed (attempt {attempt}): {e}")
+class WebhookDeliveryService:
+    """Queues webhook events for partners; WebhookDispatcher delivers them."""
 
-            if attempt < WebhookDeliveryService.MAX_RETRIES:
-                await asyncio.sleep(5 ** attempt)  # 5s, 25s backoff
+    @staticmethod
+    def enqueue(db: Session, partner, event_type: str, payload: dict) -> Optional[str]:
+        """
+        Queue a webhook event in the caller's transaction. Returns the event
+        id, or None if the partner has webhooks off.
 
-        logger.error(f"Webhook {event_type} to {partner.slug} failed after {WebhookDeliveryService.MAX_RETRIES} attempts")
+        Note:
+            Does not commit - caller should commit in their transaction pattern.
+        """
+        if not partner.webhook_enabled or not partner.webhook_url:
+            return None
+        return webhook_dispatcher.enqueue(db, partner.id, event_type, payload)
 
     @staticmethod
     def build_session_resolved_payload(session_event, grant=None):
@@ -97,3 +114,354 @@ class WebhookDeliveryService:
                 "status": grant.status,
             }
         return payload
+
+
+@dataclass
+class _LaneBatch:
+    """A claimed run of events at the head of one partner's lane."""
+    partner_id: str
+    partner_slug: str
+    webhook_url: Optional[str]
+    webhook_secret: Optional[str]
+    ids: List[int]
+    event_ids: List[str]
+    event_type: str
+    body: str
+    attempts: int  # Attempts made on the head event before this one
+
+
+class WebhookDispatcher:
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.concurrency = concurrency or int(os.getenv("WEBHOOK_DISPATCH_CONCURRENCY", "16"))
+        self.max_attempts = max_attempts or int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+        self.poll_interval = (
+            poll_interval
+            if poll_interval is not None
+            else float(os.getenv("WEBHOOK_DISPATCH_POLL_SECONDS", "2.0"))
+        )
+        self.session_factory = session_factory
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_purge = 0.0
+        self.stats: Dict[str, int] = {"queued": 0, "delivered": 0, "failed_sends": 0, "dead_lettered": 0}
+
+    async def start(self):
+        """Start the dispatcher"""
+        if self.running:
+            logger.warning("Webhook dispatcher is already running")
+            return
+        self.running = True
+        self._wake = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self.task = asyncio.create_task(self._run())
+        logger.info("Webhook dispatcher started (concurrency=%d)", self.concurrency)
+
+    async def stop(self):
+        """Stop the dispatcher; unsent events stay queued"""
+        if not self.running:
+            return
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Webhook dispatcher stopped")
+
+    def notify(self) -> None:
+        """Wake the dispatcher after queued events were committed. Safe from any thread."""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    # ---- sync core (also used directly by tests) ---------------------------
+
+    def enqueue(self, db: Session, partner_id, event_type: str, payload: dict) -> str:
+        """Add an event to the partner's lane. Does not commit."""
+        event_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        body = json.dumps({
+            "event_id": event_id,
+            "event_type": event_type,
+            "partner_id": str(partner_id),
+            "occurred_at": now.isoformat() + "Z",
+            "data": payload,
+        }, default=str)
+        db.add(PartnerWebhookDelivery(
+            partner_id=str(partner_id), event_id=event_id, event_type=event_type, body=body,
+            status="pending", attempts=0, next_attempt_at=now, created_at=now,
+        ))
+        db.flush()
+        self.stats["queued"] += 1
+        PARTNER_WEBHOOK_QUEUE_DEPTH.inc()
+        return event_id
+
+    def due_lanes(self, db: Session, now: Optional[datetime] = None) -> List[str]:
+        """Partners with a pending event that is due."""
+        now = now or datetime.utcnow()
+        return [str(partner_id) for partner_id in db.scalars(
+            select(PartnerWebhookDelivery.partner_id)
+            .where(PartnerWebhookDelivery.status == "pending", PartnerWebhookDelivery.next_attempt_at <= now)
+            .group_by(PartnerWebhookDelivery.partner_id)
+        )]
+
+    def claim(self, db: Session, partner_id: str, now: Optional[datetime] = None) -> Optional[_LaneBatch]:
+        """
+        Lease the head of a partner's lane and return it with the events that
+        follow it (up to the partner's batch size). None if the head is not
+        due, already leased, or the lane is empty. Commits.
+        """
+        now = now or datetime.utcnow()
+        head = db.scalars(
+            select(PartnerWebhookDelivery)
+            .where(PartnerWebhookDelivery.partner_id == partner_id, PartnerWebhookDelivery.status == "pending")
+            .order_by(PartnerWebhookDelivery.id)
+            .limit(1)
+        ).first()
+        if head is None or head.next_attempt_at > now or (head.locked_until and head.locked_until > now):
+            db.rollback()
+            return None
+        claimed = db.execute(
+            update(PartnerWebhookDelivery)
+            .where(
+                PartnerWebhookDelivery.id == head.id,
+                PartnerWebhookDelivery.status == "pending",
+                or_(PartnerWebhookDelivery.locked_until.is_(None), PartnerWebhookDelivery.locked_until <= now),
+            )
+            .values(locked_until=now + timedelta(seconds=LANE_LEASE_SECONDS))
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        if not claimed:
+            db.rollback()
+            return None
+
+        partner = db.get(Partner, partner_id)
+        rows = [head]
+        batch_size = partner.webhook_batch_size if partner else 1
+        if batch_size > 1:
+            rows += db.scalars(
+                select(PartnerWebhookDelivery)
+                .where(
+                    PartnerWebhookDelivery.partner_id == partner_id,
+                    PartnerWebhookDelivery.status == "pending",
+                    PartnerWebhookDelivery.id > head.id,
+                )
+                .order_by(PartnerWebhookDelivery.id)
+                .limit(batch_size - 1)
+            ).all()
+        batch = _LaneBatch(
+            partner_id=partner_id,
+            partner_slug=partner.slug if partner else partner_id,
+            webhook_url=partner.webhook_url if partner and partner.webhook_enabled else None,
+            webhook_secret=partner.webhook_secret if partner else None,
+            ids=[row.id for row in rows],
+            event_ids=[row.event_id for row in rows],
+            event_type=head.event_type if len(rows) == 1 else "batch",
+            body=head.body if len(rows) == 1 else '{"events": [' + ", ".join(row.body for row in rows) + "]}",
+            attempts=head.attempts,
+        )
+        db.commit()
+        return batch
+
+    def record(
+        self,
+        db: Session,
+        batch: _LaneBatch,
+        status_code: Optional[int],
+        error: Optional[str],
+        now: Optional[datetime] = None,
+    ) -> str:
+        """
+        Apply a send's outcome to the batch's rows and commit. Returns
+        "delivered", "retrying" (the lane waits for the backoff) or
+        "dead_lettered" (the lane may move on).
+        """
+        now = now or datetime.utcnow()
+        rows = PartnerWebhookDelivery.id.in_(batch.ids)
+        attempts = batch.attempts + 1
+        if error is None and status_code is not None and status_code < 300:
+            db.execute(
+                update(PartnerWebhookDelivery).where(rows).values(
+                    status="delivered", delivered_at=now, attempts=PartnerWebhookDelivery.attempts + 1,
+                    last_status_code=status_code, last_error=None, locked_until=None,
+                ).execution_options(synchronize_session=False)
+            )
+            db.commit()
+            self.stats["delivered"] += len(batch.ids)
+            PARTNER_WEBHOOK_DELIVERED.labels(batch.partner_slug).inc(len(batch.ids))
+            PARTNER_WEBHOOK_QUEUE_DEPTH.dec(len(batch.ids))
+            return "delivered"
+
+        error = (error or f"HTTP {status_code}")[:1000]
+        final = attempts >= self.max_attempts
+        if final:
+            self._dead_letter(db, batch.ids, status_code, error, now)
+            self.stats["dead_lettered"] += len(batch.ids)
+            PARTNER_WEBHOOK_QUEUE_DEPTH.dec(len(batch.ids))
+            logger.error(
+                f"Webhook {batch.event_type} to {batch.partner_slug} dead-lettered after {attempts} attempts: {error}"
+            )
+        else:
+            delay = min(BACKOFF_BASE_SECONDS * BACKOFF_FACTOR ** (attempts - 1), BACKOFF_MAX_SECONDS)
+            delay *= 1 + 0.1 * random.random()
+            db.execute(
+                update(PartnerWebhookDelivery).where(rows).values(
+                    attempts=attempts, next_attempt_at=now + timedelta(seconds=delay),
+                    last_status_code=status_code, last_error=error, locked_until=None,
+                ).execution_options(synchronize_session=False)
+            )
+            logger.warning(
+                f"Webhook {batch.event_type} to {batch.partner_slug} failed (attempt {attempts}), "
+                f"retrying in {delay:.0f}s: {error}"
+            )
+        db.commit()
+        self.stats["failed_sends"] += 1
+        PARTNER_WEBHOOK_FAILURES.labels(batch.partner_slug, str(final).lower()).inc()
+        return "dead_lettered" if final else "retrying"
+
+    def _dead_letter(self, db: Session, ids: List[int], status_code: Optional[int], error: str, now: datetime) -> None:
+        rows = db.scalars(select(PartnerWebhookDelivery).where(PartnerWebhookDelivery.id.in_(ids))).all()
+        db.execute(insert(PartnerWebhookDeadLetter), [
+            {
+                "partner_id": row.partner_id, "event_id": row.event_id, "event_type": row.event_type,
+                "body": row.body, "attempts": row.attempts + 1, "last_status_code": status_code,
+                "last_error": error, "created_at": row.created_at, "failed_at": now,
+            }
+            for row in rows
+        ])
+        for row in rows:
+            db.delete(row)
+
+    def replay_dead_letters(self, db: Session, partner_id, ids: Optional[List[int]] = None) -> int:
+        """
+        Re-queue a partner's unreplayed dead letters (or just ids) at the end
+        of its lane, keeping their event ids. Does not commit.
+        """
+        query = select(PartnerWebhookDeadLetter).where(
+            PartnerWebhookDeadLetter.partner_id == str(partner_id),
+            PartnerWebhookDeadLetter.replayed_at.is_(None),
+        ).order_by(PartnerWebhookDeadLetter.id)
+        if ids is not None:
+            query = query.where(PartnerWebhookDeadLetter.id.in_(ids))
+        now = datetime.utcnow()
+        letters = db.scalars(query).all()
+        for letter in letters:
+            db.add(PartnerWebhookDelivery(
+                partner_id=letter.partner_id, event_id=letter.event_id, event_type=letter.event_type,
+                body=letter.body, status="pending", attempts=0, next_attempt_at=now, created_at=now,
+            ))
+            letter.replayed_at = now
+        db.flush()
+        PARTNER_WEBHOOK_QUEUE_DEPTH.inc(len(letters))
+        return len(letters)
+
+    def purge_delivered(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Delete delivered rows older than the retention period and commit."""
+        cutoff = (now or datetime.utcnow()) - DELIVERED_RETENTION
+        deleted = db.query(PartnerWebhookDelivery).filter(
+            PartnerWebhookDelivery.status == "delivered", PartnerWebhookDelivery.delivered_at < cutoff,
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def refresh_depth(self, db: Session) -> int:
+        """Re-sync the queue depth gauge from the table (e.g. after a restart)."""
+        depth = db.scalar(
+            select(func.count()).select_from(PartnerWebhookDelivery).where(PartnerWebhookDelivery.status == "pending")
+        ) or 0
+        PARTNER_WEBHOOK_QUEUE_DEPTH.set(depth)
+        return depth
+
+    # ---- dispatch ----------------------------------------------------------
+
+    def _in_session(self, fn, *args):
+        db = self.session_factory()
+        try:
+            return fn(db, *args)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def send(self, batch: _LaneBatch) -> Tuple[Optional[int], Optional[str]]:
+        """POST a claimed batch. Returns (status code, error)."""
+        if not batch.webhook_url:
+            return None, "webhooks disabled for partner"
+        signature = ""
+        if batch.webhook_secret:
+            signature = hmac.new(batch.webhook_secret.encode(), batch.body.encode(), hashlib.sha256).hexdigest()
+        headers = {
+            "Content-Type": "application/json",
+            "X-Nerava-Event": batch.event_type,
+            "X-Nerava-Signature": f"sha256={signature}",
+            "X-Nerava-Event-Id": ",".join(batch.event_ids),
+        }
+        start = time.perf_counter()
+        try:
+            async with http_clients.client("webhooks") as client:
+                resp = await client.post(batch.webhook_url, content=batch.body, headers=headers)
+            return resp.status_code, None
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+        finally:
+            PARTNER_WEBHOOK_LATENCY.labels(batch.partner_slug).observe(time.perf_counter() - start)
+
+    async def _run_lane(self, partner_id: str) -> int:
+        """Deliver a lane in order until it is empty, not yet due, or its head backs off."""
+        delivered = 0
+        while True:
+            batch = await asyncio.to_thread(self._in_session, self.claim, partner_id)
+            if batch is None:
+                return delivered
+            status_code, error = await self.send(batch)
+            outcome = await asyncio.to_thread(self._in_session, self.record, batch, status_code, error)
+            if outcome == "retrying":
+                return delivered
+            if outcome == "delivered":
+                delivered += len(batch.ids)
+
+    async def dispatch_due(self) -> int:
+        """Deliver every due lane, up to ``concurrency`` lanes at once. Returns events delivered."""
+        lanes = await asyncio.to_thread(self._in_session, self.due_lanes)
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def run(partner_id: str) -> int:
+            async with limit:
+                try:
+                    return await self._run_lane(partner_id)
+                except Exception as e:
+                    logger.error(f"Error delivering webhooks for partner {partner_id}: {e}")
+                    return 0
+
+        return sum(await asyncio.gather(*(run(partner_id) for partner_id in lanes)))
+
+    async def _run(self):
+        await asyncio.to_thread(self._in_session, self.refresh_depth)
+        while self.running:
+            try:
+                await self.dispatch_due()
+                if time.monotonic() - self._last_purge > 3600:
+                    await asyncio.to_thread(self._in_session, self.purge_delivered)
+                    self._last_purge = time.monotonic()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in webhook dispatcher: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+# Global webhook dispatcher
+webhook_dispatcher = WebhookDispatcher()
@@ -1,8 +1,16 @@
 """
-Background worker that collects charger availability from TomTom every 5 minutes.
-
-Runs as an asyncio task inside the FastAPI process. Lightweight: ~10 API calls per cycle.
-Stores snapshots in charger_availability_snapshots for historical pattern analysis.
+Background worker that collects charger availability from TomTom every 15 minutes.
+
+Runs as an asyncio task inside the FastAPI process. The monitored stations
+are the active rows of monitored_stations; each cycle fetches them
+concurrently through the shared pooled TomTom client, capped so a day of
+cycles stays within TOMTOM_DAILY_QUOTA (stations beyond the cap are rotated
+through over successive cycles).
+
+Stores snapshots in charger_availability_snapshots, keyed by the station's
+linked charger (its station_id until it has one), for historical pattern
+analysis, in one bulk insert per cycle, and folds them into the hour-of-week
+occupancy totals (see services/charger_occupancy.py).
 """
 import asyncio
 import logging
@@ -11,54 +19,55 @@ import uuid
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
+from sqlalchemy import insert
+
+from app.services.http_clients import http_clients
+
 logger = logging.getLogger(__name__)
 
 TOMTOM_API_KEY = os.getenv("TOMTOM_API_KEY", "")
-POLL_INTERVAL_SECONDS = 900  # 15 minutes (25 stations × 96 polls/day = 2,400 < 2,500 free tier)
+POLL_INTERVAL_SECONDS = 900  # 15 minutes
+TOMTOM_DAILY_QUOTA = int(os.getenv("TOMTOM_DAILY_QUOTA", "2500"))  # Free tier
+FETCH_CONCURRENCY = int(os.getenv("AVAILABILITY_FETCH_CONCURRENCY", "5"))
 FIELD_ALERT_THRESHOLD_PCT = 60  # Alert when occupancy exceeds this %
 BUSINESS_HOURS = (7, 21)  # 7am-9pm local time for alerts
 
-# Monitored stations across all regions
-MONITORED_STATIONS: List[Dict[str, str]] = [
-    # ── Austin Domain area ──
-    {"charger_id": "tomtom_domain_1", "name": "ChargePoint @ 11505 Domain Dr", "avail_id": "a70292d8-fde5-41eb-b9c0-61829cda02c0", "region": "austin"},
-    {"charger_id": "tomtom_domain_2", "name": "ChargePoint @ 11811 Domain Dr", "avail_id": "3b359414-28af-48c6-9554-29bd34aee61c", "region": "austin"},
-    {"charger_id": "tomtom_domain_3", "name": "ChargePoint @ 11600 Alterra Pkwy", "avail_id": "b0c3386d-89ba-4b46-95a8-58b0f6a44b44", "region": "austin"},
-    {"charger_id": "tomtom_domain_4", "name": "ChargePoint @ 3004 Palm Way (A)", "avail_id": "623d43b7-7768-4739-add0-4f9f859fbff7", "region": "austin"},
-    {"charger_id": "tomtom_domain_5", "name": "ChargePoint @ 3004 Palm Way (B)", "avail_id": "1283fbc0-6385-4b8b-8432-7ba103a7e5cf", "region": "austin"},
-    {"charger_id": "tomtom_domain_6", "name": "ChargePoint @ 3000 Kramer Ln", "avail_id": "b1e3f371-8538-4839-b940-d50673105ba4", "region": "austin"},
-    {"charger_id": "tomtom_domain_7", "name": "ChargePoint @ 11500 N MoPac", "avail_id": "edfce375-5a14-4943-ac46-32c582963b3b", "region": "austin"},
-    {"charger_id": "tomtom_domain_8", "name": "ChargePoint @ 11800 Alterra Pkwy", "avail_id": "3c75c68f-934b-40fa-926b-98d699cd7c47", "region": "austin"},
-    {"charger_id": "tomtom_domain_9", "name": "ChargePoint @ 11920 Domain Dr", "avail_id": "91e497ef-bbb5-476b-885f-2d220ee9e4de", "region": "austin"},
-    {"charger_id": "tomtom_domain_10", "name": "ChargePoint @ Domain Dr", "avail_id": "3f909562-f9b1-4377-890d-92265c55442c", "region": "austin"},
-    # ── Katy TX area (field activation target) ──
-    {"charger_id": "tomtom_katy_1", "name": "ChargePoint @ 23005 Katy Fwy", "avail_id": "2995cd98-7c1d-4076-a6ff-2a67408aac4c", "region": "katy"},
-    {"charger_id": "tomtom_katy_2", "name": "ChargePoint @ 23414 W Fernhurst Dr", "avail_id": "2fc1a596-24a1-4150-8aa4-c8ba12ac6fd9", "region": "katy"},
-    {"charger_id": "tomtom_katy_3", "name": "Premier at Katy @ Bella Dolce Ln", "avail_id": "dd0e0b0d-644e-4c7f-a4d1-d68534ef75b0", "region": "katy"},
-    {"charger_id": "tomtom_katy_4", "name": "Memorial Hermann Katy Hospital", "avail_id": "d0c82ee8-8f00-4bc4-af80-591eda5cfa41", "region": "katy"},
-    {"charger_id": "tomtom_katy_5", "name": "ChargePoint @ 107 New Hope Ln", "avail_id": "3d0ab5c6-a827-8878-98f2-a6bddc62d1e8", "region": "katy"},
-    {"charger_id": "tomtom_katy_6", "name": "ChargePoint @ 1330 Park West Green Dr", "avail_id": "40733c29-cf08-4251-8e10-efdd127b74c9", "region": "katy"},
-    {"charger_id": "tomtom_katy_7", "name": "ChargePoint @ 21001 Katy Fwy", "avail_id": "6a500a27-638f-4f91-8e4c-cf1758700f70", "region": "katy"},
-    {"charger_id": "tomtom_katy_8", "name": "Vineyard Apts REVS @ Provincial Blvd", "avail_id": "97e8ad5a-7e2a-41a1-9be9-d959d316383a", "region": "katy"},
-    {"charger_id": "tomtom_katy_9", "name": "ChargePoint @ 24932 Katy Ranch Rd", "avail_id": "1f3eb99d-899c-8d17-aaa8-e15541749770", "region": "katy"},
-    {"charger_id": "tomtom_katy_10", "name": "Seacrest Apts @ Provincial Blvd", "avail_id": "14f75fda-0d64-816d-bb9b-74f24ac036a9", "region": "katy"},
-    # ── Austin Downtown (diverse networks) ──
-    {"charger_id": "tomtom_atx_downtown_1", "name": "301 E 8th St (non-CP)", "avail_id": "2fea4e5e-0755-8f50-811b-eb1db2e893fa", "region": "austin_downtown"},
-    {"charger_id": "tomtom_atx_downtown_2", "name": "ChargePoint @ 701 Brazos St", "avail_id": "0d9640e0-9698-47ca-84f3-bb91f4fd1271", "region": "austin_downtown"},
-    {"charger_id": "tomtom_atx_downtown_3", "name": "ChargePoint @ 710 Trinity St", "avail_id": "593c807e-a046-4221-8935-86993c46a4ae", "region": "austin_downtown"},
-    {"charger_id": "tomtom_atx_downtown_4", "name": "ChargePoint @ 205 E 7th St", "avail_id": "8d059a15-9e93-445a-82a4-32bf3fc07cf0", "region": "austin_downtown"},
-    {"charger_id": "tomtom_atx_downtown_5", "name": "ChargePoint @ 515 Congress Ave", "avail_id": "69a49afb-8aa5-4a7b-bb88-7fca6f762dbe", "region": "austin_downtown"},
-]
+# Where the next cycle starts in the station list when it is over the per-cycle cap
+_rotation = 0
+
+
+def _per_cycle_cap() -> int:
+    """Stations one cycle may fetch without a day of cycles exceeding the quota."""
+    return max(1, TOMTOM_DAILY_QUOTA * POLL_INTERVAL_SECONDS // 86400)
+
+
+def _load_stations(db) -> List[Dict[str, str]]:
+    """Active monitored stations, rotated and capped to this cycle's share of the quota."""
+    global _rotation
+    from app.models.charger_availability import MonitoredStation
+
+    stations = [
+        {"charger_id": s.charger_id or s.station_id, "name": s.name, "avail_id": s.tomtom_availability_id,
+         "region": s.region}
+        for s in db.query(MonitoredStation)
+        .filter(MonitoredStation.is_active == True)
+        .order_by(MonitoredStation.station_id)
+        .all()
+    ]
+    cap = _per_cycle_cap()
+    if len(stations) <= cap:
+        return stations
+    start = _rotation % len(stations)
+    _rotation = start + cap
+    return (stations[start:] + stations[:start])[:cap]
 
 
 async def _fetch_availability(avail_id: str) -> Optional[Dict[str, Any]]:
     """Fetch availability from TomTom for a single station."""
-    import httpx
-
-    url = f"https://api.tomtom.com/search/2/chargingAvailability.json?chargingAvailability={avail_id}&key={TOMTOM_API_KEY}"
+    url = "https://api.tomtom.com/search/2/chargingAvailability.json"
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url)
+        async with http_clients.client("tomtom") as client:
+            resp = await client.get(url, params={"chargingAvailability": avail_id, "key": TOMTOM_API_KEY})
             if resp.status_code == 200:
                 return resp.json()
             logger.warning(f"[AvailCollector] TomTom returned {resp.status_code} for {avail_id}")
@@ -108,40 +117,49 @@ def _parse_availability(data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-async def _collect_once():
+async def _collect_once(session_factory=None):
     """Run one collection cycle for all monitored stations."""
     from app.db import SessionLocal
     from app.models.charger_availability import ChargerAvailabilitySnapshot
+    from app.services.charger_occupancy import accumulate_hour_of_week
 
     if not TOMTOM_API_KEY:
         logger.warning("[AvailCollector] TOMTOM_API_KEY not set, skipping collection")
-        return
+        return 0
 
-    db = SessionLocal()
-    collected = 0
+    db = (session_factory or SessionLocal)()
     try:
-        for station in MONITORED_STATIONS:
-            data = await _fetch_availability(station["avail_id"])
+        stations = _load_stations(db)
+        db.rollback()  # Don't hold the read transaction across the fetches
+
+        limit = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        async def fetch(station: Dict[str, str]) -> Optional[Dict[str, Any]]:
+            async with limit:
+                return await _fetch_availability(station["avail_id"])
+
+        results = await asyncio.gather(*(fetch(station) for station in stations))
+
+        snapshots = []
+        for station, data in zip(stations, results):
             if not data:
                 continue
 
             parsed = _parse_availability(data)
-            snapshot = ChargerAvailabilitySnapshot(
-                id=str(uuid.uuid4()),
-                charger_id=station["charger_id"],
-                tomtom_availability_id=station["avail_id"],
-                source="tomtom",
-                total_ports=parsed["total_ports"],
-                available_ports=parsed["available_ports"],
-                occupied_ports=parsed["occupied_ports"],
-                out_of_service_ports=parsed["out_of_service_ports"],
-                connector_details=parsed["connector_details"],
-                recorded_at=datetime.utcnow(),
-            )
-            db.add(snapshot)
-            collected += 1
-
-            # Task 2-4: Field alert threshold check
+            snapshots.append({
+                "id": str(uuid.uuid4()),
+                "charger_id": station["charger_id"],
+                "tomtom_availability_id": station["avail_id"],
+                "source": "tomtom",
+                "total_ports": parsed["total_ports"],
+                "available_ports": parsed["available_ports"],
+                "occupied_ports": parsed["occupied_ports"],
+                "out_of_service_ports": parsed["out_of_service_ports"],
+                "connector_details": parsed["connector_details"],
+                "recorded_at": datetime.utcnow(),
+            })
+
+            # Task 2-4: Field alert threshold check (before this cycle's snapshots are written)
             total = parsed["total_ports"]
             occupied = parsed["occupied_ports"]
             if total > 0:
@@ -154,8 +172,12 @@ async def _collect_once():
                 if occupancy_pct >= FIELD_ALERT_THRESHOLD_PCT and is_business:
                     _log_field_alert(db, station, occupancy_pct, total, occupied)
 
+        if snapshots:
+            db.execute(insert(ChargerAvailabilitySnapshot), snapshots)
+            accumulate_hour_of_week(db, snapshots)
         db.commit()
-        logger.info(f"[AvailCollector] Collected {collected}/{len(MONITORED_STATIONS)} stations")
+        logger.info(f"[AvailCollector] Collected {len(snapshots)}/{len(stations)} stations")
+        return len(snapshots)
     except Exception as e:
         db.rollback()
         logger.error(f"[AvailCollector] Collection failed: {e}")
@@ -193,8 +215,10 @@ def _log_field_alert(db, station: Dict[str, str], occupancy_pct: float, total: i
 
 
 async def run_collector():
-    """Main loop: collect availability every 3 minutes."""
-    logger.info(f"[AvailCollector] Starting — monitoring {len(MONITORED_STATIONS)} stations every {POLL_INTERVAL_SECONDS}s")
+    """Main loop: collect availability every POLL_INTERVAL_SECONDS."""
+    logger.info(
+        f"[AvailCollector] Starting — up to {_per_cycle_cap()} monitored stations every {POLL_INTERVAL_SECONDS}s"
+    )
     while True:
         try:
             await _collect_once()
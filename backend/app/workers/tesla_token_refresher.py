@@ -0,0 +1,184 @@
+"""
+Tesla Token Refresher — renews access tokens before request paths need to.
+
+Every interval, finds active Tesla connections whose access token expires
+within the look-ahead window and refreshes them through
+get_valid_access_token, so the same lease that coalesces foreground
+refreshes also keeps this worker from racing them. Foreground callers only
+refresh inside the last 5 minutes, which this worker normally pre-empts.
+
+Only connections in use are kept warm: telemetry-enabled ones, and those
+used or with a charging session in the last TESLA_TOKEN_REFRESH_ACTIVE_DAYS.
+
+Connections whose refresh fails are skipped for exponentially longer (from
+one interval up to TESLA_TOKEN_REFRESH_BACKOFF_MAX_SECONDS), and tokens not
+yet expired are refreshed before already-expired ones, so connections that
+keep failing can't fill every batch.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import case, exists, or_, select
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models.session_event import SessionEvent
+from app.models.tesla_connection import TeslaConnection
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+
+
+class TeslaTokenRefresher:
+    """Background worker that refreshes Tesla tokens ahead of expiry"""
+
+    def __init__(
+        self,
+        interval_seconds: Optional[int] = None,
+        ahead_seconds: Optional[int] = None,
+        concurrency: int = 4,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.interval_seconds = (
+            interval_seconds if interval_seconds is not None
+            else int(os.getenv("TESLA_TOKEN_REFRESH_INTERVAL_SECONDS", "120"))
+        )
+        self.ahead_seconds = (
+            ahead_seconds if ahead_seconds is not None
+            else int(os.getenv("TESLA_TOKEN_REFRESH_AHEAD_SECONDS", "900"))
+        )
+        self.active_days = int(os.getenv("TESLA_TOKEN_REFRESH_ACTIVE_DAYS", "7"))
+        self.backoff_max_seconds = int(os.getenv("TESLA_TOKEN_REFRESH_BACKOFF_MAX_SECONDS", "21600"))
+        self.concurrency = concurrency
+        self.session_factory = session_factory
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"runs": 0, "refreshed": 0, "failed": 0}
+        # connection id -> (consecutive failures, don't retry before)
+        self._failures: Dict[str, tuple] = {}
+
+    async def start(self):
+        """Start the refresher"""
+        if self.running:
+            logger.warning("Tesla token refresher is already running")
+            return
+        self.running = True
+        self.task = asyncio.create_task(self._run())
+        logger.info(
+            "Tesla token refresher started (interval=%ds, ahead=%ds)", self.interval_seconds, self.ahead_seconds
+        )
+
+    async def stop(self):
+        """Stop the refresher"""
+        if not self.running:
+            return
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Tesla token refresher stopped")
+
+    async def _run(self):
+        while self.running:
+            try:
+                await self.refresh_due()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in Tesla token refresher: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def due_connection_ids(self, db: Session, now: Optional[datetime] = None) -> List[str]:
+        """
+        Active connections whose access token expires within the look-ahead
+        window: upcoming expiries soonest first, then already-expired ones.
+        Connections backing off after a failed refresh are left out.
+        """
+        now = now or datetime.utcnow()
+        since = now - timedelta(days=self.active_days)
+        recent_session = exists().where(
+            SessionEvent.driver_user_id == TeslaConnection.user_id,
+            SessionEvent.session_start >= since,
+        )
+        backing_off = [cid for cid, (_, retry_at) in self._failures.items() if retry_at > now]
+        query = (
+            select(TeslaConnection.id)
+            .where(
+                TeslaConnection.is_active.is_(True),
+                TeslaConnection.token_expires_at < now + timedelta(seconds=self.ahead_seconds),
+                or_(
+                    TeslaConnection.telemetry_enabled.is_(True),
+                    TeslaConnection.last_used_at >= since,
+                    recent_session,
+                ),
+            )
+            .order_by(
+                case((TeslaConnection.token_expires_at >= now, 0), else_=1),
+                TeslaConnection.token_expires_at,
+            )
+            .limit(BATCH_SIZE)
+        )
+        if backing_off:
+            query = query.where(TeslaConnection.id.notin_(backing_off))
+        return list(db.scalars(query))
+
+    async def refresh_due(self) -> int:
+        """Refresh every due connection. Returns how many now hold a fresh token."""
+        db = self.session_factory()
+        try:
+            connection_ids = self.due_connection_ids(db)
+        finally:
+            db.close()
+
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(connection_id: str) -> bool:
+            async with limit:
+                return await self._refresh_one(connection_id)
+
+        results = await asyncio.gather(*(refresh(cid) for cid in connection_ids))
+        now = datetime.utcnow()
+        for connection_id, ok in zip(connection_ids, results):
+            if ok:
+                self._failures.pop(connection_id, None)
+            else:
+                failures = self._failures.get(connection_id, (0, now))[0] + 1
+                delay = min(self.interval_seconds * 2 ** (failures - 1), self.backoff_max_seconds)
+                self._failures[connection_id] = (failures, now + timedelta(seconds=delay))
+        refreshed = sum(results)
+        self.stats["runs"] += 1
+        self.stats["refreshed"] += refreshed
+        self.stats["failed"] += len(results) - refreshed
+        if connection_ids:
+            logger.info("Tesla token refresher: %d/%d connections refreshed", refreshed, len(connection_ids))
+        return refreshed
+
+    async def _refresh_one(self, connection_id: str) -> bool:
+        from app.services.tesla_oauth import get_tesla_oauth_service, get_valid_access_token
+
+        db = self.session_factory()
+        try:
+            connection = db.get(TeslaConnection, connection_id)
+            if connection is None or not connection.is_active:
+                return False
+            token = await get_valid_access_token(
+                db, connection, get_tesla_oauth_service(),
+                refresh_margin=timedelta(seconds=self.ahead_seconds),
+            )
+            return token is not None
+        except Exception as e:
+            logger.warning(f"Proactive Tesla token refresh failed for connection {connection_id}: {e}")
+            return False
+        finally:
+            db.close()
+
+
+# Global refresher instance
+tesla_token_refresher = TeslaTokenRefresher()
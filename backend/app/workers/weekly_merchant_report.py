@@ -2,23 +2,203 @@
 Weekly Merchant Report Worker
 
 Sends weekly email reports to claimed merchants every Monday at 8am CT.
+
+Report data for every merchant comes from a handful of grouped queries
+(merchants + owner emails, chargers, per-charger session counts); the
+merchant -> nearby chargers mapping is built once per run with an in-memory
+grid index. Emails are rendered and sent concurrently (bounded by
+WEEKLY_REPORT_SEND_CONCURRENCY), each in its own short DB transactions.
+
+Runs are checkpointed in ``weekly_report_runs`` / ``weekly_report_deliveries``:
+a run that crashes (or a restart during Monday) resumes with the same stats
+window and skips merchants already sent.
 """
 import asyncio
 import logging
+import os
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-import pytz
+from typing import Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models import User
+from app.models.domain import DomainMerchant
+from app.models.session_event import SessionEvent
+from app.models.weekly_report import WeeklyReportDelivery, WeeklyReportRun
+from app.models.while_you_charge import Charger
+from app.services.geo import GridIndex, bounding_box
 
 logger = logging.getLogger(__name__)
 
-CT_TZ = pytz.timezone("America/Chicago")
+CT_TZ = ZoneInfo("America/Chicago")
 CHECK_INTERVAL = 3600  # Check every hour
+NEARBY_RADIUS_M = 500
+PORTAL_URL = "https://merchant.nerava.network/insights"
+CHARGER_ID_CHUNK = 1000
+# A delivery left in "sending" this long (crashed mid-send) may be retried
+STALE_CLAIM = timedelta(minutes=15)
+
+
+@dataclass
+class MerchantReport:
+    merchant_id: str
+    merchant_name: str
+    email: str
+    this_total: int
+    last_total: int
+
+
+def week_key(now_ct: datetime) -> str:
+    iso_year, iso_week, _ = now_ct.isocalendar()
+    return f"{iso_year}-W{iso_week:02d}"
+
+
+def build_reports(db, window_end: datetime, exclude_merchant_ids=()) -> List[MerchantReport]:
+    """
+    Report data for every active merchant with an owner email and at least
+    one charger within NEARBY_RADIUS_M, in three queries plus one per
+    CHARGER_ID_CHUNK nearby chargers.
+    """
+    week_start = window_end - timedelta(days=7)
+    prev_week_start = window_end - timedelta(days=14)
+    excluded = set(exclude_merchant_ids)
+
+    merchants = [
+        row for row in (
+            db.query(DomainMerchant.id, DomainMerchant.name, DomainMerchant.lat, DomainMerchant.lng, User.email)
+            .join(User, User.id == DomainMerchant.owner_user_id)
+            .filter(DomainMerchant.status == "active", User.email.isnot(None), User.email != "")
+            .all()
+        )
+        if str(row.id) not in excluded
+    ]
+    if not merchants:
+        return []
+
+    # Chargers near any merchant, indexed once for the whole run
+    boxes = [bounding_box(m.lat, m.lng, NEARBY_RADIUS_M) for m in merchants]
+    south, north = min(b[0] for b in boxes), max(b[1] for b in boxes)
+    west, east = min(b[2] for b in boxes), max(b[3] for b in boxes)
+    grid = GridIndex()
+    for charger_id, lat, lng in (
+        db.query(Charger.id, Charger.lat, Charger.lng)
+        .filter(Charger.lat.between(south, north), Charger.lng.between(west, east))
+    ):
+        grid.add(charger_id, lat, lng)
+
+    nearby: Dict[str, List[str]] = {}
+    for m in merchants:
+        charger_ids = [charger_id for charger_id, _ in grid.within(m.lat, m.lng, NEARBY_RADIUS_M)]
+        if charger_ids:
+            nearby[str(m.id)] = charger_ids
+    if not nearby:
+        return []
+
+    # Completed sessions per charger for this week and last week
+    all_charger_ids = sorted({cid for ids in nearby.values() for cid in ids})
+    counts: Dict[str, tuple] = {}
+    for i in range(0, len(all_charger_ids), CHARGER_ID_CHUNK):
+        chunk = all_charger_ids[i:i + CHARGER_ID_CHUNK]
+        rows = (
+            db.query(
+                SessionEvent.charger_id,
+                func.sum(case((SessionEvent.session_start >= week_start, 1), else_=0)),
+                func.sum(case((SessionEvent.session_start < week_start, 1), else_=0)),
+            )
+            .filter(
+                SessionEvent.charger_id.in_(chunk),
+                SessionEvent.session_start >= prev_week_start,
+                SessionEvent.session_start < window_end,
+                SessionEvent.session_end.isnot(None),
+            )
+            .group_by(SessionEvent.charger_id)
+            .all()
+        )
+        counts.update({charger_id: (int(this or 0), int(last or 0)) for charger_id, this, last in rows})
+
+    reports = []
+    for m in merchants:
+        charger_ids = nearby.get(str(m.id))
+        if not charger_ids:
+            continue
+        reports.append(MerchantReport(
+            merchant_id=str(m.id),
+            merchant_name=m.name,
+            email=m.email,
+            this_total=sum(counts.get(cid, (0, 0))[0] for cid in charger_ids),
+            last_total=sum(counts.get(cid, (0, 0))[1] for cid in charger_ids),
+        ))
+    return reports
+
+
+def render_report(report: MerchantReport) -> Dict[str, str]:
+    """Subject, plain-text and HTML bodies for one merchant's report."""
+    this_total = report.this_total
+    change = this_total - report.last_total
+    change_str = f"+{change}" if change >= 0 else str(change)
+    avg_per_day = round(this_total / 7, 1) if this_total else 0
+
+    html = f"""
+    <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 600px; margin: 0 auto;">
+        <div style="background: #0a0a0a; padding: 24px; border-radius: 12px 12px 0 0;">
+            <h1 style="color: white; margin: 0; font-size: 20px;">Nerava Weekly Report</h1>
+            <p style="color: #a3a3a3; margin: 4px 0 0;">for {report.merchant_name}</p>
+        </div>
+        <div style="padding: 24px; border: 1px solid #e5e5e5; border-top: none; border-radius: 0 0 12px 12px;">
+            <h2 style="font-size: 16px; color: #171717; margin-bottom: 16px;">This Week's Highlights</h2>
+            <table style="width: 100%; border-collapse: collapse;">
+                <tr>
+                    <td style="padding: 12px; background: #f5f5f5; border-radius: 8px; text-align: center; width: 50%;">
+                        <div style="font-size: 28px; font-weight: 700; color: #171717;">{this_total}</div>
+                        <div style="font-size: 13px; color: #737373;">EV Sessions</div>
+                    </td>
+                    <td style="width: 12px;"></td>
+                    <td style="padding: 12px; background: #f5f5f5; border-radius: 8px; text-align: center; width: 50%;">
+                        <div style="font-size: 28px; font-weight: 700; color: #171717;">{avg_per_day}</div>
+                        <div style="font-size: 13px; color: #737373;">Avg / Day</div>
+                    </td>
+                </tr>
+            </table>
+            <p style="margin-top: 16px; font-size: 14px; color: #525252;">
+                {change_str} vs last week
+            </p>
+            <a href="{PORTAL_URL}" style="display: block; text-align: center; background: #171717; color: white; padding: 12px; border-radius: 8px; text-decoration: none; font-weight: 500; margin-top: 24px;">
+                View your dashboard
+            </a>
+        </div>
+    </div>
+    """
+    text = (
+        f"Nerava Weekly Report for {report.merchant_name}\n\n"
+        f"EV sessions this week: {this_total} ({change_str} vs last week)\n"
+        f"Average per day: {avg_per_day}\n\n"
+        f"View your dashboard: {PORTAL_URL}\n"
+    )
+    return {
+        "subject": f"Your Nerava Weekly Report — {this_total} EV sessions",
+        "body_text": text,
+        "body_html": html,
+    }
 
 
 class WeeklyMerchantReportWorker:
-    def __init__(self):
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        max_attempts: int = 3,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
         self._task: asyncio.Task | None = None
         self._running = False
-        self._last_sent_week: int | None = None
+        self._last_sent_week: str | None = None
+        self.concurrency = concurrency or int(os.getenv("WEEKLY_REPORT_SEND_CONCURRENCY", "8"))
+        self.max_attempts = max_attempts
+        self.session_factory = session_factory
 
     async def start(self):
         self._running = True
@@ -46,155 +226,169 @@ class WeeklyMerchantReportWorker:
                 logger.error(f"Weekly report worker error: {e}", exc_info=True)
 
     async def _check_and_send(self):
-        """Check if it's Monday 8am CT and send reports if not already sent this week."""
+        """Send (or resume) this week's reports on Monday from 8am CT."""
         now_ct = datetime.now(CT_TZ)
 
-        # Only send on Monday, hour 8
-        if now_ct.weekday() != 0 or now_ct.hour != 8:
+        # Only send on Monday, from hour 8 (later hours resume an interrupted run)
+        if now_ct.weekday() != 0 or now_ct.hour < 8:
             return
 
-        iso_week = now_ct.isocalendar()[1]
-        if self._last_sent_week == iso_week:
+        key = week_key(now_ct)
+        if self._last_sent_week == key:
             return
 
         logger.info("Sending weekly merchant reports...")
-        self._last_sent_week = iso_week
-
         try:
-            await self._send_all_reports()
+            if await self._send_all_reports(key):
+                self._last_sent_week = key
         except Exception as e:
             logger.error(f"Failed to send weekly reports: {e}", exc_info=True)
 
-    async def _send_all_reports(self):
-        """Query all claimed merchants and send individual reports."""
-        from app.db import SessionLocal
-        from app.models.domain import DomainMerchant
-        from app.models import User
-        from app.models.session_event import SessionEvent
-        from app.models.while_you_charge import Charger
-        from app.core.email_sender import get_email_sender
-        from sqlalchemy import func, and_
-        from math import radians, sin, cos, asin, sqrt
+    # ---- checkpoints (each in its own short transaction) ------------------
 
-        db = SessionLocal()
+    def _start_run(self, key: str, now: datetime) -> Optional[WeeklyReportRun]:
+        """Create or load the run; None if it already completed."""
+        db = self.session_factory()
         try:
-            # Get all active merchants with owners
-            merchants = (
-                db.query(DomainMerchant)
-                .filter(
-                    DomainMerchant.status == "active",
-                    DomainMerchant.owner_user_id.isnot(None),
-                )
-                .all()
-            )
+            run = db.get(WeeklyReportRun, key)
+            if run is None:
+                run = WeeklyReportRun(week_key=key, window_end=now, started_at=now)
+                db.add(run)
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Another process started it first
+                    db.rollback()
+                    run = db.get(WeeklyReportRun, key)
+            if run.completed_at is not None:
+                return None
+            db.expunge(run)
+            return run
+        finally:
+            db.close()
 
-            if not merchants:
-                logger.info("No active merchants to report on")
-                return
+    def _load_reports(self, key: str, window_end: datetime) -> List[MerchantReport]:
+        db = self.session_factory()
+        try:
+            sent = [
+                merchant_id for (merchant_id,) in db.query(WeeklyReportDelivery.merchant_id).filter(
+                    WeeklyReportDelivery.week_key == key,
+                    WeeklyReportDelivery.status == "sent",
+                )
+            ]
+            return build_reports(db, window_end, exclude_merchant_ids=sent)
+        finally:
+            db.close()
 
-            email_sender = get_email_sender()
-            now = datetime.utcnow()
-            week_start = now - timedelta(days=7)
-            prev_week_start = now - timedelta(days=14)
+    def _claim(self, key: str, merchant_id: str) -> bool:
+        """Take the delivery for this merchant unless another worker has it or it is done."""
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            db.add(WeeklyReportDelivery(
+                week_key=key, merchant_id=merchant_id, status="sending", attempts=1, claimed_at=now,
+            ))
+            try:
+                db.commit()
+                return True
+            except IntegrityError:
+                db.rollback()
+            retry = (
+                ((WeeklyReportDelivery.status == "failed") & (WeeklyReportDelivery.attempts < self.max_attempts))
+                | ((WeeklyReportDelivery.status == "sending") & (WeeklyReportDelivery.claimed_at < now - STALE_CLAIM))
+            )
+            result = db.execute(
+                update(WeeklyReportDelivery)
+                .where(
+                    WeeklyReportDelivery.week_key == key,
+                    WeeklyReportDelivery.merchant_id == merchant_id,
+                    retry,
+                )
+                .values(status="sending", attempts=WeeklyReportDelivery.attempts + 1, claimed_at=now)
+            )
+            db.commit()
+            return result.rowcount == 1
+        finally:
+            db.close()
 
-            for merchant in merchants:
-                try:
-                    owner = db.query(User).filter(User.id == merchant.owner_user_id).first()
-                    if not owner or not getattr(owner, "email", None):
-                        continue
-
-                    # Find nearby chargers
-                    delta = 0.006
-                    chargers = db.query(Charger.id, Charger.lat, Charger.lng).filter(
-                        Charger.lat.between(merchant.lat - delta, merchant.lat + delta),
-                        Charger.lng.between(merchant.lng - delta, merchant.lng + delta),
-                    ).all()
-
-                    R = 6371000.0
-                    nearby_ids = []
-                    for cid, clat, clng in chargers:
-                        dlat = radians(clat - merchant.lat)
-                        dlon = radians(clng - merchant.lng)
-                        a = sin(dlat / 2) ** 2 + cos(radians(merchant.lat)) * cos(radians(clat)) * sin(dlon / 2) ** 2
-                        d = R * 2 * asin(sqrt(a))
-                        if d <= 500:
-                            nearby_ids.append(cid)
-
-                    if not nearby_ids:
-                        continue
-
-                    # This week stats
-                    this_week = db.query(
-                        func.count(SessionEvent.id).label("total"),
-                    ).filter(
-                        SessionEvent.charger_id.in_(nearby_ids),
-                        SessionEvent.session_start >= week_start,
-                        SessionEvent.session_end.isnot(None),
-                    ).first()
-
-                    # Last week stats
-                    last_week = db.query(
-                        func.count(SessionEvent.id).label("total"),
-                    ).filter(
-                        SessionEvent.charger_id.in_(nearby_ids),
-                        SessionEvent.session_start >= prev_week_start,
-                        SessionEvent.session_start < week_start,
-                        SessionEvent.session_end.isnot(None),
-                    ).first()
-
-                    this_total = this_week.total or 0
-                    last_total = last_week.total or 0
-                    change = this_total - last_total
-                    change_str = f"+{change}" if change >= 0 else str(change)
-
-                    # Daily breakdown
-                    avg_per_day = round(this_total / 7, 1) if this_total else 0
-
-                    portal_url = f"https://merchant.nerava.network/insights"
-
-                    html = f"""
-                    <div style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 600px; margin: 0 auto;">
-                        <div style="background: #0a0a0a; padding: 24px; border-radius: 12px 12px 0 0;">
-                            <h1 style="color: white; margin: 0; font-size: 20px;">Nerava Weekly Report</h1>
-                            <p style="color: #a3a3a3; margin: 4px 0 0;">for {merchant.name}</p>
-                        </div>
-                        <div style="padding: 24px; border: 1px solid #e5e5e5; border-top: none; border-radius: 0 0 12px 12px;">
-                            <h2 style="font-size: 16px; color: #171717; margin-bottom: 16px;">This Week's Highlights</h2>
-                            <table style="width: 100%; border-collapse: collapse;">
-                                <tr>
-                                    <td style="padding: 12px; background: #f5f5f5; border-radius: 8px; text-align: center; width: 50%;">
-                                        <div style="font-size: 28px; font-weight: 700; color: #171717;">{this_total}</div>
-                                        <div style="font-size: 13px; color: #737373;">EV Sessions</div>
-                                    </td>
-                                    <td style="width: 12px;"></td>
-                                    <td style="padding: 12px; background: #f5f5f5; border-radius: 8px; text-align: center; width: 50%;">
-                                        <div style="font-size: 28px; font-weight: 700; color: #171717;">{avg_per_day}</div>
-                                        <div style="font-size: 13px; color: #737373;">Avg / Day</div>
-                                    </td>
-                                </tr>
-                            </table>
-                            <p style="margin-top: 16px; font-size: 14px; color: #525252;">
-                                {change_str} vs last week
-                            </p>
-                            <a href="{portal_url}" style="display: block; text-align: center; background: #171717; color: white; padding: 12px; border-radius: 8px; text-decoration: none; font-weight: 500; margin-top: 24px;">
-                                View your dashboard
-                            </a>
-                        </div>
-                    </div>
-                    """
-
-                    email_sender.send(
-                        to=owner.email,
-                        subject=f"Your Nerava Weekly Report — {this_total} EV sessions",
-                        html=html,
-                    )
-                    logger.info(f"Sent weekly report to {owner.email} for merchant {merchant.id}")
-
-                except Exception as e:
-                    logger.error(f"Failed to send report for merchant {merchant.id}: {e}")
+    def _record(self, key: str, merchant_id: str, error: Optional[str]) -> None:
+        db = self.session_factory()
+        try:
+            values = {"status": "failed", "last_error": error[:1000]} if error else {
+                "status": "sent", "sent_at": datetime.utcnow(), "last_error": None,
+            }
+            db.execute(
+                update(WeeklyReportDelivery)
+                .where(WeeklyReportDelivery.week_key == key, WeeklyReportDelivery.merchant_id == merchant_id)
+                .values(**values)
+            )
+            db.commit()
+        finally:
+            db.close()
 
+    def _finish_run(self, key: str, sent: int, failed: int) -> None:
+        db = self.session_factory()
+        try:
+            run = db.get(WeeklyReportRun, key)
+            run.sent += sent
+            run.failed += failed
+            if not failed:
+                run.completed_at = datetime.utcnow()
+            db.commit()
         finally:
             db.close()
 
+    # ---- run ---------------------------------------------------------------
+
+    async def _deliver(self, key: str, report: MerchantReport, email_sender, semaphore: asyncio.Semaphore) -> Optional[bool]:
+        """True if sent, False if failed, None if skipped (claimed elsewhere)."""
+        async with semaphore:
+            if not await asyncio.to_thread(self._claim, key, report.merchant_id):
+                return None
+            error = None
+            try:
+                message = render_report(report)
+                ok = await asyncio.to_thread(email_sender.send_email, report.email, **message)
+                if not ok:
+                    error = "email sender returned False"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            await asyncio.to_thread(self._record, key, report.merchant_id, error)
+            if error:
+                logger.error(f"Failed to send report for merchant {report.merchant_id}: {error}")
+                return False
+            logger.info(f"Sent weekly report to {report.email} for merchant {report.merchant_id}")
+            return True
+
+    async def _send_all_reports(self, key: Optional[str] = None) -> bool:
+        """
+        Compute every merchant's report and send them concurrently, resuming
+        a partial run. Returns True once the week's run is complete.
+        """
+        from app.core.email_sender import get_email_sender
+
+        key = key or week_key(datetime.now(CT_TZ))
+        run = await asyncio.to_thread(self._start_run, key, datetime.utcnow())
+        if run is None:
+            logger.info(f"Weekly reports for {key} already sent")
+            return True
+
+        reports = await asyncio.to_thread(self._load_reports, key, run.window_end)
+        if not reports:
+            logger.info("No merchants to report on")
+            await asyncio.to_thread(self._finish_run, key, 0, 0)
+            return True
+
+        email_sender = get_email_sender()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(
+            self._deliver(key, report, email_sender, semaphore) for report in reports
+        ))
+        sent = sum(1 for r in results if r is True)
+        failed = sum(1 for r in results if r is False)
+        await asyncio.to_thread(self._finish_run, key, sent, failed)
+        logger.info(f"Weekly reports for {key}: sent={sent} failed={failed} skipped={results.count(None)}")
+        return not failed
+
 
 weekly_merchant_report_worker = WeeklyMerchantReportWorker()
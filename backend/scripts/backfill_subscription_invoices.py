@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Backfill the subscription revenue ledger from Stripe.
+
+Paid subscription invoices are normally recorded by the invoice.paid
+webhook. Run this once after deploying the ledger (or after a webhook
+outage) to import invoices paid before that. Idempotent: invoices already
+in the ledger are skipped.
+
+Usage:
+    python scripts/backfill_subscription_invoices.py
+    python scripts/backfill_subscription_invoices.py --dry-run
+"""
+
+import os
+import sys
+import argparse
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db import SessionLocal
+from app.models.merchant_subscription import MerchantSubscription
+from app.services.merchant_subscription_service import _get_stripe, handle_invoice_paid
+
+
+def backfill_invoices(dry_run: bool = False):
+    """Record every paid invoice for customers with a merchant subscription."""
+    stripe = _get_stripe()
+    db = SessionLocal()
+
+    try:
+        customer_ids = sorted({
+            customer_id
+            for (customer_id,) in db.query(MerchantSubscription.stripe_customer_id)
+            .filter(MerchantSubscription.stripe_customer_id.isnot(None))
+            .distinct()
+        })
+        print(f"Processing {len(customer_ids)} Stripe customers...")
+
+        recorded = 0
+        seen = 0
+        for customer_id in customer_ids:
+            invoices = stripe.Invoice.list(customer=customer_id, status="paid", limit=100)
+            for invoice in invoices.auto_paging_iter():
+                seen += 1
+                if dry_run:
+                    continue
+                if handle_invoice_paid(db, invoice):
+                    recorded += 1
+
+        print(f"Paid invoices seen: {seen}, newly recorded: {recorded}{' (dry run)' if dry_run else ''}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill subscription invoice payments from Stripe")
+    parser.add_argument("--dry-run", action="store_true", help="List invoices without recording them")
+    args = parser.parse_args()
+    backfill_invoices(dry_run=args.dry_run)
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic data at production scale, for benchmarks and query
+plans.
+
+Bulk-loads chargers, merchants and their charger_merchants junctions, driver
+users, session_events, campaigns, incentive_grants and the driver_earn
+nova_transactions backing them, with realistic shapes:
+
+- Geography: chargers clustered around US metros (weighted by EV adoption),
+  plus a rural/highway share spread over the continental US; merchants
+  within walking distance of a charger.
+- Time: session starts follow a diurnal curve (commute and lunch peaks, quiet
+  nights) with lighter weekends; DC fast sessions are short, L2 long.
+- Activity: per-driver and per-charger session volume is power-law
+  distributed - a few heavy users and hot chargers, a long tail.
+
+The same --seed (and --end-date) always produces the same rows. Synthetic
+rows are namespaced (``syn_`` ids / keys, ``@synthetic.nerava.test`` drivers)
+so --purge can remove them again. After loading, the per-charger stats are
+reconciled, driver wallets and wallet timeline rows are written for the
+driver_earn transactions, and the loaded days are marked for the analytics
+rollup worker.
+
+Usage:
+    # From backend/
+    python -m scripts.generate_synthetic_data --scale small
+    python -m scripts.generate_synthetic_data --scale production --seed 7
+    python -m scripts.generate_synthetic_data --chargers 5000 --sessions 200000
+    python -m scripts.generate_synthetic_data --purge
+"""
+import bisect
+import itertools
+import logging
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import User
+from app.models.campaign import Campaign
+from app.models.charger_stats import ChargerSessionStats
+from app.models.domain import NovaTransaction
+from app.models.driver_wallet import DriverWallet
+from app.models.session_event import IncentiveGrant, SessionEvent
+from app.models.wallet_timeline import WalletTimelineEvent
+from app.models.while_you_charge import Charger, ChargerMerchant, Merchant
+
+logger = logging.getLogger(__name__)
+
+ID_PREFIX = "syn_"
+DRIVER_EMAIL_DOMAIN = "synthetic.nerava.test"
+SPONSOR_NAME = "Synthetic Sponsor"
+
+# (name, state, lat, lng, weight, spread in degrees)
+METROS = [
+    ("Los Angeles", "CA", 34.05, -118.24, 14.0, 0.35),
+    ("San Francisco", "CA", 37.77, -122.42, 11.0, 0.30),
+    ("San Jose", "CA", 37.34, -121.89, 6.0, 0.20),
+    ("San Diego", "CA", 32.72, -117.16, 5.0, 0.20),
+    ("Sacramento", "CA", 38.58, -121.49, 2.5, 0.20),
+    ("Seattle", "WA", 47.61, -122.33, 4.5, 0.25),
+    ("Portland", "OR", 45.52, -122.68, 2.5, 0.20),
+    ("New York", "NY", 40.71, -74.01, 7.0, 0.30),
+    ("Boston", "MA", 42.36, -71.06, 3.5, 0.25),
+    ("Washington", "DC", 38.91, -77.04, 4.0, 0.25),
+    ("Miami", "FL", 25.76, -80.19, 3.5, 0.25),
+    ("Orlando", "FL", 28.54, -81.38, 2.0, 0.20),
+    ("Atlanta", "GA", 33.75, -84.39, 3.0, 0.25),
+    ("Austin", "TX", 30.27, -97.74, 3.0, 0.20),
+    ("Dallas", "TX", 32.78, -96.80, 3.5, 0.30),
+    ("Houston", "TX", 29.76, -95.37, 3.0, 0.30),
+    ("Denver", "CO", 39.74, -104.99, 3.0, 0.25),
+    ("Phoenix", "AZ", 33.45, -112.07, 3.0, 0.30),
+    ("Las Vegas", "NV", 36.17, -115.14, 1.5, 0.15),
+    ("Chicago", "IL", 41.88, -87.63, 3.5, 0.30),
+    ("Minneapolis", "MN", 44.98, -93.27, 1.5, 0.20),
+    ("Detroit", "MI", 42.33, -83.05, 1.5, 0.25),
+    ("Raleigh", "NC", 35.78, -78.64, 1.5, 0.20),
+    ("Salt Lake City", "UT", 40.76, -111.89, 1.5, 0.15),
+]
+RURAL_SHARE = 0.1
+# Continental US box for rural/highway chargers
+US_LAT, US_LNG = (25.0, 49.0), (-124.0, -67.0)
+
+# (network, share, DC fast power choices, L2 power choices)
+NETWORKS = [
+    ("Tesla", 0.30, [150.0, 250.0], [11.5]),
+    ("ChargePoint Network", 0.35, [62.5], [6.6, 7.2]),
+    ("Electrify America", 0.08, [150.0, 350.0], []),
+    ("EVgo", 0.07, [50.0, 100.0, 350.0], []),
+    ("Blink Network", 0.08, [50.0], [7.2]),
+    ("Non-Networked", 0.12, [], [6.6]),
+]
+MERCHANT_CATEGORIES = [
+    ("coffee", 0.22), ("restaurant", 0.35), ("grocery_or_supermarket", 0.12),
+    ("convenience_store", 0.10), ("gym", 0.05), ("shopping_mall", 0.06), ("bakery", 0.10),
+]
+
+# Relative session starts per local hour (0-23): quiet nights, morning
+# commute, lunch, evening peak
+HOURLY_WEIGHTS = [
+    0.6, 0.4, 0.3, 0.3, 0.4, 0.8, 1.6, 2.6, 3.2, 2.8, 2.6, 3.0,
+    3.4, 3.2, 2.8, 2.9, 3.4, 4.0, 4.2, 3.6, 2.8, 2.0, 1.4, 0.9,
+]
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.05, 1.1, 0.85, 0.75]  # Mon..Sun
+# Power-law exponents (Pareto alpha): lower is more skewed
+DRIVER_ACTIVITY_ALPHA = 1.2
+CHARGER_POPULARITY_ALPHA = 1.5
+
+MIN_GRANT_DURATION_MINUTES = 15
+GRANT_RATE = 0.35
+
+
+@dataclass(frozen=True)
+class SyntheticConfig:
+    chargers: int
+    merchants_per_charger: float
+    drivers: int
+    sessions: int
+    days: int = 180
+    campaigns_per_metro: int = 2
+    seed: int = 42
+    end_date: Optional[date] = None
+    batch_size: int = 5000
+
+
+SCALES: Dict[str, SyntheticConfig] = {
+    "small": SyntheticConfig(chargers=500, merchants_per_charger=2, drivers=1_000, sessions=20_000, days=60),
+    "medium": SyntheticConfig(chargers=7_000, merchants_per_charger=3, drivers=20_000, sessions=400_000, days=120),
+    # ~NREL public charger count, merchants and sessions at the volume we run
+    "production": SyntheticConfig(chargers=70_000, merchants_per_charger=4, drivers=250_000, sessions=3_000_000),
+}
+
+
+class _Sampler:
+    """Weighted choice over a fixed population in O(log n) per draw"""
+
+    def __init__(self, weights: Sequence[float]):
+        self.cumulative = list(itertools.accumulate(weights))
+        self.total = self.cumulative[-1]
+
+    def index(self, rng: random.Random) -> int:
+        return bisect.bisect_right(self.cumulative, rng.random() * self.total)
+
+
+def _rng(seed: int, stream: str) -> random.Random:
+    # Independent stream per entity type: growing sessions keeps chargers identical
+    return random.Random(f"{seed}:{stream}")
+
+
+def _end_date(config: SyntheticConfig) -> date:
+    return config.end_date or date.today()
+
+
+def _onboarded_since(config: SyntheticConfig) -> datetime:
+    # Chargers, merchants and drivers all exist before the session window opens
+    return datetime.combine(_end_date(config), datetime.min.time()) - timedelta(days=config.days * 2)
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _weighted(rng: random.Random, pairs):
+    return rng.choices([p[0] for p in pairs], weights=[p[1] for p in pairs])[0]
+
+
+def _haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 6371000 * 2 * math.asin(math.sqrt(a))
+
+
+def _batches(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+# ---------------------------------------------------------------------------
+# Generators (pure: rows only, no database access)
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ChargerSeed:
+    id: str
+    metro: Optional[int]  # index into METROS, None for rural
+    lat: float
+    lng: float
+    network: str
+    power_kw: float
+    popularity: float
+
+
+def generate_chargers(config: SyntheticConfig) -> List[ChargerSeed]:
+    rng = _rng(config.seed, "chargers")
+    metro_sampler = _Sampler([m[4] for m in METROS])
+    network_sampler = _Sampler([n[1] for n in NETWORKS])
+    chargers = []
+    for i in range(config.chargers):
+        if rng.random() < RURAL_SHARE:
+            metro = None
+            lat, lng = rng.uniform(*US_LAT), rng.uniform(*US_LNG)
+        else:
+            metro = metro_sampler.index(rng)
+            _, _, center_lat, center_lng, _, spread = METROS[metro]
+            lat, lng = rng.gauss(center_lat, spread / 2), rng.gauss(center_lng, spread / 2)
+        network, _, fast, level2 = NETWORKS[network_sampler.index(rng)]
+        # Rural chargers are mostly highway DC fast
+        if fast and (not level2 or rng.random() < (0.8 if metro is None else 0.3)):
+            power_kw = rng.choice(fast)
+        else:
+            power_kw = rng.choice(level2)
+        chargers.append(ChargerSeed(
+            id=f"{ID_PREFIX}ch_{i}", metro=metro, lat=round(lat, 6), lng=round(lng, 6),
+            network=network, power_kw=power_kw, popularity=rng.paretovariate(CHARGER_POPULARITY_ALPHA),
+        ))
+    return chargers
+
+
+def charger_rows(config: SyntheticConfig, chargers: List[ChargerSeed]) -> Iterator[dict]:
+    created = _onboarded_since(config)
+    for i, c in enumerate(chargers):
+        city, state = (METROS[c.metro][0], METROS[c.metro][1]) if c.metro is not None else (None, None)
+        yield {
+            "id": c.id, "name": f"{c.network} Station {i}", "network_name": c.network,
+            "lat": c.lat, "lng": c.lng, "city": city, "state": state,
+            "connector_types": ["Tesla"] if c.network == "Tesla" else (["CCS", "CHAdeMO"] if c.power_kw >= 50 else ["J1772"]),
+            "power_kw": c.power_kw, "num_evse": 8 if c.power_kw >= 150 else 2 + i % 4, "is_public": True,
+            "status": "available", "created_at": created, "updated_at": created,
+        }
+
+
+def merchant_rows(config: SyntheticConfig, chargers: List[ChargerSeed]) -> Iterator[Tuple[dict, dict]]:
+    """(merchant row, charger_merchants row) pairs, each merchant within walking distance of its charger"""
+    rng = _rng(config.seed, "merchants")
+    created = _onboarded_since(config)
+    n = 0
+    for c in chargers:
+        city, state = (METROS[c.metro][0], METROS[c.metro][1]) if c.metro is not None else (None, None)
+        # Geometric count around the configured mean; hot chargers sit in busier areas
+        count = int(rng.expovariate(1 / config.merchants_per_charger) * min(c.popularity, 3) / 1.5 + 0.5)
+        for rank in range(count):
+            distance = rng.uniform(40, 500)
+            bearing = rng.uniform(0, 2 * math.pi)
+            lat = c.lat + distance * math.cos(bearing) / 111320
+            lng = c.lng + distance * math.sin(bearing) / (111320 * math.cos(math.radians(c.lat)))
+            merchant_id = f"{ID_PREFIX}m_{n}"
+            category = _weighted(rng, MERCHANT_CATEGORIES)
+            distance_m = round(_haversine_m(c.lat, c.lng, lat, lng), 1)
+            yield (
+                {
+                    "id": merchant_id, "name": f"{category.replace('_', ' ').title()} {n}",
+                    "place_id": f"{ID_PREFIX}place_{n}", "lat": round(lat, 6), "lng": round(lng, 6),
+                    "category": category, "primary_category": category,
+                    "rating": round(rng.uniform(3.2, 4.9), 1), "user_rating_count": int(rng.paretovariate(1.1) * 20),
+                    "city": city, "state": state, "is_corporate": rng.random() < 0.2,
+                    "nearest_charger_id": c.id, "nearest_charger_distance_m": distance_m,
+                    "created_at": created, "updated_at": created,
+                },
+                {
+                    "charger_id": c.id, "merchant_id": merchant_id,
+                    "distance_m": distance_m,
+                    "walk_duration_s": int(distance / 1.3), "is_primary": rank == 0 and rng.random() < 0.1,
+                    "created_at": created, "updated_at": created,
+                },
+            )
+            n += 1
+
+
+def driver_rows(config: SyntheticConfig) -> Iterator[dict]:
+    rng = _rng(config.seed, "drivers")
+    start = _onboarded_since(config)
+    for i in range(config.drivers):
+        created = start + timedelta(seconds=rng.uniform(0, config.days * 86400))
+        yield {
+            "public_id": str(_uuid(rng)), "email": f"driver{i}@{DRIVER_EMAIL_DOMAIN}",
+            "phone": f"+1999{i:07d}", "auth_provider": "phone", "role_flags": "driver", "is_active": True,
+            "created_at": created, "updated_at": created,
+        }
+
+
+def campaign_rows(config: SyntheticConfig) -> List[Tuple[int, dict]]:
+    """(metro index, campaigns row) pairs: geo-radius campaigns per metro"""
+    rng = _rng(config.seed, "campaigns")
+    start = datetime.combine(_end_date(config), datetime.min.time()) - timedelta(days=config.days)
+    rows = []
+    for metro, (name, state, lat, lng, _, spread) in enumerate(METROS):
+        for k in range(config.campaigns_per_metro):
+            cost = rng.choice([50, 100, 150, 200])
+            rows.append((metro, {
+                "id": _uuid(rng), "sponsor_name": SPONSOR_NAME, "name": f"{name} Charge Rewards {k + 1}",
+                "campaign_type": "custom", "status": "active", "priority": 100 + k,
+                "budget_cents": cost * 1_000_000, "cost_per_session_cents": cost,
+                "start_date": start,
+                "rule_geo_center_lat": lat, "rule_geo_center_lng": lng,
+                "rule_geo_radius_m": int(spread * 111320), "rule_min_duration_minutes": MIN_GRANT_DURATION_MINUTES,
+                "funding_status": "funded", "created_at": start, "updated_at": start,
+            }))
+    return rows
+
+
+def session_rows(
+    config: SyntheticConfig,
+    chargers: List[ChargerSeed],
+    driver_ids: List[int],
+    campaigns: List[Tuple[int, dict]],
+) -> Iterator[Tuple[dict, Optional[dict], Optional[dict]]]:
+    """
+    (session_events row, incentive_grants row or None, nova_transactions row
+    or None). Drivers charge mostly in their home metro; sessions that end
+    before the window closes and last long enough may earn a campaign grant.
+    """
+    rng = _rng(config.seed, "sessions")
+    end = datetime.combine(_end_date(config) + timedelta(days=1), datetime.min.time())
+    first_day = end - timedelta(days=config.days)
+
+    by_metro: Dict[Optional[int], List[ChargerSeed]] = {}
+    for c in chargers:
+        by_metro.setdefault(c.metro, []).append(c)
+    metro_keys = list(by_metro)
+    metro_samplers = {m: _Sampler([c.popularity for c in cs]) for m, cs in by_metro.items()}
+    home_sampler = _Sampler([len(by_metro[m]) for m in metro_keys])
+    home = [metro_keys[home_sampler.index(rng)] for _ in driver_ids]
+    driver_sampler = _Sampler([rng.paretovariate(DRIVER_ACTIVITY_ALPHA) for _ in driver_ids])
+    day_sampler = _Sampler([WEEKDAY_WEIGHTS[(first_day + timedelta(days=d)).weekday()] for d in range(config.days)])
+    hour_sampler = _Sampler(HOURLY_WEIGHTS)
+    metro_campaigns: Dict[int, List[dict]] = {}
+    for metro, campaign in campaigns:
+        metro_campaigns.setdefault(metro, []).append(campaign)
+
+    for n in range(config.sessions):
+        d = driver_sampler.index(rng)
+        metro = home[d] if rng.random() < 0.9 else metro_keys[home_sampler.index(rng)]
+        pool = by_metro[metro]
+        charger = pool[metro_samplers[metro].index(rng)]
+        # Diurnal curve in local time, stored as UTC (offset from longitude)
+        start = (
+            first_day + timedelta(days=day_sampler.index(rng), hours=hour_sampler.index(rng) - round(charger.lng / 15))
+            + timedelta(seconds=rng.randrange(3600))
+        )
+        if start >= end:
+            start -= timedelta(days=1)
+        fast = charger.power_kw >= 50
+        minutes = max(3, int(rng.lognormvariate(math.log(28 if fast else 110), 0.5)))
+        session_end = start + timedelta(minutes=minutes)
+        ended = session_end <= end
+        battery_start = rng.randint(5, 60)
+        kwh = round(min(charger.power_kw * 0.8 * minutes / 60, (95 - battery_start) * 0.75), 2)
+        session_id = _uuid(rng)
+        session = {
+            "id": session_id, "driver_user_id": driver_ids[d], "user_id": driver_ids[d],
+            "charger_id": charger.id, "charger_network": charger.network,
+            "connector_type": "Tesla" if charger.network == "Tesla" else ("CCS" if fast else "J1772"),
+            "power_kw": charger.power_kw, "session_start": start,
+            "session_end": session_end if ended else None, "duration_minutes": minutes if ended else None,
+            "kwh_delivered": kwh if ended else None, "source": "tesla_api",
+            "source_session_id": f"{ID_PREFIX}s_{n}", "verified": ended, "verification_method": "api_polling" if ended else None,
+            "lat": charger.lat, "lng": charger.lng, "battery_start_pct": battery_start,
+            "battery_end_pct": min(100, battery_start + int(kwh / 0.75)) if ended else None,
+            "ended_reason": "unplugged" if ended else None, "quality_score": rng.randint(60, 100) if ended else None,
+            "created_at": start, "updated_at": session_end if ended else start,
+        }
+        grant = nova = None
+        if ended and minutes >= MIN_GRANT_DURATION_MINUTES and metro_campaigns.get(metro) and rng.random() < GRANT_RATE:
+            campaign = rng.choice(metro_campaigns[metro])
+            nova_id = _uuid(rng)
+            amount = campaign["cost_per_session_cents"]
+            grant = {
+                "id": _uuid(rng), "session_event_id": session_id, "campaign_id": campaign["id"],
+                "driver_user_id": driver_ids[d], "amount_cents": amount, "status": "granted",
+                "nova_transaction_id": nova_id, "reward_destination": "nerava_wallet",
+                "idempotency_key": f"{ID_PREFIX}grant_{n}", "granted_at": session_end, "created_at": session_end,
+            }
+            nova = {
+                "id": nova_id, "type": "driver_earn", "driver_user_id": driver_ids[d], "amount": amount,
+                "idempotency_key": f"{ID_PREFIX}nova_{n}", "transaction_meta": {"source": "campaign_grant"},
+                "created_at": session_end,
+            }
+        yield session, grant, nova
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def _load(db: Session, model, rows: Iterator[dict], batch_size: int, label: str) -> int:
+    total = 0
+    started = time.perf_counter()
+    for batch in _batches(rows, batch_size):
+        db.execute(insert(model), batch)
+        db.commit()
+        total += len(batch)
+    logger.info(f"[Synthetic] {label}: {total} rows in {time.perf_counter() - started:.1f}s")
+    return total
+
+
+def generate(db: Session, config: SyntheticConfig, derived: bool = True) -> Dict[str, int]:
+    """
+    Bulk-load a synthetic dataset. Returns row counts per table.
+
+    ORM bulk inserts bypass the flush hooks and NovaService, so with
+    ``derived`` the charger stats are reconciled, driver wallets and wallet
+    timeline rows are written, and the loaded days are marked dirty for the
+    analytics rollup worker afterwards.
+    """
+    counts: Dict[str, int] = {}
+    chargers = generate_chargers(config)
+    counts["chargers"] = _load(db, Charger, charger_rows(config, chargers), config.batch_size, "chargers")
+
+    pairs = merchant_rows(config, chargers)
+    merchants, junctions = 0, 0
+    started = time.perf_counter()
+    for batch in _batches(pairs, config.batch_size):
+        db.execute(insert(Merchant), [m for m, _ in batch])
+        db.execute(insert(ChargerMerchant), [j for _, j in batch])
+        db.commit()
+        merchants += len(batch)
+        junctions += len(batch)
+    logger.info(f"[Synthetic] merchants + charger_merchants: {merchants} in {time.perf_counter() - started:.1f}s")
+    counts["merchants"], counts["charger_merchants"] = merchants, junctions
+
+    counts["users"] = _load(db, User, driver_rows(config), config.batch_size, "drivers")
+    driver_ids = [
+        user_id for _, user_id in sorted(
+            (int(email[len("driver"):email.index("@")]), user_id)
+            for email, user_id in db.execute(
+                select(User.email, User.id).where(User.email.like(f"%@{DRIVER_EMAIL_DOMAIN}"))
+            )
+        )
+    ]
+
+    campaigns = campaign_rows(config)
+    counts["campaigns"] = _load(db, Campaign, (c for _, c in campaigns), config.batch_size, "campaigns")
+
+    counts.update(session_events=0, incentive_grants=0, nova_transactions=0)
+    days = set()
+    started = time.perf_counter()
+    for batch in _batches(session_rows(config, chargers, driver_ids, campaigns), config.batch_size):
+        sessions = [s for s, _, _ in batch]
+        grants = [g for _, g, _ in batch if g]
+        novas = [t for _, _, t in batch if t]
+        db.execute(insert(SessionEvent), sessions)
+        if novas:
+            db.execute(insert(NovaTransaction), novas)
+            db.execute(insert(IncentiveGrant), grants)
+        db.commit()
+        counts["session_events"] += len(sessions)
+        counts["incentive_grants"] += len(grants)
+        counts["nova_transactions"] += len(novas)
+        days.update(s["session_start"].date() for s in sessions)
+        days.update(s["session_end"].date() for s in sessions if s["session_end"])
+        if counts["session_events"] % (config.batch_size * 40) == 0:
+            logger.info(f"[Synthetic] sessions: {counts['session_events']}/{config.sessions}")
+    logger.info(
+        f"[Synthetic] sessions: {counts['session_events']} sessions, {counts['incentive_grants']} grants "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+    if derived:
+        from app.services.analytics_rollup import mark_days_dirty
+        from app.services.charger_stats import ChargerStatsReconciler
+
+        ChargerStatsReconciler().reconcile(db)
+        _reconcile_wallets(db, config.batch_size)
+        mark_days_dirty(db, days)
+        db.commit()
+    return counts
+
+
+def _reconcile_wallets(db: Session, batch_size: int) -> None:
+    """Credit driver wallets and append timeline rows for the synthetic driver_earn transactions"""
+    from app.services.nova_service import _apply_wallet_deltas, _ensure_wallets
+    from app.services.wallet_timeline import append_timeline_for_transactions
+
+    synthetic = NovaTransaction.idempotency_key.like(f"{ID_PREFIX}%")
+    # driver_earn credits both the Nova balance and reputation (1 Nova = 1 rep)
+    deltas = {
+        driver_id: [amount, amount]
+        for driver_id, amount in db.execute(
+            select(NovaTransaction.driver_user_id, func.sum(NovaTransaction.amount))
+            .where(synthetic).group_by(NovaTransaction.driver_user_id)
+        )
+    }
+    _ensure_wallets(db, list(deltas))
+    _apply_wallet_deltas(db, deltas)
+    db.commit()
+
+    started = time.perf_counter()
+    total, last_id = 0, None
+    while True:
+        query = (
+            select(
+                NovaTransaction.id, NovaTransaction.type, NovaTransaction.driver_user_id, NovaTransaction.amount,
+                NovaTransaction.transaction_meta, NovaTransaction.merchant_id, NovaTransaction.created_at,
+            )
+            .where(synthetic).order_by(NovaTransaction.id).limit(batch_size)
+        )
+        if last_id is not None:
+            query = query.where(NovaTransaction.id > last_id)
+        transactions = db.execute(query).all()
+        if not transactions:
+            break
+        append_timeline_for_transactions(db, transactions)
+        db.commit()
+        total += len(transactions)
+        last_id = transactions[-1].id
+    logger.info(
+        f"[Synthetic] wallets: {len(deltas)} wallets, {total} timeline rows in {time.perf_counter() - started:.1f}s"
+    )
+
+
+def purge(db: Session) -> Dict[str, int]:
+    """Delete every synthetic row, children first"""
+    driver_ids = select(User.id).where(User.email.like(f"%@{DRIVER_EMAIL_DOMAIN}")).scalar_subquery()
+    synthetic_chargers = Charger.id.like(f"{ID_PREFIX}%")
+    steps = [
+        ("incentive_grants", delete(IncentiveGrant).where(IncentiveGrant.idempotency_key.like(f"{ID_PREFIX}%"))),
+        ("nova_transactions", delete(NovaTransaction).where(NovaTransaction.idempotency_key.like(f"{ID_PREFIX}%"))),
+        ("session_events", delete(SessionEvent).where(SessionEvent.source_session_id.like(f"{ID_PREFIX}%"))),
+        ("campaigns", delete(Campaign).where(Campaign.sponsor_name == SPONSOR_NAME)),
+        ("wallet_timeline_events", delete(WalletTimelineEvent).where(WalletTimelineEvent.driver_user_id.in_(driver_ids))),
+        ("driver_wallets", delete(DriverWallet).where(DriverWallet.driver_id.in_(driver_ids))),
+        ("users", delete(User).where(User.id.in_(driver_ids))),
+        ("charger_merchants", delete(ChargerMerchant).where(ChargerMerchant.charger_id.like(f"{ID_PREFIX}%"))),
+        ("merchants", delete(Merchant).where(Merchant.id.like(f"{ID_PREFIX}%"))),
+        ("charger_session_stats", delete(ChargerSessionStats).where(ChargerSessionStats.charger_id.like(f"{ID_PREFIX}%"))),
+        ("chargers", delete(Charger).where(synthetic_chargers)),
+    ]
+    counts = {}
+    for table, stmt in steps:
+        counts[table] = db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+        db.commit()
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    sys.path.insert(0, ".")
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic data for performance testing")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, help="RNG seed (default 42)")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="Last day of generated activity (default today)")
+    parser.add_argument("--chargers", type=int)
+    parser.add_argument("--merchants-per-charger", type=float)
+    parser.add_argument("--drivers", type=int)
+    parser.add_argument("--sessions", type=int)
+    parser.add_argument("--days", type=int)
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--skip-derived", action="store_true", help="Skip charger stats and rollup marking")
+    parser.add_argument("--purge", action="store_true", help="Delete previously generated synthetic rows and exit")
+    args = parser.parse_args()
+
+    from app.core.env import is_production_env
+    from app.db import SessionLocal
+
+    if is_production_env():
+        sys.exit("Refusing to generate synthetic data with ENV=prod")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    overrides = {
+        field: getattr(args, field)
+        for field in ("seed", "end_date", "chargers", "merchants_per_charger", "drivers", "sessions", "days", "batch_size")
+        if getattr(args, field) is not None
+    }
+    config = replace(SCALES[args.scale], **overrides)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        result = purge(db) if args.purge else generate(db, config, derived=not args.skip_derived)
+        print(f"\nResult: {result} ({time.perf_counter() - started:.1f}s)")
+    finally:
+        db.close()
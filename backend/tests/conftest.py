@@ -32,6 +32,19 @@ def pytest_addoption(parser):
     parser.addoption("--slow", action="store_true", help="include slow tests")
 
 
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: benchmarks and long-running tests (run with --slow)")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--slow"):
+        return
+    skip_slow = pytest.mark.skip(reason="needs --slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_db():
     """
@@ -85,6 +98,20 @@ def setup_test_db():
         conn.commit()
 
 
+@pytest.fixture(autouse=True)
+def http_clients_follow_patches(monkeypatch):
+    """
+    Fresh shared HTTP clients per test, built through whatever
+    httpx.AsyncClient is at call time, so tests patching it reach
+    integrations that use app.services.http_clients.
+    """
+    import httpx
+    from app.services.http_clients import http_clients
+
+    monkeypatch.setattr(http_clients, "_clients", {})
+    monkeypatch.setattr(http_clients, "client_factory", lambda **kwargs: httpx.AsyncClient(**kwargs))
+
+
 @pytest.fixture(scope="function")
 def db():
     """
@@ -196,7 +223,7 @@ def test_merchant(db):
     """Create a test merchant for wallet timeline tests"""
     from app.models.domain import DomainMerchant
     merchant = DomainMerchant(
-        id="test_merchant_123",
+        id="00000000-0000-4000-8000-000000000123",
         name="Test Merchant",
         lat=30.4,
         lng=-97.7,
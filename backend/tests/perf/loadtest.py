@@ -0,0 +1,164 @@
+"""
+Load-test harness: latency/throughput measurement, JSON reports and
+baseline comparison.
+
+Scenarios are measured in-process (FastAPI TestClient against the test
+database from tests/conftest.py), so the numbers cover routing, validation,
+the handlers and their SQL - not network or worker overhead. Point
+TEST_DATABASE_URL at a Postgres instance to measure against Postgres
+instead of in-memory SQLite.
+
+Compare a run against a stored baseline (exit status 1 on regression):
+
+    python tests/perf/loadtest.py compare tests/perf/baselines/driver_endpoints.sqlite.json \\
+        tests/perf/results/driver_endpoints.json --threshold 0.25
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+# Latency metrics compared against the baseline (higher is worse)
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+# Below this absolute difference a latency change is treated as noise
+MIN_DELTA_MS = 2.0
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+@dataclass
+class ScenarioResult:
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    rps: float
+
+
+def run_scenario(
+    requests: Iterable[Callable[[], object]],
+    ok_statuses: Sequence[int] = (200,),
+    warmup: int = 0,
+    check: Optional[Callable[[object], bool]] = None,
+) -> ScenarioResult:
+    """
+    Issue each request in turn and time it.
+
+    Each item is a zero-argument callable returning a response with a
+    ``status_code``; the first ``warmup`` are issued but not measured. A
+    response counts as an error if its status is not in ``ok_statuses`` or
+    ``check(response)`` is false.
+    """
+    latencies_ms: List[float] = []
+    errors = 0
+    started = None
+    for i, send in enumerate(requests):
+        if i == warmup:
+            started = time.perf_counter()
+        start = time.perf_counter()
+        response = send()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if i < warmup:
+            continue
+        latencies_ms.append(elapsed_ms)
+        if response.status_code not in ok_statuses or (check and not check(response)):
+            errors += 1
+    if not latencies_ms:
+        raise ValueError("scenario issued no measured requests")
+    wall_s = time.perf_counter() - started
+    return ScenarioResult(
+        requests=len(latencies_ms),
+        errors=errors,
+        p50_ms=round(percentile(latencies_ms, 50), 2),
+        p95_ms=round(percentile(latencies_ms, 95), 2),
+        p99_ms=round(percentile(latencies_ms, 99), 2),
+        mean_ms=round(statistics.mean(latencies_ms), 2),
+        rps=round(len(latencies_ms) / wall_s, 1) if wall_s > 0 else 0.0,
+    )
+
+
+def write_report(path: Path, results: Dict[str, ScenarioResult], meta: Optional[dict] = None) -> dict:
+    report = {
+        "meta": {
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(terse=True),
+            **(meta or {}),
+        },
+        "scenarios": {name: asdict(result) for name, result in sorted(results.items())},
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    return report
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.25, min_delta_ms: float = MIN_DELTA_MS) -> List[str]:
+    """
+    Regressions of ``current`` against ``baseline`` (both report dicts).
+
+    A scenario regresses when it has errors, when a latency percentile grows
+    by more than ``threshold`` (fraction) and by at least ``min_delta_ms``,
+    or when throughput drops by more than ``threshold``. Scenarios missing
+    from the current run count as regressions; new ones are ignored.
+    """
+    problems = []
+    current_scenarios = current.get("scenarios", {})
+    for name, base in sorted(baseline.get("scenarios", {}).items()):
+        now = current_scenarios.get(name)
+        if now is None:
+            problems.append(f"{name}: missing from current run")
+            continue
+        if now.get("errors"):
+            problems.append(f"{name}: {now['errors']} of {now['requests']} requests failed")
+        for metric in LATENCY_METRICS:
+            before, after = base[metric], now[metric]
+            if after > before * (1 + threshold) and after - before >= min_delta_ms:
+                problems.append(f"{name}: {metric} {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+        if base.get("rps") and now["rps"] < base["rps"] * (1 - threshold):
+            problems.append(f"{name}: rps {base['rps']} -> {now['rps']} ({(now['rps'] / base['rps'] - 1) * 100:.0f}%)")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test report tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmp_parser = sub.add_parser("compare", help="Fail if a run regressed against a baseline")
+    cmp_parser.add_argument("baseline", type=Path)
+    cmp_parser.add_argument("current", type=Path)
+    cmp_parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative change (default 0.25)")
+    cmp_parser.add_argument("--min-delta-ms", type=float, default=MIN_DELTA_MS,
+                            help=f"Ignore latency changes smaller than this (default {MIN_DELTA_MS})")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    problems = compare(baseline, current, args.threshold, args.min_delta_ms)
+    for name, now in sorted(current.get("scenarios", {}).items()):
+        base = baseline.get("scenarios", {}).get(name, {})
+        print(
+            f"{name:28s} p50 {now['p50_ms']:>8} p95 {now['p95_ms']:>8} p99 {now['p99_ms']:>8} ms"
+            f"  {now['rps']:>8} req/s   (baseline p95 {base.get('p95_ms', '-')}, rps {base.get('rps', '-')})"
+        )
+    if problems:
+        print("\nRegressions:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
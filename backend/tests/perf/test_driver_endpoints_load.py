@@ -0,0 +1,230 @@
+"""
+Latency budget suite for driver-facing endpoints.
+
+Run with:  pytest tests/perf/test_driver_endpoints_load.py --slow -s --no-cov
+
+Seeds a metro of chargers, merchants (linked to chargers) and drivers (each
+with a Tesla connection, an open charging session and wallet history), then
+measures p50/p95/p99 and req/s for:
+
+    discovery            GET  /v1/chargers/discovery
+    charger_detail       GET  /v1/chargers/{id}/detail
+    intent_capture       POST /v1/intent/capture
+    exclusive_activate   POST /v1/exclusive/activate
+    exclusive_complete   POST /v1/exclusive/complete
+    telemetry_webhook    POST /v1/webhooks/tesla/telemetry
+    wallet_timeline      GET  /v1/wallet/timeline
+
+Results are written to LOADTEST_OUTPUT (default
+tests/perf/results/driver_endpoints.json). With LOADTEST_BASELINE set, the
+test fails on regressions beyond LOADTEST_THRESHOLD (default 0.25); see
+tests/perf/loadtest.py for the standalone compare command.
+
+LOADTEST_REQUESTS / _CHARGERS / _MERCHANTS / _DRIVERS / _SEED scale the run.
+Set TEST_DATABASE_URL to run against Postgres.
+"""
+import json
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import insert
+
+from app.models import User
+from app.models.domain import NovaTransaction
+from app.models.session_event import SessionEvent
+from app.models.tesla_connection import TeslaConnection
+from app.models.while_you_charge import Charger, ChargerMerchant, Merchant
+
+from .loadtest import compare, run_scenario, write_report
+
+REQUESTS = int(os.getenv("LOADTEST_REQUESTS", "200"))
+CHARGERS = int(os.getenv("LOADTEST_CHARGERS", "2000"))
+MERCHANTS = int(os.getenv("LOADTEST_MERCHANTS", "4000"))
+DRIVERS = int(os.getenv("LOADTEST_DRIVERS", "200"))
+SEED = int(os.getenv("LOADTEST_SEED", "42"))
+OUTPUT = Path(os.getenv("LOADTEST_OUTPUT", Path(__file__).parent / "results" / "driver_endpoints.json"))
+BASELINE = os.getenv("LOADTEST_BASELINE")
+THRESHOLD = float(os.getenv("LOADTEST_THRESHOLD", "0.25"))
+WARMUP = 10
+
+# Austin-sized metro
+CENTER_LAT, CENTER_LNG, SPREAD_DEG = 30.27, -97.74, 0.25
+MERCHANT_OFFSET_DEG = 0.0004  # ~45m from its charger
+
+
+def _seed(db, rng: random.Random):
+    now = datetime.utcnow()
+    chargers = [
+        (f"lt_ch_{i}", CENTER_LAT + rng.gauss(0, SPREAD_DEG / 2), CENTER_LNG + rng.gauss(0, SPREAD_DEG / 2))
+        for i in range(CHARGERS)
+    ]
+    db.execute(insert(Charger), [
+        {"id": cid, "name": f"Load Charger {i}", "lat": lat, "lng": lng,
+         "network_name": rng.choice(["Tesla", "ChargePoint", "EVgo", "Electrify America"]),
+         "power_kw": rng.choice([7.2, 50.0, 150.0, 250.0]), "connector_types": ["CCS", "Tesla"]}
+        for i, (cid, lat, lng) in enumerate(chargers)
+    ])
+    merchants = []
+    for i in range(MERCHANTS):
+        charger_id, lat, lng = chargers[i % CHARGERS]
+        merchants.append((f"lt_m_{i}", charger_id, lat + MERCHANT_OFFSET_DEG, lng))
+    db.execute(insert(Merchant), [
+        {"id": mid, "name": f"Load Merchant {i}", "place_id": f"lt_place_{i}", "lat": lat, "lng": lng,
+         "category": rng.choice(["coffee", "restaurant", "grocery_or_supermarket"]),
+         "short_code": f"LT{i:06d}", "region_code": "ATX", "is_corporate": False,
+         "created_at": now, "updated_at": now}
+        for i, (mid, _, lat, lng) in enumerate(merchants)
+    ])
+    db.execute(insert(ChargerMerchant), [
+        {"charger_id": charger_id, "merchant_id": mid, "distance_m": 45.0, "walk_duration_s": 60,
+         "exclusive_title": "Free Coffee" if i % 10 == 0 else None, "created_at": now, "updated_at": now}
+        for i, (mid, charger_id, _, _) in enumerate(merchants)
+    ])
+
+    drivers = [
+        User(public_id=str(uuid.uuid4()), phone=f"+1556{i:07d}", auth_provider="phone",
+             role_flags="driver", is_active=True)
+        for i in range(DRIVERS)
+    ]
+    db.add_all(drivers)
+    db.flush()
+    driver_ids = [d.id for d in drivers]
+    db.execute(insert(TeslaConnection), [
+        {"id": str(uuid.uuid4()), "user_id": driver_id, "access_token": "enc", "refresh_token": "enc",
+         "token_expires_at": now + timedelta(hours=1), "vehicle_id": f"lt_v{i}", "vin": f"LT{i:015d}",
+         "is_active": True, "telemetry_enabled": True, "created_at": now}
+        for i, driver_id in enumerate(driver_ids)
+    ])
+    db.execute(insert(SessionEvent), [
+        {"id": uuid.uuid4(), "driver_user_id": driver_id, "charger_id": chargers[i % CHARGERS][0],
+         "session_start": now - timedelta(minutes=10), "source": "demo"}
+        for i, driver_id in enumerate(driver_ids)
+    ])
+    # Historical completed sessions for charger stats
+    db.execute(insert(SessionEvent), [
+        {"id": uuid.uuid4(), "driver_user_id": rng.choice(driver_ids), "charger_id": chargers[i % CHARGERS][0],
+         "session_start": now - timedelta(days=rng.uniform(1, 60)), "session_end": now - timedelta(days=1),
+         "duration_minutes": rng.randint(5, 90), "source": "demo"}
+        for i in range(CHARGERS * 5)
+    ])
+    db.execute(insert(NovaTransaction), [
+        {"id": uuid.uuid4(), "type": "driver_earn", "driver_user_id": driver_id, "amount": rng.randint(10, 500),
+         "created_at": now - timedelta(hours=h)}
+        for driver_id in driver_ids for h in range(50)
+    ])
+    db.commit()
+    return chargers, driver_ids
+
+
+@pytest.mark.slow
+def test_driver_endpoint_latency_budget(client, db, monkeypatch):
+    from app.dependencies.driver import get_current_driver, get_current_driver_optional
+    from app.main_simple import app
+    from app.middleware.ratelimit import RateLimitMiddleware
+    from app.services.exclusive_resolver import resident_directory
+
+    # Every request comes from one client: measure the handlers, not the limiter
+    monkeypatch.setattr(RateLimitMiddleware, "_get_limit_for_path", lambda self, path: 10 ** 9)
+
+    rng = random.Random(SEED)
+    chargers, driver_ids = _seed(db, rng)
+    resident_directory.invalidate()
+
+    def as_driver(driver_id):
+        # Re-fetched per request: the request may close the shared session
+        app.dependency_overrides[get_current_driver] = lambda: db.get(User, driver_id)
+        app.dependency_overrides[get_current_driver_optional] = lambda: db.get(User, driver_id)
+
+    def sample_charger():
+        return chargers[rng.randrange(CHARGERS)]
+
+    results = {}
+
+    def discovery():
+        _, lat, lng = sample_charger()
+        return client.get("/v1/chargers/discovery", params={"lat": lat, "lng": lng, "radius_km": 10, "limit": 50})
+    results["discovery"] = run_scenario((discovery for _ in range(REQUESTS + WARMUP)), warmup=WARMUP)
+
+    def detail():
+        charger_id, lat, lng = sample_charger()
+        return client.get(f"/v1/chargers/{charger_id}/detail", params={"lat": lat, "lng": lng})
+    results["charger_detail"] = run_scenario((detail for _ in range(REQUESTS + WARMUP)), warmup=WARMUP)
+
+    counter = iter(range(10 ** 9))
+
+    def intent_capture():
+        n = next(counter)
+        _, lat, lng = sample_charger()
+        # Unique coordinates and client IP: no response-cache hits
+        return client.post(
+            "/v1/intent/capture",
+            json={"lat": lat + (n % 97) * 1e-4, "lng": lng, "accuracy_m": 20},
+            headers={"X-Forwarded-For": f"10.{n // 65536 % 256}.{n // 256 % 256}.{n % 256}"},
+        )
+    results["intent_capture"] = run_scenario((intent_capture for _ in range(REQUESTS + WARMUP)), warmup=WARMUP)
+
+    activated = []
+
+    def activate(i):
+        def send():
+            as_driver(driver_ids[i])
+            charger_id, lat, lng = chargers[i % CHARGERS]
+            response = client.post("/v1/exclusive/activate", json={
+                "merchant_place_id": f"lt_place_{i % CHARGERS}",
+                "charger_id": charger_id, "lat": lat, "lng": lng,
+            })
+            if response.status_code == 200:
+                activated.append((driver_ids[i], response.json()["exclusive_session"]["id"]))
+            return response
+        return send
+    results["exclusive_activate"] = run_scenario(activate(i) for i in range(min(DRIVERS, REQUESTS)))
+
+    def complete(driver_id, session_id):
+        def send():
+            as_driver(driver_id)
+            return client.post("/v1/exclusive/complete", json={"exclusive_session_id": session_id})
+        return send
+    results["exclusive_complete"] = run_scenario(complete(d, s) for d, s in activated)
+
+    def telemetry(i):
+        def send():
+            n = i % DRIVERS
+            return client.post("/v1/webhooks/tesla/telemetry", json={
+                "vin": f"LT{n:015d}",
+                "data": [
+                    {"key": "DetailedChargeState", "value": "Charging"},
+                    {"key": "BatteryLevel", "value": 20 + i % 70},
+                    {"key": "ACChargingPower", "value": 11.0},
+                ],
+                "created_at": datetime.utcnow().isoformat(),
+                "msg_type": "data",
+            })
+        return send
+    results["telemetry_webhook"] = run_scenario(
+        (telemetry(i) for i in range(REQUESTS + WARMUP)), warmup=WARMUP,
+        check=lambda r: r.json().get("status") == "processed",
+    )
+
+    def timeline(i):
+        def send():
+            as_driver(driver_ids[i % DRIVERS])
+            return client.get("/v1/wallet/timeline", params={"limit": 20})
+        return send
+    results["wallet_timeline"] = run_scenario((timeline(i) for i in range(REQUESTS + WARMUP)), warmup=WARMUP)
+
+    report = write_report(OUTPUT, results, meta={
+        "database": db.get_bind().dialect.name,
+        "seed": {"chargers": CHARGERS, "merchants": MERCHANTS, "drivers": DRIVERS, "rng_seed": SEED},
+        "requests_per_scenario": REQUESTS,
+    })
+    print("\ndriver_endpoints_load " + json.dumps(report["scenarios"]))
+
+    for name, result in results.items():
+        assert result.errors == 0, f"{name}: {result.errors} failed requests"
+    if BASELINE:
+        problems = compare(json.loads(Path(BASELINE).read_text()), report, THRESHOLD)
+        assert not problems, "\n".join(problems)
@@ -0,0 +1,103 @@
+"""
+Latency benchmark for POST /v1/exclusive/activate against a seeded database.
+
+Run with:  pytest tests/perf/test_exclusive_activate_latency.py --slow -s --no-cov
+
+Seeds chargers, merchants and drivers (each with an open charging session),
+activates once per driver and prints p50/p95/p99 plus SQL statements per
+request. EXCLUSIVE_BENCH_DRIVERS / _CHARGERS / _MERCHANTS scale the seed.
+"""
+import json
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert
+
+from app.models import User
+from app.models.session_event import SessionEvent
+from app.models.while_you_charge import Charger, Merchant
+
+DRIVERS = int(os.getenv("EXCLUSIVE_BENCH_DRIVERS", "300"))
+CHARGERS = int(os.getenv("EXCLUSIVE_BENCH_CHARGERS", "5000"))
+MERCHANTS = int(os.getenv("EXCLUSIVE_BENCH_MERCHANTS", "20000"))
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+@pytest.mark.slow
+def test_activate_latency(client, db):
+    from app.dependencies.driver import get_current_driver
+    from app.main_simple import app
+    from app.services.exclusive_resolver import resident_directory
+
+    now = datetime.utcnow()
+    db.execute(insert(Charger), [
+        {"id": f"bench_ch_{i}", "name": f"Bench Charger {i}",
+         "lat": 30.0 + i * 1e-4, "lng": -97.0 - i * 1e-4}
+        for i in range(CHARGERS)
+    ])
+    db.execute(insert(Merchant), [
+        {"id": f"bench_m_{i}", "name": f"Bench Merchant {i}", "place_id": f"bench_place_{i}",
+         "lat": 30.0 + i * 1e-4, "lng": -97.0 - i * 1e-4, "short_code": f"BM{i:05d}",
+         "region_code": "ATX", "is_corporate": False, "created_at": now, "updated_at": now}
+        for i in range(MERCHANTS)
+    ])
+    drivers = [
+        User(public_id=str(uuid.uuid4()), phone=f"+1555{i:07d}", auth_provider="phone", is_active=True)
+        for i in range(DRIVERS)
+    ]
+    db.add_all(drivers)
+    db.flush()
+    db.execute(insert(SessionEvent), [
+        {"id": uuid.uuid4(), "driver_user_id": d.id, "charger_id": f"bench_ch_{i % CHARGERS}",
+         "session_start": now - timedelta(minutes=10), "source": "demo"}
+        for i, d in enumerate(drivers)
+    ])
+    db.commit()
+    driver_ids = [d.id for d in drivers]
+    resident_directory.invalidate()
+
+    statements = []
+    bind = db.connection()
+    counter = lambda *args: statements.append(1)  # noqa: E731
+    event.listen(bind, "before_cursor_execute", counter)
+
+    latencies_ms = []
+    per_request_statements = []
+    try:
+        for i, driver_id in enumerate(driver_ids):
+            charger_idx = i % CHARGERS
+            # Re-fetched per request: the request may close the shared session
+            app.dependency_overrides[get_current_driver] = lambda d_id=driver_id: db.get(User, d_id)
+            body = {
+                "merchant_place_id": f"bench_place_{(i * 7) % MERCHANTS}",
+                "charger_id": f"bench_ch_{charger_idx}",
+                "lat": 30.0 + charger_idx * 1e-4,
+                "lng": -97.0 - charger_idx * 1e-4,
+            }
+            before = len(statements)
+            start = time.perf_counter()
+            response = client.post("/v1/exclusive/activate", json=body)
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+            per_request_statements.append(len(statements) - before)
+            assert response.status_code == 200, response.text
+    finally:
+        event.remove(bind, "before_cursor_execute", counter)
+
+    summary = {
+        "requests": len(latencies_ms),
+        "seed": {"drivers": DRIVERS, "chargers": CHARGERS, "merchants": MERCHANTS},
+        "p50_ms": round(_percentile(latencies_ms, 50), 2),
+        "p95_ms": round(_percentile(latencies_ms, 95), 2),
+        "p99_ms": round(_percentile(latencies_ms, 99), 2),
+        "mean_ms": round(statistics.mean(latencies_ms), 2),
+        "sql_statements_per_request": round(statistics.mean(per_request_statements), 2),
+    }
+    print("\nexclusive_activate_latency " + json.dumps(summary))
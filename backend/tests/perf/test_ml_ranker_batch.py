@@ -0,0 +1,106 @@
+"""
+Batch ranking throughput at ML_RANKER_BENCH_SIZE candidates.
+
+Run with:  pytest tests/perf/test_ml_ranker_batch.py --slow -s --no-cov
+
+Ranks ML_RANKER_BENCH_SIZE hubs and as many perks (default 10000) with
+rank_candidates, and with the per-candidate ranker it replaced (kept below
+as _legacy_*: one score_hub/score_perk call per item with its own haversine,
+then a full sort). Both must pick the same top hubs and perks, and the batch
+path must be faster.
+"""
+import json
+import math
+import os
+import random
+import time
+
+import pytest
+
+from app.services.ml_ranker import predicted_hub_occupancy, rank_candidates
+
+SIZE = int(os.getenv("ML_RANKER_BENCH_SIZE", "10000"))
+ROUNDS = int(os.getenv("ML_RANKER_BENCH_ROUNDS", "5"))
+
+
+def _legacy_haversine(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (math.sin(dlat / 2) * math.sin(dlat / 2)
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2))
+         * math.sin(dlon / 2) * math.sin(dlon / 2))
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _legacy_score_hub(hub, user_id, context):
+    distance_km = _legacy_haversine(context.get('user_lat', 0), context.get('user_lng', 0),
+                                    hub.get('lat', 0), hub.get('lng', 0))
+    score = (100 + 50 + 25) / max(1, distance_km * 0.1)
+    occupancy = predicted_hub_occupancy(hub, context.get('ts'))
+    if occupancy is not None:
+        score *= 1 - 0.5 * occupancy
+    return score
+
+
+def _legacy_score_perk(perk, user_id, context):
+    score = 50
+    hour = context.get('hour', 12)
+    if 'coffee' in perk.get('name', '').lower() and 6 <= hour <= 10:
+        score += 30
+    elif 'lunch' in perk.get('name', '').lower() and 11 <= hour <= 14:
+        score += 30
+    value = perk.get('value_cents', 0)
+    if value > 0:
+        score += min(50, value / 10)
+    return score
+
+
+def _legacy_rank(user_id, lat, lng, hubs, perks):
+    context = {'user_lat': lat, 'user_lng': lng, 'hour': 12}
+    hub_scores = [{'hub': hub, 'score': _legacy_score_hub(hub, user_id, context)} for hub in hubs]
+    hub_scores.sort(key=lambda x: x['score'], reverse=True)
+    perk_scores = [{'perk': perk, 'score': _legacy_score_perk(perk, user_id, context)} for perk in perks]
+    perk_scores.sort(key=lambda x: x['score'], reverse=True)
+    return {'ranked_hubs': hub_scores[:5], 'ranked_perks': perk_scores[:3]}
+
+
+def _best_ms(fn) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+@pytest.mark.slow
+def test_batch_ranking_beats_the_per_candidate_ranker():
+    rng = random.Random(42)
+    # No port counts: the legacy ranker has no availability term
+    hubs = [
+        {"id": f"hub_{i}", "lat": 30.27 + rng.uniform(-0.5, 0.5), "lng": -97.74 + rng.uniform(-0.5, 0.5)}
+        for i in range(SIZE)
+    ]
+    perks = [
+        {"id": f"perk_{i}", "name": rng.choice(["Coffee & Pastry", "Lunch Special", "WiFi Access", "Parking"]),
+         "value_cents": rng.randint(0, 1000)}
+        for i in range(SIZE)
+    ]
+
+    def legacy():
+        return _legacy_rank("u1", 30.27, -97.74, hubs, perks)
+
+    def batch():
+        return rank_candidates("u1", 30.27, -97.74, hubs, perks)
+
+    expected, ranked = legacy(), batch()
+    assert [h["hub"]["id"] for h in ranked["ranked_hubs"]] == [h["hub"]["id"] for h in expected["ranked_hubs"]]
+    assert [p["score"] for p in ranked["ranked_perks"]] == [p["score"] for p in expected["ranked_perks"]]
+
+    results = {
+        "candidates": SIZE,
+        "legacy_ms": round(_best_ms(legacy), 2),
+        "batch_ms": round(_best_ms(batch), 2),
+    }
+    print("\nml_ranker_batch " + json.dumps(results))
+    assert results["batch_ms"] < results["legacy_ms"], results
@@ -0,0 +1,70 @@
+"""
+Refresh-token validation latency as the number of live tokens grows.
+
+Run with:  pytest tests/perf/test_refresh_token_lookup.py --slow -s --no-cov
+
+Grows refresh_tokens through REFRESH_BENCH_SIZES live tokens (default
+1000,10000,100000; add 1000000 for the full curve) and times
+RefreshTokenService.validate_refresh_token for real tokens at each size.
+Selector lookups must stay flat: p95 at the largest size within 3x (or 2ms)
+of the smallest.
+"""
+import json
+import os
+import secrets
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.core.security import hash_refresh_token_verifier
+from app.models import RefreshToken, User
+from app.services.refresh_token_service import RefreshTokenService
+
+from .loadtest import percentile
+
+SIZES = [int(n) for n in os.getenv("REFRESH_BENCH_SIZES", "1000,10000,100000").split(",")]
+SAMPLES = int(os.getenv("REFRESH_BENCH_SAMPLES", "200"))
+BATCH = 10000
+
+
+@pytest.mark.slow
+def test_refresh_validation_is_flat_in_live_tokens(db):
+    user = User(public_id=str(uuid.uuid4()), email="refresh-bench@example.com", is_active=True)
+    db.add(user)
+    db.flush()
+    expires_at = datetime.utcnow() + timedelta(days=30)
+
+    live = 0
+    results = {}
+    for size in SIZES:
+        while live < size:
+            n = min(BATCH, size - live)
+            db.execute(insert(RefreshToken), [
+                {"id": uuid.uuid4(), "user_id": user.id, "selector": secrets.token_urlsafe(12),
+                 "token_hash": hash_refresh_token_verifier(secrets.token_urlsafe(32)),
+                 "expires_at": expires_at, "revoked": False}
+                for _ in range(n)
+            ])
+            live += n
+        plains = [RefreshTokenService.create_refresh_token(db, user)[0] for _ in range(SAMPLES)]
+        live += SAMPLES
+        db.commit()
+
+        latencies_ms = []
+        for plain in plains:
+            start = time.perf_counter()
+            token = RefreshTokenService.validate_refresh_token(db, plain)
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+            assert token is not None
+        results[size] = {
+            "live_tokens": live,
+            "p50_ms": round(percentile(latencies_ms, 50), 3),
+            "p95_ms": round(percentile(latencies_ms, 95), 3),
+        }
+
+    print("\nrefresh_token_lookup " + json.dumps(results))
+    smallest, largest = results[SIZES[0]]["p95_ms"], results[SIZES[-1]]["p95_ms"]
+    assert largest <= max(smallest * 3, smallest + 2.0), results
@@ -192,6 +192,76 @@ class TestNovaServiceGrantToDriver:
         assert wallet.energy_reputation_score == 0  # No reputation for admin_grant
 
 
+class TestNovaServiceGrantMany:
+    """Test NovaService.grant_many"""
+
+    def _make_driver(self, db: Session, email: str) -> User:
+        user = User(email=email, password_hash="hashed", is_active=True, role_flags="driver")
+        db.add(user)
+        db.flush()
+        return user
+
+    def test_grant_many_applies_deltas_and_creates_wallets(self, db: Session):
+        """Test balances aggregate per driver and missing wallets are created"""
+        user1 = self._make_driver(db, "bulk1@example.com")
+        user2 = self._make_driver(db, "bulk2@example.com")
+        db.add(DriverWallet(user_id=user1.id, nova_balance=50, energy_reputation_score=5))
+        db.commit()
+
+        transactions = NovaService.grant_many(db, [
+            {"driver_id": user1.id, "amount": 100, "type": "driver_earn", "idempotency_key": "bulk_a"},
+            {"driver_id": user2.id, "amount": 30, "type": "admin_grant", "idempotency_key": "bulk_b"},
+            {"driver_id": user1.id, "amount": 20, "type": "admin_grant", "idempotency_key": "bulk_c"},
+        ])
+
+        assert [t.amount for t in transactions] == [100, 30, 20]
+        assert [t.driver_user_id for t in transactions] == [user1.id, user2.id, user1.id]
+
+        wallet1 = db.query(DriverWallet).filter(DriverWallet.user_id == user1.id).one()
+        wallet2 = db.query(DriverWallet).filter(DriverWallet.user_id == user2.id).one()
+        assert wallet1.nova_balance == 170
+        assert wallet1.energy_reputation_score == 105  # only driver_earn adds reputation
+        assert wallet2.nova_balance == 30
+        assert wallet2.energy_reputation_score == 0
+
+    def test_grant_many_idempotent_replay(self, db: Session):
+        """Test replaying a batch returns existing transactions without double-crediting"""
+        user = self._make_driver(db, "bulk3@example.com")
+        db.commit()
+        grants = [
+            {"driver_id": user.id, "amount": 40, "idempotency_key": "bulk_replay_1"},
+            {"driver_id": user.id, "amount": 40, "idempotency_key": "bulk_replay_1"},
+            {"driver_id": user.id, "amount": 10, "idempotency_key": "bulk_replay_2"},
+        ]
+
+        first = NovaService.grant_many(db, grants)
+        second = NovaService.grant_many(db, grants)
+
+        assert first[0].id == first[1].id
+        assert [t.id for t in first] == [t.id for t in second]
+        wallet = db.query(DriverWallet).filter(DriverWallet.user_id == user.id).one()
+        assert wallet.nova_balance == 50
+        assert db.query(NovaTransaction).filter(NovaTransaction.driver_user_id == user.id).count() == 2
+
+    def test_grant_many_idempotency_conflict(self, db: Session):
+        """Test same key with a different payload raises 409 and applies nothing"""
+        from fastapi import HTTPException
+
+        user = self._make_driver(db, "bulk4@example.com")
+        db.commit()
+        NovaService.grant_many(db, [{"driver_id": user.id, "amount": 10, "idempotency_key": "bulk_conflict"}])
+
+        with pytest.raises(HTTPException) as exc_info:
+            NovaService.grant_many(db, [
+                {"driver_id": user.id, "amount": 5, "idempotency_key": "bulk_other"},
+                {"driver_id": user.id, "amount": 99, "idempotency_key": "bulk_conflict"},
+            ])
+        assert exc_info.value.status_code == 409
+
+        wallet = db.query(DriverWallet).filter(DriverWallet.user_id == user.id).one()
+        assert wallet.nova_balance == 10
+
+
 class TestNovaServiceRedeemFromDriver:
     """Test NovaService.redeem_from_driver"""
     
@@ -288,6 +288,19 @@ class TestTeslaOAuthVerifyAllVehicles:
         assert call_count == 3
 
 
+def _expired_connection(db):
+    connection = TeslaConnection(
+        user_id=1,
+        access_token="encrypted_access",
+        refresh_token="encrypted_refresh",
+        token_expires_at=datetime.utcnow() - timedelta(hours=1),
+        is_active=True,
+    )
+    db.add(connection)
+    db.commit()
+    return connection
+
+
 class TestTeslaOAuthTokenRefresh:
     """Tests for get_valid_access_token with error differentiation."""
 
@@ -306,10 +319,7 @@ class TestTeslaOAuthTokenRefresh:
 
     def test_token_refresh_on_401_deactivates(self, db):
         """HTTP 401 during refresh should deactivate the connection."""
-        connection = MagicMock(spec=TeslaConnection)
-        connection.token_expires_at = datetime.utcnow() - timedelta(hours=1)
-        connection.refresh_token = "encrypted_refresh"
-        connection.is_active = True
+        connection = _expired_connection(db)
 
         service = MagicMock()
         # Build a proper httpx response for 401
@@ -328,9 +338,7 @@ class TestTeslaOAuthTokenRefresh:
 
     def test_token_refresh_on_5xx_raises(self, db):
         """HTTP 5xx during refresh should raise (transient error)."""
-        connection = MagicMock(spec=TeslaConnection)
-        connection.token_expires_at = datetime.utcnow() - timedelta(hours=1)
-        connection.refresh_token = "encrypted_refresh"
+        connection = _expired_connection(db)
 
         service = MagicMock()
         mock_response = MagicMock()
@@ -344,6 +352,9 @@ class TestTeslaOAuthTokenRefresh:
             with pytest.raises(httpx.HTTPStatusError):
                 _run_async(get_valid_access_token(db, connection, service))
 
+        # The refresh lease is released for the next attempt
+        assert connection.refresh_lease_until is None
+
 
 class TestEVCodeGeneration:
     """Tests for EV verification code generation."""
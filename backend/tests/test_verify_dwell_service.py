@@ -885,19 +885,10 @@ class TestPing:
     
     def test_load_target_coords_charger_fallback(self, db: Session):
         """Test _load_target_coords falls back to chargers table"""
-        # Create chargers table (not chargers_openmap)
-        db.execute(text("DROP TABLE IF EXISTS chargers"))
-        db.execute(text("""
-            CREATE TABLE chargers (
-                id TEXT PRIMARY KEY,
-                lat REAL,
-                lng REAL
-            )
-        """))
-        db.execute(text("""
-            INSERT INTO chargers (id, lat, lng)
-            VALUES ('ch1', 30.2672, -97.7431)
-        """))
+        # Row in the chargers table (not chargers_openmap). Use the real table:
+        # SQLite DDL here would escape the fixture's rollback and break later tests
+        from app.models.while_you_charge import Charger
+        db.add(Charger(id="ch1", name="Fallback Charger", lat=30.2672, lng=-97.7431))
         db.commit()
         
         row = {"target_type": "charger", "target_id": "ch1", "radius_m": 100}
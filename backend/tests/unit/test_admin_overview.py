@@ -0,0 +1,89 @@
+"""
+Tests for the admin overview snapshot and the subscription invoice ledger.
+"""
+import uuid
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.models import MerchantAccount, User
+from app.models.merchant_subscription import MerchantSubscription, SubscriptionInvoicePayment
+from app.services.admin_overview import compute_overview
+from app.services.merchant_subscription_service import handle_invoice_paid
+
+
+def _subscription(db: Session, customer_id: str, status: str = "active") -> MerchantSubscription:
+    owner = User(public_id=str(uuid.uuid4()), email=f"{customer_id}@example.com", is_active=True)
+    db.add(owner)
+    db.flush()
+    account = MerchantAccount(id=str(uuid.uuid4()), owner_user_id=owner.id)
+    db.add(account)
+    db.flush()
+    sub = MerchantSubscription(
+        id=str(uuid.uuid4()),
+        merchant_account_id=account.id,
+        plan="pro",
+        status=status,
+        stripe_subscription_id=f"sub_{customer_id}",
+        stripe_customer_id=customer_id,
+    )
+    db.add(sub)
+    db.commit()
+    return sub
+
+
+def _invoice(invoice_id: str, customer_id: str, amount: int) -> dict:
+    return {
+        "id": invoice_id,
+        "customer": customer_id,
+        "subscription": f"sub_{customer_id}",
+        "amount_paid": amount,
+        "currency": "usd",
+        "status_transitions": {"paid_at": int(datetime(2026, 1, 5).timestamp())},
+    }
+
+
+def test_invoice_ledger_is_idempotent_and_feeds_overview(db: Session):
+    _subscription(db, "cus_active")
+    _subscription(db, "cus_gone", status="canceled")
+    before = compute_overview(db)["revenue"]["merchant_subscriptions_cents"]
+
+    assert handle_invoice_paid(db, _invoice("in_1", "cus_active", 4900)) is True
+    # invoice.payment_succeeded for the same invoice, and a retry
+    assert handle_invoice_paid(db, _invoice("in_1", "cus_active", 4900)) is False
+    assert handle_invoice_paid(db, _invoice("in_2", "cus_active", 4900)) is True
+    assert handle_invoice_paid(db, _invoice("in_3", "cus_gone", 9900)) is True
+    # One-off invoices are not subscription revenue
+    assert handle_invoice_paid(db, {**_invoice("in_4", "cus_active", 100), "subscription": None}) is False
+
+    assert db.query(SubscriptionInvoicePayment).filter(
+        SubscriptionInvoicePayment.stripe_invoice_id.in_(["in_1", "in_2", "in_3", "in_4"])
+    ).count() == 3
+    revenue = compute_overview(db)["revenue"]
+    assert revenue["merchant_subscriptions_cents"] - before == 9800
+
+
+def test_overview_serves_snapshot_until_refreshed(client, db: Session):
+    from app.dependencies_domain import require_admin
+    from app.main_simple import app
+
+    admin = User(public_id=str(uuid.uuid4()), email="overview-admin@example.com", is_active=True)
+    db.add(admin)
+    db.commit()
+    app.dependency_overrides[require_admin] = lambda: admin
+
+    first = client.get("/v1/admin/overview")
+    assert first.status_code == 200, first.text
+    body = first.json()
+    assert body["snapshot_computed_at"] is not None
+    assert body["snapshot_age_seconds"] >= 0
+
+    db.add(User(public_id=str(uuid.uuid4()), email="new-driver@example.com", role_flags="driver", is_active=True))
+    db.commit()
+
+    # Still the stored snapshot
+    assert client.get("/v1/admin/overview").json()["total_drivers"] == body["total_drivers"]
+
+    refreshed = client.post("/v1/admin/overview/refresh")
+    assert refreshed.status_code == 200, refreshed.text
+    assert refreshed.json()["total_drivers"] == body["total_drivers"] + 1
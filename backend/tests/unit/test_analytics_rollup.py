@@ -0,0 +1,172 @@
+"""
+Tests for the admin analytics daily rollups and the dirty-day worker.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.models import User
+from app.models.analytics_rollup import (
+    AnalyticsCampaignDailyRollup,
+    AnalyticsChargerDailyRollup,
+    AnalyticsDailyRollup,
+    AnalyticsDirtyDay,
+)
+from app.models.campaign import Campaign
+from app.models.driver_wallet import DriverWallet, Payout
+from app.models.session_event import IncentiveGrant, SessionEvent
+from app.services.analytics_rollup import AnalyticsRollupWorker
+
+
+def _driver(db: Session, n: int) -> User:
+    user = User(public_id=str(uuid.uuid4()), phone=f"+1512555{n:04d}", auth_provider="phone", is_active=True)
+    db.add(user)
+    db.flush()
+    return user
+
+
+def _session(db: Session, driver: User, start: datetime, charger_id="rollup_ch_1", kwh=10.0) -> SessionEvent:
+    event = SessionEvent(
+        id=str(uuid.uuid4()),
+        driver_user_id=driver.id,
+        charger_id=charger_id,
+        session_start=start,
+        kwh_delivered=kwh,
+        source="demo",
+    )
+    db.add(event)
+    db.flush()
+    return event
+
+
+def _campaign(db: Session, owner: User) -> Campaign:
+    campaign = Campaign(
+        id=str(uuid.uuid4()),
+        sponsor_name="Rollup Sponsor",
+        name="Rollup Campaign",
+        status="active",
+        budget_cents=100000,
+        cost_per_session_cents=200,
+        start_date=datetime.utcnow() - timedelta(days=30),
+        created_by_user_id=owner.id,
+    )
+    db.add(campaign)
+    db.flush()
+    return campaign
+
+
+def _dirty_days(db: Session):
+    return {row.day for row in db.query(AnalyticsDirtyDay).all()}
+
+
+def _days_ago(n: int, hour: int = 12) -> datetime:
+    return datetime.combine((datetime.utcnow() - timedelta(days=n)).date(), datetime.min.time()) + timedelta(hours=hour)
+
+
+def test_writes_mark_days_and_worker_rolls_them_up(db: Session):
+    a, b = _driver(db, 1), _driver(db, 2)
+    d3, d2 = _days_ago(3), _days_ago(2)
+    first = _session(db, a, d3, kwh=12.5)
+    _session(db, a, d3 + timedelta(hours=2), kwh=7.5)
+    _session(db, b, d3, charger_id="rollup_ch_2", kwh=5.0)
+    _session(db, a, d2, kwh=3.0)
+    campaign = _campaign(db, a)
+    db.add(IncentiveGrant(
+        id=str(uuid.uuid4()), session_event_id=first.id, campaign_id=campaign.id, driver_user_id=a.id,
+        amount_cents=200, status="granted", idempotency_key=f"rollup-{uuid.uuid4()}",
+        granted_at=d3, created_at=d3,
+    ))
+    wallet = DriverWallet(id=str(uuid.uuid4()), user_id=a.id)
+    db.add(wallet)
+    db.flush()
+    payout = Payout(
+        id=str(uuid.uuid4()), driver_id=a.id, wallet_id=wallet.id, amount_cents=1500,
+        status="pending", idempotency_key=f"rollup-{uuid.uuid4()}", created_at=d2,
+    )
+    db.add(payout)
+    db.commit()
+    assert {d3.date(), d2.date()} <= _dirty_days(db)
+
+    worker = AnalyticsRollupWorker(batch_days=500)
+    worker.drain(db)
+    assert not {d3.date(), d2.date()} & _dirty_days(db)
+
+    day3 = db.get(AnalyticsDailyRollup, d3.date())
+    assert (day3.session_count, day3.total_kwh, day3.active_drivers, day3.new_drivers) == (3, 25.0, 2, 2)
+    assert (day3.grant_count, day3.grants_cents, day3.payout_count) == (1, 200, 0)
+    day2 = db.get(AnalyticsDailyRollup, d2.date())
+    assert (day2.session_count, day2.active_drivers, day2.new_drivers, day2.payouts_cents) == (1, 1, 0, 0)
+
+    chargers = {
+        r.charger_id: r.session_count
+        for r in db.query(AnalyticsChargerDailyRollup).filter(AnalyticsChargerDailyRollup.day == d3.date())
+    }
+    assert chargers == {"rollup_ch_1": 2, "rollup_ch_2": 1}
+    campaign_row = db.get(AnalyticsCampaignDailyRollup, (d3.date(), campaign.id))
+    assert (campaign_row.grant_count, campaign_row.grants_cents) == (1, 200)
+
+    # Only the payout's day is dirtied (and recomputed) when it gets paid
+    payout.status = "paid"
+    db.commit()
+    assert d2.date() in _dirty_days(db) and d3.date() not in _dirty_days(db)
+    worker.drain(db)
+    assert db.get(AnalyticsDailyRollup, d2.date()).payouts_cents == 1500
+
+
+def test_backfilled_session_moves_new_driver_to_earlier_day(db: Session):
+    driver = _driver(db, 3)
+    d2, d5 = _days_ago(2), _days_ago(5)
+    _session(db, driver, d2)
+    db.commit()
+    worker = AnalyticsRollupWorker(batch_days=500)
+    worker.drain(db)
+    assert db.get(AnalyticsDailyRollup, d2.date()).new_drivers == 1
+
+    _session(db, driver, d5)
+    db.commit()
+    worker.drain(db)
+    assert db.get(AnalyticsDailyRollup, d5.date()).new_drivers == 1
+    db.expire_all()
+    assert db.get(AnalyticsDailyRollup, d2.date()).new_drivers == 0
+
+
+def test_endpoints_combine_rollups_with_live_day(client, db: Session):
+    from app.dependencies_domain import require_admin
+    from app.main_simple import app
+
+    admin = _driver(db, 4)
+    driver = _driver(db, 5)
+    d4 = _days_ago(4)
+    past = _session(db, driver, d4, kwh=8.0)
+    campaign = _campaign(db, admin)
+    db.add(IncentiveGrant(
+        id=str(uuid.uuid4()), session_event_id=past.id, campaign_id=campaign.id, driver_user_id=driver.id,
+        amount_cents=200, status="granted", idempotency_key=f"rollup-{uuid.uuid4()}",
+        granted_at=d4, created_at=d4,
+    ))
+    db.commit()
+    AnalyticsRollupWorker(batch_days=500).drain(db)
+
+    # Today's sessions are never rolled up; they are read live
+    today = _session(db, driver, datetime.utcnow() - timedelta(seconds=1), kwh=2.0)
+    db.add(IncentiveGrant(
+        id=str(uuid.uuid4()), session_event_id=today.id, campaign_id=campaign.id, driver_user_id=driver.id,
+        amount_cents=200, status="granted", idempotency_key=f"rollup-{uuid.uuid4()}",
+        granted_at=datetime.utcnow(), created_at=datetime.utcnow(),
+    ))
+    db.commit()
+
+    app.dependency_overrides[require_admin] = lambda: admin
+    sessions = {row["date"]: row for row in client.get("/v1/admin/analytics/sessions?days=7").json()}
+    assert sessions[d4.date().isoformat()] == {"date": d4.date().isoformat(), "count": 1, "total_kwh": 8.0}
+    assert sessions[datetime.utcnow().date().isoformat()]["count"] >= 1
+
+    drivers = {row["date"]: row for row in client.get("/v1/admin/analytics/drivers?days=7").json()}
+    assert drivers[d4.date().isoformat()]["new_drivers"] >= 1
+
+    campaigns = {row["id"]: row for row in client.get("/v1/admin/analytics/campaigns?days=7").json()}
+    assert campaigns[str(campaign.id)]["grant_count"] == 2
+
+    chargers = {row["charger_id"]: row for row in client.get("/v1/admin/analytics/chargers?days=7").json()}
+    assert chargers["rollup_ch_1"]["sessions"] >= 2
@@ -0,0 +1,70 @@
+"""
+Tests for the durable async wallet credit processor.
+"""
+from sqlalchemy.orm import Session
+
+from app.models.extra import CreditLedger, WalletCreditJob
+from app.services.async_wallet import AsyncWalletProcessor
+
+
+def test_enqueue_is_idempotent_by_session_id(db: Session):
+    processor = AsyncWalletProcessor(batch_size=10)
+
+    assert processor.enqueue(db, "42", 150, "sess-1") is True
+    assert processor.enqueue(db, "42", 150, "sess-1") is False
+    db.commit()
+
+    jobs = db.query(WalletCreditJob).filter(WalletCreditJob.session_id == "sess-1").all()
+    assert len(jobs) == 1
+    assert jobs[0].status == "pending"
+    assert processor.stats["duplicates"] == 1
+
+
+def test_flush_batch_applies_credits_in_batches(db: Session):
+    processor = AsyncWalletProcessor(batch_size=2)
+    for i in range(3):
+        processor.enqueue(db, "7", 100 + i, f"sess-batch-{i}")
+    db.commit()
+
+    assert processor.flush_batch(db) == 2
+    assert processor.flush_batch(db) == 1
+    assert processor.flush_batch(db) == 0
+
+    rows = db.query(CreditLedger).filter(CreditLedger.user_ref == "7").all()
+    assert sorted(r.cents for r in rows) == [100, 101, 102]
+    assert {r.meta["session_id"] for r in rows} == {"sess-batch-0", "sess-batch-1", "sess-batch-2"}
+    assert all(r.reason == "CHARGE_REWARD" for r in rows)
+
+    statuses = {j.status for j in db.query(WalletCreditJob).filter(WalletCreditJob.user_ref == "7")}
+    assert statuses == {"applied"}
+
+    # Re-queuing an applied session never credits twice
+    assert processor.enqueue(db, "7", 100, "sess-batch-0") is False
+    assert processor.flush_batch(db) == 0
+
+
+def test_failing_job_is_isolated_and_eventually_failed(monkeypatch, db: Session):
+    processor = AsyncWalletProcessor(batch_size=10, max_attempts=2)
+    processor.enqueue(db, "9", 50, "sess-good")
+    processor.enqueue(db, "9", 60, "sess-bad")
+    db.commit()
+
+    real_apply = processor._apply
+
+    def flaky_apply(db_arg, jobs, now):
+        if any(job.session_id == "sess-bad" for job in jobs):
+            raise RuntimeError("boom")
+        return real_apply(db_arg, jobs, now)
+
+    monkeypatch.setattr(processor, "_apply", flaky_apply)
+
+    assert processor.flush_batch(db) == 1
+    bad = db.query(WalletCreditJob).filter(WalletCreditJob.session_id == "sess-bad").one()
+    assert bad.status == "pending"
+    assert bad.attempts == 1
+
+    assert processor.flush_batch(db) == 0
+    db.refresh(bad)
+    assert bad.status == "failed"
+    assert "boom" in bad.last_error
+    assert db.query(CreditLedger).filter(CreditLedger.user_ref == "9").count() == 1
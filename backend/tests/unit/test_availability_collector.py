@@ -0,0 +1,83 @@
+"""
+Tests for the charger availability collector and hour-of-week occupancy totals.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.charger_availability import ChargerAvailabilitySnapshot, MonitoredStation
+from app.services.charger_occupancy import accumulate_hour_of_week, hour_of_week, occupancy_by_hour_of_week
+from app.workers import availability_collector
+
+
+def _stations(db: Session, count: int):
+    db.add_all([
+        MonitoredStation(station_id=f"tomtom_test_{i:02d}", name=f"Station {i}", tomtom_availability_id=f"avail-{i}")
+        for i in range(count)
+    ])
+    db.add(MonitoredStation(station_id="tomtom_test_off", name="Retired", tomtom_availability_id="avail-off", is_active=False))
+    db.commit()
+
+
+def _availability(occupied: int, total: int = 4) -> dict:
+    return {"connectors": [{
+        "type": "IEC62196Type1", "total": total,
+        "availability": {"current": {"available": total - occupied, "occupied": occupied, "outOfService": 0}},
+    }]}
+
+
+@pytest.mark.asyncio
+async def test_collects_stations_concurrently_in_one_bulk_write(db: Session, monkeypatch):
+    _stations(db, 8)
+    in_flight, peak, fetched = 0, 0, []
+
+    async def fetch(avail_id):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        fetched.append(avail_id)
+        return None if avail_id == "avail-5" else _availability(occupied=int(avail_id[-1]) % 5)
+
+    monkeypatch.setattr(availability_collector, "TOMTOM_API_KEY", "test")
+    monkeypatch.setattr(availability_collector, "FETCH_CONCURRENCY", 3)
+    monkeypatch.setattr(availability_collector, "_fetch_availability", fetch)
+
+    collected = await availability_collector._collect_once(
+        sessionmaker(bind=db.get_bind(), join_transaction_mode="create_savepoint")
+    )
+
+    assert collected == 7 and peak == 3
+    assert "avail-off" not in fetched
+    assert db.query(ChargerAvailabilitySnapshot).count() == 7
+    histogram = occupancy_by_hour_of_week(db, "tomtom_test_04")
+    assert histogram[hour_of_week(datetime.utcnow())]["avg_occupancy"] == 1.0
+
+
+def test_stations_rotate_when_over_the_daily_quota(db: Session, monkeypatch):
+    _stations(db, 10)
+    monkeypatch.setattr(availability_collector, "TOMTOM_DAILY_QUOTA", 4 * 96)  # 4 stations per cycle
+    monkeypatch.setattr(availability_collector, "_rotation", 0)
+
+    cycles = [[s["charger_id"][-2:] for s in availability_collector._load_stations(db)] for _ in range(3)]
+
+    assert cycles == [["00", "01", "02", "03"], ["04", "05", "06", "07"], ["08", "09", "00", "01"]]
+
+
+def test_hour_of_week_totals_accumulate_across_cycles(db: Session):
+    monday_9am = datetime(2026, 3, 2, 9, 15)
+    for occupied in (1, 3, 4):
+        accumulate_hour_of_week(db, [{
+            "charger_id": "c1", "recorded_at": monday_9am, "total_ports": 4,
+            "occupied_ports": occupied, "available_ports": 4 - occupied,
+        }])
+    # No ports reported: not a sample
+    accumulate_hour_of_week(db, [{"charger_id": "c1", "recorded_at": monday_9am, "total_ports": 0}])
+    db.commit()
+
+    histogram = occupancy_by_hour_of_week(db, "c1")
+    assert len(histogram) == 168 and sum(h is not None for h in histogram) == 1
+    assert histogram[9] == {"samples": 3, "avg_occupancy": 0.6667, "stddev": 0.3118, "full_pct": 0.3333}
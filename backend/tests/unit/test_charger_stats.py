@@ -0,0 +1,143 @@
+"""
+Tests for per-charger session stats: flush-time maintenance and nightly reconciliation.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import User
+from app.models.charger_stats import ChargerSessionStats
+from app.models.session_event import SessionEvent
+from app.services.charger_score import compute_nerava_score
+from app.services.charger_stats import (
+    ChargerStatsReconciler,
+    compute_charger_stats,
+    get_charger_stats,
+    refresh_charger_stats,
+)
+
+
+def _driver(db: Session) -> User:
+    driver = User(public_id=str(uuid.uuid4()), email=f"{uuid.uuid4().hex[:8]}@example.com", is_active=True)
+    db.add(driver)
+    db.flush()
+    return driver
+
+
+def _session(db: Session, charger_id: str, driver: User, start: datetime, minutes=None) -> SessionEvent:
+    session = SessionEvent(
+        id=str(uuid.uuid4()), driver_user_id=driver.id, charger_id=charger_id, session_start=start,
+    )
+    if minutes is not None:
+        session.session_end = start + timedelta(minutes=minutes)
+        session.duration_minutes = minutes
+    db.add(session)
+    db.flush()
+    return session
+
+
+def test_stats_follow_session_start_and_end(db: Session):
+    charger_id = f"ch_{uuid.uuid4().hex[:10]}"
+    now = datetime.utcnow()
+    a, b = _driver(db), _driver(db)
+    for minutes, driver in ((40, a), (3, a), (25, b), (30, b)):
+        _session(db, charger_id, driver, now - timedelta(days=2), minutes)
+    _session(db, charger_id, b, now - timedelta(days=20), 10)
+    live = _session(db, charger_id, a, now - timedelta(minutes=5))
+    db.commit()
+
+    stats = get_charger_stats(db, charger_id)
+    assert (stats.sessions_7d, stats.sessions_30d, stats.drivers_30d) == (5, 6, 2)
+    assert (stats.completed_sessions, stats.completed_over_5min, stats.completed_drivers) == (5, 4, 2)
+    assert stats.avg_completed_duration == 21.6
+    assert stats.open_sessions == 1
+
+    # Session end updates the row in the same flush
+    live.session_end = now
+    live.duration_minutes = 45
+    db.commit()
+    stats = get_charger_stats(db, charger_id)
+    assert (stats.open_sessions, stats.completed_sessions, stats.completed_over_5min) == (0, 6, 5)
+    assert compute_nerava_score(charger_id, db) is not None
+
+
+def test_incremental_updates_match_a_full_recompute(db: Session):
+    first, second = f"ch_{uuid.uuid4().hex[:10]}", f"ch_{uuid.uuid4().hex[:10]}"
+    now = datetime.utcnow()
+    a, b = _driver(db), _driver(db)
+    kept = _session(db, first, a, now - timedelta(days=40), 30)
+    moved = _session(db, first, a, now - timedelta(days=3), 12)
+    dropped = _session(db, first, b, now - timedelta(days=1), 4)
+    live = _session(db, second, b, now - timedelta(minutes=20))
+    db.commit()
+
+    moved.charger_id = second
+    db.delete(dropped)
+    db.flush()
+    live.session_end, live.duration_minutes = now, 20
+    kept.driver_user_id = b.id
+    _session(db, second, a, now - timedelta(days=2), 0)
+    db.commit()
+
+    expected = compute_charger_stats(db, [first, second])
+    for charger_id in (first, second):
+        stats = db.get(ChargerSessionStats, charger_id, populate_existing=True)
+        assert {field: getattr(stats, field) for field in expected[charger_id]} == expected[charger_id]
+    assert (expected[second]["completed_sessions"], expected[second]["completed_drivers"]) == (3, 2)
+    assert expected[first]["completed_drivers"] == 1
+
+
+def test_reading_a_charger_without_a_row_writes_nothing(db: Session):
+    charger_id = f"ch_{uuid.uuid4().hex[:10]}"
+    driver = _driver(db)
+    now = datetime.utcnow()
+    # A Core insert bypasses the flush hook, so no row exists yet
+    db.execute(insert(SessionEvent.__table__), [{
+        "id": str(uuid.uuid4()), "driver_user_id": driver.id, "charger_id": charger_id,
+        "session_start": now - timedelta(hours=2), "session_end": now - timedelta(hours=1),
+        "duration_minutes": 60, "source": "manual", "verified": False, "created_at": now, "updated_at": now,
+    }])
+    db.commit()
+
+    stats = get_charger_stats(db, charger_id)
+    assert (stats.completed_sessions, stats.avg_completed_duration) == (1, 60.0)
+    assert not db.new and not db.dirty
+    assert db.scalar(select(func.count()).select_from(ChargerSessionStats).where(
+        ChargerSessionStats.charger_id == charger_id)) == 0
+
+
+def test_unknown_charger_reads_zeroes(db: Session):
+    stats = get_charger_stats(db, "ch_never_used")
+    assert stats.sessions_30d == 0 and stats.open_sessions == 0
+    assert compute_nerava_score("ch_never_used", db) is None
+
+
+def test_nightly_reconcile_ages_windows_and_repairs_bulk_writes(db: Session):
+    charger_id = f"ch_{uuid.uuid4().hex[:10]}"
+    now = datetime.utcnow()
+    driver = _driver(db)
+    _session(db, charger_id, driver, now - timedelta(days=6, hours=12), 20)
+    db.commit()
+    assert get_charger_stats(db, charger_id).sessions_7d == 1
+
+    # A Core insert bypasses the flush hook
+    db.execute(insert(SessionEvent.__table__), [{
+        "id": str(uuid.uuid4()), "driver_user_id": driver.id, "charger_id": charger_id,
+        "session_start": now - timedelta(hours=1), "source": "manual", "verified": False,
+        "created_at": now, "updated_at": now,
+    }])
+    db.commit()
+    assert get_charger_stats(db, charger_id).open_sessions == 0
+
+    result = ChargerStatsReconciler().reconcile(db, now=now + timedelta(days=1))
+    assert result["chargers"] >= 1 and result["drifted"] >= 1
+    stats = db.get(ChargerSessionStats, charger_id, populate_existing=True)
+    # The six-and-a-half-day-old session has aged out of the 7d window
+    assert (stats.sessions_7d, stats.sessions_30d, stats.open_sessions) == (1, 2, 1)
+
+    # Recomputing again changes nothing
+    refresh_charger_stats(db, [charger_id], now + timedelta(days=1))
+    db.commit()
+    assert ChargerStatsReconciler().reconcile(db, now=now + timedelta(days=1))["drifted"] == 0
@@ -0,0 +1,69 @@
+"""
+Tests for the /v1/discover search service (geo range queries + keyset cursor).
+"""
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.discover import search
+
+LAT, LNG = 30.2672, -97.7431
+
+
+def _seed(db: Session):
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS offers (
+            id INTEGER PRIMARY KEY, merchant_id VARCHAR, title VARCHAR,
+            reward_cents INTEGER, active BOOLEAN, created_at DATETIME
+        )
+    """))
+    for i in range(5):
+        db.execute(
+            text("INSERT INTO merchants (id, name, category, lat, lng, is_corporate, created_at, updated_at) "
+                 "VALUES (:id, :name, 'coffee', :lat, :lng, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"),
+            {"id": f"disc_m_{i}", "name": f"Cafe {i}", "lat": LAT + 0.001 * (i + 1), "lng": LNG},
+        )
+        db.execute(
+            text("INSERT INTO chargers_openmap (id, lat, lng, name) VALUES (:id, :lat, :lng, :name)"),
+            {"id": f"disc_c_{i}", "lat": LAT, "lng": LNG + 0.0012 * (i + 1), "name": f"Charger {i}"},
+        )
+    # Far away: outside the radius
+    db.execute(text("INSERT INTO chargers_openmap (id, lat, lng, name) VALUES ('disc_far', 31.0, -97.0, 'Far')"))
+    db.execute(text("""
+        INSERT INTO offers (id, merchant_id, title, reward_cents, active, created_at) VALUES
+            (1, 'disc_m_0', 'Old offer', 100, 1, '2025-01-01 00:00:00'),
+            (2, 'disc_m_0', 'New offer', 250, 1, '2025-06-01 00:00:00'),
+            (3, 'disc_m_0', 'Inactive newest', 999, 0, '2025-12-01 00:00:00')
+    """))
+    db.flush()
+
+
+def test_keyset_pages_match_full_ranking(db: Session):
+    _seed(db)
+    kwargs = dict(lat=LAT, lng=LNG, radius_m=2000, categories=["merchant", "ev_charging"], fields=None, db=db)
+
+    full, next_cursor, total = search(limit=50, cursor=None, **kwargs)
+    assert next_cursor is None
+    assert total == 10
+    assert "charger:disc_far" not in [item["id"] for item in full]
+    distances = [item["distance_m"] for item in full]
+    assert distances == sorted(distances)
+
+    paged, cursor = [], None
+    while True:
+        page, cursor, page_total = search(limit=3, cursor=cursor, **kwargs)
+        assert page_total == 10
+        paged.extend(page)
+        if cursor is None:
+            break
+    assert [item["id"] for item in paged] == [item["id"] for item in full]
+
+
+def test_merchant_gets_latest_active_offer(db: Session):
+    _seed(db)
+    items, _, _ = search(
+        lat=LAT, lng=LNG, radius_m=2000, categories=["merchant"],
+        limit=10, cursor=None, fields=["id", "offer"], db=db,
+    )
+    offers = {item["id"]: item["offer"] for item in items}
+    assert offers["merchant:disc_m_0"] == {"title": "New offer", "est_reward_cents": 250}
+    assert offers["merchant:disc_m_1"] is None
@@ -0,0 +1,145 @@
+"""
+Tests for the concurrent vehicle telemetry sweep.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models_vehicle import VehicleAccount, VehicleTelemetry, VehicleToken
+from app.services.ev_telemetry import TelemetrySweeper, _RateBudget
+
+
+def _token(account_id: str, expires_in: timedelta) -> VehicleToken:
+    return VehicleToken(
+        id=str(uuid.uuid4()),
+        vehicle_account_id=account_id,
+        access_token="plain",
+        refresh_token="refresh",
+        expires_at=datetime.utcnow() + expires_in,
+    )
+
+
+def _accounts(db: Session, count: int, expiring=()):
+    accounts = [
+        VehicleAccount(id=str(uuid.uuid4()), user_id=1, provider="smartcar", provider_vehicle_id=f"v{i}")
+        for i in range(count)
+    ]
+    db.add_all(accounts)
+    db.flush()
+    for account in accounts:
+        expires_in = timedelta(minutes=1) if account.provider_vehicle_id in expiring else timedelta(hours=1)
+        db.add(_token(account.id, expires_in))
+    db.commit()
+    return accounts
+
+
+class _CountingBudget(_RateBudget):
+    def __init__(self):
+        super().__init__(1000)
+        self.spent = 0
+
+    async def acquire(self, cost: float = 1) -> None:
+        self.spent += cost
+        await super().acquire(cost)
+
+
+class _FakeSmartcar:
+    """Slow Smartcar stand-in that records how many vehicles are polled at once"""
+
+    def __init__(self, charging=(), failing=()):
+        self.charging, self.failing = set(charging), set(failing)
+        self.in_flight = self.max_in_flight = 0
+        self.polled = []
+        self.renewed = []
+
+    async def renew_token(self, account, latest_token):
+        self.renewed.append(account.provider_vehicle_id)
+        return _token(account.id, timedelta(hours=1))
+
+    async def charge(self, token, vehicle_id):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.02)
+        self.in_flight -= 1
+        self.polled.append(vehicle_id)
+        if vehicle_id in self.failing:
+            raise RuntimeError("smartcar timeout")
+        state = "CHARGING" if vehicle_id in self.charging else "NOT_CHARGING"
+        return {"stateOfCharge": {"value": 55}, "state": state}
+
+    async def location(self, token, vehicle_id):
+        return {"latitude": 30.27, "longitude": -97.74}
+
+    def patches(self):
+        return (
+            patch("app.services.ev_telemetry.renew_token", self.renew_token),
+            patch("app.services.ev_telemetry.get_vehicle_charge", self.charge),
+            patch("app.services.ev_telemetry.get_vehicle_location", self.location),
+        )
+
+
+@pytest.mark.asyncio
+async def test_sweep_polls_concurrently_and_survives_failures(db: Session):
+    _accounts(db, 12)
+    smartcar = _FakeSmartcar(failing={"v3"})
+    sweeper = TelemetrySweeper(concurrency=4, rate_per_second=1000)
+
+    refresh, charge, location = smartcar.patches()
+    with refresh, charge, location:
+        stored = await sweeper.sweep(db)
+
+    assert smartcar.max_in_flight == 4
+    assert len(stored) == 11 and sweeper.stats["failed"] == 1
+    assert db.query(VehicleTelemetry).count() == 11
+
+
+@pytest.mark.asyncio
+async def test_idle_vehicles_are_skipped_until_their_backoff_expires(db: Session):
+    accounts = _accounts(db, 3)
+    smartcar = _FakeSmartcar(charging={"v0"})
+    sweeper = TelemetrySweeper(concurrency=4, rate_per_second=1000, idle_backoff_seconds=300)
+
+    refresh, charge, location = smartcar.patches()
+    with refresh, charge, location:
+        await sweeper.sweep(db)
+        await sweeper.sweep(db)  # v1 and v2 unchanged: first idle observation
+        smartcar.polled.clear()
+        await sweeper.sweep(db)
+        # Charging vehicles are always polled
+        assert smartcar.polled == ["v0"]
+        assert sweeper.stats["skipped_idle"] == 2
+
+        for account in accounts:
+            sweeper._vehicles[str(account.id)].next_poll_at = 0.0
+        smartcar.polled.clear()
+        await sweeper.sweep(db)
+        assert sorted(smartcar.polled) == ["v0", "v1", "v2"]
+
+    # Still idle, so the next skip is twice as long
+    state = sweeper._vehicles[str(accounts[1].id)]
+    assert state.idle_streak == 2
+
+
+@pytest.mark.asyncio
+async def test_token_refreshes_are_budgeted_and_stored_after_the_polls(db: Session):
+    accounts = _accounts(db, 3, expiring={"v0", "v1"})
+    smartcar = _FakeSmartcar(failing={"v1"})
+    sweeper = TelemetrySweeper(concurrency=4, rate_per_second=1000)
+    budget = sweeper._budgets["smartcar"] = _CountingBudget()
+
+    refresh, charge, location = smartcar.patches()
+    with refresh, charge, location:
+        stored = await sweeper.sweep(db)
+
+    assert sorted(smartcar.renewed) == ["v0", "v1"]
+    # Two refreshes plus charge and location for each of the three vehicles
+    assert budget.spent == 2 + 3 * 2
+    assert len(stored) == 2
+    # The refreshed token is kept even though v1's poll then failed
+    for account in accounts[:2]:
+        assert db.query(VehicleToken).filter(VehicleToken.vehicle_account_id == account.id).count() == 2
+    assert db.query(VehicleToken).filter(VehicleToken.vehicle_account_id == accounts[2].id).count() == 1
@@ -0,0 +1,126 @@
+"""
+Tests for the consolidated exclusive activation lookup.
+"""
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import User
+from app.models.exclusive_session import ExclusiveSession, ExclusiveSessionStatus
+from app.models.session_event import SessionEvent
+from app.models.while_you_charge import Charger, Merchant
+from app.services.exclusive_resolver import ResidentDirectory, resolve_activation
+
+
+@contextmanager
+def count_statements(db: Session):
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    bind = db.connection()
+    event.listen(bind, "before_cursor_execute", _count)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", _count)
+
+
+@pytest.fixture
+def activation_data(db: Session):
+    driver = User(public_id=str(uuid.uuid4()), phone="+15550001111", auth_provider="phone", is_active=True)
+    db.add(driver)
+    db.add(Charger(id="res_ch_1", name="Resolver Charger", lat=30.2672, lng=-97.7431))
+    db.add(Merchant(id="res_m_1", name="Resolver Cafe", lat=30.268, lng=-97.744, place_id="ChIJres1"))
+    db.flush()
+    charging = SessionEvent(
+        id=uuid.uuid4(), driver_user_id=driver.id, charger_id="res_ch_1",
+        session_start=datetime.utcnow() - timedelta(minutes=5), source="demo",
+    )
+    active = ExclusiveSession(
+        id=str(uuid.uuid4()), driver_id=driver.id, merchant_id="res_m_1", charger_id="res_ch_1",
+        status=ExclusiveSessionStatus.ACTIVE, activated_at=datetime.now(timezone.utc),
+        expires_at=datetime.now(timezone.utc) + timedelta(minutes=60), idempotency_key="idem-res-1",
+    )
+    db.add_all([charging, active])
+    db.commit()
+    for obj in (driver, charging, active):
+        db.refresh(obj)
+    return driver, charging, active
+
+
+def test_cold_and_warm_lookups_are_one_round_trip(db: Session, activation_data):
+    driver, charging, active = activation_data
+    directory = ResidentDirectory(refresh_seconds=300)
+
+    with count_statements(db) as cold:
+        lookup = resolve_activation(
+            db, driver_id=driver.id, charger_id="res_ch_1", merchant_id="ChIJres1",
+            idempotency_key="idem-res-1", directory=directory,
+        )
+    assert len(cold) == 1
+    assert lookup.charger.name == "Resolver Charger"
+    # merchant_id given as a place_id still resolves to the WYC merchant
+    assert lookup.merchant.id == "res_m_1"
+    assert lookup.idempotent_session.id == active.id
+    assert lookup.active_session.id == active.id
+    assert str(lookup.charging_session_id) == str(charging.id)
+
+    # Warm: charger/merchant come from the resident maps, still one statement
+    with count_statements(db) as warm:
+        lookup = resolve_activation(
+            db, driver_id=driver.id, charger_id="res_ch_1", merchant_place_id="ChIJres1",
+            directory=directory,
+        )
+    assert len(warm) == 1
+    assert "chargers" not in warm[0] and "merchants" not in warm[0]
+    assert lookup.merchant.id == "res_m_1"
+    assert lookup.idempotent_session is None
+
+
+def test_unknown_charger_and_merchant(db: Session, activation_data):
+    driver, _, _ = activation_data
+    lookup = resolve_activation(
+        db, driver_id=driver.id, charger_id="nope", merchant_id="missing",
+        directory=ResidentDirectory(),
+    )
+    assert lookup.charger is None
+    assert lookup.merchant is None
+    assert lookup.active_session is not None
+
+
+def test_activate_endpoint_uses_resolved_merchant(client, db: Session):
+    from app.dependencies.driver import get_current_driver
+    from app.main_simple import app
+    from app.services.exclusive_resolver import resident_directory
+
+    resident_directory.invalidate()
+    driver = User(public_id=str(uuid.uuid4()), phone="+15550002222", auth_provider="phone", is_active=True)
+    db.add(driver)
+    db.add(Charger(id="res_ch_2", name="Endpoint Charger", lat=30.2672, lng=-97.7431))
+    db.add(Merchant(id="res_m_2", name="Endpoint Cafe", lat=30.268, lng=-97.744, place_id="ChIJres2"))
+    db.commit()
+    db.refresh(driver)
+    app.dependency_overrides[get_current_driver] = lambda: driver
+
+    body = {"merchant_place_id": "ChIJres2", "charger_id": "res_ch_2", "lat": 30.2672, "lng": -97.7431}
+    response = client.post("/v1/exclusive/activate", json=body, headers={"X-Idempotency-Key": "idem-ep-1"})
+    assert response.status_code == 200, response.text
+    session = response.json()["exclusive_session"]
+    assert session["merchant_id"] == "res_m_2"
+    assert session["verification_code"].startswith("ATX-ENDPOI-")
+
+    # Unknown charger: 404 straight from the lookup
+    other = User(public_id=str(uuid.uuid4()), phone="+15550003333", auth_provider="phone", is_active=True)
+    db.add(other)
+    db.commit()
+    db.refresh(other)
+    app.dependency_overrides[get_current_driver] = lambda: other
+    missing = client.post("/v1/exclusive/activate", json={**body, "charger_id": "res_missing"})
+    assert missing.status_code == 404
+    assert missing.json()["detail"]["error"] == "charger_not_found"
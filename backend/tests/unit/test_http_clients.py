@@ -0,0 +1,122 @@
+"""
+Tests for the pooled outbound HTTP client registry.
+"""
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services.http_clients import UpstreamClient, UpstreamConfig, UpstreamUnavailable
+
+
+def _upstream(name, handler, **config):
+    config.setdefault("retry_initial_delay", 0)
+    return UpstreamClient(name, UpstreamConfig(**config), transport=httpx.MockTransport(handler))
+
+
+def _sample(metric, **labels):
+    return REGISTRY.get_sample_value(metric, labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_client_is_shared_and_instrumented():
+    upstream = _upstream("test_shared", lambda request: httpx.Response(200, json={"ok": True}))
+    async with upstream.client() as first:
+        assert (await first.get("https://api.example.com/a")).json() == {"ok": True}
+    async with upstream.client() as second:
+        await second.get("https://api.example.com/b")
+    assert first is second and not first.is_closed
+
+    assert _sample("upstream_request_duration_seconds_count", upstream="test_shared") == 2
+    assert upstream.stats()["in_flight"] == 0
+    await upstream.aclose()
+    assert first.is_closed
+
+
+@pytest.mark.asyncio
+async def test_idempotent_requests_retry_server_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(503 if len(calls) == 1 else 200)
+
+    upstream = _upstream("test_retry", handler, retry_attempts=3)
+    async with upstream.client() as client:
+        assert (await client.get("https://api.example.com/")).status_code == 200
+        assert calls == ["GET", "GET"]
+
+        # POSTs are not replayed; the caller sees the upstream's 5xx
+        calls.clear()
+        calls.append("primed")
+        assert (await client.post("https://api.example.com/", json={})).status_code == 200
+        calls.clear()
+        assert (await client.post("https://api.example.com/", json={})).status_code == 503
+        assert calls == ["POST"]
+    await upstream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_per_host():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        if request.url.host == "down.example.com":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200)
+
+    upstream = _upstream("test_circuit", handler, retry_attempts=1, failure_threshold=2)
+    async with upstream.client() as client:
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await client.get("https://down.example.com/")
+        # Open: fails fast without contacting the host
+        with pytest.raises(UpstreamUnavailable):
+            await client.get("https://down.example.com/")
+        assert calls.count("down.example.com") == 2
+        # Other hosts behind the same upstream are unaffected
+        assert (await client.get("https://up.example.com/")).status_code == 200
+
+    assert upstream.stats()["open_circuits"] == ["down.example.com"]
+    assert _sample("upstream_request_errors_total", upstream="test_circuit", kind="connect") == 2
+    assert _sample("upstream_request_errors_total", upstream="test_circuit", kind="circuit_open") == 1
+    await upstream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_server_errors_do_not_open_the_circuit():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(500 if request.url.path == "/broken" else 200)
+
+    upstream = _upstream("test_5xx", handler, retry_attempts=1, failure_threshold=2)
+    async with upstream.client() as client:
+        for _ in range(3):
+            assert (await client.get("https://api.example.com/broken")).status_code == 500
+        # One failing endpoint doesn't take the host down for other callers
+        assert (await client.get("https://api.example.com/ok")).status_code == 200
+    assert calls.count("/broken") == 3
+    assert upstream.stats()["open_circuits"] == []
+    await upstream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_client_factory_is_injected():
+    opened = []
+
+    def factory(**kwargs):
+        opened.append(kwargs["timeout"])
+        return httpx.AsyncClient(**kwargs)
+
+    upstream = UpstreamClient(
+        "test_factory", UpstreamConfig(timeout=7.0),
+        transport=httpx.MockTransport(lambda request: httpx.Response(204)), client_factory=factory,
+    )
+    async with upstream.client() as client:
+        assert (await client.get("https://api.example.com/")).status_code == 204
+    async with upstream.client():
+        pass
+    assert opened == [7.0]
+    await upstream.aclose()
@@ -0,0 +1,107 @@
+"""
+Unit tests for the reward proof ledger (segments, side index, hash chain)
+"""
+import json
+from types import SimpleNamespace
+
+from app.services.ledger import LedgerService, _entry_hash
+
+
+def _event(event_id, user_id="driver_1", gross_cents=150):
+    return SimpleNamespace(
+        id=event_id,
+        user_id=user_id,
+        gross_cents=gross_cents,
+        net_cents=gross_cents - 15,
+        community_cents=15,
+        source="TEST",
+        meta={},
+    )
+
+
+def test_record_get_and_verify(tmp_path):
+    """Test proofs are retrievable by event id and verify against the chain"""
+    ledger = LedgerService(str(tmp_path / "ledger.jsonl"), fsync_policy="never")
+    first = ledger.record_reward_proof(_event(1))
+    ledger.record_reward_proofs([_event(2), _event(3)])
+
+    proof = ledger.get_proof(2)
+    assert proof["event_id"] == 2
+    assert ledger.get_proof(99) is None
+    assert ledger.verify_proof(first["proof_id"]) is True
+    assert ledger.verify_proof(proof["id"]) is True
+    assert proof["prev_hash"] == ledger.get_proof(1)["hash"]
+    assert ledger.verify_proof("proof_missing") is False
+
+
+def test_index_rebuilt_on_restart_and_chain_continues(tmp_path):
+    """Test a new instance rebuilds the index and keeps chaining from the tip"""
+    path = str(tmp_path / "ledger.jsonl")
+    ledger = LedgerService(path, fsync_policy="always")
+    ledger.record_reward_proofs([_event(1), _event(2)])
+    tip = ledger.stats()["chain_tip"]
+    ledger.close()
+
+    reopened = LedgerService(path, fsync_policy="always")
+    assert reopened.stats()["entries"] == 2
+    reopened.record_reward_proof(_event(3))
+    assert reopened.get_proof(3)["prev_hash"] == tip
+    assert reopened.audit()["ok"] is True
+
+
+def test_legacy_single_file_is_read_as_segment_zero(tmp_path):
+    """Test entries in the original ledger.jsonl (no prev_hash) stay readable and valid"""
+    path = tmp_path / "ledger.jsonl"
+    legacy = {
+        "id": "proof_7_1", "timestamp": "2025-11-24T13:16:10", "event_id": 7, "user_id": "u",
+        "gross_cents": 150, "net_cents": 135, "community_cents": 15, "source": "TEST", "meta": {},
+    }
+    legacy["hash"] = _entry_hash(legacy)
+    path.write_text(json.dumps(legacy) + "\n")
+
+    ledger = LedgerService(str(path), fsync_policy="never")
+    assert ledger.get_proof(7)["id"] == "proof_7_1"
+    assert ledger.verify_proof("proof_7_1") is True
+
+    ledger.record_reward_proof(_event(8))
+    assert ledger.get_proof(8)["prev_hash"] == legacy["hash"]
+    # Legacy file is never appended to
+    assert len(path.read_text().splitlines()) == 1
+    assert ledger.audit()["ok"] is True
+
+
+def test_segments_roll_over(tmp_path):
+    """Test appends move to a new segment once the active one is full"""
+    ledger = LedgerService(str(tmp_path / "ledger.jsonl"), segment_max_bytes=200, fsync_policy="never")
+    for i in range(5):
+        ledger.record_reward_proof(_event(i))
+
+    assert ledger.stats()["segments"] > 1
+    assert all(ledger.get_proof(i)["event_id"] == i for i in range(5))
+    assert ledger.audit(full=True) == {"ok": True, "checked": 5, "entries": 5, "first_invalid": None}
+
+
+def test_audit_is_incremental_and_detects_tampering(tmp_path):
+    """Test audit only re-checks new entries and flags a modified entry"""
+    path = str(tmp_path / "ledger.jsonl")
+    ledger = LedgerService(path, fsync_policy="never")
+    ledger.record_reward_proofs([_event(1), _event(2)])
+    assert ledger.audit()["checked"] == 2
+    ledger.record_reward_proof(_event(3))
+    assert ledger.audit()["checked"] == 1
+    ledger.close()
+
+    segment = ledger.segment_path(1)
+    with open(segment) as f:
+        lines = f.readlines()
+    tampered = json.loads(lines[1])
+    tampered["net_cents"] = 10_000
+    lines[1] = json.dumps(tampered) + "\n"
+    with open(segment, "w") as f:
+        f.writelines(lines)
+
+    reopened = LedgerService(path, fsync_policy="never")
+    assert reopened.verify_proof(tampered["id"]) is False
+    result = reopened.audit()
+    assert result["ok"] is False
+    assert result["first_invalid"] == tampered["id"]
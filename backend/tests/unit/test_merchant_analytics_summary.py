@@ -0,0 +1,136 @@
+"""
+Tests for merchant_summary / merchant_summaries verified-session proximity counts.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.models.while_you_charge import Merchant
+from app.services.merchant_analytics import merchant_summaries, merchant_summary
+
+LAT, LNG = 23.4567, -56.7891
+WINDOW = (datetime(2026, 3, 1), datetime(2026, 3, 31))
+
+
+@pytest.fixture
+def legacy_tables(db: Session):
+    # sessions and payments are legacy tables without models
+    db.execute(text("DROP TABLE IF EXISTS sessions"))
+    db.execute(text("DROP TABLE IF EXISTS payments"))
+    db.execute(text("""
+        CREATE TABLE sessions (
+            id TEXT PRIMARY KEY, status TEXT, lat REAL, lng REAL,
+            started_at DATETIME, verified_at DATETIME
+        )
+    """))
+    db.execute(text("""
+        CREATE TABLE payments (
+            id TEXT PRIMARY KEY, merchant_id TEXT, status TEXT, claimed INTEGER,
+            amount_cents INTEGER, created_at DATETIME
+        )
+    """))
+    db.commit()
+    yield db
+    db.execute(text("DROP TABLE IF EXISTS sessions"))
+    db.execute(text("DROP TABLE IF EXISTS payments"))
+    db.commit()
+
+
+def _merchant(db: Session, lat: float, lng: float) -> str:
+    merchant = Merchant(id=f"m_{uuid.uuid4().hex[:10]}", name="Shop", lat=lat, lng=lng)
+    db.add(merchant)
+    db.flush()
+    return merchant.id
+
+
+def _session(db: Session, lat: float, lng: float, verified_at: datetime, status: str = "verified"):
+    db.execute(text(
+        "INSERT INTO sessions (id, status, lat, lng, verified_at) VALUES (:id, :status, :lat, :lng, :at)"
+    ), {"id": uuid.uuid4().hex, "status": status, "lat": lat, "lng": lng, "at": verified_at})
+
+
+def _payment(db: Session, merchant_id: str, cents: int, created_at: datetime, claimed: int = 1):
+    db.execute(text(
+        "INSERT INTO payments (id, merchant_id, status, claimed, amount_cents, created_at)"
+        " VALUES (:id, :m, 'confirmed', :claimed, :cents, :at)"
+    ), {"id": uuid.uuid4().hex, "m": merchant_id, "claimed": claimed, "cents": cents, "at": created_at})
+
+
+def test_summary_counts_only_sessions_within_radius(legacy_tables: Session):
+    db = legacy_tables
+    shop = _merchant(db, LAT, LNG)
+    _session(db, LAT + 0.003, LNG, datetime(2026, 3, 2, 9))       # ~330m
+    _session(db, LAT, LNG + 0.004, datetime(2026, 3, 3, 9))       # ~410m
+    _session(db, LAT, LNG, datetime(2026, 3, 4, 17))
+    _session(db, LAT + 0.006, LNG, datetime(2026, 3, 5, 9))       # ~670m, outside
+    _session(db, LAT, LNG, datetime(2026, 3, 6, 9), status="started")
+    _session(db, LAT, LNG, datetime(2026, 4, 6, 9))               # outside window
+    _payment(db, shop, 500, datetime(2026, 3, 2))
+    _payment(db, shop, 300, datetime(2026, 3, 3), claimed=0)
+    db.commit()
+
+    summary = merchant_summary(db, shop, *WINDOW)
+    assert summary["verified_sessions"] == 3
+    assert summary["top_hours"] == {9: 2, 17: 1}
+    assert (summary["purchase_rewards"], summary["total_rewards_paid"]) == (1, 500)
+    assert len(summary["last_events"]) == 2
+
+    assert merchant_summary(db, "m_missing", *WINDOW)["error"] == "Merchant not found"
+
+
+def test_batch_summaries_match_single_merchant_summaries(legacy_tables: Session):
+    db = legacy_tables
+    a = _merchant(db, LAT, LNG)
+    b = _merchant(db, LAT + 0.004, LNG)        # ~445m from a: shares some sessions
+    c = _merchant(db, LAT + 1, LNG)            # far from everything
+    _session(db, LAT + 0.002, LNG, datetime(2026, 3, 2, 8))
+    _session(db, LAT - 0.002, LNG, datetime(2026, 3, 2, 12))
+    _session(db, LAT + 0.007, LNG, datetime(2026, 3, 2, 20))
+    for i in range(12):
+        _payment(db, a, 100 + i, datetime(2026, 3, 1) + timedelta(hours=i))
+    _payment(db, b, 250, datetime(2026, 3, 10))
+    db.commit()
+
+    batch = merchant_summaries(db, [a, b, c, "m_missing"], *WINDOW)
+    for merchant_id in (a, b, c):
+        assert batch[merchant_id] == merchant_summary(db, merchant_id, *WINDOW)
+    assert batch["m_missing"]["error"] == "Merchant not found"
+    assert batch[a]["verified_sessions"] == 2 and batch[b]["verified_sessions"] == 2
+    assert len(batch[a]["last_events"]) == 10
+
+    everyone = merchant_summaries(db, from_time=WINDOW[0], to_time=WINDOW[1])
+    assert everyone[a] == batch[a] and everyone[c] == batch[c]
+
+
+def test_batch_reads_only_nearby_sessions_and_requested_payments(legacy_tables: Session):
+    db = legacy_tables
+    a = _merchant(db, LAT, LNG)
+    c = _merchant(db, LAT + 1, LNG)
+    other = _merchant(db, LAT, LNG + 0.001)
+    _session(db, LAT + 0.5, LNG, datetime(2026, 3, 2, 8))  # between a and c, near neither
+    _payment(db, other, 900, datetime(2026, 3, 2))
+    db.commit()
+
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = db.get_bind().engine
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        batch = merchant_summaries(db, [a, c], *WINDOW)
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+
+    assert batch[a]["verified_sessions"] == batch[c]["verified_sessions"] == 0
+    session_reads = [params for sql, params in statements if "FROM sessions" in sql]
+    assert len(session_reads) == 2
+    # Each cluster's box stays around its own merchant, clear of the session between them
+    assert all(north - south < 0.02 for south, north, *_ in session_reads)
+    payment_reads = [params for sql, params in statements if "FROM payments" in sql]
+    assert len(payment_reads) == 2
+    assert all(other not in params and a in params and c in params for params in payment_reads)
@@ -0,0 +1,54 @@
+"""
+Tests for the intent-capture merchant cache write-behind and placement rule map.
+"""
+import uuid
+
+from sqlalchemy.orm import Session
+
+from app.models import MerchantCache, MerchantPlacementRule
+from app.services.merchant_cache_writer import MerchantCacheWriter
+from app.services.placement_rule_cache import placement_rule_cache
+
+
+def _merchant(place_id: str, name: str = "Cafe") -> dict:
+    return {"place_id": place_id, "name": name, "distance_m": 120, "photo_url": None}
+
+
+def test_unchanged_payloads_are_not_rewritten(db: Session):
+    writer = MerchantCacheWriter()
+
+    assert writer.submit([_merchant("p1"), _merchant("p2")], 30.267, -97.743) == 2
+    # Coalesced with the pending entry for p1
+    assert writer.submit([_merchant("p1")], 30.267, -97.743) == 1
+    assert writer.pending_count() == 2
+    assert writer.flush(db) == 2
+
+    rows = db.query(MerchantCache).filter(MerchantCache.place_id.in_(["p1", "p2"])).all()
+    assert len(rows) == 2
+    assert all(row.content_hash for row in rows)
+
+    # Same content again: dropped before reaching the database
+    assert writer.submit([_merchant("p1"), _merchant("p2")], 30.267, -97.743) == 0
+    assert writer.stats["skipped"] == 2
+
+    # Changed content is written in place
+    assert writer.submit([_merchant("p1", name="Cafe Renamed")], 30.267, -97.743) == 1
+    writer.flush(db)
+    row = db.query(MerchantCache).filter(MerchantCache.place_id == "p1").one()
+    assert row.merchant_data["name"] == "Cafe Renamed"
+
+
+def test_placement_rule_map_reloads_after_commit(db: Session):
+    placement_rule_cache.invalidate()
+    assert placement_rule_cache.get_many(db, ["rule_place"]) == {}
+
+    db.add(MerchantPlacementRule(
+        id=uuid.uuid4(), place_id="rule_place", status="ACTIVE",
+        daily_cap_cents=500, boost_weight=2.5, perks_enabled=True,
+    ))
+    db.commit()
+
+    rules = placement_rule_cache.get_many(db, ["rule_place", "other"])
+    assert list(rules) == ["rule_place"]
+    assert rules["rule_place"].boost_weight == 2.5
+    assert rules["rule_place"].perks_enabled is True
@@ -0,0 +1,121 @@
+"""
+Tests for batch hub and perk scoring in the ML ranker.
+"""
+import json
+import random
+
+import pytest
+
+from app.services import ml_ranker
+from app.services.db_user import get_prefs_dict, upsert_user_prefs
+from app.services.ml_ranker import (
+    RankerModel,
+    rank_candidates,
+    route_hub,
+    score_hub,
+    score_hubs,
+    score_perk,
+    score_perks,
+)
+
+
+@pytest.fixture(autouse=True)
+def _default_model():
+    ml_ranker.set_model(None)
+    yield
+    ml_ranker.set_model(None)
+
+
+def _hubs(n, rng):
+    return [
+        {"id": f"hub_{i}", "lat": 30.27 + rng.uniform(-0.3, 0.3), "lng": -97.74 + rng.uniform(-0.3, 0.3),
+         "total_ports": 4, "free_ports": rng.randint(0, 4)}
+        for i in range(n)
+    ]
+
+
+def test_batch_scores_match_single_scores_and_original_formula():
+    rng = random.Random(7)
+    hubs = _hubs(50, rng)
+    context = {"user_lat": 30.27, "user_lng": -97.74}
+    batch, features = score_hubs(hubs, "u1", context)
+    assert batch == [score_hub(hub, "u1", context) for hub in hubs]
+
+    # Without port counts, the original reward/merchant/social over distance-cost score
+    far = {"lat": 30.27, "lng": -97.74 + 0.5}
+    distance_km = ml_ranker.haversine_distance(30.27, -97.74, far["lat"], far["lng"])
+    assert score_hub(far, "u1", context) == pytest.approx(175 / max(1, distance_km * 0.1))
+
+    perks = [{"name": "Coffee & Pastry", "value_cents": 500}, {"name": "WiFi Access", "value_cents": 100}]
+    assert score_perks(perks, "u1", {"hour": 8}) == [130, 60]
+    assert score_perk(perks[0], "u1", {"hour": 12}) == 100
+
+
+def test_rank_candidates_returns_the_top_hubs_and_perks():
+    rng = random.Random(11)
+    hubs = _hubs(500, rng)
+    perks = [{"id": f"p{i}", "name": rng.choice(["Coffee", "Lunch", "Parking"]), "value_cents": rng.randint(0, 800)}
+             for i in range(200)]
+
+    result = rank_candidates("u1", 30.27, -97.74, hubs, perks, hub_limit=5, perk_limit=3)
+
+    scores, _ = score_hubs(hubs, "u1", {"user_lat": 30.27, "user_lng": -97.74})
+    assert [h["score"] for h in result["ranked_hubs"]] == sorted(scores, reverse=True)[:5]
+    assert len(result["ranked_perks"]) == 3
+    assert result["ranked_perks"][0]["score"] >= result["ranked_perks"][-1]["score"]
+    assert result["user_context"] == {"user_lat": 30.27, "user_lng": -97.74, "hour": 12}
+
+
+def test_perk_preferences_and_pluggable_weights(tmp_path):
+    prefs = {"pref_coffee": True, "pref_food": False}
+    weights = tmp_path / "weights.json"
+    weights.write_text(json.dumps({"perk_base": 10, "perk_pref_bonus": 100}))
+    model = RankerModel.from_file(str(weights))
+    ml_ranker.set_model(model)
+    perks = [{"name": "Free espresso"}, {"name": "Gym day pass"}]
+    assert score_perks(perks, "u1", {"prefs": prefs}) == [110, 10]
+
+    weights.write_text(json.dumps({"perk_bais": 1}))
+    with pytest.raises(ValueError):
+        RankerModel.from_file(str(weights))
+
+
+def test_recommend_routes_to_the_nearest_hub_weighted_by_free_ports(client):
+    # hub_domain_A (5.85 km, 3/12 free) beats hub_ut_quarters (6.9 km, 1/2 free)
+    response = client.get("/v1/recommend", params={"lat": 30.35, "lng": -97.735, "user_id": "route-test"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["id"] == "hub_domain_A"
+    assert body["distance_m"] == 5850
+    assert body["score"] == pytest.approx(body["distance_m"] * 1.15, abs=1)  # Lower is better
+    assert body["reason_tags"] == ["nearby", "3-ports-free"]
+
+    response = client.get("/v1/recommend", params={"lat": 30.29, "lng": -97.74, "user_id": "route-test"})
+    assert response.json()["id"] == "hub_ut_quarters"
+    assert response.json()["reason_tags"][0] == "closest"
+
+
+def test_route_hub_looks_up_places_only_for_hubs_a_preference_could_promote(monkeypatch):
+    km = 1 / 111.195  # Degrees of latitude per km
+    hubs = [
+        {"id": "near", "lat": 30 + 1.0 * km, "lng": -97.0, "total_ports": 4, "free_ports": 4},
+        {"id": "coffee", "lat": 30 + 1.04 * km, "lng": -97.0, "total_ports": 4, "free_ports": 4},
+        {"id": "far", "lat": 30 + 5.0 * km, "lng": -97.0, "total_ports": 4, "free_ports": 4},
+    ]
+    lookups = []
+
+    def search_nearby(lat, lng, radius_m):
+        lookups.append(round((lat - 30) / km, 2))
+        if round((lat - 30) / km, 2) == 1.04:
+            return [{"nerava_badge": "Coffee Shop", "pref_hits": {"pref_coffee": True}}]
+        return [{"nerava_badge": "Gym", "pref_hits": {"pref_exercise": True}}]
+
+    monkeypatch.setattr(ml_ranker, "search_nearby", search_nearby)
+    assert route_hub(30.0, -97.0, hubs, {"pref_coffee": False})["hub"]["id"] == "near"
+    assert lookups == []
+
+    upsert_user_prefs("route-prefs", {"pref_coffee": True})
+    best = route_hub(30.0, -97.0, hubs, get_prefs_dict("route-prefs"))
+    assert best["hub"]["id"] == "coffee"
+    assert best["reason_tags"] == ["nearby", "4-ports-free", "coffee-shop"]
+    assert sorted(lookups) == [1.0, 1.04]
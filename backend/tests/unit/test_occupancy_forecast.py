@@ -0,0 +1,126 @@
+"""
+Tests for occupancy forecast training and in-memory lookups.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.charger_availability import ChargerAvailabilitySnapshot, MonitoredStation
+from app.models.while_you_charge import Charger
+from app.routers import chargers as chargers_router
+from app.services import ml_ranker
+from app.services.charger_occupancy import accumulate_hour_of_week
+from app.services.occupancy_forecast import (
+    OccupancyForecastCache,
+    OccupancyForecastWorker,
+    train_occupancy_forecasts,
+)
+from app.workers import availability_collector
+
+NOW = datetime(2026, 3, 9, 0, 30)  # Monday
+
+
+def _history(db: Session, charger_id: str, occupancy, weeks: int = 4, now: datetime = NOW):
+    """Hourly snapshots over the past weeks; occupancy(ts) gives occupied ports out of 4."""
+    rows = []
+    ts = now - timedelta(weeks=weeks)
+    while ts < now:
+        occupied = occupancy(ts)
+        rows.append({
+            "id": str(uuid.uuid4()), "charger_id": charger_id, "source": "tomtom", "recorded_at": ts,
+            "total_ports": 4, "occupied_ports": occupied, "available_ports": 4 - occupied,
+        })
+        ts += timedelta(hours=1)
+    db.execute(insert(ChargerAvailabilitySnapshot), rows)
+    accumulate_hour_of_week(db, rows)
+    db.commit()
+
+
+def _trained_cache(db: Session) -> OccupancyForecastCache:
+    train_occupancy_forecasts(db, NOW)
+    db.commit()
+    cache = OccupancyForecastCache()
+    cache.load(db)
+    return cache
+
+
+def test_forecast_follows_the_weekly_pattern(db: Session):
+    # Busy on weekday mornings, empty otherwise
+    _history(db, "busy_mornings", lambda ts: 4 if ts.weekday() < 5 and 8 <= ts.hour < 11 else 0)
+    cache = _trained_cache(db)
+
+    assert cache.predicted_occupancy("busy_mornings", datetime(2026, 3, 10, 9, 45)) > 0.6
+    assert cache.predicted_occupancy("busy_mornings", datetime(2026, 3, 10, 3, 0)) < 0.1
+    assert cache.predicted_occupancy("busy_mornings", datetime(2026, 3, 14, 9, 0)) < 0.1  # Saturday
+    # Aware timestamps are converted to UTC
+    aware = datetime(2026, 3, 10, 3, 45, tzinfo=timezone(timedelta(hours=-6)))
+    assert cache.predicted_occupancy("busy_mornings", aware) > 0.6
+    assert cache.predicted_occupancy("unknown", NOW) is None
+
+
+def test_recent_shift_lifts_the_near_term_forecast_and_decays(db: Session):
+    steady = lambda ts: 1
+    _history(db, "steady", steady)
+    # Same history, but the last 6 hours ran full
+    _history(db, "surging", lambda ts: 4 if ts >= NOW - timedelta(hours=6) else 1)
+    cache = _trained_cache(db)
+
+    next_hour = NOW + timedelta(hours=1)
+    next_week = NOW + timedelta(days=6)
+    assert cache.predicted_occupancy("surging", next_hour) > cache.predicted_occupancy("steady", next_hour) + 0.2
+    assert abs(cache.predicted_occupancy("surging", next_week) - cache.predicted_occupancy("steady", next_week)) < 0.05
+
+
+def test_worker_retrains_only_when_stale_and_feeds_the_ranker(db: Session, monkeypatch):
+    _history(db, "c1", lambda ts: 4)
+    cache = OccupancyForecastCache()
+    worker = OccupancyForecastWorker(
+        train_interval_seconds=3600, cache=cache,
+        session_factory=sessionmaker(bind=db.get_bind(), join_transaction_mode="create_savepoint"),
+    )
+    assert worker.refresh(NOW) == 1
+    worker.refresh(NOW + timedelta(minutes=30))
+    assert worker.stats == {"trained": 1, "loaded": 2}
+    worker.refresh(NOW + timedelta(hours=2))
+    assert worker.stats["trained"] == 2
+
+    hub = {"id": "hub_1", "members": ["c1"], "lat": 30.0, "lng": -97.0}
+    context = {"user_lat": 30.0, "user_lng": -97.0, "ts": NOW}
+    unforecast = ml_ranker.score_hub(hub, "u1", context)
+    monkeypatch.setattr(ml_ranker, "occupancy_forecasts", cache)
+    assert ml_ranker.score_hub(hub, "u1", context) < unforecast * 0.6
+
+
+@pytest.mark.asyncio
+async def test_linked_station_forecasts_reach_charger_discovery(db: Session, client, monkeypatch):
+    db.add(Charger(id="nrel_forecast_1", name="Forecast Garage", lat=30.4, lng=-97.72, address="11505 Domain Dr"))
+    db.add(MonitoredStation(
+        station_id="tomtom_forecast_1", charger_id="nrel_forecast_1", name="ChargePoint @ 11505 Domain Dr",
+        tomtom_availability_id="avail-forecast",
+    ))
+    db.commit()
+
+    async def fetch(avail_id):
+        return {"connectors": [{"total": 4, "availability": {"current": {"available": 1, "occupied": 3}}}]}
+
+    monkeypatch.setattr(availability_collector, "TOMTOM_API_KEY", "test")
+    monkeypatch.setattr(availability_collector, "_fetch_availability", fetch)
+    await availability_collector._collect_once(
+        sessionmaker(bind=db.get_bind(), join_transaction_mode="create_savepoint")
+    )
+    assert db.query(ChargerAvailabilitySnapshot).filter_by(charger_id="nrel_forecast_1").count() == 1
+
+    train_occupancy_forecasts(db, datetime.utcnow() + timedelta(seconds=1))
+    db.commit()
+    cache = OccupancyForecastCache()
+    cache.load(db)
+    monkeypatch.setattr(chargers_router, "occupancy_forecasts", cache)
+
+    response = client.get("/v1/chargers/discovery", params={"lat": 30.4, "lng": -97.72, "radius_km": 5})
+    assert response.status_code == 200
+    (charger,) = response.json()["chargers"]
+    assert charger["id"] == "nrel_forecast_1"
+    assert abs(charger["predicted_occupancy"] - 0.75) < 0.01
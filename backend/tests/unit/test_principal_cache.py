@@ -0,0 +1,84 @@
+"""
+Tests for the authenticated-principal cache behind the driver/user dependencies.
+"""
+import uuid
+
+import pytest
+from fastapi import HTTPException, Request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.security import create_access_token
+from app.dependencies.domain import get_current_user
+from app.dependencies.driver import get_current_driver, get_current_driver_id
+from app.models import User
+from app.services.principal_cache import principal_cache
+
+
+def _request() -> Request:
+    return Request({"type": "http", "headers": [], "query_string": b""})
+
+
+@pytest.fixture
+def user_queries(db: Session):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", count)
+
+
+def _driver(db: Session) -> User:
+    user = User(public_id=str(uuid.uuid4()), email=f"{uuid.uuid4().hex[:8]}@example.com",
+                role_flags="driver", is_active=True)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_one_user_lookup_per_request_once_cached(db: Session, user_queries):
+    user = _driver(db)
+    token = create_access_token(user.public_id)
+    assert get_current_driver_id(_request(), token, db) == user.id
+
+    # A later request: fresh session state, principal served from cache
+    db.expunge_all()
+    user_queries.clear()
+    driver_id = get_current_driver_id(_request(), token, db)
+    driver = get_current_driver(driver_id, db)
+    same = get_current_user(user.public_id, db)
+    assert driver is same and driver.id == user.id
+    assert len(user_queries) == 1
+
+
+def test_committed_identity_changes_invalidate(db: Session):
+    user = _driver(db)
+    old_public_id = user.public_id
+    assert principal_cache.get(db, old_public_id).user_id == user.id
+
+    user.public_id = str(uuid.uuid4())
+    db.flush()
+    # Not visible until the change commits
+    assert principal_cache.get(db, old_public_id).user_id == user.id
+    db.commit()
+    assert principal_cache.get(db, old_public_id) is None
+    assert principal_cache.get(db, user.public_id).user_id == user.id
+
+    # Status is checked on the row, not cached
+    token = create_access_token(user.public_id)
+    user.is_active = False
+    db.commit()
+    with pytest.raises(HTTPException) as exc:
+        get_current_driver(get_current_driver_id(_request(), token, db), db)
+    assert exc.value.status_code == 403
+
+    db.delete(user)
+    db.commit()
+    with pytest.raises(HTTPException) as exc:
+        get_current_driver_id(_request(), token, db)
+    assert exc.value.status_code == 401
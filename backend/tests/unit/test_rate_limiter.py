@@ -0,0 +1,86 @@
+"""
+Tests for the sliding-window rate limiter and the middleware's limit lookup.
+"""
+import asyncio
+import math
+
+import pytest
+
+from app.middleware.ratelimit import RateLimitMiddleware
+from app.security.ratelimit_redis import SlidingWindowLimiter
+
+WINDOW_START = 1_800_000_000 - 1_800_000_000 % 60
+
+
+class _FakeScript:
+    """Executes SLIDING_WINDOW_SCRIPT's logic against a dict, like one shared Redis"""
+
+    def __init__(self, store: dict):
+        self.store = store
+        self.calls = 0
+
+    async def __call__(self, keys, args):
+        self.calls += 1
+        limit, weight, want = args[0], args[1], args[2]
+        used = self.store.get(keys[0], 0) + math.floor(self.store.get(keys[1], 0) * weight / 1_000_000)
+        free = limit - used
+        if free <= 0:
+            return [0, used]
+        grant = min(1 if free * 2 < limit else want, free)
+        self.store[keys[0]] = self.store.get(keys[0], 0) + grant
+        return [grant, used + grant]
+
+
+def _redis_limiter(store: dict) -> SlidingWindowLimiter:
+    limiter = SlidingWindowLimiter()
+    limiter._redis = (asyncio.get_running_loop(), None, _FakeScript(store))
+    return limiter
+
+
+@pytest.mark.asyncio
+async def test_window_boundary_does_not_double_the_limit():
+    limiter = SlidingWindowLimiter()
+    limiter._redis_retry_at = float("inf")  # In-memory
+
+    end_of_window = WINDOW_START + 59
+    assert all([(await limiter.hit("k", 10, now=end_of_window)).allowed for _ in range(10)])
+    assert not (await limiter.hit("k", 10, now=end_of_window)).allowed
+    # A fixed window would admit another 10 just after the boundary
+    admitted = [(await limiter.hit("k", 10, now=end_of_window + 2)).allowed for _ in range(10)]
+    assert admitted.count(True) == 1
+    # Half a window on, half of the previous window still counts
+    admitted = [(await limiter.hit("k", 10, now=end_of_window + 31)).allowed for _ in range(10)]
+    assert admitted.count(True) == 4
+
+
+@pytest.mark.asyncio
+async def test_batched_grants_never_over_admit_across_workers():
+    store = {}
+    workers = [_redis_limiter(store), _redis_limiter(store)]
+
+    admitted = 0
+    for i in range(300):
+        decision = await workers[i % 2].hit("rl:{v1:x:ip:1}", 120, now=WINDOW_START + i * 0.1)
+        admitted += decision.allowed
+    assert admitted == 120
+
+    redis_calls = sum(worker._redis[2].calls for worker in workers)
+    local_hits = sum(worker.stats["local"] for worker in workers)
+    # Well under the limit, most requests are served from locally held slots
+    assert local_hits > 50 and redis_calls + local_hits == 300
+
+
+def test_compiled_prefix_lookup_matches_linear_scan():
+    middleware = RateLimitMiddleware(None, requests_per_minute=120)
+
+    def scan(path):
+        if path in middleware.ENDPOINT_LIMITS:
+            return middleware.ENDPOINT_LIMITS[path]
+        for prefix, limit in middleware.ENDPOINT_LIMITS.items():
+            if path.startswith(prefix):
+                return limit
+        return 120
+
+    paths = [p + suffix for p in middleware.ENDPOINT_LIMITS for suffix in ("", "/x", "x")]
+    paths += ["/v1/auth", "/v1/chargers/discovery", "/", "/v1/drivers/location"]
+    assert [middleware._get_limit_for_path(p) for p in paths] == [scan(p) for p in paths]
@@ -0,0 +1,77 @@
+"""
+Tests for selector/verifier refresh tokens and transparent migration of legacy tokens.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.core.security import generate_refresh_token, hash_refresh_token
+from app.models import RefreshToken, User
+from app.services.refresh_token_service import RefreshTokenService
+
+
+def _user(db: Session) -> User:
+    user = User(public_id=str(uuid.uuid4()), email=f"{uuid.uuid4().hex[:8]}@example.com", is_active=True)
+    db.add(user)
+    db.flush()
+    return user
+
+
+def _legacy_token(db: Session, user: User, expires_in=timedelta(days=1)) -> str:
+    plain = generate_refresh_token()
+    db.add(RefreshToken(
+        id=str(uuid.uuid4()), user_id=user.id, token_hash=hash_refresh_token(plain),
+        expires_at=datetime.utcnow() + expires_in, revoked=False,
+    ))
+    db.flush()
+    return plain
+
+
+def test_selector_token_lookup_and_rotation(db: Session):
+    user = _user(db)
+    plain, token = RefreshTokenService.create_refresh_token(db, user)
+    selector, verifier = plain.split(".")
+    assert token.selector == selector and verifier not in token.token_hash
+
+    assert RefreshTokenService.validate_refresh_token(db, plain).id == token.id
+    # Right selector, wrong verifier
+    assert RefreshTokenService.validate_refresh_token(db, f"{selector}.{generate_refresh_token()}") is None
+    assert RefreshTokenService.validate_refresh_token(db, f"unknown.{verifier}") is None
+
+    new_plain, new_token = RefreshTokenService.rotate_refresh_token(db, token)
+    assert RefreshTokenService.validate_refresh_token(db, new_plain).id == new_token.id
+    # The rotated-out token is still found, revoked, so reuse can be detected
+    reused = RefreshTokenService.validate_refresh_token(db, plain)
+    assert reused.revoked and reused.replaced_by == new_token.id
+
+    token.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    new_token.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.flush()
+    assert RefreshTokenService.validate_refresh_token(db, new_plain) is None
+
+
+def test_legacy_tokens_validate_and_rotate_into_selector_tokens(db: Session):
+    user = _user(db)
+    plain = _legacy_token(db, user)
+    expired = _legacy_token(db, user, expires_in=timedelta(days=-1))
+
+    legacy = RefreshTokenService.validate_refresh_token(db, plain)
+    assert legacy is not None and legacy.selector is None
+    assert RefreshTokenService.validate_refresh_token(db, expired) is None
+
+    new_plain, new_token = RefreshTokenService.rotate_refresh_token(db, legacy)
+    assert new_token.selector and "." in new_plain
+    assert RefreshTokenService.validate_refresh_token(db, plain) is None
+
+
+def test_revoke_all_user_tokens_covers_both_formats(db: Session):
+    user, other = _user(db), _user(db)
+    legacy_plain = _legacy_token(db, user)
+    plain, _ = RefreshTokenService.create_refresh_token(db, user)
+    other_plain, _ = RefreshTokenService.create_refresh_token(db, other)
+
+    RefreshTokenService.revoke_all_user_tokens(db, user.id)
+    assert RefreshTokenService.validate_refresh_token(db, plain).revoked
+    assert RefreshTokenService.validate_refresh_token(db, legacy_plain) is None
+    assert not RefreshTokenService.validate_refresh_token(db, other_plain).revoked
@@ -0,0 +1,85 @@
+"""
+Tests for the synthetic performance-test data generator.
+"""
+from collections import Counter
+from dataclasses import replace
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.charger_stats import ChargerSessionStats
+from app.models.domain import NovaTransaction
+from app.models.driver_wallet import DriverWallet
+from app.models.session_event import IncentiveGrant, SessionEvent
+from app.models.wallet_timeline import WalletTimelineEvent
+from app.models.while_you_charge import Charger
+from scripts.generate_synthetic_data import (
+    SCALES,
+    campaign_rows,
+    generate,
+    generate_chargers,
+    merchant_rows,
+    purge,
+    session_rows,
+)
+
+CONFIG = replace(SCALES["small"], chargers=120, drivers=200, sessions=3000, days=30, end_date=date(2026, 3, 31))
+
+
+def _sessions(config):
+    chargers = generate_chargers(config)
+    return [s for s, _, _ in session_rows(config, chargers, list(range(1, config.drivers + 1)), campaign_rows(config))]
+
+
+def test_generation_is_deterministic_and_skewed():
+    first, again = _sessions(CONFIG), _sessions(CONFIG)
+    assert first == again
+    assert _sessions(replace(CONFIG, seed=7)) != first
+
+    # Growing the session count leaves the geography untouched
+    assert generate_chargers(replace(CONFIG, sessions=10)) == generate_chargers(CONFIG)
+
+    # Power-law activity: the busiest 10% of drivers take a large share
+    per_driver = Counter(s["driver_user_id"] for s in first)
+    top = sum(count for _, count in per_driver.most_common(CONFIG.drivers // 10))
+    assert top / len(first) > 0.4
+    # Every session starts inside the window, mostly ended
+    assert all(date(2026, 3, 1) <= s["session_start"].date() <= date(2026, 3, 31) for s in first)
+    assert sum(s["session_end"] is None for s in first) < len(first) * 0.05
+
+
+def test_bulk_load_and_purge(db: Session):
+    counts = generate(db, CONFIG)
+    assert counts["chargers"] == CONFIG.chargers
+    assert counts["merchants"] == counts["charger_merchants"] == len(list(merchant_rows(CONFIG, generate_chargers(CONFIG))))
+    assert counts["session_events"] == CONFIG.sessions
+    assert 0 < counts["incentive_grants"] == counts["nova_transactions"] < CONFIG.sessions
+    assert db.scalar(select(func.count()).select_from(IncentiveGrant).where(
+        IncentiveGrant.idempotency_key.like("syn_%"))) == counts["incentive_grants"]
+
+    # Derived per-charger stats were reconciled after the bulk insert
+    busiest = db.execute(
+        select(SessionEvent.charger_id, func.count()).where(SessionEvent.charger_id.like("syn_%"))
+        .group_by(SessionEvent.charger_id).order_by(func.count().desc()).limit(1)
+    ).one()
+    stats = db.get(ChargerSessionStats, busiest[0])
+    assert stats.completed_sessions + stats.open_sessions == busiest[1]
+
+    # Wallets and the timeline feed match the bulk-inserted driver_earn transactions
+    driver_id, earned, grants = db.execute(
+        select(NovaTransaction.driver_user_id, func.sum(NovaTransaction.amount), func.count())
+        .where(NovaTransaction.idempotency_key.like("syn_%"))
+        .group_by(NovaTransaction.driver_user_id).limit(1)
+    ).one()
+    wallet = db.query(DriverWallet).filter(DriverWallet.driver_id == driver_id).one()
+    assert wallet.nova_balance == wallet.energy_reputation_score == earned
+    assert db.scalar(select(func.count()).select_from(WalletTimelineEvent).where(
+        WalletTimelineEvent.driver_user_id == driver_id)) == grants
+    assert db.scalar(select(func.count()).select_from(WalletTimelineEvent)) >= counts["nova_transactions"]
+
+    removed = purge(db)
+    assert removed["session_events"] == CONFIG.sessions and removed["chargers"] == CONFIG.chargers
+    assert removed["wallet_timeline_events"] == counts["nova_transactions"]
+    assert removed["driver_wallets"] > 0
+    assert db.scalar(select(func.count()).select_from(Charger).where(Charger.id.like("syn_%"))) == 0
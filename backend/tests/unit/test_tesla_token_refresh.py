@@ -0,0 +1,125 @@
+"""
+Tests for single-flight Tesla token refresh and the proactive refresher.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.token_encryption import decrypt_token, encrypt_token
+from app.models.tesla_connection import TeslaConnection
+from app.services import tesla_oauth
+from app.services.tesla_oauth import get_valid_access_token
+from app.workers.tesla_token_refresher import TeslaTokenRefresher
+
+
+def _connection(db: Session, expires_in=timedelta(minutes=-1), **fields) -> TeslaConnection:
+    connection = TeslaConnection(
+        user_id=1, access_token=encrypt_token("old_access"), refresh_token=encrypt_token("old_refresh"),
+        token_expires_at=datetime.utcnow() + expires_in, is_active=True, **fields,
+    )
+    db.add(connection)
+    db.commit()
+    return connection
+
+
+def _service(calls: list) -> MagicMock:
+    async def refresh(refresh_token):
+        calls.append(refresh_token)
+        await asyncio.sleep(0.01)
+        return {"access_token": f"access_{len(calls)}", "refresh_token": f"refresh_{len(calls)}", "expires_in": 3600}
+
+    service = MagicMock()
+    service.refresh_access_token = AsyncMock(side_effect=refresh)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_refresh(db: Session):
+    connection = _connection(db)
+    calls = []
+
+    tokens = await asyncio.gather(*(
+        get_valid_access_token(db, connection, _service(calls)) for _ in range(5)
+    ))
+
+    assert calls == ["old_refresh"]
+    assert tokens == ["access_1"] * 5
+    assert decrypt_token(connection.refresh_token) == "refresh_1"
+    assert connection.refresh_lease_owner is None and connection.refresh_lease_until is None
+
+
+@pytest.mark.asyncio
+async def test_waits_for_the_lease_holder_in_another_worker(db: Session, monkeypatch):
+    monkeypatch.setattr(tesla_oauth, "_LEASE_POLL_SECONDS", 0.01)
+    connection = _connection(
+        db, refresh_lease_owner="other-host:1", refresh_lease_until=datetime.utcnow() + timedelta(seconds=30),
+    )
+    calls = []
+    waiter = asyncio.create_task(get_valid_access_token(db, connection, _service(calls)))
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    # The other worker finishes its refresh and releases the lease
+    db.execute(update(TeslaConnection).where(TeslaConnection.id == connection.id).values(
+        access_token=encrypt_token("their_access"), token_expires_at=datetime.utcnow() + timedelta(hours=1),
+        refresh_lease_owner=None, refresh_lease_until=None,
+    ))
+    db.commit()
+
+    assert await asyncio.wait_for(waiter, 1) == "their_access"
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_refresher_renews_active_connections_ahead_of_expiry(db: Session):
+    due = _connection(db, expires_in=timedelta(minutes=10), telemetry_enabled=True)
+    idle = _connection(db, expires_in=timedelta(minutes=10))
+    fresh = _connection(db, expires_in=timedelta(hours=2), last_used_at=datetime.utcnow())
+    refresher = TeslaTokenRefresher(
+        ahead_seconds=900,
+        session_factory=sessionmaker(bind=db.get_bind(), join_transaction_mode="create_savepoint"),
+    )
+    assert refresher.due_connection_ids(db) == [due.id]
+
+    calls = []
+    with patch("app.services.tesla_oauth.get_tesla_oauth_service", return_value=_service(calls)):
+        assert await refresher.refresh_due() == 1
+
+    db.expire_all()
+    assert decrypt_token(db.get(TeslaConnection, due.id).access_token) == "access_1"
+    assert decrypt_token(db.get(TeslaConnection, idle.id).access_token) == "old_access"
+    assert decrypt_token(db.get(TeslaConnection, fresh.id).access_token) == "old_access"
+    # The request-path margin is 5 minutes, so nothing is left for callers to refresh
+    assert await get_valid_access_token(db, db.get(TeslaConnection, due.id), _service(calls)) == "access_1"
+    assert calls == ["old_refresh"]
+
+
+@pytest.mark.asyncio
+async def test_failing_connections_do_not_hold_the_front_of_the_batch(db: Session, monkeypatch):
+    monkeypatch.setattr("app.workers.tesla_token_refresher.BATCH_SIZE", 1)
+    broken = _connection(db, expires_in=timedelta(days=-3), telemetry_enabled=True)
+    stale = _connection(db, expires_in=timedelta(hours=-1), telemetry_enabled=True)
+    upcoming = _connection(db, expires_in=timedelta(minutes=10), telemetry_enabled=True)
+    refresher = TeslaTokenRefresher(
+        ahead_seconds=900,
+        session_factory=sessionmaker(bind=db.get_bind(), join_transaction_mode="create_savepoint"),
+    )
+    # Tokens about to expire go ahead of ones that already have
+    assert refresher.due_connection_ids(db) == [upcoming.id]
+
+    upcoming.token_expires_at = datetime.utcnow() + timedelta(hours=2)
+    db.commit()
+    failing = MagicMock()
+    failing.refresh_access_token = AsyncMock(side_effect=RuntimeError("invalid_grant"))
+    with patch("app.services.tesla_oauth.get_tesla_oauth_service", return_value=failing):
+        assert await refresher.refresh_due() == 0
+    assert refresher.stats["failed"] == 1
+
+    # The connection that just failed backs off and the next one gets its turn
+    assert refresher.due_connection_ids(db) == [stale.id]
+    assert broken.id not in refresher.due_connection_ids(db, now=datetime.utcnow() + timedelta(seconds=60))
+    assert refresher.due_connection_ids(db, now=datetime.utcnow() + timedelta(days=1)) == [broken.id]
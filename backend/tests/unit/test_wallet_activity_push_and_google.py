@@ -63,11 +63,87 @@ def test_mark_wallet_activity_triggers_google_update(monkeypatch, db: Session, t
     assert called["count"] == 1
 
 
+def test_mark_wallet_activity_schedules_push_when_scheduler_running(monkeypatch, db: Session, test_user):
+    """With the scheduler running, activity is queued instead of pushed inline."""
+    from app.services import apple_pass_push
 
+    scheduler = apple_pass_push.PassUpdateScheduler(debounce_seconds=10, max_delay_seconds=60)
+    scheduler.running = True
 
+    def fail_send(db_arg, wallet_arg):
+        raise AssertionError("inline push should not be sent")
+
+    monkeypatch.setenv("APPLE_PASS_PUSH_ENABLED", "true")
+    monkeypatch.setattr("app.services.wallet_activity.pass_update_scheduler", scheduler)
+    monkeypatch.setattr("app.services.wallet_activity.send_updates_for_wallet", fail_send)
+
+    mark_wallet_activity(db, test_user.id)
+    mark_wallet_activity(db, test_user.id)
+
+    assert scheduler.pending_count() == 1
+    assert scheduler.stats["coalesced"] == 1
+
+
+def test_pass_update_scheduler_debounce_and_max_delay():
+    """Drivers become due after the quiet window, or after max delay under steady activity."""
+    from app.services.apple_pass_push import PassUpdateScheduler
+
+    scheduler = PassUpdateScheduler(debounce_seconds=10, max_delay_seconds=30)
+    scheduler.schedule(1, now=0)
+    scheduler.schedule(1, now=5)
+    scheduler.schedule(2, now=0)
+    for t in range(5, 40, 5):
+        scheduler.schedule(2, now=t)
+
+    assert scheduler.pop_due(now=12) == []
+    assert scheduler.pop_due(now=15) == [1]
+    # Driver 2 keeps generating activity but is capped by max delay
+    assert scheduler.pop_due(now=30) == [2]
+    assert scheduler.pending_count() == 0
 
 
+def test_send_updates_for_drivers_records_outcomes(monkeypatch, db: Session, test_user):
+    """One batch covers all drivers; dead tokens are deactivated and outcomes stored."""
+    import uuid
 
+    from app.models.domain import ApplePassRegistration
+    from app.services.apple_pass_push import send_updates_for_drivers
 
+    wallet = DriverWallet(user_id=test_user.id, nova_balance=0, energy_reputation_score=0)
+    db.add(wallet)
+    db.flush()
+    for device, token in (("dev-a", "token-ok"), ("dev-b", "token-dead")):
+        db.add(ApplePassRegistration(
+            id=uuid.uuid4(),
+            driver_wallet_id=test_user.id,
+            device_library_identifier=device,
+            push_token=token,
+            pass_type_identifier="pass.com.nerava.wallet",
+            serial_number="serial-1",
+            is_active=True,
+        ))
+    db.commit()
+
+    batches = []
+
+    def fake_send_push_batch(tokens):
+        tokens = list(tokens)
+        batches.append(tokens)
+        return {"token-ok": "Success", "token-dead": "Unregistered"}
+
+    monkeypatch.setenv("APPLE_PASS_PUSH_ENABLED", "true")
+    monkeypatch.setattr("app.services.apple_pass_push.send_push_batch", fake_send_push_batch)
+
+    send_updates_for_drivers(db, [test_user.id, test_user.id])
+    db.commit()
 
+    assert len(batches) == 1
+    assert sorted(batches[0]) == ["token-dead", "token-ok"]
 
+    regs = {r.push_token: r for r in db.query(ApplePassRegistration).all()}
+    assert regs["token-ok"].last_push_status == "Success"
+    assert regs["token-ok"].push_failure_count == 0
+    assert regs["token-ok"].is_active is True
+    assert regs["token-dead"].last_push_status == "Unregistered"
+    assert regs["token-dead"].push_failure_count == 1
+    assert regs["token-dead"].is_active is False
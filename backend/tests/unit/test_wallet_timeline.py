@@ -208,3 +208,61 @@ def test_timeline_limit(db: Session, test_user):
     
     timeline = get_wallet_timeline(db, driver_user_id=test_user.id, limit=5)
     assert len(timeline) == 5
+
+
+def test_timeline_keyset_pagination(db: Session, test_user, test_merchant):
+    """Test that cursor pages cover the feed exactly once, in order"""
+    from app.services.wallet_timeline import get_wallet_timeline_page
+
+    wallet = DriverWallet(user_id=test_user.id, nova_balance=0, energy_reputation_score=0)
+    db.add(wallet)
+    db.flush()
+
+    base_time = datetime.utcnow()
+    for i in range(7):
+        db.add(NovaTransaction(
+            id=str(uuid.uuid4()),
+            type="driver_earn",
+            driver_user_id=test_user.id,
+            amount=100 + i,
+            created_at=base_time - timedelta(minutes=i)
+        ))
+    # Same timestamp as the newest earn: SPENT sorts first
+    db.add(MerchantRedemption(
+        id=str(uuid.uuid4()),
+        merchant_id=test_merchant.id,
+        driver_user_id=test_user.id,
+        order_total_cents=500,
+        discount_cents=50,
+        nova_spent_cents=50,
+        created_at=base_time
+    ))
+    db.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = get_wallet_timeline_page(db, test_user.id, limit=3, cursor=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert len(seen) == 8
+    assert len({e["id"] for e in seen}) == 8
+    assert seen[0]["type"] == "SPENT"
+    assert [e["amount_cents"] for e in seen[1:]] == [100, 101, 102, 103, 104, 105, 106]
+
+
+def test_grant_many_appends_timeline(db: Session, test_user):
+    """Test bulk grants (which bypass the ORM flush) still feed the timeline"""
+    from app.services.nova_service import NovaService
+
+    NovaService.grant_many(db, [
+        {"driver_id": test_user.id, "amount": 300, "type": "driver_earn", "idempotency_key": "tl_bulk_1"},
+        {"driver_id": test_user.id, "amount": 5, "type": "admin_grant", "idempotency_key": "tl_bulk_2"},
+    ])
+
+    timeline = get_wallet_timeline(db, driver_user_id=test_user.id, limit=20)
+    assert len(timeline) == 1
+    assert timeline[0]["type"] == "EARNED"
+    assert timeline[0]["amount_cents"] == 300
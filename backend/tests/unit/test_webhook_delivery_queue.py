@@ -0,0 +1,147 @@
+"""
+Tests for the durable partner webhook queue and its dispatcher.
+"""
+import hashlib
+import hmac
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.partner import Partner, PartnerWebhookDeadLetter, PartnerWebhookDelivery
+from app.services import webhook_delivery_service
+from app.services.http_clients import HTTPClientRegistry, UpstreamClient, UpstreamConfig
+from app.services.webhook_delivery_service import WebhookDeliveryService, WebhookDispatcher
+
+
+def _partner(db: Session, slug: str, **fields) -> Partner:
+    partner = Partner(
+        id=str(uuid.uuid4()), name=slug, slug=slug, partner_type="driver_app", status="active",
+        webhook_url=f"https://{slug}.example.com/hooks", webhook_secret="s3cret", webhook_enabled=True,
+        **fields,
+    )
+    db.add(partner)
+    db.commit()
+    return partner
+
+
+def _dispatcher(db: Session, monkeypatch, handler, **kwargs) -> WebhookDispatcher:
+    registry = HTTPClientRegistry({})
+    registry._clients["webhooks"] = UpstreamClient(
+        "test_webhooks", UpstreamConfig(retry_attempts=1), transport=httpx.MockTransport(handler),
+    )
+    monkeypatch.setattr(webhook_delivery_service, "http_clients", registry)
+    # One lane at a time: every test session shares the fixture's connection
+    return WebhookDispatcher(
+        concurrency=1, session_factory=sessionmaker(bind=db.get_bind(), join_transaction_mode="create_savepoint"), **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_lanes_deliver_in_order_and_batch(db: Session, monkeypatch):
+    single = _partner(db, "single")
+    batched = _partner(db, "batched", webhook_batch_size=3)
+    received = []
+
+    def handler(request):
+        body = request.content
+        signature = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+        assert request.headers["X-Nerava-Signature"] == f"sha256={signature}"
+        received.append((request.url.host, request.headers["X-Nerava-Event"], json.loads(body)))
+        return httpx.Response(200)
+
+    dispatcher = _dispatcher(db, monkeypatch, handler)
+    for n in range(4):
+        WebhookDeliveryService.enqueue(db, single, "partner.session.resolved", {"n": n})
+        WebhookDeliveryService.enqueue(db, batched, "partner.session.resolved", {"n": n})
+    db.commit()
+
+    assert await dispatcher.dispatch_due() == 8
+
+    single_posts = [(event, body) for host, event, body in received if host == "single.example.com"]
+    assert [body["data"]["n"] for _, body in single_posts] == [0, 1, 2, 3]
+    assert {event for event, _ in single_posts} == {"partner.session.resolved"}
+
+    batched_posts = [(event, body) for host, event, body in received if host == "batched.example.com"]
+    assert [event for event, _ in batched_posts] == ["batch", "partner.session.resolved"]
+    assert [e["data"]["n"] for e in batched_posts[0][1]["events"]] == [0, 1, 2]
+    assert batched_posts[1][1]["data"]["n"] == 3
+
+    assert db.query(PartnerWebhookDelivery).filter_by(status="pending").count() == 0
+
+
+@pytest.mark.asyncio
+async def test_failures_back_off_block_the_lane_and_dead_letter(db: Session, monkeypatch):
+    partner = _partner(db, "flaky")
+    sent, status = [], {"code": 503}
+
+    def handler(request):
+        sent.append(json.loads(request.content)["data"]["n"])
+        return httpx.Response(status["code"])
+
+    dispatcher = _dispatcher(db, monkeypatch, handler, max_attempts=2)
+    first = WebhookDeliveryService.enqueue(db, partner, "partner.session.resolved", {"n": 0})
+    WebhookDeliveryService.enqueue(db, partner, "partner.session.resolved", {"n": 1})
+    db.commit()
+
+    assert await dispatcher.dispatch_due() == 0
+    # The head failed; the event behind it waits instead of overtaking
+    assert sent == [0]
+    head = db.query(PartnerWebhookDelivery).filter_by(event_id=first).one()
+    assert head.attempts == 1 and head.last_status_code == 503
+    assert head.next_attempt_at > datetime.utcnow() + timedelta(seconds=4)
+    assert await dispatcher.dispatch_due() == 0 and sent == [0]
+
+    # Due again: the second failure exhausts its attempts
+    db.query(PartnerWebhookDelivery).update({"next_attempt_at": datetime.utcnow()})
+    db.commit()
+    await dispatcher.dispatch_due()
+    assert sent == [0, 0, 1]
+    letter = db.query(PartnerWebhookDeadLetter).filter_by(event_id=first).one()
+    assert letter.attempts == 2 and letter.last_status_code == 503
+    assert db.query(PartnerWebhookDelivery).filter_by(event_id=first).count() == 0
+    db.expunge(head)  # SQLite may reuse its id
+
+    # Replay re-queues the event under its original id
+    db.query(PartnerWebhookDelivery).update({"next_attempt_at": datetime.utcnow()})
+    db.commit()
+    await dispatcher.dispatch_due()
+    assert dispatcher.replay_dead_letters(db, partner.id) == 2
+    db.commit()
+    status["code"] = 204
+    assert await dispatcher.dispatch_due() == 2
+    replayed = db.query(PartnerWebhookDelivery).filter_by(event_id=first).one()
+    assert replayed.status == "delivered"
+    assert db.query(PartnerWebhookDeadLetter).filter(PartnerWebhookDeadLetter.replayed_at.is_(None)).count() == 0
+
+
+def test_partner_sessions_queue_events_in_their_transaction(db: Session):
+    from app.services.partner_session_service import PartnerSessionService
+
+    partner = _partner(db, "txn", trust_tier=2)
+    start = datetime.utcnow() - timedelta(hours=1)
+    PartnerSessionService.ingest_session(
+        db, partner=partner, partner_session_id="charging-1", partner_driver_id="d1",
+        status="charging", session_start=start,
+    )
+    assert db.query(PartnerWebhookDelivery).count() == 0
+
+    PartnerSessionService.update_session(
+        db, partner=partner, partner_session_id="charging-1", status="completed", session_end=datetime.utcnow(),
+    )
+    PartnerSessionService.ingest_session(
+        db, partner=partner, partner_session_id="done-1", partner_driver_id="d1",
+        status="completed", session_start=start, session_end=datetime.utcnow(),
+    )
+    # Completing an already completed session queues nothing more
+    PartnerSessionService.update_session(db, partner=partner, partner_session_id="done-1", status="completed")
+
+    rows = db.query(PartnerWebhookDelivery).order_by(PartnerWebhookDelivery.id).all()
+    assert [(row.event_type, json.loads(row.body)["data"]["partner_session_id"]) for row in rows] == [
+        ("partner.session.resolved", "charging-1"),
+        ("partner.session.resolved", "done-1"),
+    ]
+    assert json.loads(rows[0].body)["data"]["status"] == "completed"
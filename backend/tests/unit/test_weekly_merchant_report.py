@@ -0,0 +1,122 @@
+"""
+Tests for the weekly merchant report: batched report data and resumable delivery.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models import User
+from app.models.domain import DomainMerchant
+from app.models.session_event import SessionEvent
+from app.models.weekly_report import WeeklyReportDelivery, WeeklyReportRun
+from app.models.while_you_charge import Charger
+from app.workers.weekly_merchant_report import WeeklyMerchantReportWorker, build_reports
+
+# Somewhere no other fixture puts chargers
+LAT, LNG = 12.3456, -45.6789
+
+
+def _merchant(db: Session, name: str, lat: float, lng: float) -> DomainMerchant:
+    owner = User(public_id=str(uuid.uuid4()), email=f"{uuid.uuid4().hex[:8]}@example.com", is_active=True)
+    db.add(owner)
+    db.flush()
+    merchant = DomainMerchant(
+        id=str(uuid.uuid4()), name=name, lat=lat, lng=lng, status="active",
+        zone_slug="test", owner_user_id=owner.id,
+    )
+    db.add(merchant)
+    db.flush()
+    return merchant
+
+
+def _charger(db: Session, lat: float, lng: float) -> Charger:
+    charger = Charger(id=f"ch_{uuid.uuid4().hex[:10]}", name="Test charger", lat=lat, lng=lng)
+    db.add(charger)
+    db.flush()
+    return charger
+
+
+def _sessions(db: Session, charger: Charger, start: datetime, count: int):
+    driver = User(public_id=str(uuid.uuid4()), email=f"{uuid.uuid4().hex[:8]}@example.com", is_active=True)
+    db.add(driver)
+    db.flush()
+    for i in range(count):
+        db.add(SessionEvent(
+            id=str(uuid.uuid4()), driver_user_id=driver.id, charger_id=charger.id,
+            session_start=start + timedelta(minutes=i), session_end=start + timedelta(minutes=i + 30),
+        ))
+    db.flush()
+
+
+class _FlakySender:
+    def __init__(self, fail_for=()):
+        self.fail_for = set(fail_for)
+        self.sent = []
+
+    def send_email(self, to_email, subject, body_text, body_html=None):
+        if to_email in self.fail_for:
+            raise RuntimeError("SMTP unavailable")
+        self.sent.append(to_email)
+        return True
+
+
+def test_build_reports_counts_nearby_chargers_per_week(db: Session):
+    window_end = datetime(2026, 1, 5, 8)
+    near = _charger(db, LAT + 0.001, LNG)       # ~110m
+    far = _charger(db, LAT + 0.01, LNG)         # ~1.1km
+    merchant = _merchant(db, "Cafe", LAT, LNG)
+    _merchant(db, "Nowhere", LAT + 1, LNG)      # no chargers in range
+    _sessions(db, near, window_end - timedelta(days=2), 3)
+    _sessions(db, near, window_end - timedelta(days=9), 5)
+    _sessions(db, far, window_end - timedelta(days=2), 7)
+    db.commit()
+
+    reports = {r.merchant_id: r for r in build_reports(db, window_end)}
+    mine = [r for r in reports.values() if r.merchant_name in ("Cafe", "Nowhere")]
+    assert [r.merchant_name for r in mine] == ["Cafe"]
+    report = reports[str(merchant.id)]
+    assert (report.this_total, report.last_total) == (3, 5)
+
+    assert str(merchant.id) not in {
+        r.merchant_id for r in build_reports(db, window_end, exclude_merchant_ids=[str(merchant.id)])
+    }
+
+
+def test_interrupted_run_resumes_and_skips_sent_merchants(db: Session):
+    first = _merchant(db, "First", LAT, LNG)
+    second = _merchant(db, "Second", LAT, LNG + 0.002)
+    _charger(db, LAT, LNG + 0.001)
+    db.commit()
+    first_email = db.get(User, first.owner_user_id).email
+    second_email = db.get(User, second.owner_user_id).email
+
+    worker = WeeklyMerchantReportWorker(concurrency=1, session_factory=sessionmaker(
+        bind=db.get_bind(), join_transaction_mode="create_savepoint",
+    ))
+    key = "2026-W01"
+
+    flaky = _FlakySender(fail_for=[second_email])
+    with patch("app.core.email_sender.get_email_sender", return_value=flaky):
+        assert asyncio.run(worker._send_all_reports(key)) is False
+    assert first_email in flaky.sent and second_email not in flaky.sent
+    assert db.get(WeeklyReportRun, key).completed_at is None
+
+    healthy = _FlakySender()
+    with patch("app.core.email_sender.get_email_sender", return_value=healthy):
+        assert asyncio.run(worker._send_all_reports(key)) is True
+    # Only the failed merchant is retried
+    assert second_email in healthy.sent and first_email not in healthy.sent
+
+    db.expire_all()
+    delivery = db.get(WeeklyReportDelivery, (key, str(second.id)))
+    assert (delivery.status, delivery.attempts) == ("sent", 2)
+    assert db.get(WeeklyReportRun, key).completed_at is not None
+
+    # A completed run is not repeated
+    again = _FlakySender()
+    with patch("app.core.email_sender.get_email_sender", return_value=again):
+        assert asyncio.run(worker._send_all_reports(key)) is True
+    assert again.sent == []